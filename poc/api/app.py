@@ -1,10 +1,22 @@
 import logging
+import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from api.middleware.middleware import APIMiddleware
+from api.db.db_manager import init_database_manager, close_database_manager
+from api.db.conversation_cache import get_conversation_cache
+from api.utils.template_registry import get_template_registry
+from api.utils.template_actions import run_report_job
+from api.services.report_queue import init_report_job_queue, close_report_job_queue
+from api.finance.pdf_pool import close_pdf_render_pool
+from api.finance.snapshot import get_snapshot_cache
+from api.finance.llm_gateway import get_insight_gateway
+from api.finance.report_stages import get_report_stage_profile
+from api.services.report_storage import get_report_storage, close_report_storage
+from api.services.retention import init_retention_sweeper, close_retention_sweeper
 from api.routes import twilio
 from api.utils import logger_config
 
@@ -16,9 +28,41 @@ logger.setLevel(logging.INFO)
 async def lifespan(app: FastAPI):
     # Startup code
     logger.info("API starting up")
+    # One engine and connection pool shared by every request
+    app.state.db_manager = init_database_manager()
+    app.state.conversation_cache = get_conversation_cache()
+    # A user's report data is loaded once and shared by the reports they request in a session
+    app.state.snapshot_cache = get_snapshot_cache()
+    # AI insights are cached per report data and generated off the event loop
+    app.state.insight_gateway = get_insight_gateway()
+    # Parse and compile the translation templates once instead of per message
+    app.state.template_registry = get_template_registry()
+    # Report generation runs on background workers so webhooks reply immediately
+    app.state.report_queue = None
+    if os.getenv('REPORT_QUEUE_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+        app.state.report_queue = init_report_job_queue(app.state.db_manager, runner=run_report_job)
+        await app.state.report_queue.start()
+    # Expired report PDFs are deleted from storage on a schedule
+    app.state.retention_sweeper = None
+    if os.getenv('REPORT_RETENTION_ENABLED', 'false').lower() in ('1', 'true', 'yes'):
+        app.state.retention_sweeper = init_retention_sweeper(get_report_storage())
+        app.state.retention_sweeper.start()
     yield
     # Shutdown code
     logger.info("API shutting down")
+    logger.info(f"Conversation cache stats: {app.state.conversation_cache.stats()}")
+    logger.info(f"Financial snapshot cache stats: {app.state.snapshot_cache.stats()}")
+    logger.info(f"AI insight gateway stats: {app.state.insight_gateway.stats()}")
+    logger.info(f"Report stage timings: {get_report_stage_profile().stats()}")
+    if app.state.report_queue is not None:
+        logger.info(f"Report queue stats: {app.state.report_queue.stats()}")
+    if app.state.retention_sweeper is not None:
+        logger.info(f"Retention sweeper stats: {app.state.retention_sweeper.stats()}")
+    await close_retention_sweeper()
+    await close_report_job_queue()
+    close_pdf_render_pool()
+    close_report_storage()
+    await close_database_manager()
 
 
 app = FastAPI(
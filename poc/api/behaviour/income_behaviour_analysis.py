@@ -1,6 +1,10 @@
+import calendar
+import numpy as np
 import pandas as pd
 from typing import Dict, List
 from api.db.models.tables import UnverifiedIncomes
+from api.utils.categories import income_source_category
+
 
 class IncomeBehaviouralInsights:
 
@@ -18,17 +22,11 @@ class IncomeBehaviouralInsights:
         
         print(f"DEBUG: Total incomes received: {len(incomes)}")
         
-        # Filter data with feelings
-        income_feelings = [inc for inc in incomes if inc.income_feeling]
+        # Filter data with feelings, in one frame the three analyses below share
+        income_feelings = self.income_feelings_frame(incomes)
         print(f"DEBUG: Incomes with feelings: {len(income_feelings)}")
         
-        # Debug what feelings we have
-        if income_feelings:
-            feelings_list = [inc.income_feeling for inc in income_feelings]
-            print(f"DEBUG: Feelings found: {feelings_list}")
-            amounts_list = [inc.income_amount for inc in income_feelings]
-            print(f"DEBUG: Income amounts: {amounts_list}")
-        else:
+        if income_feelings.empty:
             print("DEBUG: No income feelings found!")
             return {"has_data": False}
         
@@ -63,43 +61,58 @@ class IncomeBehaviouralInsights:
             "behavior_change_recommendations": self.generate_behavior_change_actions(insights)
         }
 
-    def find_income_amount_triggers(self, income_feelings: List[UnverifiedIncomes]):
+    def income_feelings_frame(self, incomes: List[UnverifiedIncomes]) -> pd.DataFrame:
+        """
+        One row per income with a feeling: amount, feeling score, day of month, weekday and source category.
+
+        weekday and source are categoricals whose categories are in order of first appearance,
+        so ties between equal averages resolve to the same value as walking the rows would.
+        """
+        rows = [inc for inc in incomes if inc.income_feeling]
+        dates = pd.DatetimeIndex([inc.income_date for inc in rows])
+        weekday_codes, weekdays = pd.factorize(dates.dayofweek.to_numpy())
+        type_codes, income_types = pd.factorize(np.array([inc.income_type for inc in rows], dtype=object))
+        # A handful of distinct types, each categorised once by the shared classifier
+        type_sources = [income_source_category(income_type) for income_type in income_types]
+        source_codes, sources = pd.factorize(np.array(type_sources, dtype=object))
+        
+        return pd.DataFrame({
+            "amount": np.array([inc.income_amount for inc in rows], dtype=float),
+            "score": np.array([self.feeling_scores.get(inc.income_feeling, 0) for inc in rows], dtype=np.int64),
+            "day": dates.day.to_numpy(),
+            "weekday": pd.Categorical.from_codes(weekday_codes, categories=[calendar.day_name[day] for day in weekdays]),
+            "source": pd.Categorical.from_codes(source_codes[type_codes], categories=sources),
+        })
+
+    @staticmethod
+    def _score_averages(frame: pd.DataFrame, column: str, min_count: int) -> pd.Series:
+        """Average feeling score per category of a column, in order of first appearance, for categories seen min_count times"""
+        codes = frame[column].cat.codes.to_numpy()
+        categories = frame[column].cat.categories
+        counts = np.bincount(codes, minlength=len(categories))
+        sums = np.bincount(codes, weights=frame["score"].to_numpy(), minlength=len(categories))
+        kept = counts >= min_count
+        return pd.Series(sums[kept] / counts[kept], index=categories[kept])
+
+    def find_income_amount_triggers(self, income_feelings: pd.DataFrame):
         """Find specific income amounts that trigger different behaviors"""
         insights = []
         
-        # Group by income ranges and analyze feelings
-        income_ranges = {
-            'low': [],      # Bottom 33%
-            'medium': [],   # Middle 33%
-            'high': []      # Top 33%
-        }
+        # Bottom and top thirds, split at the amounts a third and two thirds of the way through the sorted amounts
+        amounts = income_feelings["amount"].to_numpy()
+        scores = income_feelings["score"].to_numpy()
+        low_index, high_index = len(amounts) // 3, 2 * len(amounts) // 3
+        thresholds = np.partition(amounts, [low_index, high_index])
+        low_threshold = float(thresholds[low_index])
+        high_threshold = float(thresholds[high_index])
         
-        amounts = [inc.income_amount for inc in income_feelings]
-        amounts.sort()
-        
-        low_threshold = amounts[len(amounts)//3]
-        high_threshold = amounts[2*len(amounts)//3]
-        
-        for inc in income_feelings:
-            feeling_score = self.feeling_scores.get(inc.income_feeling, 0)
-            
-            if inc.income_amount <= low_threshold:
-                income_ranges['low'].append(feeling_score)
-            elif inc.income_amount >= high_threshold:
-                income_ranges['high'].append(feeling_score)
-            else:
-                income_ranges['medium'].append(feeling_score)
-        
-        # Calculate averages
-        avg_feelings = {}
-        for range_name, scores in income_ranges.items():
-            if scores:
-                avg_feelings[range_name] = sum(scores) / len(scores)
+        low = amounts <= low_threshold
+        high = ~low & (amounts >= high_threshold)
         
         # Generate actionable insights
-        if 'low' in avg_feelings and 'high' in avg_feelings:
-            low_avg = avg_feelings['low']
-            high_avg = avg_feelings['high']
+        if low.any() and high.any():
+            low_avg = scores[low].mean()
+            high_avg = scores[high].mean()
             
             if high_avg - low_avg > 1.0:  # Significant difference
                 insights.append({
@@ -110,9 +123,9 @@ class IncomeBehaviouralInsights:
                 })
         
         # Find the "confidence threshold"
-        confident_incomes = [inc for inc in income_feelings if self.feeling_scores.get(inc.income_feeling, 0) >= 1.0]
-        if confident_incomes:
-            min_confident_amount = min(inc.income_amount for inc in confident_incomes)
+        confident = scores >= 1
+        if confident.any():
+            min_confident_amount = float(amounts[confident].min())
             insights.append({
                 "type": "confidence_threshold",
                 "insight": f"You start feeling confident about income at around R{min_confident_amount:,.0f}",
@@ -122,30 +135,20 @@ class IncomeBehaviouralInsights:
         
         return insights
     
-    def find_timing_behavior_patterns(self, income_feelings: List[UnverifiedIncomes]):
+    def find_timing_behavior_patterns(self, income_feelings: pd.DataFrame):
         """Find when during the month/week users feel different about income"""
         insights = []
         
-        # Month timing analysis
-        early_month = []  # Days 1-10
-        mid_month = []    # Days 11-20
-        late_month = []   # Days 21-31
-        
-        for inc in income_feelings:
-            day = inc.income_date.day
-            feeling_score = self.feeling_scores.get(inc.income_feeling, 0)
-            
-            if day <= 10:
-                early_month.append(feeling_score)
-            elif day <= 20:
-                mid_month.append(feeling_score)
-            else:
-                late_month.append(feeling_score)
+        # Month timing analysis: days 1-10 against days 21-31
+        days = income_feelings["day"].to_numpy()
+        scores = income_feelings["score"].to_numpy()
+        early_month = scores[days <= 10]
+        late_month = scores[days > 20]
         
         # Calculate averages
-        if early_month and late_month:
-            early_avg = sum(early_month) / len(early_month)
-            late_avg = sum(late_month) / len(late_month)
+        if early_month.size and late_month.size:
+            early_avg = early_month.mean()
+            late_avg = late_month.mean()
             
             if early_avg - late_avg > 0.5:  # Feel better early month
                 insights.append({
@@ -162,22 +165,12 @@ class IncomeBehaviouralInsights:
                     "specific_action": "In the last week of each month, spend 30 minutes planning how to increase next month's income"
                 })
         
-        # Day of week analysis
-        weekday_feelings = {}
-        for inc in income_feelings:
-            day_name = inc.income_date.strftime('%A')
-            feeling_score = self.feeling_scores.get(inc.income_feeling, 0)
-            
-            if day_name not in weekday_feelings:
-                weekday_feelings[day_name] = []
-            weekday_feelings[day_name].append(feeling_score)
-        
-        # Find best and worst days
-        day_averages = {day: sum(scores)/len(scores) for day, scores in weekday_feelings.items() if len(scores) >= 2}
+        # Day of week analysis: best and worst days
+        day_averages = self._score_averages(income_feelings, "weekday", min_count=2)
         
-        if day_averages:
-            best_day = max(day_averages, key=day_averages.get)
-            worst_day = min(day_averages, key=day_averages.get)
+        if not day_averages.empty:
+            best_day = day_averages.idxmax()
+            worst_day = day_averages.idxmin()
             
             if day_averages[best_day] - day_averages[worst_day] > 0.5:
                 insights.append({
@@ -189,36 +182,16 @@ class IncomeBehaviouralInsights:
         
         return insights
     
-    def find_income_source_behavior_patterns(self, income_feelings: List[UnverifiedIncomes]):
+    def find_income_source_behavior_patterns(self, income_feelings: pd.DataFrame):
         """Find which income sources trigger different feelings and behaviors"""
         insights = []
         
-        # Group by income source
-        source_feelings = {}
-        for inc in income_feelings:
-            source = inc.income_type.lower()
-            feeling_score = self.feeling_scores.get(inc.income_feeling, 0)
-            
-            # Categorize sources
-            if 'grant' in source or 'sassa' in source:
-                category = 'government_grants'
-            elif 'employment' in source or 'salary' in source or 'wage' in source:
-                category = 'employment'
-            elif 'informal' in source or 'piece' in source or 'casual' in source:
-                category = 'informal_work'
-            else:
-                category = 'other'
-            
-            if category not in source_feelings:
-                source_feelings[category] = []
-            source_feelings[category].append(feeling_score)
-        
-        # Calculate averages and find patterns
-        source_averages = {source: sum(scores)/len(scores) for source, scores in source_feelings.items() if len(scores) >= 2}
+        # Average feeling per source category
+        source_averages = self._score_averages(income_feelings, "source", min_count=2)
         
         if len(source_averages) >= 2:
-            best_source = max(source_averages, key=source_averages.get)
-            worst_source = min(source_averages, key=source_averages.get)
+            best_source = source_averages.idxmax()
+            worst_source = source_averages.idxmin()
             
             if source_averages[best_source] - source_averages[worst_source] > 0.5:
                 insights.append({
@@ -0,0 +1,189 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from api.db.models.tables import User, MessageState, LanguagePreference
+from api.db.query_manager import AsyncQueries
+
+load_dotenv()
+
+logger = logging.getLogger("conversation-cache")
+logger.setLevel(logging.INFO)
+
+ConversationContext = Tuple[Optional[User], Optional[MessageState], Optional[LanguagePreference]]
+
+
+class ConversationStateCache:
+    """
+    Bounded LRU/TTL cache of conversation state keyed by phone number.
+
+    Sits in front of AsyncQueries for User, MessageState and LanguagePreference so that an
+    active chat is answered from memory. State transitions are written through: the database
+    is updated first and the cached entry is only changed once the write succeeds. The TTL
+    bounds how long a process can serve state written by another process.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of conversations kept. Defaults to CONVERSATION_CACHE_MAX_ENTRIES or 10000.
+            ttl_seconds (float): Seconds an entry stays valid. Defaults to CONVERSATION_CACHE_TTL_SECONDS or 900.
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('CONVERSATION_CACHE_MAX_ENTRIES', 10000))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('CONVERSATION_CACHE_TTL_SECONDS', 900))
+
+        self._entries: "OrderedDict[str, Tuple[float, ConversationContext]]" = OrderedDict()
+        self._phone_by_user_id: Dict[int, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.skipped_writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, phone_number: str) -> Optional[ConversationContext]:
+        """Return the cached context for a phone number, or None on a miss."""
+        entry = self._entries.get(phone_number)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, context = entry
+        if expires_at <= time.monotonic():
+            self._remove(phone_number)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(phone_number)
+        self.hits += 1
+        return context
+
+    def put(self, phone_number: str, context: ConversationContext) -> bool:
+        """Store a fully loaded context. Unknown users and partial contexts are not cached."""
+        user, message_state, language_preference = context
+        if not self.enabled or user is None or message_state is None or language_preference is None:
+            return False
+
+        self._entries[phone_number] = (time.monotonic() + self.ttl_seconds, context)
+        self._entries.move_to_end(phone_number)
+        self._phone_by_user_id[user.id] = phone_number
+
+        while len(self._entries) > self.max_entries:
+            oldest_phone, _ = next(iter(self._entries.items()))
+            self._remove(oldest_phone)
+            self.evictions += 1
+
+        return True
+
+    def invalidate(self, phone_number: str) -> None:
+        """Drop a conversation from the cache."""
+        self._remove(phone_number)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop a conversation from the cache by user id."""
+        phone_number = self._phone_by_user_id.get(user_id)
+        if phone_number is not None:
+            self._remove(phone_number)
+
+    def apply_transition(self, user_id: int, current_state: Optional[str] = None, previous_state: Optional[str] = None, language: Optional[str] = None) -> None:
+        """Update the cached copy after the same change has been persisted."""
+        phone_number = self._phone_by_user_id.get(user_id)
+        entry = self._entries.get(phone_number) if phone_number is not None else None
+        if entry is None:
+            return
+
+        _, message_state, language_preference = entry[1]
+        if current_state:
+            message_state.current_state = current_state
+        if previous_state:
+            message_state.previous_state = previous_state
+        if language:
+            language_preference.preferred_language = language
+
+    async def load(self, query_manager: AsyncQueries, phone_number: str) -> ConversationContext:
+        """Get the conversation context from memory, falling back to a single database query."""
+        context = self.get(phone_number)
+        if context is not None:
+            return context
+
+        context = await query_manager.load_conversation_context(phone_number=phone_number)
+        if self.put(phone_number, context):
+            # Detach the cached rows so a rollback of this request's session cannot expire them
+            for obj in context:
+                query_manager.session.expunge(obj)
+        return context
+
+    async def save_transition(self, query_manager: AsyncQueries, user_id: int, current_state: str, previous_state: Optional[str] = None, language: Optional[str] = None) -> None:
+        """Write through a conversation step, skipping the database when nothing changed."""
+        if self._is_unchanged(user_id, current_state, previous_state, language):
+            self.skipped_writes += 1
+            return
+
+        await query_manager.save_conversation_transition(
+            user_id=user_id,
+            current_state=current_state,
+            previous_state=previous_state,
+            language=language
+        )
+        self.apply_transition(user_id, current_state=current_state, previous_state=previous_state, language=language)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss/eviction counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "skipped_writes": self.skipped_writes,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._phone_by_user_id.clear()
+
+    def _is_unchanged(self, user_id: int, current_state: str, previous_state: Optional[str], language: Optional[str]) -> bool:
+        phone_number = self._phone_by_user_id.get(user_id)
+        entry = self._entries.get(phone_number) if phone_number is not None else None
+        if entry is None or entry[0] <= time.monotonic():
+            return False
+
+        _, message_state, language_preference = entry[1]
+        return (
+            message_state.current_state == current_state
+            and (not previous_state or message_state.previous_state == previous_state)
+            and (not language or language_preference.preferred_language == language)
+        )
+
+    def _remove(self, phone_number: str) -> None:
+        entry = self._entries.pop(phone_number, None)
+        if entry is not None:
+            user = entry[1][0]
+            if self._phone_by_user_id.get(user.id) == phone_number:
+                del self._phone_by_user_id[user.id]
+
+
+# Process-wide cache shared by the webhook routes and template actions
+_conversation_cache: Optional[ConversationStateCache] = None
+
+
+def get_conversation_cache() -> ConversationStateCache:
+    """Return the process-wide conversation state cache, creating it on first use."""
+    global _conversation_cache
+    if _conversation_cache is None:
+        _conversation_cache = ConversationStateCache()
+        logger.info(f"Conversation cache created (max_entries={_conversation_cache.max_entries}, ttl={_conversation_cache.ttl_seconds}s)")
+    return _conversation_cache
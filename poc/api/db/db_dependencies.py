@@ -0,0 +1,10 @@
+from fastapi import Request
+from api.db.db_manager import DatabaseManager
+from api.db.conversation_cache import ConversationStateCache
+
+def get_db_manager(request: Request) -> DatabaseManager:
+    return request.app.state.db_manager
+
+
+def get_conversation_state_cache(request: Request) -> ConversationStateCache:
+    return request.app.state.conversation_cache
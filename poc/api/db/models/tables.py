@@ -1,11 +1,21 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Boolean
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 
+from api.utils.categories import record_category
+
 Base = declarative_base()
 
 
+def _category_of(type_column: str):
+    """Column default filling a record's category from its type when the row is inserted."""
+    def _default(context):
+        record_type = context.get_current_parameters().get(type_column)
+        return record_category(record_type) if record_type is not None else None
+    return _default
+
+
 class User(Base):
 
     __tablename__ = "User"
@@ -22,7 +32,7 @@ class LanguagePreference(Base):
     __tablename__ = "LanguagePreference"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("User.id"), nullable=False, index=True)
     preferred_language = Column(String, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
@@ -32,7 +42,7 @@ class MessageState(Base):
     __tablename__ = "MessageState"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("User.id"), nullable=False, index=True)
     current_state = Column(String, nullable=False)
     previous_state = Column(String, nullable=True)
     has_started = Column(Boolean, default=False)
@@ -41,6 +51,7 @@ class MessageState(Base):
 
 class MessageLog(Base):
     __tablename__ = "MessageLog"
+    __table_args__ = (Index("ix_MessageLog_user_id_sent_at", "user_id", "sent_at"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
@@ -67,10 +78,14 @@ class MessageLog(Base):
 class UnverifiedExpenses(Base):
 
     __tablename__ = "UnverifiedExpenses"
+    # Reports read one user's records in a date range; also serves plain user_id lookups
+    __table_args__ = (Index("ix_UnverifiedExpenses_user_id_expense_date", "user_id", "expense_date"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
     expense_type = Column(String, nullable=False)
+    # Main category of expense_type, so reports group by it without parsing the type
+    expense_category = Column(String, nullable=True, default=_category_of("expense_type"))
     expense_amount = Column(Float, nullable=False)
     expense_feeling = Column(String, nullable=True)
     expense_date = Column(DateTime, nullable=False, default=datetime.utcnow())
@@ -79,10 +94,12 @@ class UnverifiedExpenses(Base):
 class UnverifiedIncomes(Base):
 
     __tablename__ = "UnverifiedIncomes"
+    __table_args__ = (Index("ix_UnverifiedIncomes_user_id_income_date", "user_id", "income_date"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
     income_type = Column(String, nullable=False)
+    income_category = Column(String, nullable=True, default=_category_of("income_type"))
     income_amount = Column(Float, nullable=False)
     income_feeling = Column(String, nullable=True)
     income_date = Column(DateTime, nullable=False, default=datetime.utcnow())
@@ -91,8 +108,45 @@ class UnverifiedIncomes(Base):
 class FinancialFeelings(Base):
 
     __tablename__ = "FinancialFeelings"
+    __table_args__ = (Index("ix_FinancialFeelings_user_id_feeling_date", "user_id", "feeling_date"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
     feeling = Column(String, nullable=False)
     feeling_date = Column(DateTime, default=datetime.utcnow())
+
+
+class MonthlyRollup(Base):
+
+    __tablename__ = "MonthlyRollup"
+    __table_args__ = (Index("ix_MonthlyRollup_user_id_record_type_month", "user_id", "record_type", "month"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
+    record_type = Column(String, nullable=False)
+    # 'YYYY-MM'
+    month = Column(String, nullable=False)
+    # What the row is grouped by within the month, e.g. "type" or "weekday", and the group's value
+    dimension = Column(String, nullable=False)
+    group_key = Column(String, nullable=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    minimum = Column(Float, nullable=True)
+    maximum = Column(Float, nullable=True)
+    first_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ReportJob(Base):
+
+    __tablename__ = "ReportJob"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("User.id"), nullable=False)
+    phone_number = Column(String, nullable=False)
+    report_type = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
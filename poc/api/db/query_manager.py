@@ -1,7 +1,113 @@
-from api.db.models.tables import User, LanguagePreference, MessageState, UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings
+from api.db.models.tables import User, LanguagePreference, MessageState, UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings, MonthlyRollup, ReportJob
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from datetime import datetime
+from sqlalchemy import case, delete, extract, func, insert, literal, select, update
+import calendar
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# Record types produced by the dummy data generators and the tables they are stored in
+FINANCIAL_RECORD_TABLES = {
+    "expense": UnverifiedExpenses,
+    "income": UnverifiedIncomes,
+    "feeling": FinancialFeelings,
+}
+
+# (model, type, amount, date, feeling) columns of the record types that carry an amount
+AMOUNT_RECORD_COLUMNS = {
+    "expense": (UnverifiedExpenses, UnverifiedExpenses.expense_type, UnverifiedExpenses.expense_amount, UnverifiedExpenses.expense_date, UnverifiedExpenses.expense_feeling),
+    "income": (UnverifiedIncomes, UnverifiedIncomes.income_type, UnverifiedIncomes.income_amount, UnverifiedIncomes.income_date, UnverifiedIncomes.income_feeling),
+}
+
+# Feelings carry no amount; grouping them counts them
+GROUPED_RECORD_COLUMNS = {
+    **AMOUNT_RECORD_COLUMNS,
+    "feeling": (FinancialFeelings, FinancialFeelings.feeling, literal(0.0), FinancialFeelings.feeling_date, FinancialFeelings.feeling),
+}
+
+# Category columns stored with each record at insert time, see api.utils.categories
+RECORD_CATEGORY_COLUMNS = {
+    "expense": UnverifiedExpenses.expense_category,
+    "income": UnverifiedIncomes.income_category,
+}
+
+AMOUNT_GROUP_COLUMNS = ("type", "category", "day", "weekday", "month", "month_part", "feeling")
+
+# Records below this amount are also rolled up on their own, as small, frequent purchases
+ROLLUP_SMALL_BELOW = 50
+
+# Group by columns kept in MonthlyRollup per record type. "month" is always kept: its row marks the month as rolled up
+ROLLUP_GROUP_COLUMNS = {
+    "expense": AMOUNT_GROUP_COLUMNS,
+    "income": AMOUNT_GROUP_COLUMNS,
+    "feeling": ("type", "month"),
+}
+
+
+def month_key(moment: Union[date, datetime]) -> str:
+    """'YYYY-MM' of a date or datetime."""
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def month_start(month: str) -> datetime:
+    year, month_number = month.split("-")
+    return datetime(int(year), int(month_number), 1)
+
+
+def next_month_start(month: str) -> datetime:
+    start = month_start(month)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def month_end(month: str) -> datetime:
+    """Last representable moment of a month, for the inclusive date range queries."""
+    return next_month_start(month) - timedelta(microseconds=1)
+
+
+def _amount_group_expressions(column: str, type_column, category_column, date_column, feeling_column) -> list:
+    """SQL expressions a group by column is computed from. extract() works on both SQLite and PostgreSQL."""
+    if column == "type":
+        return [type_column]
+    if column == "category":
+        return [category_column]
+    if column == "day":
+        # A 'YYYY-MM-DD' string on SQLite and a DATE on PostgreSQL
+        return [func.date(date_column)]
+    if column == "weekday":
+        # 0 is Sunday on both databases
+        return [extract("dow", date_column)]
+    if column == "month":
+        return [extract("year", date_column), extract("month", date_column)]
+    if column == "month_part":
+        day_of_month = extract("day", date_column)
+        return [case((day_of_month <= 10, "Beginning"), (day_of_month <= 20, "Middle"), else_="End")]
+    return [feeling_column]
+
+
+def _amount_group_key(column: str, values: tuple) -> Any:
+    """Turn the grouped values of a column into its key: a date, a weekday name, 'YYYY-MM' or the plain value."""
+    if column == "day":
+        return date.fromisoformat(values[0]) if isinstance(values[0], str) else values[0]
+    if column == "weekday":
+        return calendar.day_name[(int(values[0]) + 6) % 7]
+    if column == "month":
+        return f"{int(values[0]):04d}-{int(values[1]):02d}"
+    return values[0]
+
+
+@dataclass(frozen=True)
+class AmountGroup:
+    """One GROUP BY row of a user's expenses or incomes."""
+
+    # One value per group by column, e.g. ("Transport - Taxi fare", "Monday")
+    key: Tuple[Any, ...]
+    total: float
+    count: int
+    minimum: float
+    maximum: float
+    # Lowest row id in the group, so callers can order groups by first appearance
+    first_id: int
+
 
 class AsyncQueries:
 
@@ -15,12 +121,27 @@ class AsyncQueries:
         )
         return result.scalar_one_or_none()
     
+    async def load_conversation_context(self, phone_number: str) -> Tuple[Optional[User], Optional[MessageState], Optional[LanguagePreference]]:
+        """Get a user with their message state and language preference in a single query."""
+        result = await self.session.execute(
+            select(User, MessageState, LanguagePreference)
+            .outerjoin(MessageState, MessageState.user_id == User.id)
+            .outerjoin(LanguagePreference, LanguagePreference.user_id == User.id)
+            .where(User.phone_number == phone_number)
+            .limit(1)
+        )
+        row = result.first()
+        if row is None:
+            return None, None, None
+        return row[0], row[1], row[2]
+    
     async def get_user_expenses_by_date_range(self, user_id: int, start_date: datetime, end_date: datetime) -> list[UnverifiedExpenses]:
         """Get all expenses for a user within a date range."""
         result = await self.session.execute(
             select(UnverifiedExpenses).where(
-                UnverifiedExpenses.user_id == user_id and
-                UnverifiedExpenses.expense_date >= start_date and UnverifiedExpenses.expense_date <= end_date
+                UnverifiedExpenses.user_id == user_id,
+                UnverifiedExpenses.expense_date >= start_date,
+                UnverifiedExpenses.expense_date <= end_date
             )
         )
         return result.scalars().all()
@@ -29,8 +150,9 @@ class AsyncQueries:
         """Get all incomes for a user within a date range."""
         result = await self.session.execute(
             select(UnverifiedIncomes).where(
-                UnverifiedIncomes.user_id == user_id and
-                UnverifiedIncomes.income_date >= start_date and UnverifiedIncomes.income_date <= end_date
+                UnverifiedIncomes.user_id == user_id,
+                UnverifiedIncomes.income_date >= start_date,
+                UnverifiedIncomes.income_date <= end_date
             )
         )
         return result.scalars().all()
@@ -39,12 +161,21 @@ class AsyncQueries:
         """Get all financial feelings for a user within a date range."""
         result = await self.session.execute(
             select(FinancialFeelings).where(
-                FinancialFeelings.user_id == user_id and
-                FinancialFeelings.feeling_date >= start_date and FinancialFeelings.feeling_date <= end_date
+                FinancialFeelings.user_id == user_id,
+                FinancialFeelings.feeling_date >= start_date,
+                FinancialFeelings.feeling_date <= end_date
             )
         )
         return result.scalars().all()
     
+    async def get_users_after(self, after_id: int, limit: int, user_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, str]]:
+        """Get the next page of (id, phone_number) of users with an id above after_id, in id order, optionally only the given users."""
+        statement = select(User.id, User.phone_number).where(User.id > after_id)
+        if user_ids is not None:
+            statement = statement.where(User.id.in_(list(user_ids)))
+        result = await self.session.execute(statement.order_by(User.id).limit(limit))
+        return [(user_id, phone_number) for user_id, phone_number in result.all()]
+    
     async def get_user_language_preference(self, user_id: int) -> LanguagePreference:
         """Get a user's language preference."""
         result = await self.session.execute(
@@ -110,24 +241,395 @@ class AsyncQueries:
         )
         await self.session.commit()
 
+    async def save_conversation_transition(self, user_id: int, current_state: str, previous_state: Optional[str] = None, language: Optional[str] = None) -> None:
+        """Persist a conversation step (state and, if selected, language) in one transaction."""
+        now = datetime.utcnow()
+
+        state_values = {"current_state": current_state, "updated_at": now}
+        if previous_state:
+            state_values["previous_state"] = previous_state
+
+        await self.session.execute(
+            update(MessageState).where(MessageState.user_id == user_id).values(**state_values)
+        )
+        if language:
+            await self.session.execute(
+                update(LanguagePreference).where(LanguagePreference.user_id == user_id).values(preferred_language=language, updated_at=now)
+            )
+        await self.session.commit()
+
     # Insert Methods
 
     async def insert_user_unverified_expenses(self, user_id: int, expenses: list[UnverifiedExpenses]) -> None:
         """Insert unverified expenses for a user."""
         self.session.add_all(expenses)
+        await self.session.flush()
+        await self.refresh_monthly_rollups(user_id, "expense", {month_key(record.expense_date) for record in expenses})
         await self.session.commit()
 
     async def insert_user_unverified_incomes(self, user_id: int, incomes: list[UnverifiedIncomes]) -> None:
         """Insert unverified incomes for a user."""
         self.session.add_all(incomes)
+        await self.session.flush()
+        await self.refresh_monthly_rollups(user_id, "income", {month_key(record.income_date) for record in incomes})
         await self.session.commit()
 
     async def insert_user_financial_feelings(self, user_id: int, feelings: list[FinancialFeelings]) -> None:
         """Insert financial feelings for a user."""
         self.session.add_all(feelings)
+        await self.session.flush()
+        await self.refresh_monthly_rollups(user_id, "feeling", {month_key(record.feeling_date) for record in feelings})
         await self.session.commit()
     
 
+    async def bulk_insert_financial_records(self, records: Iterable[Tuple[str, Dict[str, Any]]], commit: bool = True) -> Dict[str, int]:
+        """
+        Insert (record_type, values) pairs with one executemany INSERT per table.
+
+        Args:
+            records: Pairs such as ("expense", {...}) as returned by create_poc_dummy_data_south_africa.
+            commit (bool): Commit once all tables are written. Pass False to leave it to the caller's transaction.
+
+        Returns:
+            Number of rows inserted per record type.
+        """
+        rows_by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for record_type, values in records:
+            if record_type not in FINANCIAL_RECORD_TABLES:
+                raise ValueError(f"Unknown financial record type: {record_type}")
+            rows_by_type.setdefault(record_type, []).append(values)
+
+        for record_type, rows in rows_by_type.items():
+            await self.session.execute(insert(FINANCIAL_RECORD_TABLES[record_type]), rows)
+
+        if commit:
+            await self.session.commit()
+
+        return {record_type: len(rows) for record_type, rows in rows_by_type.items()}
+
+    # Aggregation methods
+
+    async def aggregate_user_amounts(
+        self,
+        record_type: str,
+        user_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        group_by: Iterable[str] = (),
+        below_amount: Optional[float] = None
+    ) -> List[AmountGroup]:
+        """
+        Sum, count, min and max a user's expense or income amounts with GROUP BY in the database.
+
+        Args:
+            record_type (str): "expense" or "income", or "feeling" to count feelings (their amounts are 0).
+            user_id (int): Owner of the records.
+            start_date (datetime): Start of the period, inclusive.
+            end_date (datetime): End of the period, inclusive.
+            group_by (Iterable[str]): Any of AMOUNT_GROUP_COLUMNS. Empty for one overall row.
+            below_amount (float): Only include records with a smaller amount.
+
+        Returns:
+            One AmountGroup per group, ordered by first appearance. Empty when no record matches.
+        """
+        if record_type not in GROUPED_RECORD_COLUMNS:
+            raise ValueError(f"Unknown amount record type: {record_type}")
+        group_by = tuple(group_by)
+        unknown = set(group_by) - set(AMOUNT_GROUP_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown group by columns: {', '.join(sorted(unknown))}")
+        if "category" in group_by and record_type not in RECORD_CATEGORY_COLUMNS:
+            raise ValueError(f"{record_type} records have no category")
+
+        model, type_column, amount_column, date_column, feeling_column = GROUPED_RECORD_COLUMNS[record_type]
+        category_column = RECORD_CATEGORY_COLUMNS.get(record_type)
+        expressions = [_amount_group_expressions(column, type_column, category_column, date_column, feeling_column) for column in group_by]
+        keys = [expression for column_expressions in expressions for expression in column_expressions]
+
+        conditions = [model.user_id == user_id, date_column >= start_date, date_column <= end_date]
+        if below_amount is not None:
+            conditions.append(amount_column < below_amount)
+
+        statement = select(
+            *keys,
+            func.sum(amount_column),
+            func.count(),
+            func.min(amount_column),
+            func.max(amount_column),
+            func.min(model.id),
+        ).where(*conditions)
+        if keys:
+            statement = statement.group_by(*keys).order_by(func.min(model.id))
+
+        groups = []
+        for row in (await self.session.execute(statement)).all():
+            total, count, minimum, maximum, first_id = row[len(keys):]
+            if not count:
+                continue
+            key, position = [], 0
+            for column, column_expressions in zip(group_by, expressions):
+                key.append(_amount_group_key(column, tuple(row[position:position + len(column_expressions)])))
+                position += len(column_expressions)
+            groups.append(AmountGroup(
+                key=tuple(key),
+                total=float(total),
+                count=int(count),
+                minimum=float(minimum),
+                maximum=float(maximum),
+                first_id=int(first_id),
+            ))
+        return groups
+
+    async def get_user_extreme_amount_record(self, record_type: str, user_id: int, start_date: datetime, end_date: datetime, largest: bool = True):
+        """Get the user's largest (or smallest) expense or income in a date range, the earliest one on ties."""
+        if record_type not in AMOUNT_RECORD_COLUMNS:
+            raise ValueError(f"Unknown amount record type: {record_type}")
+        model, _, amount_column, date_column, _ = AMOUNT_RECORD_COLUMNS[record_type]
+        result = await self.session.execute(
+            select(model)
+            .where(model.user_id == user_id, date_column >= start_date, date_column <= end_date)
+            .order_by(amount_column.desc() if largest else amount_column.asc(), model.id)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def count_user_feelings(self, user_id: int, start_date: datetime, end_date: datetime) -> List[Tuple[str, int]]:
+        """Count a user's financial feelings per feeling in a date range, ordered by first appearance."""
+        result = await self.session.execute(
+            select(FinancialFeelings.feeling, func.count())
+            .where(
+                FinancialFeelings.user_id == user_id,
+                FinancialFeelings.feeling_date >= start_date,
+                FinancialFeelings.feeling_date <= end_date
+            )
+            .group_by(FinancialFeelings.feeling)
+            .order_by(func.min(FinancialFeelings.id))
+        )
+        return [(feeling, int(count)) for feeling, count in result.all()]
+
+    # Monthly rollup methods
+
+    async def refresh_monthly_rollups(self, user_id: int, record_type: str, months: Iterable[str]) -> None:
+        """
+        Recompute a user's MonthlyRollup rows for the given months from their records.
+
+        Called with the months touched by new records, so only those months are read again.
+        Months without records still get a zero "month" row, which marks them as rolled up.
+        Expenses and incomes also get a "small" row per month for records below ROLLUP_SMALL_BELOW.
+
+        Args:
+            user_id (int): Owner of the records.
+            record_type (str): "expense", "income" or "feeling".
+            months (Iterable[str]): 'YYYY-MM' months to recompute.
+        """
+        if record_type not in ROLLUP_GROUP_COLUMNS:
+            raise ValueError(f"Unknown rollup record type: {record_type}")
+        months = sorted(set(months))
+        if not months:
+            return
+
+        await self.session.execute(
+            delete(MonthlyRollup).where(
+                MonthlyRollup.user_id == user_id,
+                MonthlyRollup.record_type == record_type,
+                MonthlyRollup.month.in_(months)
+            )
+        )
+
+        wanted = set(months)
+        now = datetime.utcnow()
+        rows = []
+        for column in ROLLUP_GROUP_COLUMNS[record_type]:
+            group_by = ("month",) if column == "month" else ("month", column)
+            groups = await self.aggregate_user_amounts(
+                record_type, user_id, month_start(months[0]), month_end(months[-1]), group_by=group_by
+            )
+            for group in groups:
+                if group.key[0] not in wanted:
+                    continue
+                value = group.key[-1]
+                rows.append({
+                    "user_id": user_id, "record_type": record_type, "month": group.key[0],
+                    "dimension": column, "group_key": value.isoformat() if isinstance(value, date) else value,
+                    "total": group.total, "count": group.count, "minimum": group.minimum, "maximum": group.maximum,
+                    "first_id": group.first_id, "updated_at": now,
+                })
+
+        if record_type in AMOUNT_RECORD_COLUMNS:
+            groups = await self.aggregate_user_amounts(
+                record_type, user_id, month_start(months[0]), month_end(months[-1]), group_by=("month",), below_amount=ROLLUP_SMALL_BELOW
+            )
+            rows += [{
+                "user_id": user_id, "record_type": record_type, "month": group.key[0], "dimension": "small", "group_key": None,
+                "total": group.total, "count": group.count, "minimum": group.minimum, "maximum": group.maximum,
+                "first_id": group.first_id, "updated_at": now,
+            } for group in groups if group.key[0] in wanted]
+
+        rolled_up = {row["month"] for row in rows if row["dimension"] == "month"}
+        rows += [{
+            "user_id": user_id, "record_type": record_type, "month": month, "dimension": "month", "group_key": month,
+            "total": 0.0, "count": 0, "minimum": None, "maximum": None, "first_id": None, "updated_at": now,
+        } for month in months if month not in rolled_up]
+
+        await self.session.execute(insert(MonthlyRollup), rows)
+
+    async def rebuild_monthly_rollups(self, user_id: int) -> Dict[str, int]:
+        """
+        Recompute all of a user's MonthlyRollup rows, for backfilling records written without them.
+
+        Returns:
+            Number of months rolled up per record type.
+        """
+        counts = {}
+        for record_type in ROLLUP_GROUP_COLUMNS:
+            await self.session.execute(
+                delete(MonthlyRollup).where(MonthlyRollup.user_id == user_id, MonthlyRollup.record_type == record_type)
+            )
+            groups = await self.aggregate_user_amounts(record_type, user_id, datetime.min, datetime.max, group_by=("month",))
+            months = [group.key[0] for group in groups]
+            await self.refresh_monthly_rollups(user_id, record_type, months)
+            counts[record_type] = len(months)
+        return counts
+
+    async def get_monthly_rollups(self, user_id: int, record_type: str, months: Iterable[str], group_by: Iterable[str]) -> Tuple[Set[str], Dict[str, List[AmountGroup]]]:
+        """
+        Read a user's rolled up groups for the given months.
+
+        Args:
+            months (Iterable[str]): 'YYYY-MM' months to read.
+            group_by (Iterable[str]): Columns from ROLLUP_GROUP_COLUMNS to read groups for, or "small".
+
+        Returns:
+            The months that are rolled up, and per group by column one AmountGroup per month and value,
+            keyed like aggregate_user_amounts with that single column. Months missing from the first
+            have no rows and must be read from the records, as must months rolled up before one of
+            the group by columns was kept.
+        """
+        group_by = tuple(group_by)
+        result = await self.session.execute(
+            select(MonthlyRollup).where(
+                MonthlyRollup.user_id == user_id,
+                MonthlyRollup.record_type == record_type,
+                MonthlyRollup.month.in_(list(months)),
+                MonthlyRollup.dimension.in_(set(group_by) | {"month"})
+            ).order_by(MonthlyRollup.first_id)
+        )
+
+        rows = result.scalars().all()
+        rolled_up = {row.month for row in rows if row.dimension == "month"}
+        # Months rolled up before a group by column was added have records but no rows for it
+        dimensions: Dict[str, Set[str]] = {}
+        for row in rows:
+            dimensions.setdefault(row.month, set()).add(row.dimension)
+        required = set(group_by) - {"small"}
+        rolled_up -= {
+            row.month for row in rows
+            if row.dimension == "month" and row.count and not required <= dimensions[row.month]
+        }
+
+        groups: Dict[str, List[AmountGroup]] = {column: [] for column in group_by}
+        for row in rows:
+            if not row.count or row.dimension not in groups or row.month not in rolled_up:
+                continue
+            if row.dimension == "small":
+                value = row.month
+            else:
+                value = date.fromisoformat(row.group_key) if row.dimension == "day" else row.group_key
+            groups[row.dimension].append(AmountGroup(
+                key=(value,),
+                total=row.total,
+                count=row.count,
+                minimum=row.minimum,
+                maximum=row.maximum,
+                first_id=row.first_id,
+            ))
+        return rolled_up, groups
+
+    # Report job methods
+
+    async def create_report_job(self, user_id: int, phone_number: str, report_type: str) -> ReportJob:
+        """Queue a report job."""
+        job = ReportJob(user_id=user_id, phone_number=phone_number, report_type=report_type, status="queued")
+        self.session.add(job)
+        await self.session.commit()
+        return job
+
+    async def get_report_job(self, job_id: int) -> Optional[ReportJob]:
+        """Get a report job by id."""
+        return await self.session.get(ReportJob, job_id, populate_existing=True)
+
+    async def claim_next_report_job(self) -> Optional[ReportJob]:
+        """Mark the oldest queued job as running and return it, or None if nothing is queued."""
+        while True:
+            result = await self.session.execute(
+                select(ReportJob.id).where(ReportJob.status == "queued").order_by(ReportJob.id).limit(1)
+            )
+            job_id = result.scalar_one_or_none()
+            if job_id is None:
+                return None
+
+            # Only one claimer can move the job out of 'queued'
+            claimed = await self.session.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id, ReportJob.status == "queued")
+                .values(status="running", attempts=ReportJob.attempts + 1, updated_at=datetime.utcnow())
+            )
+            await self.session.commit()
+            if claimed.rowcount == 1:
+                return await self.get_report_job(job_id)
+
+    async def update_report_job(self, job_id: int, status: str, last_error: Optional[str] = None, attempts: Optional[int] = None) -> bool:
+        """
+        Set a report job's status. Given attempts, only a job still running that attempt is updated,
+        so a worker whose lease was taken over cannot overwrite the new owner's state. Returns whether the job was updated.
+        """
+        conditions = [ReportJob.id == job_id]
+        if attempts is not None:
+            conditions += [ReportJob.status == "running", ReportJob.attempts == attempts]
+        result = await self.session.execute(
+            update(ReportJob).where(*conditions).values(status=status, last_error=last_error, updated_at=datetime.utcnow())
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def renew_report_job_lease(self, job_id: int, attempts: int) -> bool:
+        """Move a running job's updated_at, its lease, to now. Returns False if the job is no longer running that attempt."""
+        result = await self.session.execute(
+            update(ReportJob)
+            .where(ReportJob.id == job_id, ReportJob.status == "running", ReportJob.attempts == attempts)
+            .values(updated_at=datetime.utcnow())
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def requeue_expired_report_jobs(self, expired_before: datetime, max_attempts: int) -> int:
+        """Put running jobs whose lease ran out before expired_before, and that have attempts left, back in the queue."""
+        result = await self.session.execute(
+            update(ReportJob)
+            .where(ReportJob.status == "running", ReportJob.updated_at < expired_before, ReportJob.attempts < max_attempts)
+            .values(status="queued", updated_at=datetime.utcnow())
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def fail_expired_report_jobs(self, expired_before: datetime, max_attempts: int, last_error: str) -> List[ReportJob]:
+        """Mark running jobs whose lease ran out and that have no attempts left as failed, returning the jobs this call failed."""
+        result = await self.session.execute(
+            select(ReportJob.id).where(ReportJob.status == "running", ReportJob.updated_at < expired_before, ReportJob.attempts >= max_attempts)
+        )
+        failed = []
+        for job_id in result.scalars().all():
+            # Only one process fails each job, so the user is told once
+            updated = await self.session.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id, ReportJob.status == "running", ReportJob.updated_at < expired_before)
+                .values(status="failed", last_error=last_error, updated_at=datetime.utcnow())
+            )
+            await self.session.commit()
+            if updated.rowcount == 1:
+                failed.append(await self.get_report_job(job_id))
+        return failed
+
     # Object related methods
     async def add(self, obj):
         """Add an object to the database."""
@@ -0,0 +1,63 @@
+"""
+Rebuild the MonthlyRollup rows of users from their records.
+
+Use after loading records without going through AsyncQueries' insert methods (imports,
+manual fixes), or to backfill a database created before the rollups existed.
+
+Usage (from the poc directory):
+    python -m api.db.rebuild_rollups                # every user
+    python -m api.db.rebuild_rollups --user-id 3 7
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+
+from api.db.db_manager import DatabaseManager, get_database_manager
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+
+logger = logging.getLogger("rebuild-rollups")
+logger.setLevel(logging.INFO)
+
+
+async def rebuild_monthly_rollups(db_manager: Optional[DatabaseManager] = None, user_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, int]]:
+    """
+    Rebuild the rollups of the given users, or of every user, one transaction per user.
+
+    Returns:
+        Months rolled up per record type, per user.
+    """
+    db_manager = db_manager or get_database_manager()
+    if user_ids is None:
+        async with db_manager.session_scope() as session:
+            user_ids = (await session.execute(select(User.id).order_by(User.id))).scalars().all()
+
+    results = {}
+    for user_id in user_ids:
+        async with db_manager.session_scope() as session:
+            results[user_id] = await AsyncQueries(session=session).rebuild_monthly_rollups(user_id)
+        logger.info(f"Rebuilt monthly rollups for user {user_id}: {results[user_id]}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--user-id", type=int, nargs="+", dest="user_ids", help="Users to rebuild. Defaults to every user")
+    args = parser.parse_args()
+
+    async def _run():
+        db_manager = get_database_manager()
+        # Databases from before the rollups need the table first
+        await db_manager.create_tables()
+        results = await rebuild_monthly_rollups(db_manager, args.user_ids)
+        await db_manager.dispose()
+        print(f"Rebuilt monthly rollups for {len(results)} users")
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
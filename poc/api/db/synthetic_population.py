@@ -0,0 +1,253 @@
+"""
+Load a reproducible synthetic population of registered POC users into the database.
+
+Every user gets M whole months of South African expenses, incomes and financial feelings,
+drawn from the same distributions the POC webhook seeds new users with. A user's records come
+from their own random.Random seeded with the population seed and the user's index, so the
+same seed gives the same users whatever the population size, and --start-index appends more.
+Records are written with one executemany INSERT per table and batch of users, on SQLite or
+PostgreSQL (DATABASE_URL), and the users' monthly rollups are rebuilt after each batch.
+
+Usage (from the poc directory):
+    python -m api.db.synthetic_population --users 1000 --months 12 --seed 7
+    python -m api.db.synthetic_population --users 500 --start-index 1000 --end-month 2025-07
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from api.db.db_manager import DatabaseManager, get_database_manager
+from api.db.models.tables import LanguagePreference, MessageState, User
+from api.db.query_manager import AsyncQueries, month_key, month_start
+
+logger = logging.getLogger("synthetic-population")
+logger.setLevel(logging.INFO)
+
+FinancialRecord = Tuple[str, Dict[str, Any]]
+
+# South African expense types with local context
+EXPENSE_TYPES = (
+    "Food & Groceries - Pick n Pay",
+    "Food & Groceries - Shoprite",
+    "Food & Groceries - Street vendor",
+    "Food & Groceries - Bread and milk",
+    "Transport - Taxi fare",
+    "Transport - Bus fare",
+    "Transport - Petrol",
+    "Transport - Uber ride",
+    "Utilities - Electricity prepaid",
+    "Utilities - Cell phone airtime",
+    "Utilities - Data bundle",
+    "Healthcare - Clinic visit",
+    "Healthcare - Pharmacy medicine",
+    "Education - School fees",
+    "Education - School uniform",
+    "Clothing - Work clothes",
+    "Clothing - Hair salon",
+    "Housing - Rent",
+    "Housing - Home repairs",
+    "Social - Stokvel contribution",
+    "Social - Funeral contribution",
+    "Social - Church offering",
+)
+
+# South African income types for lower-income bracket
+INCOME_TYPES = (
+    "Employment - Monthly salary",
+    "Employment - Weekly wages",
+    "Employment - Overtime pay",
+    "Employment - Casual work",
+    "Government Grant - Child support",
+    "Government Grant - Disability grant",
+    "Government Grant - Old age pension",
+    "Informal Work - Selling goods",
+    "Informal Work - Hair braiding",
+    "Informal Work - Car washing",
+    "Informal Work - Garden work",
+    "Other Income - Money from family",
+    "Other Income - Stokvel payout",
+    "Other Income - Side hustle",
+)
+
+FEELINGS = ("Very Worried", "Worried", "Getting By", "Okay", "Doing Well")
+
+# Financial feelings lean towards the worried end for lower-income users
+WEIGHTED_FEELINGS = ("Very Worried",) * 3 + ("Worried",) * 4 + ("Getting By",) * 2 + ("Okay", "Doing Well")
+
+# Rand amount ranges by the first keyword found in the type, e.g. R800-R3500 rent
+EXPENSE_AMOUNT_RANGES = (
+    ("Housing", (800, 3500)),
+    ("Food", (15, 400)),
+    ("Transport", (8, 150)),
+    ("Utilities", (25, 300)),
+    ("Education", (50, 800)),
+    ("Healthcare", (20, 250)),
+    ("Social", (20, 500)),
+)
+OTHER_EXPENSE_AMOUNT_RANGE = (10, 200)
+
+INCOME_AMOUNT_RANGES = (
+    ("Employment", (1500, 8000)),
+    ("Government Grant", (350, 2000)),
+    ("Informal Work", (50, 1200)),
+)
+OTHER_INCOME_AMOUNT_RANGE = (30, 800)
+
+
+def _amount(rng: random.Random, record_type: str, ranges, other_range) -> float:
+    low, high = next((amount_range for keyword, amount_range in ranges if keyword in record_type), other_range)
+    return round(rng.uniform(low, high), 2)
+
+
+def month_records(user_id: int, year: int, month: int, rng: random.Random) -> List[FinancialRecord]:
+    """
+    One month of a user's records: 4-12 expenses, 1-4 incomes and, two months in three, a feeling.
+
+    Half of the expenses and incomes carry a feeling. Days are 1-28 so every month has them.
+    """
+    records = []
+    for _ in range(rng.randint(4, 12)):
+        expense_type = rng.choice(EXPENSE_TYPES)
+        expense_date = datetime(year, month, rng.randint(1, 28))
+        amount = _amount(rng, expense_type, EXPENSE_AMOUNT_RANGES, OTHER_EXPENSE_AMOUNT_RANGE)
+        expense_feeling = rng.choice(FEELINGS) if rng.choice([True, False]) else None
+        records.append(("expense", {
+            "user_id": user_id,
+            "expense_type": expense_type,
+            "expense_amount": amount,
+            "expense_feeling": expense_feeling,
+            "expense_date": expense_date,
+        }))
+
+    for _ in range(rng.randint(1, 4)):
+        income_type = rng.choice(INCOME_TYPES)
+        income_date = datetime(year, month, rng.randint(1, 28))
+        amount = _amount(rng, income_type, INCOME_AMOUNT_RANGES, OTHER_INCOME_AMOUNT_RANGE)
+        income_feeling = rng.choice(FEELINGS) if rng.choice([True, False]) else None
+        records.append(("income", {
+            "user_id": user_id,
+            "income_type": income_type,
+            "income_amount": amount,
+            "income_feeling": income_feeling,
+            "income_date": income_date,
+        }))
+
+    if rng.choice([True, True, False]):
+        records.append(("feeling", {
+            "user_id": user_id,
+            "feeling": rng.choice(WEIGHTED_FEELINGS),
+            "feeling_date": datetime(year, month, rng.randint(1, 28)),
+        }))
+    return records
+
+
+def population_months(months: int, end_month: Optional[str] = None) -> List[str]:
+    """The 'YYYY-MM' months of the population: the given number of whole months before end_month (default: this month)."""
+    end = month_start(end_month or month_key(datetime.now()))
+    end_index = end.year * 12 + end.month - 1
+    return [f"{index // 12:04d}-{index % 12 + 1:02d}" for index in range(end_index - months, end_index)]
+
+
+def synthetic_phone_number(index: int) -> str:
+    return f"whatsapp:+2779{index:07d}"
+
+
+def synthetic_user_records(user_id: int, index: int, seed: int, months: List[str]) -> List[FinancialRecord]:
+    """The records of the population's index-th user, the same for the same seed and months."""
+    rng = random.Random(f"{seed}:{index}")
+    records = []
+    for month in months:
+        start = month_start(month)
+        records += month_records(user_id, start.year, start.month, rng)
+    return records
+
+
+async def load_population(
+    db_manager: DatabaseManager,
+    users: int,
+    months: int = 12,
+    seed: int = 0,
+    end_month: Optional[str] = None,
+    start_index: int = 0,
+    batch_size: int = 100,
+    rollups: bool = True
+) -> Dict[str, int]:
+    """
+    Insert registered users with their synthetic records, one transaction per batch of users.
+
+    Users are on the main menu in English, like users who finished registration, so webhooks
+    from their numbers continue their conversation.
+
+    Args:
+        users (int): Users to create, with indexes start_index to start_index + users - 1.
+        months (int): Whole months of records per user, ending before end_month.
+        seed (int): Population seed.
+        end_month (str): 'YYYY-MM' month after the last month of records. Defaults to the current month.
+        batch_size (int): Users inserted per transaction.
+        rollups (bool): Rebuild the users' monthly rollups, as reports read closed months from them.
+
+    Returns:
+        Rows inserted per table kind: users, expense, income and feeling.
+    """
+    record_months = population_months(months, end_month)
+    counts = {"users": 0, "expense": 0, "income": 0, "feeling": 0}
+    for batch_start in range(start_index, start_index + users, batch_size):
+        indexes = range(batch_start, min(start_index + users, batch_start + batch_size))
+        async with db_manager.session_scope() as session:
+            query_manager = AsyncQueries(session=session)
+            result = await session.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [{"phone_number": synthetic_phone_number(index), "registered": True} for index in indexes]
+            )
+            user_ids = result.scalars().all()
+            await session.execute(insert(MessageState), [
+                {"user_id": user_id, "current_state": "registered_user_template", "has_started": True} for user_id in user_ids
+            ])
+            await session.execute(insert(LanguagePreference), [
+                {"user_id": user_id, "preferred_language": "English"} for user_id in user_ids
+            ])
+
+            records = [record for user_id, index in zip(user_ids, indexes) for record in synthetic_user_records(user_id, index, seed, record_months)]
+            for record_type, count in (await query_manager.bulk_insert_financial_records(records, commit=False)).items():
+                counts[record_type] += count
+            if rollups:
+                for user_id in user_ids:
+                    await query_manager.rebuild_monthly_rollups(user_id)
+        counts["users"] += len(user_ids)
+        logger.info(f"Loaded {counts['users']} of {users} synthetic users")
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument("--months", type=int, default=12, help="Whole months of records per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--end-month", help="'YYYY-MM' after the last month of records. Defaults to the current month")
+    parser.add_argument("--start-index", type=int, default=0, help="Index of the first user, to add users to a loaded population")
+    parser.add_argument("--batch-size", type=int, default=100, help="Users inserted per transaction")
+    parser.add_argument("--no-rollups", action="store_true", help="Skip rebuilding the monthly rollups")
+    args = parser.parse_args()
+
+    async def _run():
+        db_manager = get_database_manager()
+        await db_manager.create_tables()
+        start = time.perf_counter()
+        counts = await load_population(
+            db_manager, args.users, args.months, args.seed, args.end_month, args.start_index, args.batch_size, rollups=not args.no_rollups
+        )
+        seconds = time.perf_counter() - start
+        await db_manager.dispose()
+        print(f"Loaded {counts} in {seconds:.1f} s ({counts['users'] / seconds:.1f} users/sec)")
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,127 @@
 # api/utils/financial_aggregation.py
-from datetime import datetime, timedelta, date
+from dataclasses import dataclass
+from datetime import date
 from typing import Dict, List, Any, Optional, Tuple
-from sqlalchemy import func, extract
-from api.db.models.tables import UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings
-from api.db.query_manager import AsyncQueries
-from api.db.db_manager import DatabaseManager
+from api.db.db_manager import DatabaseManager, get_database_manager
+from api.finance.record_aggregates import AmountTotals, RecordAggregates
+from api.finance.snapshot import FinancialSnapshotCache, UserFinancialSnapshot, get_snapshot_cache
+from api.utils.categories import is_essential_category
 import calendar
 
+import numpy as np
+
+
+@dataclass(frozen=True)
+class GroupedAmounts:
+    """Amount totals and row counts per key, in order of first appearance."""
+
+    keys: np.ndarray
+    totals: np.ndarray
+    counts: np.ndarray
+
+    @classmethod
+    def from_totals(cls, totals: Dict[Any, AmountTotals]) -> "GroupedAmounts":
+        return cls(
+            keys=np.array(list(totals), dtype=object),
+            totals=np.array([t.total for t in totals.values()], dtype=float),
+            counts=np.array([t.count for t in totals.values()], dtype=int),
+        )
+
+    def as_dict(self) -> Dict[Any, float]:
+        return {key: float(total) for key, total in zip(self.keys, self.totals)}
+
+
+@dataclass(frozen=True)
+class FinancialFrames:
+    """
+    The shared intermediate every report section is computed from.
+
+    Built from the database aggregates of a snapshot (from_aggregates), so every section
+    works on a handful of groups however many records the user has. Essential spending is
+    matched over the distinct categories, not over every row.
+    """
+
+    expense_count: int
+    income_count: int
+    expenses_by_type: GroupedAmounts
+    expenses_by_category: GroupedAmounts
+    expenses_by_weekday: GroupedAmounts
+    expenses_by_month: GroupedAmounts
+    incomes_by_source: GroupedAmounts
+    incomes_by_month: GroupedAmounts
+    feeling_counts: Dict[str, int]
+    total_expenses: float
+    total_income: float
+
+    @classmethod
+    def from_aggregates(cls, expenses: RecordAggregates, incomes: RecordAggregates, feeling_counts: List[Tuple[str, int]]) -> "FinancialFrames":
+        return cls(
+            expense_count=expenses.overall.count,
+            income_count=incomes.overall.count,
+            expenses_by_type=GroupedAmounts.from_totals(expenses.by_type),
+            expenses_by_category=GroupedAmounts.from_totals(expenses.by_category),
+            expenses_by_weekday=GroupedAmounts.from_totals(expenses.by_weekday),
+            expenses_by_month=GroupedAmounts.from_totals(expenses.by_month),
+            incomes_by_source=GroupedAmounts.from_totals(incomes.by_category),
+            incomes_by_month=GroupedAmounts.from_totals(incomes.by_month),
+            feeling_counts=dict(feeling_counts),
+            total_expenses=expenses.overall.total,
+            total_income=incomes.overall.total,
+        )
+
+    def expenses_matching(self, *categories: str) -> float:
+        """Total spent in the categories containing any of the given names."""
+        return self._category_total(lambda category: any(name in category for name in categories))
+
+    @property
+    def essential_expenses(self) -> float:
+        """Total spent in essential categories such as food, transport and housing."""
+        return self._category_total(is_essential_category)
+
+    def _category_total(self, predicate) -> float:
+        matches = np.array([predicate(category) for category in self.expenses_by_category.keys], dtype=bool)
+        return float(self.expenses_by_category.totals[matches].sum()) if matches.size else 0.0
+
+
 class FinancialAggregator:
     """Comprehensive financial aggregation for South African lower-income users"""
     
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int, db_manager: Optional[DatabaseManager] = None, snapshot_cache: Optional[FinancialSnapshotCache] = None):
         self.user_id = user_id
+        self.db_manager = db_manager or get_database_manager()
+        self.snapshot_cache = snapshot_cache or get_snapshot_cache()
         
-    async def get_comprehensive_financial_report(self, months_back: int = 6) -> Dict[str, Any]:
+    async def load_snapshot(self, months_back: int = 6) -> UserFinancialSnapshot:
+        """The user's records for the period, shared with the category reports"""
+        return await self.snapshot_cache.load(self.db_manager, self.user_id, months_back)
+    
+    async def get_comprehensive_financial_report(self, months_back: int = 6, snapshot: Optional[UserFinancialSnapshot] = None) -> Dict[str, Any]:
         """Generate comprehensive financial report for the user"""
         
-        async with DatabaseManager().session_scope() as session:
-            query_manager = AsyncQueries(session=session)
-            
-            # Get date range
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=months_back * 30)
-            
-            # Get all data
-            expenses = await query_manager.get_user_expenses_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            incomes = await query_manager.get_user_incomes_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            feelings = await query_manager.get_user_feelings_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            
-            # Generate comprehensive report
-            report = {
-                "period": f"{start_date.strftime('%B %Y')} to {end_date.strftime('%B %Y')}",
-                "summary": await self._generate_summary(expenses, incomes),
-                "spending_patterns": await self._analyze_spending_patterns(expenses),
-                "income_analysis": await self._analyze_income_patterns(incomes),
-                "financial_health": await self._assess_financial_health(expenses, incomes, feelings),
-                "category_breakdown": await self._categorize_expenses(expenses),
-                "monthly_trends": await self._analyze_monthly_trends(expenses, incomes),
-                "actionable_insights": await self._generate_actionable_insights(expenses, incomes),
-                "emergency_preparedness": await self._assess_emergency_preparedness(expenses, incomes)
-            }
-            
-            return report
+        # Aggregated in the database and shared with the category reports
+        snapshot = snapshot or await self.load_snapshot(months_back)
+        
+        frames = FinancialFrames.from_aggregates(snapshot.expenses, snapshot.incomes, snapshot.feeling_counts)
+        report = self.build_report(frames)
+        return {"period": snapshot.period, **report}
     
-    async def _generate_summary(self, expenses: List, incomes: List) -> Dict[str, Any]:
+    def build_report(self, frames: FinancialFrames) -> Dict[str, Any]:
+        """Compute every report section from one shared FinancialFrames"""
+        return {
+            "summary": self._generate_summary(frames),
+            "spending_patterns": self._analyze_spending_patterns(frames),
+            "income_analysis": self._analyze_income_patterns(frames),
+            "financial_health": self._assess_financial_health(frames),
+            "category_breakdown": self._categorize_expenses(frames),
+            "monthly_trends": self._analyze_monthly_trends(frames),
+            "actionable_insights": self._generate_actionable_insights(frames),
+            "emergency_preparedness": self._assess_emergency_preparedness(frames)
+        }
+    
+    def _generate_summary(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Generate high-level financial summary"""
-        total_expenses = sum(exp.expense_amount for exp in expenses)
-        total_income = sum(inc.income_amount for inc in incomes)
+        total_expenses = frames.total_expenses
+        total_income = frames.total_income
         net_position = total_income - total_expenses
         
         return {
@@ -64,46 +133,37 @@ class FinancialAggregator:
             "financial_status": "Saving Money" if net_position > 0 else "Spending More Than Earning"
         }
     
-    async def _analyze_spending_patterns(self, expenses: List) -> Dict[str, Any]:
+    def _analyze_spending_patterns(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Analyze spending patterns specific to lower-income users"""
-        if not expenses:
+        if not frames.expense_count:
             return {}
             
         # Group by day of week
-        day_spending = {}
-        for exp in expenses:
-            day_name = exp.expense_date.strftime('%A')
-            day_spending[day_name] = day_spending.get(day_name, 0) + exp.expense_amount
+        day_spending = frames.expenses_by_weekday.as_dict()
         
         # Find peak spending day
         peak_day = max(day_spending.items(), key=lambda x: x[1]) if day_spending else ("N/A", 0)
         
         # Essential vs non-essential categorization
-        essential_categories = ["Food", "Transport", "Utilities", "Housing", "Healthcare", "Education"]
-        essential_spending = sum(exp.expense_amount for exp in expenses 
-                               if any(cat in exp.expense_type for cat in essential_categories))
-        non_essential_spending = sum(exp.expense_amount for exp in expenses) - essential_spending
+        essential_spending = frames.essential_expenses
+        non_essential_spending = frames.total_expenses - essential_spending
         
         return {
             "peak_spending_day": {"day": peak_day[0], "amount": round(peak_day[1], 2)},
             "essential_spending": round(essential_spending, 2),
             "non_essential_spending": round(non_essential_spending, 2),
-            "essential_percentage": round((essential_spending / sum(exp.expense_amount for exp in expenses) * 100), 1),
+            "essential_percentage": round((essential_spending / frames.total_expenses * 100), 1) if frames.total_expenses else 0,
             "day_of_week_spending": {day: round(amount, 2) for day, amount in day_spending.items()}
         }
     
-    async def _analyze_income_patterns(self, incomes: List) -> Dict[str, Any]:
+    def _analyze_income_patterns(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Analyze income patterns"""
-        if not incomes:
+        if not frames.income_count:
             return {}
             
         # Group by income source
-        income_sources = {}
-        for inc in incomes:
-            source = inc.income_type.split(' - ')[0]  # Get main category
-            income_sources[source] = income_sources.get(source, 0) + inc.income_amount
-        
-        total_income = sum(inc.income_amount for inc in incomes)
+        income_sources = frames.incomes_by_source.as_dict()
+        total_income = frames.total_income
         
         return {
             "income_sources": {source: round(amount, 2) for source, amount in income_sources.items()},
@@ -112,10 +172,10 @@ class FinancialAggregator:
             "government_dependency": round(income_sources.get("Government Grant", 0) / total_income * 100, 1) if total_income > 0 else 0
         }
     
-    async def _assess_financial_health(self, expenses: List, incomes: List, feelings: List) -> Dict[str, Any]:
+    def _assess_financial_health(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Assess overall financial health"""
-        total_expenses = sum(exp.expense_amount for exp in expenses)
-        total_income = sum(inc.income_amount for inc in incomes)
+        total_expenses = frames.total_expenses
+        total_income = frames.total_income
         
         # Stress indicators
         stress_indicators = []
@@ -125,9 +185,7 @@ class FinancialAggregator:
             stress_indicators.append("Income below recommended minimum")
         
         # Analyze feelings
-        feeling_counts = {}
-        for feeling in feelings:
-            feeling_counts[feeling.feeling] = feeling_counts.get(feeling.feeling, 0) + 1
+        feeling_counts = dict(frames.feeling_counts)
         
         worried_feelings = feeling_counts.get("Very Worried", 0) + feeling_counts.get("Worried", 0)
         total_feelings = sum(feeling_counts.values())
@@ -168,42 +226,23 @@ class FinancialAggregator:
             
         return {"score": round(score, 1), "status": status}
     
-    async def _categorize_expenses(self, expenses: List) -> Dict[str, Any]:
+    def _categorize_expenses(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Categorize expenses for better understanding"""
-        categories = {}
-        for exp in expenses:
-            category = exp.expense_type.split(' - ')[0]  # Get main category
-            if category not in categories:
-                categories[category] = {"total": 0, "count": 0, "items": []}
-            categories[category]["total"] += exp.expense_amount
-            categories[category]["count"] += 1
-            categories[category]["items"].append({
-                "description": exp.expense_type,
-                "amount": exp.expense_amount,
-                "date": exp.expense_date.strftime('%Y-%m-%d')
-            })
+        categories = frames.expenses_by_category
         
-        # Sort by total spending
-        sorted_categories = dict(sorted(categories.items(), key=lambda x: x[1]["total"], reverse=True))
+        # Sort by total spending, keeping first-appearance order between equal totals
+        order = np.argsort(-categories.totals, kind="stable")
         
         return {
-            "by_category": {cat: {"total": round(data["total"], 2), "count": data["count"]} 
-                          for cat, data in sorted_categories.items()},
-            "top_spending_category": list(sorted_categories.keys())[0] if sorted_categories else "None"
+            "by_category": {categories.keys[i]: {"total": round(float(categories.totals[i]), 2), "count": int(categories.counts[i])}
+                          for i in order},
+            "top_spending_category": categories.keys[order[0]] if order.size else "None"
         }
     
-    async def _analyze_monthly_trends(self, expenses: List, incomes: List) -> Dict[str, Any]:
+    def _analyze_monthly_trends(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Analyze monthly trends"""
-        monthly_expenses = {}
-        monthly_incomes = {}
-        
-        for exp in expenses:
-            month_key = exp.expense_date.strftime('%Y-%m')
-            monthly_expenses[month_key] = monthly_expenses.get(month_key, 0) + exp.expense_amount
-        
-        for inc in incomes:
-            month_key = inc.income_date.strftime('%Y-%m')
-            monthly_incomes[month_key] = monthly_incomes.get(month_key, 0) + inc.income_amount
+        monthly_expenses = frames.expenses_by_month.as_dict()
+        monthly_incomes = frames.incomes_by_month.as_dict()
         
         return {
             "monthly_expenses": {month: round(amount, 2) for month, amount in monthly_expenses.items()},
@@ -227,28 +266,27 @@ class FinancialAggregator:
         else:
             return "Stable"
     
-    async def _generate_actionable_insights(self, expenses: List, incomes: List) -> List[str]:
+    def _generate_actionable_insights(self, frames: FinancialFrames) -> List[str]:
         """Generate actionable insights for lower-income users"""
         insights = []
-        total_expenses = sum(exp.expense_amount for exp in expenses)
-        total_income = sum(inc.income_amount for inc in incomes)
+        total_expenses = frames.total_expenses
+        total_income = frames.total_income
         
         # Spending insights
         if total_expenses > total_income:
             insights.append("⚠️ You're spending more than you earn. Consider reducing non-essential expenses.")
         
         # Category-specific insights
-        food_spending = sum(exp.expense_amount for exp in expenses if "Food" in exp.expense_type)
+        food_spending = frames.expenses_matching("Food")
         if food_spending > total_income * 0.4:
             insights.append("🍽️ Food spending is high. Consider buying in bulk or cooking at home more.")
         
-        transport_spending = sum(exp.expense_amount for exp in expenses if "Transport" in exp.expense_type)
+        transport_spending = frames.expenses_matching("Transport")
         if transport_spending > total_income * 0.2:
             insights.append("🚌 Transport costs are significant. Look for cheaper routes or carpooling options.")
         
         # Income insights
-        income_sources = set(inc.income_type.split(' - ')[0] for inc in incomes)
-        if len(income_sources) == 1:
+        if len(frames.incomes_by_source.keys) == 1:
             insights.append("💼 Consider diversifying income sources for financial security.")
         
         # Positive reinforcement
@@ -258,12 +296,10 @@ class FinancialAggregator:
         
         return insights
     
-    async def _assess_emergency_preparedness(self, expenses: List, incomes: List) -> Dict[str, Any]:
+    def _assess_emergency_preparedness(self, frames: FinancialFrames) -> Dict[str, Any]:
         """Assess emergency fund preparedness"""
-        monthly_expenses = sum(exp.expense_amount for exp in expenses) / 6  # Average monthly
-        total_income = sum(inc.income_amount for inc in incomes)
-        total_expenses = sum(exp.expense_amount for exp in expenses)
-        potential_savings = total_income - total_expenses
+        monthly_expenses = frames.total_expenses / 6  # Average monthly
+        potential_savings = frames.total_income - frames.total_expenses
         
         # Calculate how many months of expenses they could cover
         months_covered = (potential_savings / monthly_expenses) if monthly_expenses > 0 else 0
@@ -281,4 +317,4 @@ class FinancialAggregator:
             "months_covered": round(months_covered, 1),
             "emergency_fund_status": "Good" if months_covered >= 3 else "Building" if months_covered >= 1 else "Critical",
             "recommendation": recommendation
-        }
\ No newline at end of file
+        }
@@ -1,130 +1,109 @@
 # api/utils/category_reports.py
-from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
-from api.db.models.tables import UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings
+from api.db.models.tables import UnverifiedIncomes
 from api.behaviour.income_behaviour_analysis import IncomeBehaviouralInsights
-from api.db.query_manager import AsyncQueries
-from api.db.db_manager import DatabaseManager
-import calendar
+from api.db.db_manager import DatabaseManager, get_database_manager
+from api.finance.record_aggregates import AmountTotals, RecordAggregates
+from api.finance.snapshot import FinancialSnapshotCache, UserFinancialSnapshot, get_snapshot_cache
+from api.utils.categories import is_essential_category
 from collections import defaultdict
 
 class CategoryReportGenerator:
     """Generate detailed reports for specific financial categories"""
     
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int, db_manager: Optional[DatabaseManager] = None, snapshot_cache: Optional[FinancialSnapshotCache] = None):
         self.user_id = user_id
+        self.db_manager = db_manager or get_database_manager()
+        self.snapshot_cache = snapshot_cache or get_snapshot_cache()
     
-    async def generate_expenses_report(self, months_back: int = 6) -> Dict[str, Any]:
+    async def load_snapshot(self, months_back: int = 6) -> UserFinancialSnapshot:
+        """The user's records for the period, shared with the other reports generated shortly after"""
+        return await self.snapshot_cache.load(self.db_manager, self.user_id, months_back)
+    
+    async def generate_expenses_report(self, months_back: int = 6, snapshot: Optional[UserFinancialSnapshot] = None) -> Dict[str, Any]:
         """Generate detailed expense-focused report"""
         
-        async with DatabaseManager().session_scope() as session:
-            query_manager = AsyncQueries(session=session)
-            
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=months_back * 30)
-            
-            expenses = await query_manager.get_user_expenses_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
+        snapshot = snapshot or await self.load_snapshot(months_back)
+        expenses = snapshot.expenses
             
-            if not expenses:
-                return {"error": "No expense data found for the specified period"}
-            
-            report = {
-                "report_type": "Expenses Analysis",
-                "period": f"{start_date.strftime('%B %Y')} to {end_date.strftime('%B %Y')}",
-                "summary": await self._expense_summary(expenses),
-                "category_analysis": await self._detailed_category_analysis(expenses),
-                "spending_patterns": await self._expense_spending_patterns(expenses),
-                "cost_cutting_opportunities": await self._identify_cost_cutting(expenses),
-                "spending_triggers": await self._analyze_spending_triggers(expenses),
-                "recommendations": await self._expense_recommendations(expenses)
-            }
-            
-            return report
+        if not expenses.overall.count:
+            return {"error": "No expense data found for the specified period"}
+        
+        report = {
+            "report_type": "Expenses Analysis",
+            "period": snapshot.period,
+            "summary": await self._expense_summary(expenses),
+            "category_analysis": await self._detailed_category_analysis(expenses),
+            "spending_patterns": await self._expense_spending_patterns(expenses),
+            "cost_cutting_opportunities": await self._identify_cost_cutting(expenses),
+            "spending_triggers": await self._analyze_spending_triggers(expenses),
+            "recommendations": await self._expense_recommendations(expenses)
+        }
+        
+        return report
     
-    async def generate_incomes_report(self, months_back: int = 6) -> Dict[str, Any]:
+    async def generate_incomes_report(self, months_back: int = 6, snapshot: Optional[UserFinancialSnapshot] = None) -> Dict[str, Any]:
         """Generate detailed income-focused report"""
         
-        async with DatabaseManager().session_scope() as session:
-            query_manager = AsyncQueries(session=session)
-            
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=months_back * 30)
-            
-            incomes = await query_manager.get_user_incomes_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            
-            if not incomes:
-                return {"error": "No income data found for the specified period"}
-            
-            report = {
-                "report_type": "Income Analysis",
-                "period": f"{start_date.strftime('%B %Y')} to {end_date.strftime('%B %Y')}",
-                "summary": await self._income_summary(incomes),
-                "source_analysis": await self._detailed_income_source_analysis(incomes),
-                "stability_analysis": await self._income_stability_analysis(incomes),
-                "growth_opportunities": await self._identify_income_opportunities(incomes),
-                "diversification_score": await self._calculate_income_diversification(incomes),
-                "income_behavior_triggers": await self._analyze_income_behavior_triggers(incomes),
-                "recommendations": await self._income_recommendations(incomes)
-            }
-            
-            return report
+        snapshot = snapshot or await self.load_snapshot(months_back)
+        incomes = snapshot.incomes
+        
+        if not incomes.overall.count:
+            return {"error": "No income data found for the specified period"}
+        
+        report = {
+            "report_type": "Income Analysis",
+            "period": snapshot.period,
+            "summary": await self._income_summary(incomes),
+            "source_analysis": await self._detailed_income_source_analysis(incomes),
+            "stability_analysis": await self._income_stability_analysis(incomes),
+            "growth_opportunities": await self._identify_income_opportunities(incomes),
+            "diversification_score": await self._calculate_income_diversification(incomes),
+            # The behavioural analysis works on individual incomes and the feelings recorded with them
+            "income_behavior_triggers": await self._analyze_income_behavior_triggers(snapshot.income_records),
+            "recommendations": await self._income_recommendations(incomes)
+        }
+        
+        return report
     
-    async def generate_feelings_report(self, months_back: int = 6) -> Dict[str, Any]:
+    async def generate_feelings_report(self, months_back: int = 6, snapshot: Optional[UserFinancialSnapshot] = None) -> Dict[str, Any]:
         """Generate detailed financial feelings/wellness report"""
         
-        async with DatabaseManager().session_scope() as session:
-            query_manager = AsyncQueries(session=session)
-            
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=months_back * 30)
-            
-            feelings = await query_manager.get_user_feelings_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            
-            # Also get expenses and incomes for correlation analysis
-            expenses = await query_manager.get_user_expenses_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            incomes = await query_manager.get_user_incomes_by_date_range(
-                user_id=self.user_id, start_date=start_date, end_date=end_date
-            )
-            
-            if not feelings:
-                return {"error": "No financial feelings data found for the specified period"}
-            
-            report = {
-                "report_type": "Financial Wellness Analysis",
-                "period": f"{start_date.strftime('%B %Y')} to {end_date.strftime('%B %Y')}",
-                "summary": await self._feelings_summary(feelings),
-                "stress_analysis": await self._analyze_financial_stress(feelings),
-                "correlation_analysis": await self._correlate_feelings_with_finances(feelings, expenses, incomes),
-                "wellness_trends": await self._analyze_wellness_trends(feelings),
-                "support_recommendations": await self._wellness_recommendations(feelings),
-                "mental_health_insights": await self._mental_health_insights(feelings)
-            }
-            
-            return report
+        snapshot = snapshot or await self.load_snapshot(months_back)
+        feelings = snapshot.feelings
+        
+        if not feelings:
+            return {"error": "No financial feelings data found for the specified period"}
+        
+        report = {
+            "report_type": "Financial Wellness Analysis",
+            "period": snapshot.period,
+            "summary": await self._feelings_summary(feelings),
+            "stress_analysis": await self._analyze_financial_stress(feelings),
+            # Daily expense totals for correlation analysis
+            "correlation_analysis": await self._correlate_feelings_with_finances(feelings, snapshot.expenses),
+            "wellness_trends": await self._analyze_wellness_trends(feelings),
+            "support_recommendations": await self._wellness_recommendations(feelings),
+            "mental_health_insights": await self._mental_health_insights(feelings)
+        }
+        
+        return report
     
     # EXPENSE REPORT METHODS
-    async def _expense_summary(self, expenses: List) -> Dict[str, Any]:
+    async def _expense_summary(self, expenses: RecordAggregates) -> Dict[str, Any]:
         """Detailed expense summary"""
-        total_expenses = sum(exp.expense_amount for exp in expenses)
+        total_expenses = expenses.overall.total
         avg_daily = total_expenses / 180  # 6 months ≈ 180 days
         
-        # Find largest and smallest expenses
-        largest_expense = max(expenses, key=lambda x: x.expense_amount)
-        smallest_expense = min(expenses, key=lambda x: x.expense_amount)
+        # Largest and smallest expenses, loaded as rows by the query
+        largest_expense = expenses.largest
+        smallest_expense = expenses.smallest
         
         return {
             "total_expenses": round(total_expenses, 2),
             "average_daily_spending": round(avg_daily, 2),
-            "total_transactions": len(expenses),
-            "average_transaction_size": round(total_expenses / len(expenses), 2),
+            "total_transactions": expenses.overall.count,
+            "average_transaction_size": round(expenses.overall.average, 2),
             "largest_expense": {
                 "amount": largest_expense.expense_amount,
                 "type": largest_expense.expense_type,
@@ -137,39 +116,23 @@ class CategoryReportGenerator:
             }
         }
     
-    async def _detailed_category_analysis(self, expenses: List) -> Dict[str, Any]:
+    async def _detailed_category_analysis(self, expenses: RecordAggregates) -> Dict[str, Any]:
         """Deep dive into expense categories"""
-        categories = defaultdict(lambda: {"total": 0, "count": 0, "avg": 0, "transactions": []})
-        
-        for exp in expenses:
-            category = exp.expense_type.split(' - ')[0]
-            categories[category]["total"] += exp.expense_amount
-            categories[category]["count"] += 1
-            categories[category]["transactions"].append({
-                "amount": exp.expense_amount,
-                "description": exp.expense_type,
-                "date": exp.expense_date.strftime('%Y-%m-%d'),
-                "feeling": exp.expense_feeling
-            })
-        
-        # Calculate averages and sort
-        for category in categories:
-            categories[category]["avg"] = categories[category]["total"] / categories[category]["count"]
-        
-        sorted_categories = dict(sorted(categories.items(), key=lambda x: x[1]["total"], reverse=True))
+        categories = expenses.by_category
+        sorted_categories = dict(sorted(categories.items(), key=lambda x: x[1].total, reverse=True))
+        category_total = sum(data.total for data in categories.values())
         
         # Essential vs Non-essential classification
-        essential_categories = ["Food & Groceries", "Transport", "Utilities", "Housing", "Healthcare", "Education"]
-        essential_total = sum(data["total"] for cat, data in sorted_categories.items() if cat in essential_categories)
-        non_essential_total = sum(data["total"] for cat, data in sorted_categories.items() if cat not in essential_categories)
+        essential_total = sum(data.total for cat, data in sorted_categories.items() if is_essential_category(cat))
+        non_essential_total = sum(data.total for cat, data in sorted_categories.items() if not is_essential_category(cat))
         
         return {
             "category_breakdown": {
                 cat: {
-                    "total": round(data["total"], 2),
-                    "count": data["count"],
-                    "average": round(data["avg"], 2),
-                    "percentage": round((data["total"] / sum(d["total"] for d in categories.values())) * 100, 1)
+                    "total": round(data.total, 2),
+                    "count": data.count,
+                    "average": round(data.average, 2),
+                    "percentage": round((data.total / category_total) * 100, 1)
                 } for cat, data in sorted_categories.items()
             },
             "essential_vs_non_essential": {
@@ -178,60 +141,44 @@ class CategoryReportGenerator:
                 "essential_percentage": round((essential_total / (essential_total + non_essential_total)) * 100, 1)
             },
             "top_spending_category": list(sorted_categories.keys())[0],
-            "most_frequent_category": max(categories.items(), key=lambda x: x[1]["count"])[0]
+            "most_frequent_category": max(categories.items(), key=lambda x: x[1].count)[0]
         }
     
-    async def _expense_spending_patterns(self, expenses: List) -> Dict[str, Any]:
+    async def _expense_spending_patterns(self, expenses: RecordAggregates) -> Dict[str, Any]:
         """Analyze spending patterns and timing"""
         # Day of week analysis
-        day_spending = defaultdict(list)
-        for exp in expenses:
-            day_name = exp.expense_date.strftime('%A')
-            day_spending[day_name].append(exp.expense_amount)
-        
         day_analysis = {
             day: {
-                "total": round(sum(amounts), 2),
-                "count": len(amounts),
-                "average": round(sum(amounts) / len(amounts), 2)
-            } for day, amounts in day_spending.items()
+                "total": round(data.total, 2),
+                "count": data.count,
+                "average": round(data.average, 2)
+            } for day, data in expenses.by_weekday.items()
         }
         
         # Time of month analysis
         month_part_spending = {"Beginning": 0, "Middle": 0, "End": 0}
-        for exp in expenses:
-            day = exp.expense_date.day
-            if day <= 10:
-                month_part_spending["Beginning"] += exp.expense_amount
-            elif day <= 20:
-                month_part_spending["Middle"] += exp.expense_amount
-            else:
-                month_part_spending["End"] += exp.expense_amount
+        for part, data in expenses.by_month_part.items():
+            month_part_spending[part] += data.total
         
         return {
             "day_of_week_analysis": day_analysis,
             "peak_spending_day": max(day_analysis.items(), key=lambda x: x[1]["total"])[0],
             "month_part_spending": {k: round(v, 2) for k, v in month_part_spending.items()},
-            "spending_frequency": len(expenses) / 180,  # transactions per day
+            "spending_frequency": expenses.overall.count / 180,  # transactions per day
         }
     
-    async def _identify_cost_cutting(self, expenses: List) -> List[Dict[str, Any]]:
+    async def _identify_cost_cutting(self, expenses: RecordAggregates) -> List[Dict[str, Any]]:
         """Identify specific cost-cutting opportunities - ADJUSTED THRESHOLDS"""
         opportunities = []
         
         # Analyze categories for potential savings
-        categories = defaultdict(lambda: {"total": 0, "count": 0})
-        for exp in expenses:
-            category = exp.expense_type.split(' - ')[0]
-            categories[category]["total"] += exp.expense_amount
-            categories[category]["count"] += 1
-        
-        total_spending = sum(exp.expense_amount for exp in expenses)
+        categories = expenses.by_category
+        total_spending = expenses.overall.total
         
         # LOWERED THRESHOLDS for South African lower-income users
         
         # Food spending analysis - LOWERED from 35% to 8%
-        food_total = categories.get("Food & Groceries", {}).get("total", 0)
+        food_total = categories["Food & Groceries"].total if "Food & Groceries" in categories else 0
         if food_total > total_spending * 0.08:  # Changed from 0.35 to 0.08
             opportunities.append({
                 "category": "Food & Groceries",
@@ -242,7 +189,7 @@ class CategoryReportGenerator:
             })
         
         # Transport analysis - LOWERED from 25% to 4%
-        transport_total = categories.get("Transport", {}).get("total", 0)
+        transport_total = categories["Transport"].total if "Transport" in categories else 0
         if transport_total > total_spending * 0.04:  # Changed from 0.25 to 0.04
             opportunities.append({
                 "category": "Transport",
@@ -253,7 +200,7 @@ class CategoryReportGenerator:
             })
         
         # Social spending analysis - NEW OPPORTUNITY
-        social_total = categories.get("Social", {}).get("total", 0)
+        social_total = categories["Social"].total if "Social" in categories else 0
         if social_total > total_spending * 0.05:  # 5% threshold
             opportunities.append({
                 "category": "Social",
@@ -264,7 +211,7 @@ class CategoryReportGenerator:
             })
         
         # Housing analysis - NEW OPPORTUNITY  
-        housing_total = categories.get("Housing", {}).get("total", 0)
+        housing_total = categories["Housing"].total if "Housing" in categories else 0
         if housing_total > total_spending * 0.40:  # 40% threshold
             opportunities.append({
                 "category": "Housing",
@@ -275,9 +222,8 @@ class CategoryReportGenerator:
             })
         
         # Small frequent expenses - LOWERED from 50 to 20
-        small_expenses = [exp for exp in expenses if exp.expense_amount < 50]
-        if len(small_expenses) > 20:  # Changed from 50 to 20
-            small_total = sum(exp.expense_amount for exp in small_expenses)
+        if expenses.small.count > 20:  # Changed from 50 to 20
+            small_total = expenses.small.total
             opportunities.append({
                 "category": "Small Purchases",
                 "current_spending": round(small_total, 2),
@@ -288,51 +234,40 @@ class CategoryReportGenerator:
         
         return opportunities
     
-    async def _analyze_spending_triggers(self, expenses: List) -> Dict[str, Any]:
+    async def _analyze_spending_triggers(self, expenses: RecordAggregates) -> Dict[str, Any]:
         """Analyze what triggers spending"""
         # Analyze spending by feelings
-        feeling_spending = defaultdict(list)
-        for exp in expenses:
-            if exp.expense_feeling:
-                feeling_spending[exp.expense_feeling].append(exp.expense_amount)
-        
         feeling_analysis = {
             feeling: {
-                "total": round(sum(amounts), 2),
-                "count": len(amounts),
-                "average": round(sum(amounts) / len(amounts), 2)
-            } for feeling, amounts in feeling_spending.items()
+                "total": round(data.total, 2),
+                "count": data.count,
+                "average": round(data.average, 2)
+            } for feeling, data in expenses.by_feeling.items() if feeling
         }
         
         # Weekend vs weekday spending
-        weekend_spending = []
-        weekday_spending = []
-        for exp in expenses:
-            if exp.expense_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
-                weekend_spending.append(exp.expense_amount)
-            else:
-                weekday_spending.append(exp.expense_amount)
+        weekend = AmountTotals()
+        weekday = AmountTotals()
+        for day, data in expenses.by_weekday.items():
+            (weekend if day in ("Saturday", "Sunday") else weekday).add(data)
         
         return {
             "emotional_triggers": feeling_analysis,
             "weekend_vs_weekday": {
-                "weekend_total": round(sum(weekend_spending), 2),
-                "weekday_total": round(sum(weekday_spending), 2),
-                "weekend_average": round(sum(weekend_spending) / len(weekend_spending), 2) if weekend_spending else 0,
-                "weekday_average": round(sum(weekday_spending) / len(weekday_spending), 2) if weekday_spending else 0
+                "weekend_total": round(weekend.total, 2),
+                "weekday_total": round(weekday.total, 2),
+                "weekend_average": round(weekend.average, 2) if weekend.count else 0,
+                "weekday_average": round(weekday.average, 2) if weekday.count else 0
             }
         }
     
-    async def _expense_recommendations(self, expenses: List) -> List[str]:
+    async def _expense_recommendations(self, expenses: RecordAggregates) -> List[str]:
         """Generate expense-specific recommendations"""
         recommendations = []
-        total_spending = sum(exp.expense_amount for exp in expenses)
+        total_spending = expenses.overall.total
         
         # Category-based recommendations
-        categories = defaultdict(float)
-        for exp in expenses:
-            category = exp.expense_type.split(' - ')[0]
-            categories[category] += exp.expense_amount
+        categories = {category: data.total for category, data in expenses.by_category.items()}
         
         # Food recommendations
         if categories.get("Food & Groceries", 0) > total_spending * 0.4:
@@ -354,12 +289,12 @@ class CategoryReportGenerator:
         return recommendations
     
     # INCOME REPORT METHODS
-    async def _income_summary(self, incomes: List) -> Dict[str, Any]:
+    async def _income_summary(self, incomes: RecordAggregates) -> Dict[str, Any]:
         """Detailed income summary"""
-        total_income = sum(inc.income_amount for inc in incomes)
+        total_income = incomes.overall.total
         
-        # Find largest and most frequent income sources
-        largest_income = max(incomes, key=lambda x: x.income_amount)
+        # Largest income, loaded as a row by the query
+        largest_income = incomes.largest
         
         # Monthly average
         monthly_avg = total_income / 6  # 6 months
@@ -367,8 +302,8 @@ class CategoryReportGenerator:
         return {
             "total_income": round(total_income, 2),
             "monthly_average": round(monthly_avg, 2),
-            "total_income_events": len(incomes),
-            "average_income_per_event": round(total_income / len(incomes), 2),
+            "total_income_events": incomes.overall.count,
+            "average_income_per_event": round(incomes.overall.average, 2),
             "largest_income": {
                 "amount": largest_income.income_amount,
                 "type": largest_income.income_type,
@@ -376,44 +311,30 @@ class CategoryReportGenerator:
             }
         }
     
-    async def _detailed_income_source_analysis(self, incomes: List) -> Dict[str, Any]:
+    async def _detailed_income_source_analysis(self, incomes: RecordAggregates) -> Dict[str, Any]:
         """Deep dive into income sources"""
-        sources = defaultdict(lambda: {"total": 0, "count": 0, "transactions": []})
-        
-        for inc in incomes:
-            source = inc.income_type.split(' - ')[0]
-            sources[source]["total"] += inc.income_amount
-            sources[source]["count"] += 1
-            sources[source]["transactions"].append({
-                "amount": inc.income_amount,
-                "description": inc.income_type,
-                "date": inc.income_date.strftime('%Y-%m-%d'),
-                "feeling": inc.income_feeling
-            })
+        sources = incomes.by_category
         
         # Calculate percentages
-        total_income = sum(data["total"] for data in sources.values())
+        total_income = sum(data.total for data in sources.values())
         
         return {
             "source_breakdown": {
                 source: {
-                    "total": round(data["total"], 2),
-                    "count": data["count"],
-                    "average": round(data["total"] / data["count"], 2),
-                    "percentage": round((data["total"] / total_income) * 100, 1)
+                    "total": round(data.total, 2),
+                    "count": data.count,
+                    "average": round(data.average, 2),
+                    "percentage": round((data.total / total_income) * 100, 1)
                 } for source, data in sources.items()
             },
-            "primary_income_source": max(sources.items(), key=lambda x: x[1]["total"])[0],
-            "most_frequent_source": max(sources.items(), key=lambda x: x[1]["count"])[0]
+            "primary_income_source": max(sources.items(), key=lambda x: x[1].total)[0],
+            "most_frequent_source": max(sources.items(), key=lambda x: x[1].count)[0]
         }
     
-    async def _income_stability_analysis(self, incomes: List) -> Dict[str, Any]:
+    async def _income_stability_analysis(self, incomes: RecordAggregates) -> Dict[str, Any]:
         """Analyze income stability and predictability"""
         # Monthly income analysis
-        monthly_income = defaultdict(float)
-        for inc in incomes:
-            month_key = inc.income_date.strftime('%Y-%m')
-            monthly_income[month_key] += inc.income_amount
+        monthly_income = {month: data.total for month, data in incomes.by_month.items()}
         
         monthly_amounts = list(monthly_income.values())
         if len(monthly_amounts) > 1:
@@ -424,9 +345,9 @@ class CategoryReportGenerator:
             stability_score = 50  # Neutral score for insufficient data
         
         # Regular vs irregular income
-        employment_income = sum(inc.income_amount for inc in incomes if "Employment" in inc.income_type)
-        grant_income = sum(inc.income_amount for inc in incomes if "Government Grant" in inc.income_type)
-        irregular_income = sum(inc.income_amount for inc in incomes if "Informal" in inc.income_type or "Other" in inc.income_type)
+        employment_income = incomes.total_where(lambda income_type: "Employment" in income_type)
+        grant_income = incomes.total_where(lambda income_type: "Government Grant" in income_type)
+        irregular_income = incomes.total_where(lambda income_type: "Informal" in income_type or "Other" in income_type)
         
         total_income = employment_income + grant_income + irregular_income
         
@@ -446,17 +367,12 @@ class CategoryReportGenerator:
         behavioural_insights = IncomeBehaviouralInsights()
         return behavioural_insights.analyze_behavioral_triggers(incomes)
     
-    async def _identify_income_opportunities(self, incomes: List) -> List[Dict[str, Any]]:
+    async def _identify_income_opportunities(self, incomes: RecordAggregates) -> List[Dict[str, Any]]:
         """Identify income growth opportunities"""
         opportunities = []
         
         # Analyze current income sources
-        sources = defaultdict(float)
-        for inc in incomes:
-            source = inc.income_type.split(' - ')[0]
-            sources[source] += inc.income_amount
-        
-        total_income = sum(sources.values())
+        sources = {source: data.total for source, data in incomes.by_category.items()}
         
         # Government grant optimization
         if sources.get("Government Grant", 0) < 1000:  # Low grant income
@@ -490,9 +406,9 @@ class CategoryReportGenerator:
         
         return opportunities
     
-    async def _calculate_income_diversification(self, incomes: List) -> Dict[str, Any]:
+    async def _calculate_income_diversification(self, incomes: RecordAggregates) -> Dict[str, Any]:
         """Calculate income diversification score"""
-        sources = set(inc.income_type.split(' - ')[0] for inc in incomes)
+        sources = incomes.by_category
         diversification_score = min(len(sources) * 25, 100)  # Max 4 sources = 100%
         
         risk_assessment = "Low Risk" if diversification_score >= 75 else "Medium Risk" if diversification_score >= 50 else "High Risk"
@@ -506,14 +422,11 @@ class CategoryReportGenerator:
                            else "High dependency on few sources - diversify urgently"
         }
     
-    async def _income_recommendations(self, incomes: List) -> List[str]:
+    async def _income_recommendations(self, incomes: RecordAggregates) -> List[str]:
         """Generate income-specific recommendations"""
         recommendations = []
         
-        sources = defaultdict(float)
-        for inc in incomes:
-            source = inc.income_type.split(' - ')[0]
-            sources[source] += inc.income_amount
+        sources = {source: data.total for source, data in incomes.by_category.items()}
         
         # Source-specific recommendations
         if len(sources) == 1:
@@ -591,21 +504,12 @@ class CategoryReportGenerator:
         else:
             return "Stable"
     
-    async def _correlate_feelings_with_finances(self, feelings: List, expenses: List, incomes: List) -> Dict[str, Any]:
+    async def _correlate_feelings_with_finances(self, feelings: List, expenses: RecordAggregates) -> Dict[str, Any]:
         """Correlate feelings with financial events"""
         correlations = []
         
-        # Group financial events by date
-        daily_expenses = defaultdict(float)
-        daily_incomes = defaultdict(float)
-        
-        for exp in expenses:
-            date_key = exp.expense_date.strftime('%Y-%m-%d')
-            daily_expenses[date_key] += exp.expense_amount
-        
-        for inc in incomes:
-            date_key = inc.income_date.strftime('%Y-%m-%d')
-            daily_incomes[date_key] += inc.income_amount
+        # Financial events grouped by date in the database
+        daily_expenses = {day.strftime('%Y-%m-%d'): data.total for day, data in expenses.by_day.items()}
         
         # Analyze feelings around high expense days
         high_expense_days = [date for date, amount in daily_expenses.items() if amount > 500]
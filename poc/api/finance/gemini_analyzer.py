@@ -1,14 +1,29 @@
 import google.generativeai as genai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 from datetime import datetime
 
+from api.finance.llm_gateway import InsightGateway, get_insight_gateway
+
+# Rule-based advice each report already carries, used when the model cannot answer
+FALLBACK_RECOMMENDATION_KEYS = {
+    "expenses": "recommendations",
+    "incomes": "recommendations",
+    "feelings": "support_recommendations",
+    "comprehensive": "actionable_insights",
+}
+
 class PersonalizedGeminiAnalyzer:
     """Use Google Gemini to generate personalized AI insights based on actual user data"""
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, api_key: Optional[str] = None, model: Any = None, gateway: Optional[InsightGateway] = None):
+        # Any object with generate_content(prompt) -> response.text works, e.g. LocalInsightModel offline
+        if model is None:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = model
+        # Runs the blocking model call off the event loop and caches insights for unchanged data
+        self.gateway = gateway or get_insight_gateway()
     
     async def generate_personalized_insights(self, report_data: Dict[str, Any], report_type: str, user_context: str = "South African lower-income user") -> Dict[str, Any]:
         """Generate AI insights based on the user's specific financial data"""
@@ -20,16 +35,44 @@ class PersonalizedGeminiAnalyzer:
         prompt = self._create_personalized_prompt(data_summary, report_type, user_context)
         
         try:
-            response = self.model.generate_content(prompt)
-            insights = self._parse_personalized_response(response.text, report_type)
-            
-            # Add data context to insights
-            insights["analyzed_data"] = data_summary
-            insights["analysis_date"] = datetime.now().strftime('%Y-%m-%d %H:%M')
-            
-            return insights
+            cache_key = self.gateway.key_for(report_type, data_summary, user_context)
+            return await self.gateway.generate(cache_key, lambda: self._generate_insights(prompt, data_summary, report_type), report_type)
         except Exception as e:
-            return {"error": f"AI analysis failed: {str(e)}"}
+            # Timeouts, an open circuit breaker and model errors all fall back to the report's own advice
+            reason = str(e) or type(e).__name__
+            return self._fallback_insights(report_data, data_summary, report_type, reason) or {"error": f"AI analysis failed: {reason}"}
+    
+    def _generate_insights(self, prompt: str, data_summary: Dict[str, Any], report_type: str) -> Dict[str, Any]:
+        """Ask the model and parse its answer. Blocking, so the gateway runs it in a worker thread"""
+        response = self.model.generate_content(prompt)
+        insights = self._parse_personalized_response(response.text, report_type)
+        
+        # Add data context to insights
+        insights["analyzed_data"] = data_summary
+        insights["analysis_date"] = datetime.now().strftime('%Y-%m-%d %H:%M')
+        
+        return insights
+    
+    def _fallback_insights(self, report_data: Dict[str, Any], data_summary: Dict[str, Any], report_type: str, reason: str) -> Optional[Dict[str, Any]]:
+        """Build insights from the rule-based recommendations of the report, or None if it has none"""
+        recommendations = report_data.get(FALLBACK_RECOMMENDATION_KEYS.get(report_type, ""), [])
+        if not recommendations:
+            return None
+        
+        return {
+            "personalized_assessment": "",
+            "specific_concerns": [],
+            "targeted_opportunities": [],
+            "actionable_recommendations": list(recommendations),
+            "realistic_goals": [],
+            "motivational_message": "",
+            "data_based_insights": [],
+            "analysis_type": f"{report_type.title()} Recommendations",
+            "ai_confidence": "Rule-based",
+            "fallback_reason": reason,
+            "analyzed_data": data_summary,
+            "analysis_date": datetime.now().strftime('%Y-%m-%d %H:%M'),
+        }
     
     def _extract_key_data_points(self, report_data: Dict[str, Any], report_type: str) -> Dict[str, Any]:
         """Extract the most important data points for AI analysis"""
@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("llm-gateway")
+logger.setLevel(logging.INFO)
+
+Insights = Dict[str, Any]
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing model until it has had time to recover.
+
+    After failure_threshold consecutive failures the breaker opens and every call is
+    rejected for reset_seconds. Then one trial call is let through (half open): success
+    closes the breaker, failure opens it again. A cancelled trial call says nothing about the
+    model, so the breaker goes back to open with its reset period already over and the next
+    call becomes the trial.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the model now."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            return True
+        # Open, or half open with the trial call still running
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"AI insight circuit breaker opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+    def record_cancelled(self) -> None:
+        if self.state == "half_open":
+            self.state = "open"
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of call durations in seconds, with approximate percentiles."""
+
+    BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the overflow bucket
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, capped at the slowest call."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={bound:g}s" for bound in self.buckets] + [f">{self.buckets[-1]:g}s"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 1),
+            "p95_ms": round(self.quantile(0.95) * 1000, 1),
+            "max_ms": round(self.maximum * 1000, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class InsightGateway:
+    """
+    Async gateway for the blocking LLM calls behind the report insights.
+
+    Calls run in a worker thread so the event loop keeps serving webhooks while the model
+    answers. Parsed insights are kept in a bounded LRU/TTL cache keyed by a SHA-256 of the
+    prompt inputs, so a report on unchanged data does not ask the model again, and
+    concurrent requests for the same insights share a single call. The call runs in its own
+    task, so cancelling one request does not cancel it for the others; it is only cancelled
+    once every request waiting for it was. Failures are not cached.
+
+    When the model slows down, at most max_concurrency calls run at once, each call gives up
+    after timeout_seconds (waiting for a slot included) and repeated failures open a circuit
+    breaker, so report requests fail fast and can fall back to the rule-based insights.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the gateway.
+
+        Args:
+            max_entries (int): Maximum number of insights kept. Defaults to AI_INSIGHTS_CACHE_MAX_ENTRIES or 1000.
+            ttl_seconds (float): Seconds insights stay valid. Defaults to AI_INSIGHTS_CACHE_TTL_SECONDS or 86400.
+            max_concurrency (int): Model calls running at once. Defaults to AI_INSIGHTS_MAX_CONCURRENCY or 4.
+            timeout_seconds (float): Deadline of one call. Defaults to AI_INSIGHTS_TIMEOUT_SECONDS or 20.
+            failure_threshold (int): Consecutive failures that open the breaker. Defaults to AI_INSIGHTS_BREAKER_FAILURES or 5.
+            reset_seconds (float): Seconds the breaker stays open. Defaults to AI_INSIGHTS_BREAKER_RESET_SECONDS or 60.
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('AI_INSIGHTS_CACHE_MAX_ENTRIES', 1000))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('AI_INSIGHTS_CACHE_TTL_SECONDS', 86400))
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(os.getenv('AI_INSIGHTS_MAX_CONCURRENCY', 4))
+        self.timeout_seconds = timeout_seconds if timeout_seconds is not None else float(os.getenv('AI_INSIGHTS_TIMEOUT_SECONDS', 20))
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold if failure_threshold is not None else int(os.getenv('AI_INSIGHTS_BREAKER_FAILURES', 5)),
+            reset_seconds=reset_seconds if reset_seconds is not None else float(os.getenv('AI_INSIGHTS_BREAKER_RESET_SECONDS', 60)),
+        )
+
+        self._entries: "OrderedDict[str, Tuple[float, Insights]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.latency: Dict[str, LatencyHistogram] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def key_for(report_type: str, data_summary: Dict[str, Any], user_context: str = "") -> str:
+        """Hash the prompt inputs. default=str covers dates and numpy scalars in the summary."""
+        payload = json.dumps([report_type, user_context, data_summary], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Insights]:
+        """Return the cached insights for a key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, insights = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return insights
+
+    def put(self, key: str, insights: Insights) -> None:
+        if not self.enabled:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, insights)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def generate(self, key: str, call: Callable[[], Insights], report_type: str = "unknown") -> Insights:
+        """
+        Get insights from memory, joining a call in progress or starting one.
+
+        Args:
+            key (str): Cache key of the insights, from key_for.
+            call (Callable): Blocking function asking the model and parsing its answer. Run in a worker thread.
+            report_type (str): Report the insights are for. Labels the latency histogram.
+
+        Raises:
+            CircuitOpenError: The breaker is open after repeated failures.
+            asyncio.TimeoutError: The call missed its deadline.
+        """
+        insights = self.get(key)
+        if insights is not None:
+            self.hits += 1
+            return insights
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            loading = asyncio.create_task(self._load(key, call, report_type))
+            self._loading[key] = loading
+        return await self._wait(loading)
+
+    async def _load(self, key: str, call: Callable[[], Insights], report_type: str) -> Insights:
+        try:
+            insights = await self._call_model(call, report_type)
+        except BaseException:
+            self.errors += 1
+            raise
+        else:
+            self.put(key, insights)
+            return insights
+        finally:
+            del self._loading[key]
+
+    async def _wait(self, loading: asyncio.Task) -> Insights:
+        self._waiters[loading] = self._waiters.get(loading, 0) + 1
+        try:
+            return await asyncio.shield(loading)
+        except asyncio.CancelledError:
+            # Only this request was cancelled; the call is given up once no request is left waiting for it,
+            # and waited for so the breaker has left its trial state by the time this request returns
+            if not loading.done() and self._waiters[loading] == 1:
+                loading.cancel()
+                await asyncio.wait({loading})
+            raise
+        finally:
+            self._waiters[loading] -= 1
+            if not self._waiters[loading]:
+                del self._waiters[loading]
+
+    async def _call_model(self, call: Callable[[], Insights], report_type: str) -> Insights:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"AI insights unavailable, retrying in up to {self.breaker.reset_seconds:g}s")
+
+        start = time.perf_counter()
+        try:
+            insights = await asyncio.wait_for(self._run_in_slot(call), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # The caller went away; without this a cancelled trial call would leave the breaker half open for good
+            self.breaker.record_cancelled()
+            raise
+        else:
+            self.breaker.record_success()
+            return insights
+        finally:
+            self.latency.setdefault(report_type, LatencyHistogram()).observe(time.perf_counter() - start)
+
+    async def _run_in_slot(self, call: Callable[[], Insights]) -> Insights:
+        await self._slots.acquire()
+        self.in_flight += 1
+        running = asyncio.get_running_loop().run_in_executor(None, call)
+
+        def _release(done: asyncio.Future) -> None:
+            # The thread cannot be stopped, so a timed out call keeps its slot until it returns
+            self.in_flight -= 1
+            self._slots.release()
+            if not done.cancelled():
+                done.exception()
+
+        running.add_done_callback(_release)
+        return await asyncio.shield(running)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters, breaker state and call latencies for monitoring."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "breaker_state": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+            "breaker_rejected": self.breaker.rejected,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "latency": {report_type: histogram.snapshot() for report_type, histogram in self.latency.items()},
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@dataclass(frozen=True)
+class LocalModelResponse:
+    text: str
+
+
+class LocalInsightModel:
+    """
+    Offline stand-in for the Gemini model, with the same generate_content interface.
+
+    Answers every prompt with a fixed response in the section format the analyzer parses,
+    optionally sleeping first to behave like a slow remote call. Counts its calls so tests
+    and benchmarks can see how many reached the model.
+    """
+
+    RESPONSE = """**FINANCIAL HEALTH ASSESSMENT**
+Your spending is steady and most of it goes to essentials.
+
+**TOP 3 CONCERNS**
+• Small purchases add up over the month
+• Weekend spending is higher than weekday spending
+• There is little left over for savings
+
+**TOP 3 OPPORTUNITIES**
+• Buy groceries in bulk at month start
+• Join a stokvel to save with others
+• Walk short distances instead of taking a taxi
+
+**IMMEDIATE ACTION STEPS**
+1. Write down every purchase this week
+2. Set aside R50 on payday
+3. Plan weekend spending in advance
+
+**ENCOURAGEMENT**
+Every rand you save is a step towards a safer month.
+"""
+
+    def __init__(self, delay_seconds: float = 0.0, response: Optional[str] = None):
+        self.delay_seconds = delay_seconds
+        self.response = response if response is not None else self.RESPONSE
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> LocalModelResponse:
+        with self._lock:
+            self.calls += 1
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return LocalModelResponse(text=self.response)
+
+
+# Process-wide gateway shared by every report dispatcher
+_insight_gateway: Optional[InsightGateway] = None
+
+
+def get_insight_gateway() -> InsightGateway:
+    """Return the process-wide insight gateway, creating it on first use."""
+    global _insight_gateway
+    if _insight_gateway is None:
+        _insight_gateway = InsightGateway()
+        logger.info(
+            f"AI insight gateway created (max_entries={_insight_gateway.max_entries}, ttl={_insight_gateway.ttl_seconds}s, "
+            f"max_concurrency={_insight_gateway.max_concurrency}, timeout={_insight_gateway.timeout_seconds}s)"
+        )
+    return _insight_gateway
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("pdf-cache")
+logger.setLevel(logging.INFO)
+
+
+class PDFDiskCache:
+    """
+    Content-addressed, size-bounded disk cache of rendered report PDFs.
+
+    Entries are keyed by a SHA-256 of the render inputs (report type, report data and phone
+    number), so re-sending an unchanged report skips rendering. When the directory grows
+    past max_bytes the least recently used files are deleted.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str): Directory the PDFs are stored in. Created if missing.
+            max_bytes (int): Total size kept on disk. Defaults to REPORT_PDF_CACHE_MAX_MB or 100 MB.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv('REPORT_PDF_CACHE_MAX_MB', 100)) * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(report_type: str, report_data: Dict[str, Any], user_phone: str) -> str:
+        """Hash the render inputs. default=str covers dates and numpy scalars in the report data."""
+        payload = json.dumps([report_type, user_phone, report_data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached PDF, or None on a miss."""
+        path = self._path(key)
+        try:
+            pdf_bytes = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # Bump the modification time so eviction sees this entry as recently used
+        os.utime(path)
+        self.hits += 1
+        return pdf_bytes
+
+    def put(self, key: str, pdf_bytes: bytes) -> None:
+        """Store a PDF atomically and evict old entries if the cache is over its size limit."""
+        if len(pdf_bytes) > self.max_bytes:
+            return
+
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as tmp:
+            tmp.write(pdf_bytes)
+        os.replace(tmp.name, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.pdf"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                self.evictions += 1
+
+    def size_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.glob("*.pdf"))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size_bytes": self.size_bytes()}
+
+
+# Process-wide cache, only enabled when REPORT_PDF_CACHE_DIR is set
+_pdf_cache: Optional[PDFDiskCache] = None
+
+
+def get_pdf_cache() -> Optional[PDFDiskCache]:
+    """Return the process-wide PDF cache, or None when caching is disabled."""
+    global _pdf_cache
+    directory = os.getenv('REPORT_PDF_CACHE_DIR')
+    if _pdf_cache is None and directory:
+        _pdf_cache = PDFDiskCache(directory)
+        logger.info(f"Report PDF cache enabled at {directory} (max {_pdf_cache.max_bytes} bytes)")
+    return _pdf_cache
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from api.finance.pdf_generator import FinancialReportPDF
+
+load_dotenv()
+
+logger = logging.getLogger("pdf-pool")
+logger.setLevel(logging.INFO)
+
+
+@dataclass(frozen=True)
+class PDFRenderRequest:
+    """Everything a worker process needs to render one report. Only plain, picklable data."""
+
+    report_data: Dict[str, Any]
+    report_type: str
+    user_phone: str
+
+
+# One generator per worker process, so the ReportLab styles are set up once per process
+_process_pdf_generator: Optional[FinancialReportPDF] = None
+
+
+def render_report_pdf(request: PDFRenderRequest) -> bytes:
+    """Render a report PDF. Runs inside a pool worker process."""
+    global _process_pdf_generator
+    if _process_pdf_generator is None:
+        _process_pdf_generator = FinancialReportPDF()
+    return _process_pdf_generator.generate_category_report_pdf(request.report_data, request.report_type, request.user_phone)
+
+
+class PDFRenderPool:
+    """
+    Renders report PDFs in a ProcessPoolExecutor so ReportLab never blocks the event loop.
+
+    At most max_pending renders are submitted at once. Further callers wait for a slot, or
+    raise asyncio.TimeoutError after acquire_timeout, instead of piling work onto the pool.
+    The worker processes are started on the first render.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None, acquire_timeout: Optional[float] = None, start_method: Optional[str] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers (int): Worker processes. 0 renders in a thread instead. Defaults to PDF_POOL_WORKERS or 2.
+            max_pending (int): Renders submitted at once. Defaults to PDF_POOL_MAX_PENDING or twice max_workers.
+            acquire_timeout (float): Seconds to wait for a slot before giving up. Defaults to PDF_POOL_ACQUIRE_TIMEOUT_SECONDS or no limit.
+            start_method (str): multiprocessing start method. Defaults to PDF_POOL_START_METHOD or spawn.
+        """
+        self.max_workers = max_workers if max_workers is not None else int(os.getenv('PDF_POOL_WORKERS', 2))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv('PDF_POOL_MAX_PENDING', max(self.max_workers, 1) * 2))
+        timeout = acquire_timeout if acquire_timeout is not None else os.getenv('PDF_POOL_ACQUIRE_TIMEOUT_SECONDS')
+        self.acquire_timeout = float(timeout) if timeout else None
+        # spawn keeps the event loop, DB connections and threads of the app out of the workers
+        self.start_method = start_method or os.getenv('PDF_POOL_START_METHOD', 'spawn')
+
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(self.max_pending)
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.rendered = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and self.max_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+            logger.info(f"PDF render pool started with {self.max_workers} {self.start_method} workers")
+        return self._executor
+
+    async def render(self, report_data: Dict[str, Any], report_type: str, user_phone: str) -> bytes:
+        """Render a report PDF off the event loop, waiting for a free slot when the pool is saturated."""
+        request = PDFRenderRequest(report_data=report_data, report_type=report_type, user_phone=user_phone)
+
+        self.waiting += 1
+        try:
+            # Unlike wait_for, a timeout here cancels acquire() itself, which gives back a slot it was just handed
+            async with asyncio.timeout(self.acquire_timeout):
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                pdf_bytes = await asyncio.to_thread(render_report_pdf, request)
+            else:
+                pdf_bytes = await asyncio.get_running_loop().run_in_executor(executor, render_report_pdf, request)
+            self.rendered += 1
+            logger.debug(f"Rendered {report_type} PDF in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return pdf_bytes
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("PDF render pool shut down")
+
+
+# Process-wide pool shared by every report dispatcher
+_pdf_render_pool: Optional[PDFRenderPool] = None
+
+
+def get_pdf_render_pool() -> PDFRenderPool:
+    """Return the process-wide PDF render pool, creating it on first use."""
+    global _pdf_render_pool
+    if _pdf_render_pool is None:
+        _pdf_render_pool = PDFRenderPool()
+    return _pdf_render_pool
+
+
+def close_pdf_render_pool() -> None:
+    """Shut down the process-wide PDF render pool. Called from the FastAPI lifespan on shutdown."""
+    global _pdf_render_pool
+    if _pdf_render_pool is not None:
+        _pdf_render_pool.shutdown()
+        _pdf_render_pool = None
@@ -0,0 +1,200 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from api.db.query_manager import AmountGroup, AsyncQueries, ROLLUP_GROUP_COLUMNS, ROLLUP_SMALL_BELOW, month_end, month_key, month_start, next_month_start
+from api.utils.categories import record_category
+
+
+@dataclass
+class AmountTotals:
+    """Sum, count, min and max of amounts, merged from one or more AmountGroups."""
+
+    total: float = 0.0
+    count: int = 0
+    minimum: float = float("inf")
+    maximum: float = float("-inf")
+    first_id: int = 0
+
+    def add(self, group: Union[AmountGroup, "AmountTotals"]) -> None:
+        self.first_id = min(self.first_id, group.first_id) if self.count else group.first_id
+        self.total += group.total
+        self.count += group.count
+        self.minimum = min(self.minimum, group.minimum)
+        self.maximum = max(self.maximum, group.maximum)
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+def rollup(groups: Iterable[AmountGroup], key: Callable[[AmountGroup], Any]) -> Dict[Any, AmountTotals]:
+    """Merge groups by key. Keys are ordered by the first record that produced them."""
+    totals: Dict[Any, AmountTotals] = {}
+    for group in groups:
+        totals.setdefault(key(group), AmountTotals()).add(group)
+    return dict(sorted(totals.items(), key=lambda item: item[1].first_id))
+
+
+def closed_months(start_date: datetime, end_date: datetime, now: Optional[datetime] = None) -> List[str]:
+    """The whole months inside [start_date, end_date] that ended before the current month."""
+    current_month_start = month_start(month_key(now or datetime.now()))
+    months = []
+    month = month_key(start_date) if start_date == month_start(month_key(start_date)) else month_key(next_month_start(month_key(start_date)))
+    while next_month_start(month) <= current_month_start and month_end(month) <= end_date:
+        months.append(month)
+        month = month_key(next_month_start(month))
+    return months
+
+
+def uncovered_ranges(start_date: datetime, end_date: datetime, rolled_up: Iterable[str]) -> List[Tuple[datetime, datetime]]:
+    """The parts of [start_date, end_date] outside the rolled up months, as inclusive date ranges."""
+    ranges = []
+    range_start = start_date
+    for month in sorted(rolled_up):
+        if month_start(month) > range_start:
+            ranges.append((range_start, month_start(month) - timedelta(microseconds=1)))
+        range_start = next_month_start(month)
+    if range_start <= end_date:
+        ranges.append((range_start, end_date))
+    return ranges
+
+
+@dataclass(frozen=True)
+class RecordAggregates:
+    """
+    A user's expenses, incomes or feelings for a report period, pre-aggregated by the database.
+
+    Each group by column is a separate GROUP BY query, so only a handful of rows come back
+    per column however many records the user has. Categories are grouped by the category
+    column stored with each record, so no type string is parsed.
+    """
+
+    # Group by column -> its groups, e.g. "weekday" -> one AmountGroup per weekday
+    groups: Dict[str, List[AmountGroup]]
+    small: AmountTotals = field(default_factory=AmountTotals)
+    largest: Optional[Any] = None
+    smallest: Optional[Any] = None
+
+    @classmethod
+    async def load(
+        cls,
+        query_manager: AsyncQueries,
+        record_type: str,
+        user_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        group_by: Iterable[str] = ("type",),
+        extremes: bool = False,
+        small_below: Optional[float] = None
+    ) -> "RecordAggregates":
+        """
+        Run the aggregation queries for one record type.
+
+        Months of the period that have ended and were rolled up are read from MonthlyRollup; the
+        partial first month, the current month and any month without rollups from the records.
+
+        Args:
+            group_by (Iterable[str]): Columns from AMOUNT_GROUP_COLUMNS to aggregate by, one query each.
+            extremes (bool): Also fetch the largest and smallest record.
+            small_below (float): Also total the records below this amount. ROLLUP_SMALL_BELOW is read from the rollups.
+        """
+        group_by = tuple(group_by)
+        # Whole months that have ended are read from MonthlyRollup; the rest of the period from the records
+        rolled_up, groups = set(), {column: [] for column in group_by}
+        months = closed_months(start_date, end_date)
+        small_from_rollups = small_below == ROLLUP_SMALL_BELOW
+        if months and set(group_by) <= set(ROLLUP_GROUP_COLUMNS.get(record_type, ())):
+            rolled_up, groups = await query_manager.get_monthly_rollups(
+                user_id, record_type, months, group_by + (("small",) if small_from_rollups else ())
+            )
+        small_groups = groups.pop("small", [])
+        ranges = uncovered_ranges(start_date, end_date, rolled_up)
+
+        for range_start, range_end in ranges:
+            for column in group_by:
+                groups[column] += await query_manager.aggregate_user_amounts(record_type, user_id, range_start, range_end, group_by=(column,))
+
+        small = AmountTotals()
+        if small_below is not None:
+            small_ranges = ranges if small_from_rollups else [(start_date, end_date)]
+            for range_start, range_end in small_ranges:
+                small_groups += await query_manager.aggregate_user_amounts(record_type, user_id, range_start, range_end, below_amount=small_below)
+            for group in small_groups:
+                small.add(group)
+
+        largest = smallest = None
+        if extremes and any(groups.values()):
+            by_month = rollup(groups["month"], lambda group: group.key[0]) if "month" in groups else {}
+            largest = await cls._extreme_record(query_manager, record_type, user_id, start_date, end_date, by_month, largest=True)
+            smallest = await cls._extreme_record(query_manager, record_type, user_id, start_date, end_date, by_month, largest=False)
+
+        return cls(groups=groups, small=small, largest=largest, smallest=smallest)
+
+    @staticmethod
+    async def _extreme_record(
+        query_manager: AsyncQueries,
+        record_type: str,
+        user_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        by_month: Dict[str, AmountTotals],
+        largest: bool
+    ) -> Optional[Any]:
+        """The largest or smallest record, searched only in the months whose totals hold that amount."""
+        if by_month:
+            extreme = max(totals.maximum for totals in by_month.values()) if largest else min(totals.minimum for totals in by_month.values())
+            # Ties are resolved by row id over every month holding the amount
+            holding = sorted(month for month, totals in by_month.items() if (totals.maximum if largest else totals.minimum) == extreme)
+            start_date = max(start_date, month_start(holding[0]))
+            end_date = min(end_date, month_end(holding[-1]))
+        return await query_manager.get_user_extreme_amount_record(record_type, user_id, start_date, end_date, largest=largest)
+
+    def _rollup(self, column: str, key: Callable[[Any], Any] = lambda value: value) -> Dict[Any, AmountTotals]:
+        if column not in self.groups:
+            raise KeyError(f"'{column}' was not in the group by columns of this load")
+        return rollup(self.groups[column], lambda group: key(group.key[0]))
+
+    @cached_property
+    def overall(self) -> AmountTotals:
+        # Every grouping covers all records, so any of them gives the overall totals
+        totals = AmountTotals()
+        for group in next(iter(self.groups.values()), []):
+            totals.add(group)
+        return totals
+
+    @cached_property
+    def by_type(self) -> Dict[str, AmountTotals]:
+        return self._rollup("type")
+
+    @cached_property
+    def by_category(self) -> Dict[str, AmountTotals]:
+        if "category" in self.groups:
+            return self._rollup("category")
+        # Loads without the category column merge their types through the shared classifier
+        return self._rollup("type", record_category)
+
+    @cached_property
+    def by_day(self) -> Dict[date, AmountTotals]:
+        return self._rollup("day")
+
+    @cached_property
+    def by_weekday(self) -> Dict[str, AmountTotals]:
+        return self._rollup("weekday")
+
+    @cached_property
+    def by_month(self) -> Dict[str, AmountTotals]:
+        return self._rollup("month")
+
+    @cached_property
+    def by_month_part(self) -> Dict[str, AmountTotals]:
+        return self._rollup("month_part")
+
+    @cached_property
+    def by_feeling(self) -> Dict[Optional[str], AmountTotals]:
+        return self._rollup("feeling")
+
+    def total_where(self, predicate: Callable[[str], bool]) -> float:
+        """Total of the record types matching the predicate."""
+        return sum(totals.total for record_type, totals in self.by_type.items() if predicate(record_type))
@@ -1,70 +1,149 @@
     # api/utils/report_dispatcher.py
 from typing import Dict, Any, Optional
 from api.db.models.tables import User
+from api.db.db_manager import DatabaseManager
 from api.finance.category_reports import CategoryReportGenerator
 from api.finance.aggregator import FinancialAggregator
-from api.finance.pdf_generator import FinancialReportPDF
+from api.finance.pdf_pool import PDFRenderPool, get_pdf_render_pool
+from api.finance.pdf_cache import PDFDiskCache, get_pdf_cache
 from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
-from datetime import datetime
+from api.finance.report_stages import ReportStage, ReportStageProfile, get_report_stage_profile, run_report_stages
+from api.finance.snapshot import FinancialSnapshotCache, UserFinancialSnapshot
+from api.services.report_storage import ReportStorage
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("report-dispatcher")
+logger.setLevel(logging.INFO)
+
+REPORT_TYPES = ("expenses", "incomes", "feelings", "comprehensive")
+
+
+class ReportUnavailable(Exception):
+    """Raised by the aggregate stage when the report has no data, to stop the stages after it"""
+    
+    def __init__(self, report_data: Dict[str, Any]):
+        super().__init__(report_data.get("error"))
+        self.report_data = report_data
 
 
 class PersonalizedReportDispatcher:
     """Enhanced report dispatcher with personalized AI insights"""
     
-    def __init__(self, user, gemini_api_key: str = None):
+    def __init__(self, user, gemini_api_key: str = None, db_manager: Optional[DatabaseManager] = None, pdf_pool: Optional[PDFRenderPool] = None, pdf_cache: Optional[PDFDiskCache] = None, ai_analyzer: Optional[PersonalizedGeminiAnalyzer] = None, stage_profile: Optional[ReportStageProfile] = None, snapshot_cache: Optional[FinancialSnapshotCache] = None):
         self.user = user
-        self.category_generator = CategoryReportGenerator(user.id)
-        self.comprehensive_generator = FinancialAggregator(user.id)
-        self.pdf_generator = FinancialReportPDF()
-        self.ai_analyzer = PersonalizedGeminiAnalyzer(gemini_api_key) if gemini_api_key else None
+        # Both generators read the user's data through the same snapshot cache
+        self.category_generator = CategoryReportGenerator(user.id, db_manager=db_manager, snapshot_cache=snapshot_cache)
+        self.comprehensive_generator = FinancialAggregator(user.id, db_manager=db_manager, snapshot_cache=snapshot_cache)
+        # PDFs are rendered in worker processes so ReportLab does not block the event loop
+        self.pdf_pool = pdf_pool or get_pdf_render_pool()
+        # Optional disk cache so unchanged reports are not rendered again
+        self.pdf_cache = pdf_cache or get_pdf_cache()
+        self.ai_analyzer = ai_analyzer or (PersonalizedGeminiAnalyzer(gemini_api_key) if gemini_api_key else None)
+        # Stage timings of every report, for profiling
+        self.stage_profile = stage_profile or get_report_stage_profile()
     
-    async def generate_personalized_report(self, report_type: str, months_back: int = 6, include_ai: bool = True, generate_pdf: bool = True) -> Dict[str, Any]:
-        """Generate report with personalized AI analysis of user's actual data"""
+    async def generate_personalized_report(self, report_type: str, months_back: int = 6, include_ai: bool = True, generate_pdf: bool = True, report_storage: Optional[ReportStorage] = None, expiration_hours: int = 24) -> Dict[str, Any]:
+        """
+        Generate report with personalized AI analysis of user's actual data
         
-        # Generate the base report
-        if report_type == "expenses":
-            report_data = await self.category_generator.generate_expenses_report(months_back)
-        elif report_type == "incomes":
-            report_data = await self.category_generator.generate_incomes_report(months_back)
-        elif report_type == "feelings":
-            report_data = await self.category_generator.generate_feelings_report(months_back)
-        elif report_type == "comprehensive":
-            report_data = await self.comprehensive_generator.get_comprehensive_financial_report(months_back)
-        else:
+        Runs as a pipeline of stages: fetch -> aggregate -> {AI insights, PDF render -> upload}.
+        The AI insights do not depend on the PDF, so they run at the same time as the render
+        and upload. The upload stage only runs when a report_storage is given and puts the
+        link in presigned_url. stage_timings_ms holds the milliseconds of each stage and the total.
+        """
+        if report_type not in REPORT_TYPES:
             return {"error": f"Unknown report type: {report_type}"}
         
-        if "error" in report_data:
-            return report_data
-        
-        result = {"report_data": report_data}
-        
+        result: Dict[str, Any] = {}
+        stages = [
+            ReportStage("fetch", lambda done: self._fetch(report_type, months_back)),
+            ReportStage("aggregate", lambda done: self._aggregate(report_type, months_back, done["fetch"]), ("fetch",)),
+        ]
         # Generate PERSONALIZED AI insights based on actual user data
         if include_ai and self.ai_analyzer:
-            try:
-                personalized_insights = await self.ai_analyzer.generate_personalized_insights(
-                    report_data, 
-                    report_type, 
-                    f"South African lower-income user (Phone: {self.user.phone_number})"
-                )
-                result["personalized_ai_insights"] = personalized_insights
-            except Exception as e:
-                result["ai_insights_error"] = f"Personalized AI analysis failed: {str(e)}"
-        
-        # Generate PDF if requested
+            stages.append(ReportStage("ai_insights", lambda done: self._ai_insights(done["aggregate"], report_type, result), ("aggregate",)))
+        # The bytes stay in memory and are uploaded straight from there
         if generate_pdf:
-            try:
-                pdf_bytes = self.pdf_generator.generate_category_report_pdf(report_data, report_type, self.user.phone_number)
-                pdf_filename = f"{report_type}_report_{self.user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                
-                with open(pdf_filename, 'wb') as f:
-                    f.write(pdf_bytes)
-                
-                result["pdf_filename"] = pdf_filename
-                result["pdf_size_kb"] = len(pdf_bytes) / 1024
-            except Exception as e:
-                result["pdf_error"] = f"PDF generation failed: {str(e)}"
+            stages.append(ReportStage("pdf", lambda done: self._pdf(done["aggregate"], report_type, result), ("aggregate",)))
+            if report_storage is not None:
+                stages.append(ReportStage("upload", lambda done: self._upload(done["pdf"], report_type, report_storage, expiration_hours, result), ("pdf",)))
+        
+        start = time.perf_counter()
+        try:
+            done, timings = await run_report_stages(stages)
+        except ReportUnavailable as e:
+            return e.report_data
+        timings["total"] = round((time.perf_counter() - start) * 1000, 1)
         
-        return result
+        self.stage_profile.record(report_type, timings)
+        logger.debug(f"{report_type} report stages (ms): {timings}")
+        return {"report_data": done["aggregate"], **result, "stage_timings_ms": timings}
+    
+    async def _fetch(self, report_type: str, months_back: int) -> UserFinancialSnapshot:
+        if report_type == "comprehensive":
+            return await self.comprehensive_generator.load_snapshot(months_back)
+        return await self.category_generator.load_snapshot(months_back)
+    
+    async def _aggregate(self, report_type: str, months_back: int, snapshot: UserFinancialSnapshot) -> Dict[str, Any]:
+        if report_type == "expenses":
+            report_data = await self.category_generator.generate_expenses_report(months_back, snapshot=snapshot)
+        elif report_type == "incomes":
+            report_data = await self.category_generator.generate_incomes_report(months_back, snapshot=snapshot)
+        elif report_type == "feelings":
+            report_data = await self.category_generator.generate_feelings_report(months_back, snapshot=snapshot)
+        else:
+            report_data = await self.comprehensive_generator.get_comprehensive_financial_report(months_back, snapshot=snapshot)
+        
+        if "error" in report_data:
+            raise ReportUnavailable(report_data)
+        return report_data
+    
+    async def _ai_insights(self, report_data: Dict[str, Any], report_type: str, result: Dict[str, Any]) -> None:
+        try:
+            result["personalized_ai_insights"] = await self.ai_analyzer.generate_personalized_insights(
+                report_data, 
+                report_type, 
+                f"South African lower-income user (Phone: {self.user.phone_number})"
+            )
+        except Exception as e:
+            result["ai_insights_error"] = f"Personalized AI analysis failed: {str(e)}"
+    
+    async def _pdf(self, report_data: Dict[str, Any], report_type: str, result: Dict[str, Any]) -> Optional[bytes]:
+        try:
+            pdf_bytes = await self._render_pdf(report_data, report_type)
+        except Exception as e:
+            result["pdf_error"] = f"PDF generation failed: {str(e)}"
+            return None
+        result["pdf_bytes"] = pdf_bytes
+        result["pdf_size_kb"] = len(pdf_bytes) / 1024
+        return pdf_bytes
+    
+    async def _upload(self, pdf_bytes: Optional[bytes], report_type: str, report_storage: ReportStorage, expiration_hours: int, result: Dict[str, Any]) -> None:
+        if not pdf_bytes:
+            return
+        try:
+            result["presigned_url"] = await report_storage.upload_pdf_from_bytes_secure(
+                pdf_bytes=pdf_bytes,
+                user_id=self.user.id,
+                report_type=report_type,
+                expiration_hours=expiration_hours
+            )
+        except Exception as e:
+            result["upload_error"] = f"Report upload failed: {str(e)}"
+
+    async def _render_pdf(self, report_data: Dict[str, Any], report_type: str) -> bytes:
+        """Render the report PDF, reusing a cached copy of an identical report when available"""
+        if self.pdf_cache is None:
+            return await self.pdf_pool.render(report_data, report_type, self.user.phone_number)
+
+        cache_key = self.pdf_cache.key_for(report_type, report_data, self.user.phone_number)
+        pdf_bytes = await asyncio.to_thread(self.pdf_cache.get, cache_key)
+        if pdf_bytes is None:
+            pdf_bytes = await self.pdf_pool.render(report_data, report_type, self.user.phone_number)
+            await asyncio.to_thread(self.pdf_cache.put, cache_key, pdf_bytes)
+        return pdf_bytes
 
 # Usage example with personalized insights:
 async def generate_personalized_user_report(user, report_type: str):
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from api.finance.llm_gateway import LatencyHistogram
+
+logger = logging.getLogger("report-stages")
+logger.setLevel(logging.INFO)
+
+StageResults = Dict[str, Any]
+
+# Stages range from milliseconds (aggregation) to seconds (AI insights, uploads)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+@dataclass(frozen=True)
+class ReportStage:
+    """One step of the report pipeline. run receives the results of the stages finished so far."""
+
+    name: str
+    run: Callable[[StageResults], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+
+
+async def run_report_stages(stages: Sequence[ReportStage]) -> Tuple[StageResults, Dict[str, float]]:
+    """
+    Run a pipeline of stages, each as soon as the stages it depends on have finished.
+
+    Stages without a path between them run concurrently. If a stage raises, the stages still
+    running are cancelled and the exception is re-raised.
+
+    Args:
+        stages (Sequence[ReportStage]): The pipeline, every stage listed after its dependencies.
+
+    Returns:
+        The result of every stage, and the milliseconds each one took, by stage name.
+    """
+    names = set()
+    for stage in stages:
+        missing = [name for name in stage.depends_on if name not in names]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on {missing}, which must be listed before it")
+        names.add(stage.name)
+
+    results: StageResults = {}
+    timings: Dict[str, float] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def _run(stage: ReportStage) -> None:
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+        start = time.perf_counter()
+        try:
+            results[stage.name] = await stage.run(results)
+        finally:
+            timings[stage.name] = round((time.perf_counter() - start) * 1000, 1)
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(_run(stage), name=f"report-stage-{stage.name}")
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return results, timings
+
+
+class ReportStageProfile:
+    """Latency histograms of every report stage run in this process, by report type and stage."""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def record(self, report_type: str, timings: Dict[str, float]) -> None:
+        for stage, milliseconds in timings.items():
+            self.latency.setdefault((report_type, stage), LatencyHistogram(STAGE_BUCKETS)).observe(milliseconds / 1000)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{report_type}.{stage}": histogram.snapshot() for (report_type, stage), histogram in sorted(self.latency.items())}
+
+
+# Process-wide profile shared by every report dispatcher
+_report_stage_profile: Optional[ReportStageProfile] = None
+
+
+def get_report_stage_profile() -> ReportStageProfile:
+    """Return the process-wide report stage profile, creating it on first use."""
+    global _report_stage_profile
+    if _report_stage_profile is None:
+        _report_stage_profile = ReportStageProfile()
+    return _report_stage_profile
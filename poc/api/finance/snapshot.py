@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import FinancialFeelings, UnverifiedIncomes
+from api.db.query_manager import AsyncQueries, ROLLUP_SMALL_BELOW
+from api.finance.record_aggregates import RecordAggregates
+
+load_dotenv()
+
+logger = logging.getLogger("financial-snapshot")
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+# Expenses below this amount count as small, frequent purchases
+SMALL_EXPENSE_AMOUNT = ROLLUP_SMALL_BELOW
+
+# Every grouping used by the comprehensive, expenses, incomes and feelings reports
+EXPENSE_GROUP_BY = ("type", "category", "day", "weekday", "month", "month_part", "feeling")
+INCOME_GROUP_BY = ("type", "category", "weekday", "month")
+
+SnapshotKey = Tuple[str, int, int]
+
+
+@dataclass(frozen=True)
+class UserFinancialSnapshot:
+    """
+    Everything the report generators read about one user for one report period.
+
+    Loaded once and shared by the comprehensive, expenses, incomes and feelings reports, so a
+    user asking for several reports does not have the same ranges queried again for each.
+    """
+
+    user_id: int
+    start_date: datetime
+    end_date: datetime
+    expenses: RecordAggregates
+    incomes: RecordAggregates
+    # Individual rows, for the analyses that cannot work from aggregates
+    income_records: List[UnverifiedIncomes]
+    feelings: List[FinancialFeelings]
+    feeling_counts: List[Tuple[str, int]]
+
+    @property
+    def period(self) -> str:
+        return f"{self.start_date.strftime('%B %Y')} to {self.end_date.strftime('%B %Y')}"
+
+    @classmethod
+    async def load(cls, db_manager: DatabaseManager, user_id: int, months_back: int = 6) -> "UserFinancialSnapshot":
+        """
+        Run the snapshot's queries concurrently, each in its own session from the shared pool.
+
+        Args:
+            db_manager (DatabaseManager): Database to read from.
+            user_id (int): Owner of the records.
+            months_back (int): Length of the period in 30 day months, ending now.
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=months_back * 30)
+
+        async def _fetch(query: Callable[[AsyncQueries], Awaitable[T]]) -> T:
+            async with db_manager.session_scope() as session:
+                return await query(AsyncQueries(session=session))
+
+        expenses, incomes, income_records, feelings, feeling_totals = await asyncio.gather(
+            _fetch(lambda query_manager: RecordAggregates.load(
+                query_manager, "expense", user_id, start_date, end_date,
+                group_by=EXPENSE_GROUP_BY, extremes=True, small_below=SMALL_EXPENSE_AMOUNT
+            )),
+            _fetch(lambda query_manager: RecordAggregates.load(
+                query_manager, "income", user_id, start_date, end_date, group_by=INCOME_GROUP_BY, extremes=True
+            )),
+            _fetch(lambda query_manager: query_manager.get_user_incomes_by_date_range(user_id, start_date, end_date)),
+            _fetch(lambda query_manager: query_manager.get_user_feelings_by_date_range(user_id, start_date, end_date)),
+            _fetch(lambda query_manager: RecordAggregates.load(query_manager, "feeling", user_id, start_date, end_date)),
+        )
+
+        return cls(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            expenses=expenses,
+            incomes=incomes,
+            income_records=list(income_records),
+            feelings=list(feelings),
+            feeling_counts=[(feeling, totals.count) for feeling, totals in feeling_totals.by_type.items()],
+        )
+
+
+class FinancialSnapshotCache:
+    """
+    Bounded LRU/TTL cache of UserFinancialSnapshots keyed by database, user and period length.
+
+    Concurrent requests for the same snapshot share a single load. Recording a new expense,
+    income or feeling invalidates the user's snapshots; the short TTL bounds how long a
+    process can serve records written by another process.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of snapshots kept. Defaults to REPORT_SNAPSHOT_MAX_ENTRIES or 1000.
+            ttl_seconds (float): Seconds a snapshot stays valid. Defaults to REPORT_SNAPSHOT_TTL_SECONDS or 300.
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('REPORT_SNAPSHOT_MAX_ENTRIES', 1000))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('REPORT_SNAPSHOT_TTL_SECONDS', 300))
+
+        self._entries: "OrderedDict[SnapshotKey, Tuple[float, UserFinancialSnapshot]]" = OrderedDict()
+        self._loading: Dict[SnapshotKey, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: SnapshotKey) -> Optional[UserFinancialSnapshot]:
+        """Return the cached snapshot for a key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, snapshot = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return snapshot
+
+    def put(self, key: SnapshotKey, snapshot: UserFinancialSnapshot) -> None:
+        if not self.enabled:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def load(self, db_manager: DatabaseManager, user_id: int, months_back: int = 6) -> UserFinancialSnapshot:
+        """Get a user's snapshot from memory, joining a load in progress or starting one."""
+        key = (db_manager.db_url, user_id, months_back)
+        snapshot = self.get(key)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            self.coalesced += 1
+            return await asyncio.shield(loading)
+
+        self.misses += 1
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[key] = loading
+        try:
+            snapshot = await UserFinancialSnapshot.load(db_manager, user_id, months_back)
+        except BaseException as e:
+            loading.set_exception(e)
+            # Waiters re-raise it; this marks it retrieved when there are none
+            loading.exception()
+            raise
+        else:
+            # Invalidated while loading: hand the result to the waiters but do not keep it
+            if self._loading.get(key) is loading:
+                self.put(key, snapshot)
+            loading.set_result(snapshot)
+            return snapshot
+        finally:
+            if self._loading.get(key) is loading:
+                del self._loading[key]
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every snapshot of a user, after their records change."""
+        for key in [key for key in self._entries if key[1] == user_id]:
+            del self._entries[key]
+        for key in [key for key in self._loading if key[1] == user_id]:
+            del self._loading[key]
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss/eviction counters for monitoring."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Process-wide cache shared by the report generators and the record template actions
+_snapshot_cache: Optional[FinancialSnapshotCache] = None
+
+
+def get_snapshot_cache() -> FinancialSnapshotCache:
+    """Return the process-wide financial snapshot cache, creating it on first use."""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        _snapshot_cache = FinancialSnapshotCache()
+        logger.info(f"Financial snapshot cache created (max_entries={_snapshot_cache.max_entries}, ttl={_snapshot_cache.ttl_seconds}s)")
+    return _snapshot_cache
@@ -5,7 +5,7 @@ from typing import Optional
 from dotenv import load_dotenv
 from twilio.rest import Client
 
-from utils.utils import is_e164_format
+from api.utils.utils import is_e164_format
 
 load_dotenv()
 
@@ -118,13 +118,14 @@ class TwilioClient:
         """Check if the Twilio number is properly initialized."""
         return self.from_number is not None
     
-    def send_mesage_notification(self, to: str, body: str) -> bool:
+    def send_mesage_notification(self, to: str, body: str, media_url: Optional[str] = None) -> bool:
         """
-        Sends an SMS message to a specified phone number.
+        Sends an SMS or WhatsApp message to a specified phone number.
 
         Parameters:
-        to (str): The recipient's phone number in E.164 format.
-        body (str): The content of the SMS message.
+        to (str): The recipient's phone number in E.164 format, prefixed with "whatsapp:" for WhatsApp.
+        body (str): The content of the message.
+        media_url (str): Optional URL of a file to attach, such as a report PDF.
 
         Returns:
         bool: True if the message is sent successfully, False otherwise.
@@ -132,7 +133,15 @@ class TwilioClient:
         try:
 
             if self.is_client_valid():
-                self.client.messages.create(to=to, from_=self.from_number, body=body)
+                from_number = self.from_number
+                if to.startswith("whatsapp:") and not from_number.startswith("whatsapp:"):
+                    from_number = f"whatsapp:{from_number}"
+
+                message_options = {"to": to, "from_": from_number, "body": body}
+                if media_url:
+                    message_options["media_url"] = [media_url]
+
+                self.client.messages.create(**message_options)
                 return True
             raise ValueError(
                 "Failed to send message. Twilio client is not initialized."
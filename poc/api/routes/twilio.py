@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import JSONResponse, PlainTextResponse
 from api.middleware.utils import validate_twilio_request
 from api.db.query_manager import AsyncQueries
 from api.db.db_manager import DatabaseManager
+from api.db.db_dependencies import get_db_manager, get_conversation_state_cache
+from api.db.conversation_cache import ConversationStateCache
 from api.utils.twilio_templates import TwilioTemplateManager
-from api.db.models.tables import User, MessageState, LanguagePreference, UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings
-from api.utils.template_actions import create_poc_dummy_data_south_africa
+from api.db.models.tables import User, MessageState, LanguagePreference
+from api.utils.template_actions import insert_poc_dummy_data, seed_poc_dummy_data
+from dotenv import load_dotenv
 import logging
 
+load_dotenv()
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Seed POC dummy data after the first reply is sent instead of inside the webhook response
+POC_SEED_IN_BACKGROUND = os.getenv('POC_SEED_IN_BACKGROUND', 'false').lower() in ('1', 'true', 'yes')
+
 router = APIRouter(
     prefix="/api/twilio",
     tags=["twilio"],
@@ -19,12 +28,9 @@ router = APIRouter(
 
 
 @router.post("/whatsapp")
-async def twilio_webhook(form_data: dict = Depends(validate_twilio_request)):
+async def twilio_webhook(form_data: dict = Depends(validate_twilio_request), db_manager: DatabaseManager = Depends(get_db_manager), conversation_cache: ConversationStateCache = Depends(get_conversation_state_cache)):
     """Handle incoming WhatsApp messages from Twilio."""
     logging.info("Received WhatsApp message from Twilio")
-    # Database Manager
-    db_manager = DatabaseManager(db_url='sqlite+aiosqlite:///test_db.db')
-    
     # Use async context manager properly
     async with db_manager.session_scope() as db_session:
         # Query Manager
@@ -34,8 +40,8 @@ async def twilio_webhook(form_data: dict = Depends(validate_twilio_request)):
         message_body = form_data.get("Body", "")
         from_number = form_data.get("From", "")
 
-        # Check if the user exists in your database
-        user = await query_manager.get_user_by_phone(phone_number=from_number)
+        # Load the user, conversation state and language preference (from memory for active chats)
+        user, user_message_state, language_preference = await conversation_cache.load(query_manager, phone_number=from_number)
         
         if user is None:
             # User not found, set template
@@ -63,7 +69,7 @@ async def twilio_webhook(form_data: dict = Depends(validate_twilio_request)):
             logging.info("Initializing tables for new user")
 
             # Get the template message
-            next_template, previous_template, twiml_message = template_manager.get_template_message()
+            next_template, previous_template, twiml_message = await template_manager.get_template_message()
             
             # Create message state (will stay on language selector)
             new_message_state = MessageState(
@@ -78,11 +84,6 @@ async def twilio_webhook(form_data: dict = Depends(validate_twilio_request)):
         
         logging.info("User found, set template")
 
-        # Get conversation state
-        user_message_state = await query_manager.get_user_message_state(user_id=user.id)
-        # Get user language preference
-        language_preference = await query_manager.get_user_language_preference(user_id=user.id)
-
         print(f"DEBUG: Current state: {user_message_state.current_state}")
         print(f"DEBUG: Has started: {user_message_state.has_started}")
         print(f"DEBUG: Current language: {language_preference.preferred_language}")
@@ -99,30 +100,30 @@ async def twilio_webhook(form_data: dict = Depends(validate_twilio_request)):
         )
 
         # Get the response (this handles all the logic)
-        next_template, previous_template, twiml_message = template_manager.get_template_message()
+        next_template, previous_template, twiml_message = await template_manager.get_template_message()
 
-        # Check if language was selected and update database
+        # Check if language was selected
         selected_language = template_manager.get_selected_language()
         if selected_language:
             print(f"DEBUG: Language selected: {selected_language}")
-            await query_manager.update_user_language_preference(user_id=user.id, new_language=selected_language)
 
-        # Update the database state
-        await query_manager.update_current_message_state(user_id=user.id, new_state=next_template)
-        if previous_template:
-            await query_manager.update_previous_message_state(user_id=user.id, new_state=previous_template)
+        # Update the conversation state (and language) in a single commit and refresh the cache
+        await conversation_cache.save_transition(
+            query_manager,
+            user_id=user.id,
+            current_state=next_template,
+            previous_state=previous_template,
+            language=selected_language
+        )
 
         logging.info("Response processed, returning TwiML")
         
         return PlainTextResponse(content=twiml_message, media_type="application/xml")
     
 @router.post("/whatsapp/poc")
-async def twilio_webhook_poc(form_data: dict = Depends(validate_twilio_request)):
+async def twilio_webhook_poc(background_tasks: BackgroundTasks, form_data: dict = Depends(validate_twilio_request), db_manager: DatabaseManager = Depends(get_db_manager), conversation_cache: ConversationStateCache = Depends(get_conversation_state_cache)):
     """Handle incoming WhatsApp messages from Twilio with South African dummy data for POC."""
     logging.info("Received WhatsApp message from Twilio (POC)")
-    # Database Manager
-    db_manager = DatabaseManager(db_url='sqlite+aiosqlite:///test_db.db')
-    
     # Use async context manager properly
     async with db_manager.session_scope() as db_session:
         # Query Manager
@@ -132,8 +133,8 @@ async def twilio_webhook_poc(form_data: dict = Depends(validate_twilio_request))
         message_body = form_data.get("Body", "")
         from_number = form_data.get("From", "")
 
-        # Check if the user exists in your database
-        user = await query_manager.get_user_by_phone(phone_number=from_number)
+        # Load the user, conversation state and language preference (from memory for active chats)
+        user, user_message_state, language_preference = await conversation_cache.load(query_manager, phone_number=from_number)
         
         if user is None:
             # User not found, set template
@@ -161,24 +162,15 @@ async def twilio_webhook_poc(form_data: dict = Depends(validate_twilio_request))
             logging.info("Initializing tables for new user")
 
             # ===== SOUTH AFRICAN POC DUMMY DATA GENERATION =====
-            logging.info("Generating South African lower-income dummy data for POC user")
-            from api.utils.template_actions import create_poc_dummy_data_south_africa
-            
-            dummy_data_list = await create_poc_dummy_data_south_africa(new_user)
-            
-            # Add all dummy data to database
-            for data_type, data_dict in dummy_data_list:
-                if data_type == 'expense':
-                    expense_record = UnverifiedExpenses(**data_dict)
-                    await query_manager.add(expense_record)
-                elif data_type == 'income':
-                    income_record = UnverifiedIncomes(**data_dict)
-                    await query_manager.add(income_record)
-                elif data_type == 'feeling':
-                    feeling_record = FinancialFeelings(**data_dict)
-                    await query_manager.add(feeling_record)
-            
-            logging.info(f"Generated {len(dummy_data_list)} South African dummy records for POC user")
+            if POC_SEED_IN_BACKGROUND:
+                # Runs once the response is sent, after this session has committed the new user
+                logging.info("Scheduling South African dummy data generation for POC user")
+                background_tasks.add_task(seed_poc_dummy_data, new_user, db_manager)
+            else:
+                logging.info("Generating South African lower-income dummy data for POC user")
+                # One INSERT per table plus the monthly rollups, committed with the rest of this request
+                counts = await insert_poc_dummy_data(query_manager, new_user)
+                logging.info(f"Generated {sum(counts.values())} South African dummy records for POC user")
             # ===== END DUMMY DATA GENERATION =====
 
             # Get the template message
@@ -198,11 +190,6 @@ async def twilio_webhook_poc(form_data: dict = Depends(validate_twilio_request))
         # Rest of your existing logic for existing users...
         logging.info("User found, set template")
 
-        # Get conversation state
-        user_message_state = await query_manager.get_user_message_state(user_id=user.id)
-        # Get user language preference
-        language_preference = await query_manager.get_user_language_preference(user_id=user.id)
-
         print(f"DEBUG: Current state: {user_message_state.current_state}")
         print(f"DEBUG: Has started: {user_message_state.has_started}")
         print(f"DEBUG: Current language: {language_preference.preferred_language}")
@@ -222,16 +209,19 @@ async def twilio_webhook_poc(form_data: dict = Depends(validate_twilio_request))
         # Get the response (this handles all the logic)
         next_template, previous_template, twiml_message = await template_manager.get_template_message()
 
-        # Check if language was selected and update database
+        # Check if language was selected
         selected_language = template_manager.get_selected_language()
         if selected_language:
             print(f"DEBUG: Language selected: {selected_language}")
-            await query_manager.update_user_language_preference(user_id=user.id, new_language=selected_language)
 
-        # Update the database state
-        await query_manager.update_current_message_state(user_id=user.id, new_state=next_template)
-        if previous_template:
-            await query_manager.update_previous_message_state(user_id=user.id, new_state=previous_template)
+        # Update the conversation state (and language) in a single commit and refresh the cache
+        await conversation_cache.save_transition(
+            query_manager,
+            user_id=user.id,
+            current_state=next_template,
+            previous_state=previous_template,
+            language=selected_language
+        )
 
         logging.info("Response processed, returning TwiML")
         
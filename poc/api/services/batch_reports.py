@@ -0,0 +1,249 @@
+"""
+Generate every user's reports ahead of the monthly send-out.
+
+Users are streamed from the database a chunk at a time. Within a chunk a pool of worker tasks
+takes one user at a time and builds all of their reports at once; the reports share one
+snapshot of the user's data, held in a snapshot cache that lives as long as the chunk. PDFs
+render in the PDF process pool and are uploaded to the report storage backend selected by
+REPORT_STORAGE_BACKEND. Prints users per second and the p50/p95 of every report stage.
+
+Usage (from the poc directory):
+    python -m api.services.batch_reports
+    python -m api.services.batch_reports --workers 8 --chunk-size 200 --pdf-workers 4
+    python -m api.services.batch_reports --user-id 3 7 --report-types expenses incomes
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from api.db.db_manager import DatabaseManager, get_database_manager
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
+from api.finance.pdf_pool import PDFRenderPool
+from api.finance.report import REPORT_TYPES, PersonalizedReportDispatcher
+from api.finance.report_stages import ReportStageProfile
+from api.finance.snapshot import FinancialSnapshotCache
+from api.services.report_storage import ReportStorage, close_report_storage, get_report_storage
+
+load_dotenv()
+
+logger = logging.getLogger("batch-reports")
+logger.setLevel(logging.INFO)
+
+# Order the stage timings are printed in
+STAGES = ("fetch", "aggregate", "ai_insights", "pdf", "upload", "total")
+
+
+@dataclass
+class BatchReportSummary:
+    """Outcome of a batch run, with the timings of every stage of the reports that were generated."""
+
+    users: int = 0
+    reports: int = 0
+    # Reports skipped because the user has no records of that kind
+    no_data: int = 0
+    failed: int = 0
+    snapshot_loads: int = 0
+    seconds: float = 0.0
+    stage_timings_ms: Dict[str, List[float]] = field(default_factory=dict)
+
+    @property
+    def users_per_second(self) -> float:
+        return self.users / self.seconds if self.seconds else 0.0
+
+    def stage_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """Count, p50 and p95 milliseconds per stage, in pipeline order."""
+        stages = sorted(self.stage_timings_ms, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES))
+        percentiles = {}
+        for stage in stages:
+            p50, p95 = np.percentile(self.stage_timings_ms[stage], [50, 95])
+            percentiles[stage] = {"count": len(self.stage_timings_ms[stage]), "p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1)}
+        return percentiles
+
+    def format(self) -> str:
+        lines = [f"{'stage':>12} {'reports':>8} {'p50 ms':>10} {'p95 ms':>10}"]
+        for stage, values in self.stage_percentiles().items():
+            lines.append(f"{stage:>12} {values['count']:>8} {values['p50_ms']:>10.1f} {values['p95_ms']:>10.1f}")
+        lines.append(
+            f"{self.users} users in {self.seconds:.1f} s ({self.users_per_second:.2f} users/sec): "
+            f"{self.reports} reports, {self.no_data} without data, {self.failed} failed, {self.snapshot_loads} snapshot loads"
+        )
+        return "\n".join(lines)
+
+
+class BatchReportRunner:
+    """
+    Builds the reports of many users with a bounded pool of worker tasks.
+
+    Each user's reports run concurrently through PersonalizedReportDispatcher and read one
+    snapshot of the user's data, so the database is queried once per user however many
+    report types are generated. Snapshots are kept in a cache per chunk of users and dropped
+    with it, which bounds memory on large user bases.
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        report_storage: Optional[ReportStorage] = None,
+        pdf_pool: Optional[PDFRenderPool] = None,
+        ai_analyzer: Optional[PersonalizedGeminiAnalyzer] = None,
+        report_types: Sequence[str] = REPORT_TYPES,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        months_back: int = 6,
+        generate_pdf: bool = True,
+        expiration_hours: Optional[int] = None
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            db_manager (DatabaseManager): Database to read users and records from.
+            report_storage (ReportStorage): Where PDFs are uploaded. None keeps them in memory only.
+            pdf_pool (PDFRenderPool): Process pool rendering the PDFs. Defaults to one with PDF_POOL_WORKERS processes.
+            ai_analyzer (PersonalizedGeminiAnalyzer): Adds AI insights to every report when given.
+            report_types (Sequence[str]): Reports generated per user. Defaults to all of REPORT_TYPES.
+            workers (int): Users processed at once. Defaults to BATCH_REPORT_WORKERS or 4.
+            chunk_size (int): Users read from the database at a time. Defaults to BATCH_REPORT_CHUNK_SIZE or 100.
+            months_back (int): Length of the report period in 30 day months.
+            generate_pdf (bool): Render (and upload) the PDFs, or only compute the report data.
+            expiration_hours (int): Validity of the uploaded reports' links. Defaults to BATCH_REPORT_EXPIRATION_HOURS or 24.
+        """
+        unknown = set(report_types) - set(REPORT_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown report types: {', '.join(sorted(unknown))}")
+
+        self.db_manager = db_manager
+        self.report_storage = report_storage
+        self.pdf_pool = pdf_pool or PDFRenderPool()
+        self.ai_analyzer = ai_analyzer
+        self.report_types = tuple(report_types)
+        self.workers = workers if workers is not None else int(os.getenv('BATCH_REPORT_WORKERS', 4))
+        self.chunk_size = chunk_size if chunk_size is not None else int(os.getenv('BATCH_REPORT_CHUNK_SIZE', 100))
+        self.months_back = months_back
+        self.generate_pdf = generate_pdf
+        self.expiration_hours = expiration_hours if expiration_hours is not None else int(os.getenv('BATCH_REPORT_EXPIRATION_HOURS', 24))
+        # Kept apart from the process-wide profile, which describes on-demand reports
+        self.stage_profile = ReportStageProfile()
+
+    async def run(self, user_ids: Optional[Iterable[int]] = None) -> BatchReportSummary:
+        """Generate the reports of the given users, or of every user, one chunk after another."""
+        summary = BatchReportSummary()
+        start = time.perf_counter()
+        async for users in self._user_chunks(user_ids):
+            await self._run_chunk(users, summary)
+            logger.info(f"Generated reports for {summary.users} users ({summary.users / (time.perf_counter() - start):.2f} users/sec)")
+        summary.seconds = time.perf_counter() - start
+        return summary
+
+    async def _user_chunks(self, user_ids: Optional[Iterable[int]]) -> AsyncIterator[List[Tuple[int, str]]]:
+        """Pages of (id, phone_number), each read in its own short session."""
+        user_ids = list(user_ids) if user_ids is not None else None
+        after_id = 0
+        while True:
+            async with self.db_manager.session_scope() as session:
+                users = await AsyncQueries(session=session).get_users_after(after_id, self.chunk_size, user_ids)
+            if not users:
+                return
+            yield users
+            after_id = users[-1][0]
+
+    async def _run_chunk(self, users: List[Tuple[int, str]], summary: BatchReportSummary) -> None:
+        # Every snapshot of the chunk stays until the chunk is done
+        snapshots = FinancialSnapshotCache(max_entries=len(users), ttl_seconds=float("inf"))
+        pending: asyncio.Queue = asyncio.Queue()
+        for user in users:
+            pending.put_nowait(user)
+
+        async def _worker() -> None:
+            while True:
+                try:
+                    user_id, phone_number = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._run_user(User(id=user_id, phone_number=phone_number), snapshots, summary)
+
+        await asyncio.gather(*(_worker() for _ in range(min(self.workers, len(users)))))
+        summary.snapshot_loads += snapshots.stats()["misses"]
+
+    async def _run_user(self, user: User, snapshots: FinancialSnapshotCache, summary: BatchReportSummary) -> None:
+        dispatcher = PersonalizedReportDispatcher(
+            user, db_manager=self.db_manager, pdf_pool=self.pdf_pool, ai_analyzer=self.ai_analyzer,
+            stage_profile=self.stage_profile, snapshot_cache=snapshots
+        )
+        results = await asyncio.gather(*(
+            dispatcher.generate_personalized_report(
+                report_type, months_back=self.months_back, include_ai=self.ai_analyzer is not None, generate_pdf=self.generate_pdf,
+                report_storage=self.report_storage, expiration_hours=self.expiration_hours
+            ) for report_type in self.report_types
+        ), return_exceptions=True)
+
+        summary.users += 1
+        for report_type, result in zip(self.report_types, results):
+            error = self._report_error(result)
+            if error is not None:
+                summary.failed += 1
+                logger.error(f"{report_type} report for user {user.id} failed: {error}")
+            elif "report_data" not in result:
+                summary.no_data += 1
+            else:
+                summary.reports += 1
+                for stage, milliseconds in result["stage_timings_ms"].items():
+                    summary.stage_timings_ms.setdefault(stage, []).append(milliseconds)
+
+    def _report_error(self, result: Any) -> Optional[str]:
+        if isinstance(result, BaseException):
+            return repr(result)
+        for key in ("pdf_error", "upload_error"):
+            if key in result:
+                return result[key]
+        if "report_data" in result and self.generate_pdf and self.report_storage is not None and not result.get("presigned_url"):
+            return "Report was not uploaded"
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--user-id", type=int, nargs="+", dest="user_ids", help="Users to generate reports for. Defaults to every user")
+    parser.add_argument("--report-types", nargs="+", choices=REPORT_TYPES, default=list(REPORT_TYPES))
+    parser.add_argument("--workers", type=int, help="Users processed at once. Defaults to BATCH_REPORT_WORKERS or 4")
+    parser.add_argument("--chunk-size", type=int, help="Users read from the database at a time. Defaults to BATCH_REPORT_CHUNK_SIZE or 100")
+    parser.add_argument("--pdf-workers", type=int, default=os.cpu_count(), help="PDF render processes. Defaults to the number of CPUs")
+    parser.add_argument("--months-back", type=int, default=6)
+    parser.add_argument("--no-pdf", action="store_true", help="Only compute the report data")
+    args = parser.parse_args()
+
+    async def _run():
+        db_manager = get_database_manager()
+        pdf_pool = PDFRenderPool(max_workers=args.pdf_workers)
+        runner = BatchReportRunner(
+            db_manager,
+            report_storage=None if args.no_pdf else get_report_storage(),
+            pdf_pool=pdf_pool,
+            report_types=args.report_types,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            months_back=args.months_back,
+            generate_pdf=not args.no_pdf,
+        )
+        try:
+            summary = await runner.run(args.user_ids)
+        finally:
+            pdf_pool.shutdown()
+            close_report_storage()
+            await db_manager.dispose()
+        print(summary.format())
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from api.services.retention import RetentionSweepResult
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class LocalReportStorage:
+    """
+    Filesystem stand-in for SecureS3Service.
+
+    Objects use the same reports/<user_id>/ key layout as S3 and are written under a local
+    directory, so the report pipeline can run and be load-tested without AWS. URLs point at
+    base_url when one is set (e.g. a static file server), otherwise at file:// paths.
+    """
+
+    def __init__(self, directory: Optional[str] = None, base_url: Optional[str] = None):
+        """
+        Initialize the storage.
+
+        Args:
+            directory (str): Root directory for stored objects. Defaults to REPORT_STORAGE_LOCAL_DIR or ./report_storage.
+            base_url (str): URL prefix returned for stored objects. Defaults to REPORT_STORAGE_BASE_URL or file:// URLs.
+        """
+        self.directory = Path(directory or os.getenv('REPORT_STORAGE_LOCAL_DIR', 'report_storage')).resolve()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base_url = base_url if base_url is not None else os.getenv('REPORT_STORAGE_BASE_URL')
+        self.base_url = base_url.rstrip('/') if base_url else None
+
+    def _path(self, object_name: str) -> Path:
+        path = (self.directory / object_name).resolve()
+        if self.directory not in path.parents:
+            raise ValueError(f"Object name escapes the storage directory: {object_name}")
+        return path
+
+    def _url(self, object_name: str) -> str:
+        if self.base_url:
+            return f"{self.base_url}/{object_name}"
+        return self._path(object_name).as_uri()
+
+    def _write(self, object_name: str, pdf_bytes: bytes) -> None:
+        path = self._path(object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+            tmp.write(pdf_bytes)
+        os.replace(tmp.name, path)
+
+    async def upload_pdf_from_bytes_secure(self, pdf_bytes: bytes, user_id: int, report_type: str,
+                                           expiration_hours: int = 24) -> Optional[str]:
+        """Store a PDF and return its URL. expiration_hours is accepted for parity with S3 and ignored."""
+        try:
+            timestamp = int(datetime.now().timestamp())
+            object_name = f"reports/{user_id}/{report_type}_report_{timestamp}.pdf"
+            await asyncio.to_thread(self._write, object_name, pdf_bytes)
+            logger.info(f"Stored PDF ({len(pdf_bytes) / 1024:.1f} KB) locally: {object_name}")
+            return self._url(object_name)
+        except Exception as e:
+            logger.error(f"Unexpected error storing PDF locally: {e}")
+            return None
+
+    async def generate_new_presigned_url(self, object_name: str, expiration_hours: int = 24) -> Optional[str]:
+        """Return the URL of a stored object, or None if it does not exist"""
+        if not await asyncio.to_thread(self._path(object_name).is_file):
+            return None
+        return self._url(object_name)
+
+    async def delete_file(self, object_name: str) -> bool:
+        try:
+            await asyncio.to_thread(self._path(object_name).unlink)
+            logger.info(f"Deleted local file: {object_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete local file: {e}")
+            return False
+
+    def _delete_older_than(self, cutoff: float) -> RetentionSweepResult:
+        result = RetentionSweepResult()
+        for path in (self.directory / "reports").glob("**/*.pdf"):
+            result.scanned += 1
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                result.expired += 1
+                path.unlink()
+                result.deleted += 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                result.errors += 1
+                logger.warning(f"Failed to delete {path}: {e}")
+        return result
+
+    async def cleanup_old_files(self, days_old: int = 7) -> RetentionSweepResult:
+        """Delete stored reports older than specified days"""
+        start = time.perf_counter()
+        result = await asyncio.to_thread(self._delete_older_than, time.time() - days_old * 86400)
+        result.duration_seconds = time.perf_counter() - start
+        logger.info(f"Cleaned up {result.deleted} old local files ({result.scanned} scanned)")
+        return result
+
+    def close(self):
+        pass
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import ReportJob
+from api.db.query_manager import AsyncQueries
+from api.message_clients.twilio import TwilioClient
+
+load_dotenv()
+
+logger = logging.getLogger("report-queue")
+logger.setLevel(logging.INFO)
+
+# Produces the messages for a job: {"error": bool, "messages": [{"body": ..., "media_url": ...}]}
+ReportRunner = Callable[[ReportJob], Awaitable[Dict[str, Any]]]
+# Sends one message to a phone number, returning whether it was accepted
+ReportNotifier = Callable[[str, Dict[str, str]], Awaitable[bool]]
+
+FAILURE_MESSAGE = {"body": "Sorry, there was an error generating your report. Please try again later."}
+EXPIRED_ERROR = "Report job stopped renewing its lease"
+
+
+async def send_twilio_notification(to: str, message: Dict[str, str]) -> bool:
+    """Deliver a report message through the Twilio REST API without blocking the event loop."""
+    client = TwilioClient()
+    return await asyncio.to_thread(
+        client.send_mesage_notification,
+        to=to,
+        body=message.get("body", ""),
+        media_url=message.get("media_url")
+    )
+
+
+class ReportJobQueue:
+    """
+    Report generation queue backed by the ReportJob table.
+
+    The webhook enqueues a job and replies straight away. Worker tasks claim queued jobs,
+    run them and deliver the resulting messages through the notifier. Jobs are rows in the
+    database, so several processes can share the queue and anything queued survives a restart.
+    A claimed job is leased: its updated_at is renewed while it runs, and a running job whose
+    lease expired, because its process died, is queued again, or failed once its attempts are
+    used up. A worker that finds its lease was taken over abandons the job without delivering
+    it, and status writes only apply to the attempt still running, so the new owner's state is
+    never overwritten. Generation and delivery have separate concurrency limits.
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        runner: ReportRunner,
+        notifier: Optional[ReportNotifier] = None,
+        workers: Optional[int] = None,
+        generation_concurrency: Optional[int] = None,
+        delivery_concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the queue. Workers are started with start().
+
+        Args:
+            db_manager (DatabaseManager): Database holding the ReportJob table.
+            runner (ReportRunner): Generates the messages for a job.
+            notifier (ReportNotifier): Delivers a message. Defaults to the Twilio REST API.
+            workers (int): Worker tasks. Defaults to REPORT_QUEUE_WORKERS or 4.
+            generation_concurrency (int): Reports generated at once. Defaults to REPORT_QUEUE_GENERATION_CONCURRENCY or 2.
+            delivery_concurrency (int): Messages sent at once. Defaults to REPORT_QUEUE_DELIVERY_CONCURRENCY or 4.
+            max_attempts (int): Generation attempts before a job fails. Defaults to REPORT_QUEUE_MAX_ATTEMPTS or 2.
+            poll_interval (float): Seconds between checks for jobs queued by other processes. Defaults to REPORT_QUEUE_POLL_INTERVAL_SECONDS or 5.
+            lease_seconds (float): Seconds without a renewal before a running job is taken from its process. Defaults to REPORT_QUEUE_LEASE_SECONDS or 60.
+        """
+        self.db_manager = db_manager
+        self.runner = runner
+        self.notifier = notifier or send_twilio_notification
+        self.workers = workers if workers is not None else int(os.getenv('REPORT_QUEUE_WORKERS', 4))
+        self.max_attempts = max_attempts if max_attempts is not None else int(os.getenv('REPORT_QUEUE_MAX_ATTEMPTS', 2))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('REPORT_QUEUE_POLL_INTERVAL_SECONDS', 5))
+        self.lease_seconds = lease_seconds if lease_seconds is not None else float(os.getenv('REPORT_QUEUE_LEASE_SECONDS', 60))
+
+        self.generation_limit = asyncio.Semaphore(generation_concurrency if generation_concurrency is not None else int(os.getenv('REPORT_QUEUE_GENERATION_CONCURRENCY', 2)))
+        self.delivery_limit = asyncio.Semaphore(delivery_concurrency if delivery_concurrency is not None else int(os.getenv('REPORT_QUEUE_DELIVERY_CONCURRENCY', 4)))
+
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.expired = 0
+        self.lost = 0
+
+    @property
+    def is_running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        """Create the job table if needed, recover jobs whose lease expired and start the workers."""
+        if self.is_running:
+            return
+
+        async with self.db_manager.engine.begin() as conn:
+            await conn.run_sync(ReportJob.__table__.create, checkfirst=True)
+
+        await self._recover_expired_jobs()
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._wakeup.set()
+        logger.info(f"Report queue started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Cancel the workers. Jobs they were running stay 'running' and are recovered once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Report queue stopped")
+
+    async def enqueue(self, user_id: int, phone_number: str, report_type: str) -> int:
+        """Persist a report job and wake a worker. Returns the job id."""
+        async with self.db_manager.session_scope() as session:
+            job = await AsyncQueries(session=session).create_report_job(user_id=user_id, phone_number=phone_number, report_type=report_type)
+        self._wakeup.set()
+        logger.info(f"Queued {report_type} job {job.id} for user {user_id}")
+        return job.id
+
+    async def get_job(self, job_id: int) -> Optional[ReportJob]:
+        async with self.db_manager.session_scope() as session:
+            return await AsyncQueries(session=session).get_report_job(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": len(self._tasks), "completed": self.completed, "failed": self.failed, "retried": self.retried, "expired": self.expired, "lost": self.lost}
+
+    async def _worker(self) -> None:
+        while True:
+            # Cleared before claiming so a job enqueued meanwhile still wakes a worker
+            self._wakeup.clear()
+            try:
+                async with self.db_manager.session_scope() as session:
+                    job = await AsyncQueries(session=session).claim_next_report_job()
+            except Exception as e:
+                logger.error(f"Failed to claim a report job: {e}")
+                job = None
+
+            if job is None:
+                # Idle: take back jobs from processes that died, then wait for new ones
+                try:
+                    if await self._recover_expired_jobs():
+                        continue
+                except Exception as e:
+                    logger.error(f"Failed to recover expired report jobs: {e}")
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job)
+
+    async def _recover_expired_jobs(self) -> int:
+        """Requeue running jobs whose lease expired, failing and notifying those without attempts left. Returns the jobs requeued."""
+        expired_before = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        async with self.db_manager.session_scope() as session:
+            queries = AsyncQueries(session=session)
+            failed = await queries.fail_expired_report_jobs(expired_before, self.max_attempts, last_error=EXPIRED_ERROR)
+            requeued = await queries.requeue_expired_report_jobs(expired_before, self.max_attempts)
+
+        for job in failed:
+            logger.warning(f"Report job {job.id} expired after {job.attempts} attempts, marking it failed")
+            self.failed += 1
+            await self._deliver(job, [FAILURE_MESSAGE])
+        if requeued:
+            self.expired += requeued
+            logger.info(f"Requeued {requeued} report jobs whose lease expired")
+        return requeued
+
+    async def _renew_lease(self, job: ReportJob) -> None:
+        """Renew a job's lease a few times per lease period. Returns once the lease was lost to another process."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self._owns(job):
+                    return
+            except Exception as e:
+                logger.error(f"Failed to renew the lease of report job {job.id}: {e}")
+
+    async def _owns(self, job: ReportJob) -> bool:
+        """Renew the job's lease, returning False if it is no longer running this attempt."""
+        async with self.db_manager.session_scope() as session:
+            return await AsyncQueries(session=session).renew_report_job_lease(job.id, job.attempts)
+
+    async def _process(self, job: ReportJob) -> None:
+        run = asyncio.create_task(self._run(job))
+        lease = asyncio.create_task(self._renew_lease(job))
+        try:
+            await asyncio.wait({run, lease}, return_when=asyncio.FIRST_COMPLETED)
+            if not run.done():
+                # The lease expired and the job was taken over, so its new owner delivers the report
+                self.lost += 1
+                logger.warning(f"Report job {job.id} lost its lease, abandoning attempt {job.attempts}")
+                run.cancel()
+            outcome, = await asyncio.gather(run, return_exceptions=True)
+            if isinstance(outcome, Exception):
+                logger.error(f"Report job {job.id} could not be finished: {outcome}")
+        finally:
+            run.cancel()
+            lease.cancel()
+
+    async def _run(self, job: ReportJob) -> None:
+        try:
+            async with self.generation_limit:
+                result = await self.runner(job)
+        except Exception as e:
+            logger.error(f"Report job {job.id} raised: {e}")
+            result = {"error": str(e), "messages": [FAILURE_MESSAGE]}
+
+        if result.get("error") or not result.get("messages"):
+            error = str(result.get("error") or "Report produced no messages")
+            if job.attempts < self.max_attempts:
+                if await self._set_status(job, "queued", last_error=error):
+                    self.retried += 1
+                    self._wakeup.set()
+                return
+
+            if await self._set_status(job, "failed", last_error=error):
+                self.failed += 1
+                await self._deliver(job, result.get("messages") or [FAILURE_MESSAGE])
+            return
+
+        # Checked again right before sending, as the lease may have run out since the last renewal
+        if not await self._owns(job):
+            self.lost += 1
+            logger.warning(f"Report job {job.id} lost its lease before delivery, not sending attempt {job.attempts}")
+            return
+
+        if await self._deliver(job, result["messages"]):
+            self.completed += 1
+            await self._set_status(job, "done")
+        else:
+            self.failed += 1
+            await self._set_status(job, "failed", last_error="Delivery failed")
+
+    async def _deliver(self, job: ReportJob, messages: List[Dict[str, str]]) -> bool:
+        # Messages are sent in order, so the link arrives after the summary
+        async with self.delivery_limit:
+            for message in messages:
+                try:
+                    if not await self.notifier(job.phone_number, message):
+                        return False
+                except Exception as e:
+                    logger.error(f"Failed to deliver report job {job.id}: {e}")
+                    return False
+        return True
+
+    async def _set_status(self, job: ReportJob, status: str, last_error: Optional[str] = None) -> bool:
+        """Set the status of the attempt this worker is running, returning False if the job was taken over."""
+        async with self.db_manager.session_scope() as session:
+            updated = await AsyncQueries(session=session).update_report_job(job.id, status=status, last_error=last_error, attempts=job.attempts)
+        if not updated:
+            logger.warning(f"Report job {job.id} was taken over, not marking attempt {job.attempts} {status}")
+        return updated
+
+
+# Process-wide queue, started by the FastAPI lifespan
+_report_job_queue: Optional[ReportJobQueue] = None
+
+
+def init_report_job_queue(db_manager: DatabaseManager, runner: ReportRunner, **kwargs) -> ReportJobQueue:
+    """Create the process-wide ReportJobQueue. Called once from the FastAPI lifespan."""
+    global _report_job_queue
+    if _report_job_queue is None:
+        _report_job_queue = ReportJobQueue(db_manager=db_manager, runner=runner, **kwargs)
+    return _report_job_queue
+
+
+def get_report_job_queue() -> Optional[ReportJobQueue]:
+    """Return the process-wide ReportJobQueue, or None when reports are generated inline."""
+    return _report_job_queue
+
+
+async def close_report_job_queue() -> None:
+    """Stop the process-wide ReportJobQueue. Called from the FastAPI lifespan on shutdown."""
+    global _report_job_queue
+    if _report_job_queue is not None:
+        await _report_job_queue.stop()
+        _report_job_queue = None
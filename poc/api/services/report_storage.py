@@ -0,0 +1,58 @@
+import logging
+import os
+from typing import Optional, Protocol, Union
+
+from dotenv import load_dotenv
+
+from api.services.local_storage import LocalReportStorage
+from api.services.retention import RetentionSweepResult
+from api.services.s3_bucket import SecureS3Service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ReportStorage(Protocol):
+    """What the report actions need from a storage backend. Every method is non-blocking."""
+
+    async def upload_pdf_from_bytes_secure(self, pdf_bytes: bytes, user_id: int, report_type: str, expiration_hours: int = 24) -> Optional[str]: ...
+
+    async def generate_new_presigned_url(self, object_name: str, expiration_hours: int = 24) -> Optional[str]: ...
+
+    async def delete_file(self, object_name: str) -> bool: ...
+
+    async def cleanup_old_files(self, days_old: int = 7) -> RetentionSweepResult: ...
+
+    def close(self): ...
+
+
+# Process-wide backend, so the S3 client and its connection pool are created once
+_report_storage: Optional[Union[SecureS3Service, LocalReportStorage]] = None
+
+
+def get_report_storage() -> ReportStorage:
+    """
+    Return the process-wide report storage backend, creating it on first use.
+
+    REPORT_STORAGE_BACKEND selects "s3" (default) or "local".
+    """
+    global _report_storage
+    if _report_storage is None:
+        backend = os.getenv('REPORT_STORAGE_BACKEND', 's3').lower()
+        if backend == 's3':
+            _report_storage = SecureS3Service()
+        elif backend == 'local':
+            _report_storage = LocalReportStorage()
+        else:
+            raise ValueError(f"Unknown REPORT_STORAGE_BACKEND: {backend}")
+        logger.info(f"Report storage backend: {backend}")
+    return _report_storage
+
+
+def close_report_storage() -> None:
+    """Close the process-wide report storage backend. Called from the FastAPI lifespan on shutdown."""
+    global _report_storage
+    if _report_storage is not None:
+        _report_storage.close()
+        _report_storage = None
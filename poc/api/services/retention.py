@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("report-retention")
+logger.setLevel(logging.INFO)
+
+
+@dataclass
+class RetentionSweepResult:
+    """Counts from one pass over a report storage backend."""
+
+    scanned: int = 0
+    expired: int = 0
+    deleted: int = 0
+    errors: int = 0
+    delete_requests: int = 0
+    duration_seconds: float = 0.0
+
+
+def is_report_key(key: str) -> bool:
+    """Report objects live under reports/, or <phone>/reports/ for uploads made before the layout was unified."""
+    return key.startswith("reports/") or "/reports/" in key
+
+
+class ReportRetentionSweeper:
+    """
+    Deletes expired report PDFs from the storage backend on a schedule.
+
+    The backend's cleanup_old_files does the listing and deleting. The sweeper runs it every
+    interval, logs each pass and keeps running totals for stats().
+    """
+
+    def __init__(self, storage: Any, retention_days: Optional[int] = None, interval_hours: Optional[float] = None, initial_delay: Optional[float] = None):
+        """
+        Initialize the sweeper. The schedule is started with start().
+
+        Args:
+            storage (ReportStorage): Backend to sweep.
+            retention_days (int): Age after which reports are deleted. Defaults to REPORT_RETENTION_DAYS or 7.
+            interval_hours (float): Hours between sweeps. Defaults to REPORT_RETENTION_INTERVAL_HOURS or 24.
+            initial_delay (float): Seconds before the first sweep, keeping it off the startup path. Defaults to REPORT_RETENTION_INITIAL_DELAY_SECONDS or 60.
+        """
+        self.storage = storage
+        self.retention_days = retention_days if retention_days is not None else int(os.getenv('REPORT_RETENTION_DAYS', 7))
+        self.interval_hours = interval_hours if interval_hours is not None else float(os.getenv('REPORT_RETENTION_INTERVAL_HOURS', 24))
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv('REPORT_RETENTION_INITIAL_DELAY_SECONDS', 60))
+
+        self._task: Optional[asyncio.Task] = None
+        # Only one pass at a time, whether scheduled or triggered by hand
+        self._sweep_lock = asyncio.Lock()
+
+        self.sweeps = 0
+        self.totals = RetentionSweepResult()
+        self.last_result: Optional[RetentionSweepResult] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def sweep_once(self) -> RetentionSweepResult:
+        """Run one retention pass and record its metrics."""
+        async with self._sweep_lock:
+            start = time.perf_counter()
+            result = await self.storage.cleanup_old_files(days_old=self.retention_days)
+            if result.duration_seconds == 0.0:
+                result.duration_seconds = time.perf_counter() - start
+
+        self.sweeps += 1
+        self.last_result = result
+        for field, value in asdict(result).items():
+            setattr(self.totals, field, getattr(self.totals, field) + value)
+
+        logger.info(
+            f"Retention sweep: scanned {result.scanned}, deleted {result.deleted}/{result.expired} expired, "
+            f"{result.errors} errors, {result.delete_requests} delete requests in {result.duration_seconds:.2f}s"
+        )
+        return result
+
+    def start(self) -> None:
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Retention sweeper started: {self.retention_days} day retention every {self.interval_hours}h")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Retention sweeper stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sweeps": self.sweeps,
+            "totals": asdict(self.totals),
+            "last": asdict(self.last_result) if self.last_result else None,
+        }
+
+    async def _run(self) -> None:
+        await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                logger.error(f"Retention sweep failed: {e}")
+            await asyncio.sleep(self.interval_hours * 3600)
+
+
+# Process-wide sweeper, started by the FastAPI lifespan
+_retention_sweeper: Optional[ReportRetentionSweeper] = None
+
+
+def init_retention_sweeper(storage: Any, **kwargs) -> ReportRetentionSweeper:
+    """Create the process-wide ReportRetentionSweeper. Called once from the FastAPI lifespan."""
+    global _retention_sweeper
+    if _retention_sweeper is None:
+        _retention_sweeper = ReportRetentionSweeper(storage=storage, **kwargs)
+    return _retention_sweeper
+
+
+def get_retention_sweeper() -> Optional[ReportRetentionSweeper]:
+    """Return the process-wide ReportRetentionSweeper, or None when retention is disabled."""
+    return _retention_sweeper
+
+
+async def close_retention_sweeper() -> None:
+    """Stop the process-wide ReportRetentionSweeper. Called from the FastAPI lifespan on shutdown."""
+    global _retention_sweeper
+    if _retention_sweeper is not None:
+        await _retention_sweeper.stop()
+        _retention_sweeper = None
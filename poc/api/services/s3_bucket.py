@@ -1,20 +1,35 @@
+import asyncio
 import boto3
 import os
 import io
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from botocore.exceptions import ClientError, NoCredentialsError
 import logging
 from dotenv import load_dotenv
 
+from api.services.retention import RetentionSweepResult, is_report_key
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# delete_objects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
 class SecureS3Service:
-    """Secure S3 service using presigned URLs instead of public access"""
+    """
+    Secure S3 service using presigned URLs instead of public access.
+
+    boto3 is synchronous, so every call that can touch the network runs in a worker thread.
+    A single client (and its connection pool) is meant to be shared through
+    get_report_storage() rather than created per report.
+    """
     
-    def __init__(self):
+    def __init__(self, s3_client=None):
         self.aws_access_key_id = os.getenv('AWS_ACCESS_KEY_ID')
         self.aws_secret_access_key = os.getenv('AWS_SECRET_ACCESS_KEY')
         self.aws_region = os.getenv('AWS_REGION', 'us-east-1')
@@ -23,16 +38,40 @@ class SecureS3Service:
         if not all([self.aws_access_key_id, self.aws_secret_access_key, self.bucket_name]):
             raise ValueError("Missing required AWS S3 configuration. Check your .env file.")
         
-        # Initialize S3 client
-        self.s3_client = boto3.client(
+        # Reports above the threshold are uploaded in parallel multipart chunks
+        self.transfer_config = TransferConfig(
+            multipart_threshold=int(float(os.getenv('S3_MULTIPART_THRESHOLD_MB', 8)) * 1024 * 1024),
+            multipart_chunksize=int(float(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', 8)) * 1024 * 1024),
+            max_concurrency=int(os.getenv('S3_MULTIPART_CONCURRENCY', 4))
+        )
+        
+        # Initialize S3 client. boto3 clients are thread-safe, so the worker threads share one connection pool
+        self.s3_client = s3_client or boto3.client(
             's3',
             aws_access_key_id=self.aws_access_key_id,
             aws_secret_access_key=self.aws_secret_access_key,
-            region_name=self.aws_region
+            region_name=self.aws_region,
+            config=Config(
+                max_pool_connections=int(os.getenv('S3_MAX_POOL_CONNECTIONS', 10)),
+                retries={'max_attempts': int(os.getenv('S3_MAX_ATTEMPTS', 3)), 'mode': 'standard'}
+            )
         )
         
-        # Verify bucket exists or create it (PRIVATE by default)
-        self._ensure_private_bucket_exists()
+        self.delete_requests_per_second = float(os.getenv('S3_DELETE_REQUESTS_PER_SECOND', 5))
+        self._last_delete_request = 0.0
+        
+        # The bucket is verified (or created PRIVATE) on first use instead of in the constructor
+        self._bucket_ready = False
+        self._bucket_lock = asyncio.Lock()
+    
+    async def _ensure_bucket(self):
+        """Verify the bucket once per service without blocking the event loop"""
+        if self._bucket_ready:
+            return
+        async with self._bucket_lock:
+            if not self._bucket_ready:
+                await asyncio.to_thread(self._ensure_private_bucket_exists)
+                self._bucket_ready = True
     
     def _ensure_private_bucket_exists(self):
         """Ensure the S3 bucket exists as PRIVATE (no public access)"""
@@ -98,8 +137,11 @@ class SecureS3Service:
             timestamp = int(datetime.now().timestamp())
             object_name = f"{user_phone_number}/reports/{report_type}_report_{timestamp}.pdf"
             
+            await self._ensure_bucket()
+            
             # Upload file to PRIVATE bucket (no ACL = private by default)
-            self.s3_client.upload_file(
+            await asyncio.to_thread(
+                self.s3_client.upload_file,
                 file_path,
                 self.bucket_name,
                 object_name,
@@ -116,11 +158,7 @@ class SecureS3Service:
             )
             
             # Generate presigned URL that expires
-            presigned_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_name},
-                ExpiresIn=expiration_hours * 3600  # Convert hours to seconds
-            )
+            presigned_url = await self.generate_new_presigned_url(object_name, expiration_hours)
             
             logger.info(f"Successfully uploaded PDF to PRIVATE S3 with presigned URL: {object_name}")
             logger.info(f"Presigned URL expires in {expiration_hours} hours")
@@ -158,14 +196,18 @@ class SecureS3Service:
             timestamp = int(datetime.now().timestamp())
             object_name = f"reports/{user_id}/{report_type}_report_{timestamp}.pdf"
             
-            # Create file-like object from bytes
+            await self._ensure_bucket()
+            
+            # Stream the in-memory bytes; boto3 switches to multipart above the transfer threshold
             pdf_file_obj = io.BytesIO(pdf_bytes)
             
-            # Upload to PRIVATE bucket
-            self.s3_client.upload_fileobj(
+            # Upload to PRIVATE bucket without blocking the event loop
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
                 pdf_file_obj,
                 self.bucket_name,
                 object_name,
+                Config=self.transfer_config,
                 ExtraArgs={
                     'ContentType': 'application/pdf',
                     'ContentDisposition': f'attachment; filename="{report_type}_report.pdf"',
@@ -178,14 +220,10 @@ class SecureS3Service:
                 }
             )
             
-            # Generate presigned URL
-            presigned_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_name},
-                ExpiresIn=expiration_hours * 3600
-            )
+            # Generate presigned URL that expires
+            presigned_url = await self.generate_new_presigned_url(object_name, expiration_hours)
             
-            logger.info(f"Successfully uploaded PDF to PRIVATE S3 with presigned URL: {object_name}")
+            logger.info(f"Successfully uploaded PDF ({len(pdf_bytes) / 1024:.1f} KB) to PRIVATE S3 with presigned URL: {object_name}")
             return presigned_url
             
         except NoCredentialsError:
@@ -198,7 +236,7 @@ class SecureS3Service:
             logger.error(f"Unexpected error uploading to S3: {e}")
             return None
     
-    def generate_new_presigned_url(self, object_name: str, expiration_hours: int = 24) -> Optional[str]:
+    async def generate_new_presigned_url(self, object_name: str, expiration_hours: int = 24) -> Optional[str]:
         """
         Generate a new presigned URL for an existing object
         
@@ -210,10 +248,12 @@ class SecureS3Service:
             New presigned URL or None if failed
         """
         try:
-            presigned_url = self.s3_client.generate_presigned_url(
+            # Signing is local, but resolving credentials may hit the network (instance metadata, STS)
+            presigned_url = await asyncio.to_thread(
+                self.s3_client.generate_presigned_url,
                 'get_object',
                 Params={'Bucket': self.bucket_name, 'Key': object_name},
-                ExpiresIn=expiration_hours * 3600
+                ExpiresIn=expiration_hours * 3600  # Convert hours to seconds
             )
             
             logger.info(f"Generated new presigned URL for {object_name}")
@@ -234,7 +274,8 @@ class SecureS3Service:
             True if successful, False otherwise
         """
         try:
-            self.s3_client.delete_object(
+            await asyncio.to_thread(
+                self.s3_client.delete_object,
                 Bucket=self.bucket_name,
                 Key=object_name
             )
@@ -249,32 +290,81 @@ class SecureS3Service:
             logger.error(f"Unexpected error deleting from S3: {e}")
             return False
     
-    async def cleanup_old_files(self, days_old: int = 7):
-        """Delete files older than specified days"""
+    async def cleanup_old_files(self, days_old: int = 7) -> RetentionSweepResult:
+        """
+        Delete report files older than specified days
+        
+        Pages through the whole bucket, so legacy <phone>/reports/ keys are swept too, and
+        deletes expired keys with batched delete_objects calls (up to 1000 keys each).
+        Delete requests are rate limited to S3_DELETE_REQUESTS_PER_SECOND.
+        
+        Returns:
+            Scanned, expired and deleted counts for the pass
+        """
+        result = RetentionSweepResult()
+        start = time.perf_counter()
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_old)
+        
         try:
-            cutoff_date = datetime.now() - timedelta(days=days_old)
-            
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix='reports/'
-            )
-            
-            if 'Contents' not in response:
-                logger.info("No files found for cleanup")
-                return
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            pages = iter(paginator.paginate(Bucket=self.bucket_name, PaginationConfig={'PageSize': DELETE_BATCH_SIZE}))
+            batch = []
             
-            deleted_count = 0
-            for obj in response['Contents']:
-                if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
-                    self.s3_client.delete_object(
-                        Bucket=self.bucket_name,
-                        Key=obj['Key']
-                    )
-                    deleted_count += 1
+            # Each page is a network call, so pages are fetched in a worker thread one at a time
+            while (page := await asyncio.to_thread(next, pages, None)) is not None:
+                for obj in page.get('Contents', []):
+                    result.scanned += 1
+                    last_modified = obj['LastModified']
+                    if last_modified.tzinfo is None:
+                        last_modified = last_modified.replace(tzinfo=timezone.utc)
+                    if is_report_key(obj['Key']) and last_modified < cutoff_date:
+                        result.expired += 1
+                        batch.append(obj['Key'])
+                        if len(batch) == DELETE_BATCH_SIZE:
+                            await self._delete_batch(batch, result)
+                            batch = []
             
-            logger.info(f"Cleaned up {deleted_count} old files from S3")
+            if batch:
+                await self._delete_batch(batch, result)
             
         except ClientError as e:
+            result.errors += 1
             logger.error(f"Failed to cleanup old files: {e}")
         except Exception as e:
-            logger.error(f"Unexpected error during cleanup: {e}")
\ No newline at end of file
+            result.errors += 1
+            logger.error(f"Unexpected error during cleanup: {e}")
+        
+        result.duration_seconds = time.perf_counter() - start
+        logger.info(f"Cleaned up {result.deleted} of {result.expired} expired files from S3 ({result.scanned} scanned)")
+        return result
+    
+    async def _delete_batch(self, keys: List[str], result: RetentionSweepResult):
+        """Delete up to 1000 keys in one request, waiting out the delete rate limit first"""
+        wait = self._last_delete_request + 1 / self.delete_requests_per_second - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_delete_request = time.monotonic()
+        
+        try:
+            response = await asyncio.to_thread(
+                self.s3_client.delete_objects,
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+            )
+        except ClientError as e:
+            result.errors += len(keys)
+            logger.error(f"Failed to delete batch of {len(keys)} files: {e}")
+            return
+        finally:
+            result.delete_requests += 1
+        
+        # Quiet mode only reports the keys that failed
+        errors = response.get('Errors', [])
+        for error in errors:
+            logger.warning(f"Failed to delete {error.get('Key')}: {error.get('Code')} {error.get('Message')}")
+        result.errors += len(errors)
+        result.deleted += len(keys) - len(errors)
+    
+    def close(self):
+        """Close the client's connection pool"""
+        self.s3_client.close()
@@ -0,0 +1,52 @@
+import os
+import re
+import sys
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Distinct record types kept per lookup. Types are typed in by users, so the caches are bounded
+CATEGORY_CACHE_SIZE = int(os.getenv('CATEGORY_CACHE_SIZE', 4096))
+
+# Main categories that count as essential spending, matched at the start of a word, e.g. "Food & Groceries"
+ESSENTIAL_CATEGORIES = ("Food", "Transport", "Utilities", "Housing", "Healthcare", "Education")
+
+# Keywords that place an income type in a source category, checked in order
+INCOME_SOURCE_KEYWORDS = (
+    ('government_grants', ('grant', 'sassa')),
+    ('employment', ('employment', 'salary', 'wage')),
+    ('informal_work', ('informal', 'piece', 'casual')),
+)
+
+_ESSENTIAL_PATTERN = re.compile(r"\b(?:" + "|".join(map(re.escape, ESSENTIAL_CATEGORIES)) + r")")
+_INCOME_SOURCE_PATTERNS = tuple(
+    (category, re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)) for category, keywords in INCOME_SOURCE_KEYWORDS
+)
+
+
+@lru_cache(maxsize=CATEGORY_CACHE_SIZE)
+def record_category(record_type: str) -> str:
+    """
+    Main category of an expense or income type, e.g. 'Food & Groceries - Shoprite' -> 'Food & Groceries'.
+
+    Computed once per distinct type and interned, so the category column of every record with the
+    same category shares one string. Stored with each record when it is inserted.
+    """
+    return sys.intern(record_type.split(' - ')[0])
+
+
+@lru_cache(maxsize=CATEGORY_CACHE_SIZE)
+def is_essential_category(category: str) -> bool:
+    """Whether spending in a main category is essential, e.g. 'Food & Groceries' or 'Transport'."""
+    return _ESSENTIAL_PATTERN.search(category) is not None
+
+
+@lru_cache(maxsize=CATEGORY_CACHE_SIZE)
+def income_source_category(income_type: str) -> str:
+    """Source category of an income type, e.g. 'Government Grant - Child support' -> 'government_grants'"""
+    for category, pattern in _INCOME_SOURCE_PATTERNS:
+        if pattern.search(income_type):
+            return category
+    return 'other'
@@ -0,0 +1,190 @@
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, Dict, List, Mapping, Optional, Tuple
+
+from api.models.enums import Languages
+from api.models.inbound_responses import LanguageSelector
+from api.utils.language_config import TEMPLATE_VALIDATORS
+
+if TYPE_CHECKING:
+    from api.utils.template_registry import CompiledTemplate
+
+# Names the template manager knows how to execute. Templates referring to anything else are rejected at load time.
+SUPPORTED_ACTIONS = frozenset({
+    "generate_expense_report",
+    "generate_income_report",
+    "generate_feelings_report",
+    "generate_comprehensive_report",
+    "update_user_language_preference",
+})
+
+SUPPORTED_INPUT_HANDLERS = frozenset({
+    "expense_recording",
+    "income_recording",
+    "feeling_recording",
+})
+
+
+class TransitionType(str, Enum):
+    route = "route"
+    action = "action"
+    language = "language"
+
+
+@dataclass(frozen=True)
+class Transition:
+    """What happens when a state receives a given normalized input."""
+
+    type: TransitionType
+    target: Optional[str]
+    language: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ConversationState:
+    """
+    A compiled template state.
+
+    transitions maps normalized user input to a Transition. Free-text input that has no
+    transition is only accepted by continuous states, after passing the state's validator.
+    """
+
+    name: str
+    normalize: Callable[[str], str]
+    validate: Callable[[str], bool]
+    transitions: Mapping[str, Transition]
+    continuous: bool
+    input_handler: Optional[str]
+    next_template: Optional[str]
+    previous_template: Optional[str]
+
+
+def _normalize_option(user_response: str) -> str:
+    return user_response.strip()
+
+
+def _normalize_language(user_response: str) -> str:
+    return user_response.strip().capitalize()
+
+
+class ConversationStateMachine:
+    """The state x normalized input -> transition table for one language."""
+
+    def __init__(self, states: Mapping[str, ConversationState]):
+        self.states = states
+
+    def resolve(self, state_name: str, user_response: str) -> Tuple[ConversationState, str, Optional[Transition]]:
+        """
+        Look up the transition for an inbound message.
+
+        Returns:
+            Tuple of (state, normalized input, transition). The transition is None when the
+            input is not a menu option of the state.
+        """
+        state = self.states[state_name]
+        option = state.normalize(user_response or "")
+        return state, option, state.transitions.get(option)
+
+
+def compile_state(template: "CompiledTemplate") -> ConversationState:
+    """
+    Compile a template into a ConversationState with its validator bound once.
+    """
+    validator = TEMPLATE_VALIDATORS.get(template.name)
+    transitions: Dict[str, Transition] = {}
+
+    if validator is LanguageSelector:
+        normalize = _normalize_language
+        for language in Languages:
+            transitions[language.value] = Transition(TransitionType.language, template.next_template, language.value)
+    else:
+        normalize = _normalize_option
+        for option, target in template.response_routing.items():
+            transitions[option] = Transition(TransitionType.route, target)
+        # Actions take precedence over routing for the same option
+        for option, action_name in template.actions.items():
+            transitions[option] = Transition(TransitionType.action, action_name)
+
+    return ConversationState(
+        name=template.name,
+        normalize=normalize,
+        validate=validator.validate_input if validator else (lambda user_response: False),
+        transitions=MappingProxyType(transitions),
+        continuous=template.continuous_template,
+        input_handler=template.input_handler,
+        next_template=template.next_template,
+        previous_template=template.previous_template,
+    )
+
+
+def validate_templates(templates: Mapping[str, "CompiledTemplate"], start_state: str) -> List[str]:
+    """
+    Check a language's templates for problems that would otherwise only show up mid-conversation.
+
+    Args:
+        templates (Mapping[str, CompiledTemplate]): Templates of one language keyed by name.
+        start_state (str): The template every new conversation starts on.
+
+    Returns:
+        List of problem descriptions, empty when the templates are consistent.
+    """
+    problems = []
+
+    if start_state not in templates:
+        problems.append(f"start template '{start_state}' is missing")
+
+    for name, template in templates.items():
+        validator = TEMPLATE_VALIDATORS.get(name)
+        if validator is None:
+            problems.append(f"'{name}' has no inbound validator")
+
+        for field in ("next_template", "previous_template"):
+            target = getattr(template, field)
+            if target and target not in templates:
+                problems.append(f"'{name}' {field} points to unknown template '{target}'")
+
+        for option, target in template.response_routing.items():
+            if target not in templates:
+                problems.append(f"'{name}' option {option} routes to unknown template '{target}'")
+
+        for option, action_name in template.actions.items():
+            if action_name not in SUPPORTED_ACTIONS:
+                problems.append(f"'{name}' option {option} uses unknown action '{action_name}'")
+            if option in template.response_routing:
+                problems.append(f"'{name}' option {option} is both an action and a route")
+
+        if validator is not None and validator is not LanguageSelector:
+            for option in list(template.response_routing) + list(template.actions):
+                if not validator.validate_input(option):
+                    problems.append(f"'{name}' option {option} is rejected by {validator.__name__}")
+
+        if template.continuous_template and template.input_handler not in SUPPORTED_INPUT_HANDLERS:
+            problems.append(f"'{name}' is continuous but has unknown input handler '{template.input_handler}'")
+
+    if start_state in templates:
+        reachable = {start_state}
+        queue = deque([start_state])
+        while queue:
+            template = templates[queue.popleft()]
+            targets = list(template.response_routing.values())
+            if template.next_template:
+                targets.append(template.next_template)
+            for target in targets:
+                if target in templates and target not in reachable:
+                    reachable.add(target)
+                    queue.append(target)
+
+        for name in templates:
+            if name not in reachable:
+                problems.append(f"'{name}' is unreachable from '{start_state}'")
+
+    return problems
+
+
+def compile_state_machine(templates: Mapping[str, "CompiledTemplate"]) -> ConversationStateMachine:
+    """Compile the templates of one language into a ConversationStateMachine."""
+    return ConversationStateMachine(MappingProxyType({
+        name: compile_state(template) for name, template in templates.items()
+    }))
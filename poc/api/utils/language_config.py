@@ -9,51 +9,23 @@ def load_language_config(path: str = "./api/translations") -> dict:
         for lang_file in Path(path).glob("*.yaml")
     }
 
-def get_template_validation(template_name: str) -> TemplateValidation:
-    templates = {
-        "unregistered_number_language_selector_template": {
-            "inbound_validator": LanguageSelector,
-        },
-        "unregistered_number_welcome_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "registration_no_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "registered_user_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "sisonova_personal_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "sisonova_public_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "sisonova_personal_expense_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "sisonova_personal_income_template": {
-            "inbound_validator": NumberedMenuValidator,
-        },
-        "sisonova_personal_record_expense_template":{
-            "inbound_validator": IncomeExpenseRecordingValidator
-        },
-        "sisonova_personal_record_income_template":{
-            "inbound_validator": IncomeExpenseRecordingValidator
-        },
-        "sisonova_personal_financial_feeling_template": {
-            "inbound_validator": NumberedMenuValidator
-        },
-        "sisonova_personal_record_feeling_template": {
-            "inbound_validator": FinancialFeelingRecordingValidator
-        },
-        "language_selector_template": {
-            "inbound_validator": NumberedMenuValidator
-        },
-        "not_yet_implemented_template": {
-            "inbound_validator": NumberedMenuValidator
-        }
-
-    }
+# Inbound validator for each template, shared by every language
+TEMPLATE_VALIDATORS = {
+    "unregistered_number_language_selector_template": LanguageSelector,
+    "unregistered_number_welcome_template": NumberedMenuValidator,
+    "registration_no_template": NumberedMenuValidator,
+    "registered_user_template": NumberedMenuValidator,
+    "sisonova_personal_template": NumberedMenuValidator,
+    "sisonova_public_template": NumberedMenuValidator,
+    "sisonova_personal_expense_template": NumberedMenuValidator,
+    "sisonova_personal_income_template": NumberedMenuValidator,
+    "sisonova_personal_record_expense_template": IncomeExpenseRecordingValidator,
+    "sisonova_personal_record_income_template": IncomeExpenseRecordingValidator,
+    "sisonova_personal_financial_feeling_template": NumberedMenuValidator,
+    "sisonova_personal_record_feeling_template": FinancialFeelingRecordingValidator,
+    "language_selector_template": NumberedMenuValidator,
+    "not_yet_implemented_template": NumberedMenuValidator,
+}
 
-    return templates[template_name]
+def get_template_validation(template_name: str) -> TemplateValidation:
+    return {"inbound_validator": TEMPLATE_VALIDATORS[template_name]}
@@ -1,74 +1,32 @@
 # api/utils/poc_dummy_data_sa.py
-from api.db.models.tables import UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings, User
+from api.db.models.tables import UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings, User, ReportJob
 import os
 from api.finance.report import PersonalizedReportDispatcher
-from api.db.db_manager import DatabaseManager
+from api.db.db_manager import DatabaseManager, get_database_manager
 from api.db.query_manager import AsyncQueries
+from api.db.conversation_cache import get_conversation_cache
+from api.db.synthetic_population import month_records
+from api.finance.snapshot import get_snapshot_cache
 import random
 from datetime import datetime, timedelta
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 from api.utils.utils import create_comprehensive_ai_message
-from api.services.s3_bucket import SecureS3Service
+from api.services.report_storage import get_report_storage
+from api.services.report_queue import get_report_job_queue
 
-async def create_poc_dummy_data_south_africa(user_object: User) -> List[Tuple[str, Dict[str, Any]]]:
+async def create_poc_dummy_data_south_africa(user_object: User, rng: Optional[random.Random] = None) -> List[Tuple[str, Dict[str, Any]]]:
     """
     Create South African lower-income representative dummy data for testing
     Updated to match actual table schema
+
+    Pass a seeded rng for reproducible data; api.db.synthetic_population builds whole populations this way.
     """
+    rng = rng or random.Random()
     dummy_data = []
     
     # Generate data for the last 2-3 years
     current_year = datetime.now().year
-    start_year = random.randint(2022, 2023)
-    
-    # South African expense types with local context
-    expense_types = [
-        "Food & Groceries - Pick n Pay",
-        "Food & Groceries - Shoprite", 
-        "Food & Groceries - Street vendor",
-        "Food & Groceries - Bread and milk",
-        "Transport - Taxi fare",
-        "Transport - Bus fare", 
-        "Transport - Petrol",
-        "Transport - Uber ride",
-        "Utilities - Electricity prepaid",
-        "Utilities - Cell phone airtime",
-        "Utilities - Data bundle",
-        "Healthcare - Clinic visit",
-        "Healthcare - Pharmacy medicine",
-        "Education - School fees",
-        "Education - School uniform",
-        "Clothing - Work clothes",
-        "Clothing - Hair salon",
-        "Housing - Rent",
-        "Housing - Home repairs",
-        "Social - Stokvel contribution",
-        "Social - Funeral contribution",
-        "Social - Church offering"
-    ]
-    
-    # South African income types for lower-income bracket
-    income_types = [
-        "Employment - Monthly salary",
-        "Employment - Weekly wages", 
-        "Employment - Overtime pay",
-        "Employment - Casual work",
-        "Government Grant - Child support",
-        "Government Grant - Disability grant",
-        "Government Grant - Old age pension",
-        "Informal Work - Selling goods",
-        "Informal Work - Hair braiding",
-        "Informal Work - Car washing",
-        "Informal Work - Garden work",
-        "Other Income - Money from family",
-        "Other Income - Stokvel payout",
-        "Other Income - Side hustle"
-    ]
-    
-    # Financial feelings in South African context
-    feelings_options = [
-        "Very Worried", "Worried", "Getting By", "Okay", "Doing Well"
-    ]
+    start_year = rng.randint(2022, 2023)
     
     # Generate data for each year
     for year in range(start_year, current_year + 1):
@@ -79,99 +37,39 @@ async def create_poc_dummy_data_south_africa(user_object: User) -> List[Tuple[st
             max_month = 12
             
         for month in range(1, max_month + 1):
-            # Generate 4-12 expenses per month (more frequent, smaller amounts)
-            num_expenses = random.randint(4, 12)
-            for _ in range(num_expenses):
-                expense_type = random.choice(expense_types)
-                
-                # Random day in the month
-                day = random.randint(1, min(28, 31))
-                expense_date = datetime(year, month, day)
-                
-                # South African Rand amounts appropriate for lower income
-                if "Housing" in expense_type:
-                    amount = round(random.uniform(800, 3500), 2)  # R800-R3500 rent
-                elif "Food" in expense_type:
-                    amount = round(random.uniform(15, 400), 2)   # R15-R400 per shop
-                elif "Transport" in expense_type:
-                    amount = round(random.uniform(8, 150), 2)    # R8-R150 per trip/fill
-                elif "Utilities" in expense_type:
-                    amount = round(random.uniform(25, 300), 2)   # R25-R300 per bill
-                elif "Education" in expense_type:
-                    amount = round(random.uniform(50, 800), 2)   # R50-R800 school costs
-                elif "Healthcare" in expense_type:
-                    amount = round(random.uniform(20, 250), 2)   # R20-R250 medical
-                elif "Social" in expense_type:
-                    amount = round(random.uniform(20, 500), 2)   # R20-R500 contributions
-                else:
-                    amount = round(random.uniform(10, 200), 2)   # R10-R200 other
-                
-                # Random feeling for this expense
-                expense_feeling = random.choice(feelings_options) if random.choice([True, False]) else None
-                
-                expense_data = {
-                    'user_id': user_object.id,
-                    'expense_type': expense_type,
-                    'expense_amount': amount,
-                    'expense_feeling': expense_feeling,
-                    'expense_date': expense_date
-                }
-                dummy_data.append(('expense', expense_data))
-            
-            # Generate 1-4 incomes per month (multiple income streams common)
-            num_incomes = random.randint(1, 4)
-            for _ in range(num_incomes):
-                income_type = random.choice(income_types)
-                
-                # Random day in the month
-                day = random.randint(1, min(28, 31))
-                income_date = datetime(year, month, day)
-                
-                # South African income amounts for lower income bracket
-                if "Employment" in income_type:
-                    amount = round(random.uniform(1500, 8000), 2)  # R1500-R8000 monthly
-                elif "Government Grant" in income_type:
-                    amount = round(random.uniform(350, 2000), 2)   # R350-R2000 grants
-                elif "Informal Work" in income_type:
-                    amount = round(random.uniform(50, 1200), 2)    # R50-R1200 informal
-                else:  # Other Income
-                    amount = round(random.uniform(30, 800), 2)     # R30-R800 other
-                
-                # Random feeling for this income
-                income_feeling = random.choice(feelings_options) if random.choice([True, False]) else None
-                
-                income_data = {
-                    'user_id': user_object.id,
-                    'income_type': income_type,
-                    'income_amount': amount,
-                    'income_feeling': income_feeling,
-                    'income_date': income_date
-                }
-                dummy_data.append(('income', income_data))
-            
-            # Generate financial feelings (more frequent due to financial stress)
-            if random.choice([True, True, False]):  # 66% chance - higher stress
-                day = random.randint(1, min(28, 31))
-                feeling_date = datetime(year, month, day)
-                
-                # Weight feelings towards more worried end for lower income
-                weighted_feelings = (
-                    ["Very Worried"] * 3 + 
-                    ["Worried"] * 4 + 
-                    ["Getting By"] * 2 + 
-                    ["Okay"] * 1 + 
-                    ["Doing Well"] * 1
-                )
-                
-                feeling_data = {
-                    'user_id': user_object.id,
-                    'feeling': random.choice(weighted_feelings),
-                    'feeling_date': feeling_date
-                }
-                dummy_data.append(('feeling', feeling_data))
+            dummy_data += month_records(user_object.id, year, month, rng)
     
     return dummy_data
 
+async def insert_poc_dummy_data(query_manager: AsyncQueries, user_object: User) -> Dict[str, int]:
+    """
+    Generate and bulk insert the South African dummy data for a POC user, with its monthly rollups.
+
+    Nothing is committed, so the caller's transaction decides when the records are stored.
+    """
+    dummy_data_list = await create_poc_dummy_data_south_africa(user_object)
+    counts = await query_manager.bulk_insert_financial_records(dummy_data_list, commit=False)
+    # The dummy history spans past months, so roll them up for the reports
+    await query_manager.rebuild_monthly_rollups(user_object.id)
+    return counts
+
+async def seed_poc_dummy_data(user_object: User, db_manager: Optional[DatabaseManager] = None) -> Dict[str, int]:
+    """
+    Generate and bulk insert the South African dummy data for a POC user in its own transaction.
+
+    Used as a background task, after the webhook has replied and its session has committed the user.
+    """
+    db_manager = db_manager or get_database_manager()
+    try:
+        async with db_manager.session_scope() as session:
+            counts = await insert_poc_dummy_data(AsyncQueries(session=session), user_object)
+        get_snapshot_cache().invalidate_user(user_object.id)
+        print(f"Seeded POC dummy data for user {user_object.id}: {counts}")
+        return counts
+    except Exception as e:
+        print(f"ERROR seeding POC dummy data for user {user_object.id}: {str(e)}")
+        return {}
+
 async def update_user_language_preference(query_manager: AsyncQueries, user_object: User, new_language_option: str) -> Dict:
     try:
 
@@ -191,6 +89,7 @@ async def update_user_language_preference(query_manager: AsyncQueries, user_obje
         new_language = language_map[new_language_option]
 
         await query_manager.update_user_language_preference(user_id=user_object.id, new_language=new_language)
+        get_conversation_cache().apply_transition(user_id=user_object.id, language=new_language)
         return {
             "error": False,
             "messages": [{"body": "Language preference updated successfully."}]
@@ -206,8 +105,8 @@ async def update_user_language_preference(query_manager: AsyncQueries, user_obje
 async def generate_comprehensive_report(report_dispatcher: PersonalizedReportDispatcher, user_object: User) -> Dict[str, Any]:
     """Generate actual comprehensive report using async PersonalizedReportDispatcher"""
 
-    s3_bucket = SecureS3Service()
-    if not report_dispatcher or not s3_bucket:
+    report_storage = get_report_storage()
+    if not report_dispatcher or not report_storage:
         return {"body": "Something went wrong generating your report. Please try again later."}
     
     try:
@@ -215,7 +114,8 @@ async def generate_comprehensive_report(report_dispatcher: PersonalizedReportDis
             report_type="comprehensive",
             months_back=6,
             include_ai=False,
-            generate_pdf=True
+            generate_pdf=True,
+            report_storage=report_storage
         )
 
         if "error" in report_result:
@@ -225,32 +125,19 @@ async def generate_comprehensive_report(report_dispatcher: PersonalizedReportDis
             }
         
         # Extract results
-        pdf_filename = report_result.get("pdf_filename")
+        pdf_bytes = report_result.get("pdf_bytes")
         ai_insights = report_result.get("personalized_ai_insights", {})
 
-        if not pdf_filename or not os.path.exists(pdf_filename):
+        if not pdf_bytes:
             return {
                 "error": True,
                 "messages": [{"body": "Sorry, the financial profile report file could not be found."}]
             }
         
         
-        # Upload to secure S3
-        presigned_url = await s3_bucket.upload_pdf_from_file_secure(
-            file_path=pdf_filename,
-            user_phone_number=user_object.phone_number,
-            report_type="comprehensive",
-            expiration_hours=24
-        )
+        # Uploaded from memory by the dispatcher's upload stage
+        presigned_url = report_result.get("presigned_url")
         
-        # Clean up local file
-        if presigned_url:
-            try:
-                os.remove(pdf_filename)
-                print(f"Cleaned up local file: {pdf_filename}")
-            except Exception as e:
-                print(f"Failed to clean up local file: {e}")
-
         if not presigned_url:
             return {
                 "error": True,
@@ -300,8 +187,8 @@ async def generate_comprehensive_report(report_dispatcher: PersonalizedReportDis
 async def generate_feelings_report(report_dispatcher: PersonalizedReportDispatcher, user_object: User) -> Dict[str, Any]:
     """Generate actual feelings report using async PersonalizedReportDispatcher"""
 
-    s3_bucket = SecureS3Service()
-    if not report_dispatcher or not s3_bucket:
+    report_storage = get_report_storage()
+    if not report_dispatcher or not report_storage:
         return {"body": "Something went wrong generating your report. Please try again later."}
     
     try:
@@ -309,7 +196,8 @@ async def generate_feelings_report(report_dispatcher: PersonalizedReportDispatch
             report_type="feelings",  # New report type
             months_back=6,
             include_ai=False,
-            generate_pdf=True
+            generate_pdf=True,
+            report_storage=report_storage
         )
 
         if "error" in report_result:
@@ -319,32 +207,19 @@ async def generate_feelings_report(report_dispatcher: PersonalizedReportDispatch
             }
         
         # Extract results
-        pdf_filename = report_result.get("pdf_filename")
+        pdf_bytes = report_result.get("pdf_bytes")
         ai_insights = report_result.get("personalized_ai_insights", {})
 
-        if not pdf_filename or not os.path.exists(pdf_filename):
+        if not pdf_bytes:
             return {
                 "error": True,
                 "messages": [{"body": "Sorry, the wellness report file could not be found."}]
             }
         
         
-        # Upload to secure S3
-        presigned_url = await s3_bucket.upload_pdf_from_file_secure(
-            file_path=pdf_filename,
-            user_phone_number=user_object.phone_number,
-            report_type="feelings",
-            expiration_hours=24
-        )
+        # Uploaded from memory by the dispatcher's upload stage
+        presigned_url = report_result.get("presigned_url")
         
-        # Clean up local file
-        if presigned_url:
-            try:
-                os.remove(pdf_filename)
-                print(f"Cleaned up local file: {pdf_filename}")
-            except Exception as e:
-                print(f"Failed to clean up local file: {e}")
-
         if not presigned_url:
             return {
                 "error": True,
@@ -393,9 +268,9 @@ async def generate_feelings_report(report_dispatcher: PersonalizedReportDispatch
 async def generate_income_report(report_dispatcher: PersonalizedReportDispatcher, user_object: User) -> Dict[str, Any]:
     """Generate actual income report using async PersonalizedReportDispatcher"""
 
-    s3_bucket = SecureS3Service()
+    report_storage = get_report_storage()
     print("HERE")
-    if not report_dispatcher or not s3_bucket:
+    if not report_dispatcher or not report_storage:
         return {"body": "Something went wrong generating your report. Please try again later."}
     
     try:
@@ -403,7 +278,8 @@ async def generate_income_report(report_dispatcher: PersonalizedReportDispatcher
             report_type="incomes",
             months_back=6,
             include_ai=False,
-            generate_pdf=True
+            generate_pdf=True,
+            report_storage=report_storage
         )
 
         if "error" in report_result:
@@ -413,32 +289,19 @@ async def generate_income_report(report_dispatcher: PersonalizedReportDispatcher
             }
         
         # Extract results
-        pdf_filename = report_result.get("pdf_filename")
+        pdf_bytes = report_result.get("pdf_bytes")
         ai_insights = report_result.get("personalized_ai_insights", {})
 
-        if not pdf_filename or not os.path.exists(pdf_filename):
+        if not pdf_bytes:
             return {
                 "error": True,
                 "messages": [{"body": "Sorry, the report file could not be found."}]
             }
         
         
-        # Upload to secure S3
-        presigned_url = await s3_bucket.upload_pdf_from_file_secure(
-            file_path=pdf_filename,
-            user_phone_number=user_object.phone_number,
-            report_type="incomes",
-            expiration_hours=24
-        )
+        # Uploaded from memory by the dispatcher's upload stage
+        presigned_url = report_result.get("presigned_url")
         
-        # Clean up local file
-        if presigned_url:
-            try:
-                os.remove(pdf_filename)
-                print(f"Cleaned up local file: {pdf_filename}")
-            except Exception as e:
-                print(f"Failed to clean up local file: {e}")
-
         if not presigned_url:
             return {
                 "error": True,
@@ -489,9 +352,9 @@ async def generate_income_report(report_dispatcher: PersonalizedReportDispatcher
 async def generate_expense_report(report_dispatcher: PersonalizedReportDispatcher, user_object: User) -> Dict[str, Any]:
     """Generate actual expense report using async PersonalizedReportDispatcher"""
 
-    s3_bucket = SecureS3Service()
+    report_storage = get_report_storage()
 
-    if not report_dispatcher or not s3_bucket:
+    if not report_dispatcher or not report_storage:
         return {"body": "Something went wrong generating your report. Please try again later."}
     
     try:
@@ -502,7 +365,8 @@ async def generate_expense_report(report_dispatcher: PersonalizedReportDispatche
             report_type="expenses",
             months_back=6,
             include_ai=False,
-            generate_pdf=True
+            generate_pdf=True,
+            report_storage=report_storage
         )
         
         if "error" in report_result:
@@ -512,31 +376,18 @@ async def generate_expense_report(report_dispatcher: PersonalizedReportDispatche
             }
         
         # Extract results
-        pdf_filename = report_result.get("pdf_filename")
+        pdf_bytes = report_result.get("pdf_bytes")
         ai_insights = report_result.get("personalized_ai_insights", {})
 
-        if not pdf_filename or not os.path.exists(pdf_filename):
+        if not pdf_bytes:
             return {
                 "error": True,
                 "messages": [{"body": "Sorry, the report file could not be found."}]
             }
         
-        # Upload to secure S3
-        presigned_url = await s3_bucket.upload_pdf_from_file_secure(
-            file_path=pdf_filename,
-            user_phone_number=user_object.phone_number,
-            report_type="expenses",
-            expiration_hours=24
-        )
+        # Uploaded from memory by the dispatcher's upload stage
+        presigned_url = report_result.get("presigned_url")
         
-        # Clean up local file
-        if presigned_url:
-            try:
-                os.remove(pdf_filename)
-                print(f"Cleaned up local file: {pdf_filename}")
-            except Exception as e:
-                print(f"Failed to clean up local file: {e}")
-
         if not presigned_url:
             return {
                 "error": True,
@@ -607,6 +458,8 @@ async def record_feeling_inputs_to_db(user_input: str, user_object: User, query_
 
         # Record feelings to the database
         await query_manager.insert_user_financial_feelings(user_id=user_id, feelings=feelings)
+        # The user's cached report data no longer matches their records
+        get_snapshot_cache().invalidate_user(user_id)
 
         return {
             "error": False,
@@ -645,6 +498,7 @@ async def record_expense_inputs_to_db(user_input: str, user_object: User, query_
                 expenses.append(expense)
 
         await query_manager.insert_user_unverified_expenses(user_id=user_id, expenses=expenses)
+        get_snapshot_cache().invalidate_user(user_id)
         return {
             "error": False,
             "messages": [{"body": "Expenses recorded successfully!"}]
@@ -680,6 +534,7 @@ async def record_income_inputs_to_db(user_input: str, user_object: User, query_m
                 incomes.append(income)
 
         await query_manager.insert_user_unverified_incomes(user_id=user_id, incomes=incomes)
+        get_snapshot_cache().invalidate_user(user_id)
         return {
             "error": False,
             "messages": [{"body": "Incomes recorded successfully!"}]
@@ -693,8 +548,46 @@ async def record_income_inputs_to_db(user_input: str, user_object: User, query_m
         }
     
 
+# Report actions that run inline or through the report job queue
+REPORT_ACTIONS = {
+    "generate_expense_report": generate_expense_report,
+    "generate_income_report": generate_income_report,
+    "generate_feelings_report": generate_feelings_report,
+    "generate_comprehensive_report": generate_comprehensive_report,
+}
+
+async def request_report(report_type: str, report_dispatcher: Optional[PersonalizedReportDispatcher], user_object: User) -> Dict[str, Any]:
+    """Queue a report when the report job queue is running, otherwise generate it inside the request"""
+    queue = get_report_job_queue()
+    if queue is None or not queue.is_running:
+        return await REPORT_ACTIONS[report_type](report_dispatcher=report_dispatcher, user_object=user_object)
+
+    await queue.enqueue(user_id=user_object.id, phone_number=user_object.phone_number, report_type=report_type)
+    return {
+        "error": False,
+        "messages": [{"body": "⏳ Your report is being prepared. I'll send it to you here as soon as it's ready."}],
+        "stay_on_current": True
+    }
+
+async def run_report_job(job: ReportJob) -> Dict[str, Any]:
+    """Generate a queued report for its user. Used as the ReportJobQueue runner"""
+    db_manager = get_database_manager()
+    async with db_manager.session_scope() as session:
+        user = await session.get(User, job.user_id)
+
+    if user is None:
+        return {"error": f"User {job.user_id} not found", "messages": []}
+
+    report_dispatcher = PersonalizedReportDispatcher(
+        user=user,
+        gemini_api_key=os.getenv("GEMINI_API_KEY"),
+        db_manager=db_manager
+    )
+    return await REPORT_ACTIONS[job.report_type](report_dispatcher=report_dispatcher, user_object=user)
+
+
 async def main():
-    db_manager = DatabaseManager(db_url='sqlite+aiosqlite:///test_db.db')
+    db_manager = get_database_manager()
     
     # Use async context manager properly
     async with db_manager.session_scope() as db_session:
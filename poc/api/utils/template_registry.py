@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from api.utils.conversation_state_machine import ConversationStateMachine, compile_state_machine, validate_templates
+from api.utils.language_config import load_language_config
+from api.utils.twiml_responses import generate_twiml_message
+
+load_dotenv()
+
+logger = logging.getLogger("template-registry")
+logger.setLevel(logging.INFO)
+
+DEFAULT_TRANSLATIONS_PATH = Path(__file__).resolve().parent.parent / "translations"
+DEFAULT_TEMPLATE = "unregistered_number_language_selector_template"
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A single message template with its routing tables and TwiML rendered ahead of time."""
+
+    name: str
+    language: str
+    template_message: str
+    template_error_message: str
+    error_message: Tuple[str, ...]
+    next_template: Optional[str]
+    previous_template: Optional[str]
+    response_routing: Mapping[str, str]
+    actions: Mapping[str, str]
+    continuous_template: bool
+    input_handler: Optional[str]
+    # Pre-rendered responses for the common paths
+    error_response: str
+    twiml_message: str
+    twiml_error_message: str
+
+
+def compile_template(name: str, language: str, raw: Dict[str, Any]) -> CompiledTemplate:
+    """Compile one raw YAML template into an immutable CompiledTemplate."""
+    error_message = tuple(str(option) for option in (raw.get("error_message") or []))
+    template_message = raw.get("template_message", "")
+    template_error_message = raw.get("template_error_message", "")
+
+    error_options = "\n".join([f"- {option}" for option in error_message])
+    error_response = template_error_message.format(error_message=error_options) if template_error_message else ""
+
+    return CompiledTemplate(
+        name=name,
+        language=language,
+        template_message=template_message,
+        template_error_message=template_error_message,
+        error_message=error_message,
+        next_template=raw.get("next_template"),
+        previous_template=raw.get("previous_template"),
+        response_routing=MappingProxyType({str(k): v for k, v in (raw.get("response_routing") or {}).items()}),
+        actions=MappingProxyType({str(k): v for k, v in (raw.get("actions") or {}).items()}),
+        continuous_template=bool(raw.get("continuous_template", False)),
+        input_handler=raw.get("input_handler"),
+        error_response=error_response,
+        twiml_message=generate_twiml_message([{"body": template_message}]),
+        twiml_error_message=generate_twiml_message([{"body": error_response}]),
+    )
+
+
+class TemplateRegistry:
+    """
+    Translation templates loaded once and indexed as language -> template name -> CompiledTemplate.
+
+    The index is immutable and replaced as a whole on reload, so readers never see a
+    partially loaded set. Each language is also compiled into a ConversationStateMachine, and
+    templates with dangling routes or unreachable states are rejected at load time. With hot
+    reload enabled the YAML files are re-read when their modification times change, checked
+    at most once per reload interval.
+    """
+
+    def __init__(self, path: Optional[str] = None, hot_reload: Optional[bool] = None, reload_interval: Optional[float] = None):
+        """
+        Initialize and load the registry.
+
+        Args:
+            path (str): Directory holding the <language>.yaml files. Defaults to api/translations.
+            hot_reload (bool): Re-read files when they change. Defaults to TEMPLATE_HOT_RELOAD or False.
+            reload_interval (float): Minimum seconds between change checks. Defaults to TEMPLATE_RELOAD_INTERVAL_SECONDS or 2.
+        """
+        self.path = Path(path) if path is not None else DEFAULT_TRANSLATIONS_PATH
+        self.hot_reload = hot_reload if hot_reload is not None else os.getenv('TEMPLATE_HOT_RELOAD', 'false').lower() in ('1', 'true', 'yes')
+        self.reload_interval = reload_interval if reload_interval is not None else float(os.getenv('TEMPLATE_RELOAD_INTERVAL_SECONDS', 2))
+
+        self._lock = threading.Lock()
+        self._templates: Mapping[str, Mapping[str, CompiledTemplate]] = MappingProxyType({})
+        self._state_machines: Mapping[str, ConversationStateMachine] = MappingProxyType({})
+        self._mtimes: Dict[str, float] = {}
+        self._last_check = 0.0
+        self.load()
+
+    def load(self) -> None:
+        """Read, compile, validate and index every translation file."""
+        with self._lock:
+            raw_config = load_language_config(path=str(self.path))
+            if not raw_config:
+                raise ValueError(f"No translation files found in {self.path}")
+
+            templates = MappingProxyType({
+                language: MappingProxyType({
+                    name: compile_template(name, language, raw or {})
+                    for name, raw in language_templates.items()
+                })
+                for language, language_templates in raw_config.items()
+            })
+
+            problems = self._validate(templates)
+            if problems:
+                raise ValueError("Invalid translation templates:\n" + "\n".join(f"- {problem}" for problem in problems))
+
+            self._templates = templates
+            self._state_machines = MappingProxyType({
+                language: compile_state_machine(language_templates)
+                for language, language_templates in templates.items()
+            })
+            self._mtimes = self._current_mtimes()
+            self._last_check = time.monotonic()
+
+        logger.info(f"Loaded templates for languages: {', '.join(sorted(self._templates))}")
+
+    @staticmethod
+    def _validate(templates: Mapping[str, Mapping[str, CompiledTemplate]]) -> List[str]:
+        problems = []
+        all_names = set().union(*(language_templates.keys() for language_templates in templates.values()))
+
+        for language, language_templates in sorted(templates.items()):
+            for name in sorted(all_names - set(language_templates)):
+                problems.append(f"[{language}] '{name}' is missing")
+            problems.extend(f"[{language}] {problem}" for problem in validate_templates(language_templates, start_state=DEFAULT_TEMPLATE))
+
+        return problems
+
+    def get(self, language: str, template_name: Optional[str]) -> CompiledTemplate:
+        """Return the compiled template for a language, defaulting to the language selector."""
+        if self.hot_reload:
+            self.reload_if_changed()
+        return self._templates[language][template_name or DEFAULT_TEMPLATE]
+
+    def state_machine(self, language: str) -> ConversationStateMachine:
+        """Return the compiled conversation state machine for a language."""
+        if self.hot_reload:
+            self.reload_if_changed()
+        return self._state_machines[language]
+
+    @property
+    def languages(self) -> Tuple[str, ...]:
+        return tuple(self._templates)
+
+    def templates_for(self, language: str) -> Mapping[str, CompiledTemplate]:
+        return self._templates[language]
+
+    def reload_if_changed(self) -> bool:
+        """Reload the templates if any translation file was added, removed or modified."""
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return False
+        self._last_check = now
+
+        if self._current_mtimes() == self._mtimes:
+            return False
+
+        try:
+            self.load()
+        except Exception as e:
+            # Keep serving the last good templates
+            logger.error(f"Failed to reload templates: {e}")
+            return False
+        return True
+
+    def _current_mtimes(self) -> Dict[str, float]:
+        return {str(f): f.stat().st_mtime for f in self.path.glob("*.yaml")}
+
+
+# Process-wide registry shared by every TwilioTemplateManager
+_template_registry: Optional[TemplateRegistry] = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Return the process-wide template registry, loading it on first use."""
+    global _template_registry
+    if _template_registry is None:
+        _template_registry = TemplateRegistry()
+    return _template_registry
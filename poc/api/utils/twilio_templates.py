@@ -1,15 +1,32 @@
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Callable, Awaitable
 import os
 from api.db.models.tables import User
 from api.db.query_manager import AsyncQueries
 from api.finance.report import PersonalizedReportDispatcher
-from api.utils.language_config import load_language_config, get_template_validation
+from api.utils.conversation_state_machine import ConversationState, Transition, TransitionType
+from api.utils.template_registry import CompiledTemplate, get_template_registry
 from api.utils.twiml_responses import generate_twiml_message
-from api.utils.template_actions import generate_expense_report, update_user_language_preference, record_expense_inputs_to_db, record_income_inputs_to_db, generate_comprehensive_report, generate_feelings_report, generate_income_report, record_feeling_inputs_to_db
+from api.utils.template_actions import request_report, update_user_language_preference, record_expense_inputs_to_db, record_income_inputs_to_db, record_feeling_inputs_to_db
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Action and input handler dispatch tables. Their keys must match SUPPORTED_ACTIONS and
+# SUPPORTED_INPUT_HANDLERS, which the template registry checks the YAML templates against.
+ACTION_HANDLERS: Dict[str, Callable[["TwilioTemplateManager"], Awaitable[Dict[str, Any]]]] = {
+    "generate_expense_report": lambda manager: request_report("generate_expense_report", report_dispatcher=manager.report_dispatcher, user_object=manager.user_object),
+    "generate_income_report": lambda manager: request_report("generate_income_report", report_dispatcher=manager.report_dispatcher, user_object=manager.user_object),
+    "generate_feelings_report": lambda manager: request_report("generate_feelings_report", report_dispatcher=manager.report_dispatcher, user_object=manager.user_object),
+    "generate_comprehensive_report": lambda manager: request_report("generate_comprehensive_report", report_dispatcher=manager.report_dispatcher, user_object=manager.user_object),
+    "update_user_language_preference": lambda manager: update_user_language_preference(query_manager=manager.query_manager, user_object=manager.user_object, new_language_option=manager.selected_option),
+}
+
+INPUT_HANDLERS: Dict[str, Callable[["TwilioTemplateManager"], Awaitable[Dict[str, Any]]]] = {
+    "expense_recording": lambda manager: record_expense_inputs_to_db(user_input=manager.user_response, user_object=manager.user_object, query_manager=manager.query_manager),
+    "income_recording": lambda manager: record_income_inputs_to_db(user_input=manager.user_response, user_object=manager.user_object, query_manager=manager.query_manager),
+    "feeling_recording": lambda manager: record_feeling_inputs_to_db(user_input=manager.user_response, user_object=manager.user_object, query_manager=manager.query_manager),
+}
+
 
 class TwilioTemplateManager:
 
@@ -25,7 +42,9 @@ class TwilioTemplateManager:
         self.action_result = None
         self.query_manager = query_manager
         self.preferred_language = self._language_selection_mapping(language=language)
-        self.templates = {}
+        self.template_registry = get_template_registry()
+        self.templates: Optional[CompiledTemplate] = None
+        self.state_machine = None
         self._set_message_template(template_name=self.current_template_name)
         
         # Initialize report dispatcher if user object is available
@@ -45,115 +64,53 @@ class TwilioTemplateManager:
         return language_codes[language]
     
     def _set_message_template(self, template_name: Optional[str]) -> None:
-        if template_name is None:
-            self.templates = load_language_config()[self.preferred_language]["unregistered_number_language_selector_template"]
-        else:
-            self.templates = load_language_config()[self.preferred_language][template_name]
-
-    def _validate_user_response(self) -> bool:
-        validation_obj = get_template_validation(template_name=self.current_template_name)
-
-        try:
-            validation_class = validation_obj["inbound_validator"]
-            is_valid = validation_class.validate_input(self.user_response)
-
-            if is_valid:
-                if self.current_template_name == "unregistered_number_language_selector_template":
-                    self.selected_language = self.user_response.strip().title()
-                else:
-                    self.selected_option = self.user_response.strip()
-
-            return is_valid
-        except (ValueError, AttributeError) as e:
-            print(f"Validation error: {e}")
-            return False
-
-    def _is_action_event(self) -> bool:
-        """Check if the selected option is an action event"""
-        actions = self.templates.get("actions", {})
-        return self.selected_option in actions
-
-    def _is_routing_event(self) -> bool:
-        """Check if the selected option is a routing event"""
-        response_routing = self.templates.get("response_routing", {})
-        return self.selected_option in response_routing
-    
-    def _is_continuous_template(self) -> bool:
-        return self.templates.get("continuous_template", False)
-
-    def _get_next_template_from_routing(self) -> Optional[str]:
-        """Get the next template based on response_routing configuration."""
-        response_routing = self.templates.get("response_routing", {})
-        return response_routing.get(self.selected_option)
+        self.templates = self.template_registry.get(self.preferred_language, template_name)
+        self.state_machine = self.template_registry.state_machine(self.preferred_language)
 
     def reload_templates_with_language(self, new_language: str):
         """Reload templates with a new language"""
         self.preferred_language = self._language_selection_mapping(new_language)
-        next_template = self.templates.get("next_template", self.current_template_name)
-        self.templates = load_language_config()[self.preferred_language][next_template]
+        next_template = self.templates.next_template or self.current_template_name
+        self.templates = self.template_registry.get(self.preferred_language, next_template)
 
     def _build_twiml_messages(self, messages: List[Dict[str, str]]) -> str:
         """Build TwiML from message list using existing function"""
         return generate_twiml_message(messages)
     
-    async def _handle_continuous_input_templates(self) -> Dict[str, Any]:
+    async def _handle_continuous_input_templates(self, state: ConversationState) -> Dict[str, Any]:
         """Handle continuous input templates"""
-        input_handler = self.templates.get("input_handler", None)
+        input_handler = INPUT_HANDLERS.get(state.input_handler)
 
         if not input_handler:
-            return {"error": "No input handler defined for this template"}
+            return {"error": f"No handler implemented for template: {state.input_handler}"}
         
         try:
-            if input_handler == "expense_recording":
-                return await record_expense_inputs_to_db(user_input=self.user_response, user_object=self.user_object, query_manager=self.query_manager)
-            elif input_handler == "income_recording":
-                return await record_income_inputs_to_db(user_input=self.user_response, user_object=self.user_object, query_manager=self.query_manager)
-            elif input_handler == "feeling_recording":
-                return await record_feeling_inputs_to_db(user_input=self.user_response, user_object=self.user_object, query_manager=self.query_manager)
-            else:
-                return {"error": f"No handler implemented for template: {input_handler}"}
-            
+            return await input_handler(self)
         except Exception as e:
             print(f"ERROR executing input handler: {str(e)}")
             return {"error": f"Failed to execute input handler: {str(e)}"}
     
-    async def _execute_action(self) -> Dict[str, Any]:
+    async def _execute_action(self, transition: Transition) -> Dict[str, Any]:
         """Execute the actual async Python methods for actions"""
-        actions = self.templates.get("actions", {})
-        action_name = actions.get(self.selected_option)
-        
-        print(f"DEBUG: Actions: {actions}")
-        print(f"DEBUG: Action name: {action_name}")
-        if not action_name:
-            return {"error": "No action defined for this option"}
+        action_name = transition.target
+        action = ACTION_HANDLERS.get(action_name)
         
         print(f"DEBUG: Executing async action: {action_name}")
+        if not action:
+            return {"error": f"No handler implemented for action: {action_name}"}
         
-        # Map action names to actual async method calls
         try:
-            if action_name == "generate_expense_report":
-                return await generate_expense_report(report_dispatcher=self.report_dispatcher, user_object=self.user_object)
-            elif action_name == "generate_income_report":
-                return await generate_income_report(report_dispatcher=self.report_dispatcher, user_object=self.user_object)
-            elif action_name == "generate_feelings_report":
-                return await generate_feelings_report(report_dispatcher=self.report_dispatcher, user_object=self.user_object)
-            elif action_name == "generate_comprehensive_report":
-                return await generate_comprehensive_report(report_dispatcher=self.report_dispatcher, user_object=self.user_object)
-            elif action_name == "update_user_language_preference":
-                return await update_user_language_preference(query_manager=self.query_manager, user_object=self.user_object, new_language_option=self.selected_option)
-            # elif action_name == "record_expense_action":
-            #     return await self._start_expense_recording()
-            # elif action_name == "record_income_action":
-            #     return await self._start_income_recording()
-            # elif action_name == "record_feeling_action":
-            #     return await self._start_feeling_recording()
-            else:
-                return {"error": f"No handler implemented for action: {action_name}"}
-                
+            return await action(self)
         except Exception as e:
             print(f"ERROR executing async action {action_name}: {str(e)}")
             return {"error": f"Failed to execute action: {str(e)}"}
 
+    def _build_result_twiml(self, result: Dict[str, Any]) -> str:
+        """Build TwiML from an action or input handler result, falling back to the error message"""
+        if not result.get("messages"):
+            return self.templates.twiml_error_message
+        return self._build_twiml_messages(result["messages"])
+
     async def get_template_message(self) -> Tuple[str, Optional[str], str]:
         """
         Generate complete TwiML message including media attachments
@@ -162,92 +119,74 @@ class TwilioTemplateManager:
 
         # Initial response
         if self.current_template_name is None:
-            message = self.templates["template_message"]
-            twiml_message = self._build_twiml_messages([{"body": message}])
-            return "unregistered_number_language_selector_template", None, twiml_message
+            return "unregistered_number_language_selector_template", None, self.templates.twiml_message
+
+        state, option, transition = self.state_machine.resolve(self.current_template_name, self.user_response)
 
         # Language selection
-        if (self.current_template_name == "unregistered_number_language_selector_template" 
-            and self.has_started):
-            if self._validate_user_response():
-                next_template = self.templates.get("next_template")
-                
-                if self.selected_language:
-                    self.reload_templates_with_language(self.selected_language)
-                
-                message = self.templates["template_message"]
-                previous_template = self.templates.get("previous_template")
-                
-                twiml_message = self._build_twiml_messages([{"body": message}])
-                return next_template, previous_template, twiml_message
-            else:
-                error_options = "\n".join([f"- {option}" for option in self.templates["error_message"]])
-                error_message = self.templates["template_error_message"].format(error_message=error_options)
-                twiml_message = self._build_twiml_messages([{"body": error_message}])
-                return self.current_template_name, None, twiml_message
+        if transition is not None and transition.type == TransitionType.language:
+            if not self.has_started:
+                return self.current_template_name, None, self.templates.twiml_error_message
+
+            self.selected_language = transition.language
+            next_template = transition.target
+            self.reload_templates_with_language(self.selected_language)
+
+            previous_template = self.templates.previous_template
+            return next_template, previous_template, self.templates.twiml_message
 
-        # Handle actions and routing
-        if self._validate_user_response():
-            # Check if this is an action event
-            if self._is_action_event():
-                print(f"DEBUG: Processing TwiML-integrated ACTION for option '{self.selected_option}'")
-                
-                # Execute action and get TwiML message structure
-                action_result = await self._execute_action()
-                
-                if action_result["error"]:
-                    print(f"ERROR: {action_result['error']}")
-                    twiml_message = self._build_twiml_messages(action_result["messages"])
-                    return self.current_template_name, None, twiml_message
-                
-                # Action succeeded - build complete TwiML with media
-                twiml_message = self._build_twiml_messages(action_result["messages"])
-                
-                # Determine next template
-                if action_result.get("stay_on_current", False):
-                    next_template = self.current_template_name
-                else:
-                    next_template = action_result.get("next_template", self.current_template_name)
-                
-                previous_template = self.templates.get("previous_template")
-                return next_template, previous_template, twiml_message
+        # Check if this is an action event
+        if transition is not None and transition.type == TransitionType.action:
+            self.selected_option = option
+            print(f"DEBUG: Processing TwiML-integrated ACTION for option '{self.selected_option}'")
+            
+            # Execute action and get TwiML message structure
+            action_result = await self._execute_action(transition)
+            twiml_message = self._build_result_twiml(action_result)
+            
+            if action_result.get("error"):
+                print(f"ERROR: {action_result['error']}")
+                return self.current_template_name, None, twiml_message
+            
+            # Determine next template
+            if action_result.get("stay_on_current", False):
+                next_template = self.current_template_name
+            else:
+                next_template = action_result.get("next_template", self.current_template_name)
             
-            # Check if this is a routing event
-            elif self._is_routing_event():
-                print(f"DEBUG: Processing ROUTING event for option '{self.selected_option}'")
-                next_template = self._get_next_template_from_routing()
-                
-                if next_template and next_template != self.current_template_name:
-                    self._set_message_template(template_name=next_template)
-                    message = self.templates["template_message"]
-                    previous_template = self.templates.get("previous_template")
-                else:
-                    message = self.templates["template_message"]
-                    previous_template = self.templates.get("previous_template")
-                    next_template = self.current_template_name
-                
-                twiml_message = self._build_twiml_messages([{"body": message}])
-                return next_template, previous_template, twiml_message
+            previous_template = self.templates.previous_template
+            return next_template, previous_template, twiml_message
+        
+        # Check if this is a routing event
+        if transition is not None and transition.type == TransitionType.route:
+            self.selected_option = option
+            print(f"DEBUG: Processing ROUTING event for option '{self.selected_option}'")
+            next_template = transition.target
             
-            elif self._is_continuous_template():
-                cont_result = await self._handle_continuous_input_templates()
-                print(cont_result)
-                if cont_result["error"]:
-                    twiml_message = self._build_twiml_messages(cont_result["messages"])
-                    return self.current_template_name, None, twiml_message
-                
-                # Action succeeded - build complete TwiML with media
-                twiml_message = self._build_twiml_messages(cont_result["messages"])
-                
+            if next_template and next_template != self.current_template_name:
+                self._set_message_template(template_name=next_template)
+            else:
                 next_template = self.current_template_name
-                previous_template = self.templates.get("previous_template")
-                return next_template, previous_template, twiml_message
+            
+            previous_template = self.templates.previous_template
+            return next_template, previous_template, self.templates.twiml_message
+        
+        # Free-text input for continuous templates
+        if state.continuous and state.validate(self.user_response):
+            self.selected_option = option
+            cont_result = await self._handle_continuous_input_templates(state)
+            twiml_message = self._build_result_twiml(cont_result)
+
+            if cont_result.get("error"):
+                print(f"ERROR: {cont_result['error']}")
+                return self.current_template_name, None, twiml_message
+            
+            next_template = self.current_template_name
+            previous_template = self.templates.previous_template
+            return next_template, previous_template, twiml_message
         
         # Error case
-        error_options = "\n".join([f"- {option}" for option in self.templates["error_message"]])
-        error_message = self.templates["template_error_message"].format(error_message=error_options)
-        twiml_message = self._build_twiml_messages([{"body": error_message}])
-        return self.current_template_name, None, twiml_message
+        return self.current_template_name, None, self.templates.twiml_error_message
 
     def get_selected_language(self) -> Optional[str]:
         """Return the language selected by the user (if any)"""
@@ -0,0 +1,66 @@
+"""
+Time to answer concurrent AI insight requests with the blocking model call and through the gateway.
+
+Each user asks for the same report several times at once, as happens when a user taps the
+report menu again while waiting. The model is the offline LocalInsightModel with a fixed
+delay standing in for Gemini's latency. "blocking" calls it on the event loop like the
+analyzer used to; "gateway" goes through the InsightGateway, which runs the calls in
+worker threads, shares one call between identical requests and caches the insights.
+
+Usage (from the poc directory):
+    python -m benchmarks.ai_insights --users 1 5 20 --repeats 3 --delay 0.2
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
+from api.finance.llm_gateway import InsightGateway, LocalInsightModel
+
+
+def _report(user: int):
+    return {"summary": {"total_expenses": 1000.0 + user, "total_transactions": 10 + user}}
+
+
+async def _blocking(analyzer: PersonalizedGeminiAnalyzer, user: int):
+    data_summary = analyzer._extract_key_data_points(_report(user), "expenses")
+    prompt = analyzer._create_personalized_prompt(data_summary, "expenses", f"user {user}")
+    return analyzer._generate_insights(prompt, data_summary, "expenses")
+
+
+async def _gateway(analyzer: PersonalizedGeminiAnalyzer, user: int):
+    return await analyzer.generate_personalized_insights(_report(user), "expenses", f"user {user}")
+
+
+async def _measure(users: int, repeats: int, delay: float, through_gateway: bool) -> Tuple[float, int]:
+    model = LocalInsightModel(delay_seconds=delay)
+    analyzer = PersonalizedGeminiAnalyzer(model=model, gateway=InsightGateway(max_entries=1000, ttl_seconds=600))
+    request = _gateway if through_gateway else _blocking
+
+    start = time.perf_counter()
+    # Two waves: concurrent duplicate requests, then the same reports asked for again
+    for _ in range(2):
+        await asyncio.gather(*(request(analyzer, user) for user in range(users) for _ in range(repeats)))
+    return (time.perf_counter() - start) * 1000, model.calls
+
+
+async def _main(user_counts: List[int], repeats: int, delay: float) -> None:
+    print(f"{'users':>6} {'requests':>9} {'blocking ms':>12} {'calls':>6} {'gateway ms':>11} {'calls':>6} {'speedup':>8}")
+    for users in user_counts:
+        blocking, blocking_calls = await _measure(users, repeats, delay, through_gateway=False)
+        gateway, gateway_calls = await _measure(users, repeats, delay, through_gateway=True)
+        print(f"{users:>6} {users * repeats * 2:>9} {blocking:>12.1f} {blocking_calls:>6} {gateway:>11.1f} {gateway_calls:>6} {blocking / gateway:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 20], help="Users requesting a report at the same time")
+    parser.add_argument("--repeats", type=int, default=3, help="Identical requests per user in each wave")
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds the fake model takes to answer")
+    args = parser.parse_args()
+    asyncio.run(_main(args.users, args.repeats, args.delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Work done by the date range record queries on a shared database, before and after the predicate fix.
+
+The previous queries joined their conditions with Python ``and``, which SQLAlchemy
+collapses to the first comparison, so a six-month report read the user's whole history.
+Each query is run for a sample of users against a database with the (user_id, date)
+indexes and one without, and reports the rows returned, the SQLite virtual machine steps
+needed to answer it (a proxy for rows visited) and the ORM latency.
+
+Usage (from the poc directory):
+    python -m benchmarks.date_range_queries --users 2000 --records 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import select
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import UnverifiedExpenses
+from api.db.query_manager import AsyncQueries
+from benchmarks.db_indexes import _create_tables_without_indexes, _seed
+
+
+def _legacy_statement(user_id: int, start_date: datetime, end_date: datetime):
+    return select(UnverifiedExpenses).where(
+        UnverifiedExpenses.user_id == user_id and
+        UnverifiedExpenses.expense_date >= start_date and UnverifiedExpenses.expense_date <= end_date
+    )
+
+
+def _fixed_statement(user_id: int, start_date: datetime, end_date: datetime):
+    return select(UnverifiedExpenses).where(
+        UnverifiedExpenses.user_id == user_id,
+        UnverifiedExpenses.expense_date >= start_date,
+        UnverifiedExpenses.expense_date <= end_date
+    )
+
+
+def _vm_steps(db_path: str, db_manager: DatabaseManager, statement) -> int:
+    """Count the SQLite VM instructions executed to fully read the statement's rows."""
+    compiled = statement.compile(db_manager.engine.sync_engine)
+    processors = compiled._bind_processors
+    params = [processors[name](compiled.params[name]) if name in processors else compiled.params[name] for name in compiled.positiontup]
+    steps = 0
+
+    def _count() -> int:
+        nonlocal steps
+        steps += 1
+        return 0
+
+    connection = sqlite3.connect(db_path)
+    connection.set_progress_handler(_count, 1)
+    connection.execute(str(compiled), params).fetchall()
+    connection.close()
+    return steps
+
+
+async def _measure(db_path: str, users: int, records: int, indexed: bool, sample: List[int]) -> Dict[str, Dict[str, float]]:
+    db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{db_path}")
+    if indexed:
+        await db_manager.create_tables()
+    else:
+        async with db_manager.engine.begin() as conn:
+            await conn.run_sync(_create_tables_without_indexes)
+    await _seed(db_manager, users, records)
+
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=180)
+    results = {}
+    for name, build in (("legacy", _legacy_statement), ("fixed", _fixed_statement)):
+        rows, steps, timings = [], [], []
+        for user_index in sample:
+            user_id = user_index + 1
+            statement = build(user_id, start_date, end_date)
+            start = time.perf_counter()
+            async with db_manager.session_scope() as session:
+                if name == "fixed":
+                    fetched = await AsyncQueries(session=session).get_user_expenses_by_date_range(user_id, start_date, end_date)
+                else:
+                    fetched = (await session.execute(statement)).scalars().all()
+            timings.append((time.perf_counter() - start) * 1000)
+            rows.append(len(fetched))
+            steps.append(_vm_steps(db_path, db_manager, statement))
+        results[name] = {"rows": statistics.median(rows), "steps": statistics.median(steps), "ms": statistics.median(timings)}
+    await db_manager.dispose()
+    return results
+
+
+async def _main(user_counts: List[int], records: int, sample_size: int) -> None:
+    print(f"{'users':>7} {'indexes':>8} {'predicate':>10} {'rows':>6} {'VM steps':>10} {'ms':>7}")
+    for users in user_counts:
+        sample = random.Random(0).sample(range(users), min(sample_size, users))
+        for indexed in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                results = await _measure(os.path.join(tmp, "ranges.db"), users, records, indexed, sample)
+            for name, result in results.items():
+                print(f"{users:>7} {'yes' if indexed else 'no':>8} {name:>10} {result['rows']:>6.0f} {result['steps']:>10.0f} {result['ms']:>7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[2_000], help="Users sharing the database")
+    parser.add_argument("--records", type=int, default=100, help="Expenses per user over two years")
+    parser.add_argument("--sample", type=int, default=20, help="Users timed per database")
+    args = parser.parse_args()
+    asyncio.run(_main(args.users, args.records, args.sample))
+
+
+if __name__ == "__main__":
+    main()
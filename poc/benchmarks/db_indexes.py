@@ -0,0 +1,112 @@
+"""
+Per-user query latency on a shared database, with and without the user_id/date indexes.
+
+Seeds many users with two years of expenses, incomes and feelings each, then times the
+webhook's conversation context lookup and the comprehensive financial report for a
+sample of users. The same data is loaded into a database created without any secondary
+indexes (as databases were before the indexes were declared) and one created with them.
+
+Usage (from the poc directory):
+    python -m benchmarks.db_indexes --users 500 2000 --records 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from sqlalchemy.schema import CreateTable
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import Base, LanguagePreference, MessageState, User
+from api.db.query_manager import AsyncQueries
+from api.db.synthetic_population import EXPENSE_TYPES, FEELINGS, INCOME_TYPES
+from api.finance.aggregator import FinancialAggregator
+
+
+def _create_tables_without_indexes(connection) -> None:
+    for table in Base.metadata.sorted_tables:
+        connection.execute(CreateTable(table))
+
+
+async def _seed(db_manager: DatabaseManager, users: int, records: int) -> None:
+    rng = random.Random(users)
+    now = datetime.now()
+    minutes = 730 * 1440
+    async with db_manager.session_scope() as session:
+        query_manager = AsyncQueries(session=session)
+        for i in range(users):
+            user = await query_manager.add(User(phone_number=f"whatsapp:+2764{i:07d}"))
+            session.add(MessageState(user_id=user.id, current_state="registered_user_template", has_started=True))
+            session.add(LanguagePreference(user_id=user.id, preferred_language="English"))
+            batch = [("expense", {
+                "user_id": user.id, "expense_type": rng.choice(EXPENSE_TYPES), "expense_amount": round(rng.uniform(5, 800), 2),
+                "expense_feeling": rng.choice(FEELINGS), "expense_date": now - timedelta(minutes=rng.randrange(1, minutes)),
+            }) for _ in range(records)]
+            batch += [("income", {
+                "user_id": user.id, "income_type": rng.choice(INCOME_TYPES), "income_amount": round(rng.uniform(100, 4000), 2),
+                "income_feeling": rng.choice(FEELINGS), "income_date": now - timedelta(minutes=rng.randrange(1, minutes)),
+            }) for _ in range(records // 4)]
+            batch += [("feeling", {"user_id": user.id, "feeling": rng.choice(FEELINGS), "feeling_date": now - timedelta(minutes=rng.randrange(1, minutes))}) for _ in range(records // 10)]
+            await query_manager.bulk_insert_financial_records(batch, commit=False)
+
+
+async def _context(db_manager: DatabaseManager, user_index: int) -> None:
+    async with db_manager.session_scope() as session:
+        await AsyncQueries(session=session).load_conversation_context(f"whatsapp:+2764{user_index:07d}")
+
+
+async def _time(run: Callable[[int], Awaitable], sample: List[int]) -> float:
+    timings: List[float] = []
+    for user_index in sample:
+        start = time.perf_counter()
+        await run(user_index)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def _measure(db_url: str, users: int, records: int, indexed: bool, sample: List[int]):
+    db_manager = DatabaseManager(db_url=db_url)
+    if indexed:
+        await db_manager.create_tables()
+    else:
+        async with db_manager.engine.begin() as conn:
+            await conn.run_sync(_create_tables_without_indexes)
+    await _seed(db_manager, users, records)
+
+    context = await _time(lambda i: _context(db_manager, i), sample)
+    # User ids follow insertion order, starting at 1
+    report = await _time(lambda i: FinancialAggregator(i + 1, db_manager=db_manager).get_comprehensive_financial_report(6), sample)
+    await db_manager.dispose()
+    return context, report
+
+
+async def _main(user_counts: List[int], records: int, sample_size: int) -> None:
+    print(f"{'users':>7} {'rows':>9} {'context ms':>11} {'indexed':>8} {'report ms':>10} {'indexed':>8} {'speedup':>8}")
+    for users in user_counts:
+        sample = random.Random(0).sample(range(users), min(sample_size, users))
+        results = []
+        for indexed in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                db_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'indexes.db')}"
+                results.append(await _measure(db_url, users, records, indexed, sample))
+        (context, report), (indexed_context, indexed_report) = results
+        rows = users * (records + records // 4 + records // 10)
+        print(f"{users:>7} {rows:>9} {context:>11.2f} {indexed_context:>8.2f} {report:>10.1f} {indexed_report:>8.1f} {report / indexed_report:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[500, 2_000], help="Users sharing the database")
+    parser.add_argument("--records", type=int, default=100, help="Expenses per user; incomes and feelings scale with it")
+    parser.add_argument("--sample", type=int, default=20, help="Users timed per database")
+    args = parser.parse_args()
+    asyncio.run(_main(args.users, args.records, args.sample))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Event-loop stall and throughput of report PDF rendering.
+
+Renders a burst of report PDFs concurrently, either inline on the event loop (the previous
+behaviour of PersonalizedReportDispatcher) or through PDFRenderPool with 1/4/8 worker
+processes. A heartbeat task that wakes every millisecond measures how long the event loop
+was unable to run anything else.
+
+Usage (from the poc directory):
+    python -m benchmarks.pdf_rendering --reports 32 --workers 1 4 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+from api.finance.aggregator import FinancialAggregator
+from api.finance.category_reports import CategoryReportGenerator
+from api.finance.pdf_generator import FinancialReportPDF
+from api.finance.pdf_pool import PDFRenderPool
+from api.utils.template_actions import create_poc_dummy_data_south_africa
+
+HEARTBEAT_SECONDS = 0.001
+
+
+async def _build_reports() -> List[tuple]:
+    """Generate one report of each type from seeded POC data."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'pdf.db')}")
+        await db_manager.create_tables()
+        rng = random.Random(0)
+        async with db_manager.session_scope() as session:
+            query_manager = AsyncQueries(session=session)
+            user = await query_manager.add(User(phone_number="whatsapp:+27620000000"))
+            await query_manager.bulk_insert_financial_records(await create_poc_dummy_data_south_africa(user, rng), commit=False)
+
+        category_generator = CategoryReportGenerator(user.id, db_manager=db_manager)
+        reports = [
+            ("expenses", await category_generator.generate_expenses_report(6)),
+            ("incomes", await category_generator.generate_incomes_report(6)),
+            ("feelings", await category_generator.generate_feelings_report(6)),
+            ("comprehensive", await FinancialAggregator(user.id, db_manager=db_manager).get_comprehensive_financial_report(6)),
+        ]
+        await db_manager.dispose()
+    return reports
+
+
+async def _measure(render: Callable[[Dict, str], Awaitable[bytes]], reports: List[tuple], count: int) -> Dict[str, float]:
+    stalls: List[float] = []
+    running = True
+
+    async def heartbeat():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            stalls.append(max(0.0, time.perf_counter() - start - HEARTBEAT_SECONDS))
+
+    monitor = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(render(*reports[i % len(reports)]) for i in range(count)))
+    elapsed = time.perf_counter() - start
+
+    running = False
+    await monitor
+    return {
+        "throughput": count / elapsed,
+        "stall_total_ms": sum(stalls) * 1000,
+        "stall_max_ms": max(stalls) * 1000,
+    }
+
+
+async def main(count: int, worker_counts: List[int]) -> None:
+    logging.getLogger("pdf-pool").setLevel(logging.WARNING)
+    reports = await _build_reports()
+    print(f"{'strategy':<16}{'reports/s':>12}{'stall total ms':>16}{'stall max ms':>14}")
+
+    pdf_generator = FinancialReportPDF()
+
+    async def render_inline(report_type: str, report_data: Dict) -> bytes:
+        return pdf_generator.generate_category_report_pdf(report_data, report_type, "whatsapp:+27620000000")
+
+    result = await _measure(render_inline, reports, count)
+    print(f"{'inline':<16}{result['throughput']:>12.1f}{result['stall_total_ms']:>16.1f}{result['stall_max_ms']:>14.1f}")
+
+    for workers in worker_counts:
+        pool = PDFRenderPool(max_workers=workers)
+        try:
+            # Start the worker processes outside the measured window
+            await asyncio.gather(*(pool.render(reports[0][1], reports[0][0], "whatsapp:+27620000000") for _ in range(workers)))
+
+            async def render_pooled(report_type: str, report_data: Dict) -> bytes:
+                return await pool.render(report_data, report_type, "whatsapp:+27620000000")
+
+            result = await _measure(render_pooled, reports, count)
+        finally:
+            pool.shutdown()
+        print(f"{f'pool x{workers}':<16}{result['throughput']:>12.1f}{result['stall_total_ms']:>16.1f}{result['stall_max_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    asyncio.run(main(args.reports, args.workers))
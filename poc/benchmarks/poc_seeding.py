@@ -0,0 +1,76 @@
+"""
+Time spent seeding POC dummy data inside the first webhook response.
+
+Compares the previous per-row seeding (``query_manager.add`` = session.add + flush for every
+record) with ``AsyncQueries.bulk_insert_financial_records`` (one executemany INSERT per table),
+for a sequence of new POC users. Both run in the request's transaction, as the webhook does.
+
+Usage (from the poc directory):
+    python -m benchmarks.poc_seeding --users 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User, UnverifiedExpenses, UnverifiedIncomes, FinancialFeelings
+from api.db.query_manager import AsyncQueries
+from api.utils.template_actions import create_poc_dummy_data_south_africa
+
+RECORD_TABLES = {"expense": UnverifiedExpenses, "income": UnverifiedIncomes, "feeling": FinancialFeelings}
+
+
+async def _per_row(query_manager: AsyncQueries, dummy_data_list) -> None:
+    for data_type, data_dict in dummy_data_list:
+        await query_manager.add(RECORD_TABLES[data_type](**data_dict))
+
+
+async def _bulk(query_manager: AsyncQueries, dummy_data_list) -> None:
+    await query_manager.bulk_insert_financial_records(dummy_data_list, commit=False)
+
+
+async def _run(seed: Callable, users: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'seeding.db')}")
+        await db_manager.create_tables()
+
+        timings: List[float] = []
+        records = 0
+        rng = random.Random(0)
+        for i in range(users):
+            start = time.perf_counter()
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                user = await query_manager.add(User(phone_number=f"whatsapp:+2761000{i:04d}"))
+                dummy_data_list = await create_poc_dummy_data_south_africa(user, rng)
+                await seed(query_manager, dummy_data_list)
+            timings.append((time.perf_counter() - start) * 1000)
+            records += len(dummy_data_list)
+
+        await db_manager.dispose()
+
+    timings.sort()
+    return {
+        "records": records / users,
+        "mean": statistics.mean(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+async def main(users: int) -> None:
+    print(f"{'strategy':<12}{'records/user':>14}{'mean ms':>12}{'p95 ms':>12}")
+    for name, seed in (("per-row", _per_row), ("bulk", _bulk)):
+        result = await _run(seed, users)
+        print(f"{name:<12}{result['records']:>14.0f}{result['mean']:>12.1f}{result['p95']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.users))
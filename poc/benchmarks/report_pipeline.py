@@ -0,0 +1,73 @@
+"""
+Per-stage timings of the report pipeline, and what running the stages one after another would cost.
+
+Generates each report type with AI insights, a PDF and an upload to local storage. The AI
+model is the offline LocalInsightModel with a fixed delay standing in for Gemini's latency;
+PDFs render in a thread. "sequential" is the sum of the stage timings, the time the
+dispatcher took when the AI call and the PDF render ran one after the other.
+
+Usage (from the poc directory):
+    python -m benchmarks.report_pipeline --expenses 1000 --ai-delay 1.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+from typing import Dict, List
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User
+from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
+from api.finance.llm_gateway import InsightGateway, LocalInsightModel
+from api.finance.pdf_pool import PDFRenderPool
+from api.finance.report import REPORT_TYPES, PersonalizedReportDispatcher
+from api.finance.report_stages import ReportStageProfile
+from api.services.local_storage import LocalReportStorage
+from benchmarks.report_queries import _seed
+
+STAGES = ("fetch", "aggregate", "ai_insights", "pdf", "upload")
+
+
+async def _main(expenses: int, ai_delay: float, repeat: int) -> None:
+    print(f"{'report':>14} " + " ".join(f"{stage + ' ms':>15}" for stage in STAGES) + f" {'sequential ms':>14} {'pipeline ms':>12} {'saved':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'pipeline.db')}")
+        await db_manager.create_tables()
+        user_id = await _seed(db_manager, expenses)
+        storage = LocalReportStorage(directory=os.path.join(tmp, "reports"))
+        pool = PDFRenderPool(max_workers=0)
+
+        for report_type in REPORT_TYPES:
+            runs: List[Dict[str, float]] = []
+            for _ in range(repeat):
+                # Fresh caches so every run asks the model and renders the PDF
+                analyzer = PersonalizedGeminiAnalyzer(model=LocalInsightModel(delay_seconds=ai_delay), gateway=InsightGateway(max_entries=0))
+                dispatcher = PersonalizedReportDispatcher(
+                    User(id=user_id, phone_number="whatsapp:+27600000000"), db_manager=db_manager,
+                    pdf_pool=pool, pdf_cache=None, ai_analyzer=analyzer, stage_profile=ReportStageProfile()
+                )
+                result = await dispatcher.generate_personalized_report(report_type, report_storage=storage)
+                runs.append(result["stage_timings_ms"])
+
+            medians = {stage: statistics.median(run.get(stage, 0.0) for run in runs) for stage in (*STAGES, "total")}
+            sequential = sum(medians[stage] for stage in STAGES)
+            print(
+                f"{report_type:>14} " + " ".join(f"{medians[stage]:>15.1f}" for stage in STAGES)
+                + f" {sequential:>14.1f} {medians['total']:>12.1f} {1 - medians['total'] / sequential:>6.0%}"
+            )
+
+        await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--expenses", type=int, default=1_000, help="Expense rows of the benchmark user")
+    parser.add_argument("--ai-delay", type=float, default=1.0, help="Seconds the fake model takes to answer")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(_main(args.expenses, args.ai_delay, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Report latency as a user's transaction history grows.
+
+Times the comprehensive and expenses reports, which read the GROUP BY aggregates of the
+period instead of loading every expense and income as ORM rows. All records fall inside the
+report period, on a file-backed SQLite database.
+
+Usage (from the poc directory):
+    python -m benchmarks.report_queries --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+from api.db.synthetic_population import EXPENSE_TYPES, FEELINGS, INCOME_TYPES
+from api.finance.aggregator import FinancialAggregator
+from api.finance.category_reports import CategoryReportGenerator
+
+
+async def _seed(db_manager: DatabaseManager, size: int) -> int:
+    rng = random.Random(size)
+    now = datetime.now()
+    minutes = 170 * 1440
+    async with db_manager.session_scope() as session:
+        query_manager = AsyncQueries(session=session)
+        user = await query_manager.add(User(phone_number=f"whatsapp:+2763{size:08d}"))
+        records = [("expense", {
+            "user_id": user.id, "expense_type": rng.choice(EXPENSE_TYPES), "expense_amount": round(rng.uniform(5, 800), 2),
+            "expense_feeling": rng.choice(FEELINGS), "expense_date": now - timedelta(minutes=rng.randrange(1, minutes)),
+        }) for _ in range(size)]
+        records += [("income", {
+            "user_id": user.id, "income_type": rng.choice(INCOME_TYPES), "income_amount": round(rng.uniform(100, 4000), 2),
+            "income_feeling": rng.choice(FEELINGS), "income_date": now - timedelta(minutes=rng.randrange(1, minutes)),
+        }) for _ in range(size // 4)]
+        records += [("feeling", {"user_id": user.id, "feeling": rng.choice(FEELINGS), "feeling_date": now - timedelta(minutes=rng.randrange(1, minutes))}) for _ in range(size // 10)]
+        await query_manager.bulk_insert_financial_records(records, commit=False)
+    return user.id
+
+
+async def _time(run: Callable[[], Awaitable], repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def _main(sizes: List[int], repeat: int) -> None:
+    print(f"{'expenses':>10} {'comprehensive ms':>17} {'expenses report ms':>19}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'reports.db')}")
+            await db_manager.create_tables()
+            user_id = await _seed(db_manager, size)
+
+            grouped = await _time(lambda: FinancialAggregator(user_id, db_manager=db_manager).get_comprehensive_financial_report(6), repeat)
+            expenses_report = await _time(lambda: CategoryReportGenerator(user_id, db_manager=db_manager).generate_expenses_report(6), repeat)
+            print(f"{size:>10} {grouped:>17.1f} {expenses_report:>19.1f}")
+
+            await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Expense rows of the benchmark user")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(_main(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
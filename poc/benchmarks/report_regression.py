@@ -0,0 +1,97 @@
+"""
+Check the report pipeline benchmarks against the stored baseline, or save a new baseline.
+
+Runs tests/test_report_benchmarks.py with pytest-benchmark and compares each benchmark's
+fastest round with the baseline's. A benchmark more than --threshold slower is run again,
+up to --retries times, keeping its best time: a real regression is slow every time, while a
+burst of load from other processes on the machine passes on a retry. Exits with status 1
+when any benchmark is still slower than the threshold, so it can gate CI.
+
+Timings only compare on the machine the baseline was saved on. Save it again after an
+intended change, from a committed tree, with --save.
+
+Usage (from the poc directory):
+    python -m benchmarks.report_regression
+    python -m benchmarks.report_regression --save
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+POC_DIRECTORY = Path(__file__).resolve().parents[1]
+BENCHMARK_TESTS = "tests/test_report_benchmarks.py"
+BASELINE_PATH = POC_DIRECTORY / "benchmarks" / "baselines" / "report_benchmarks.json"
+
+# Slowdown of a benchmark's fastest round, against the baseline, that fails the check
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_RETRIES = 3
+# Seconds spent on each benchmark; longer than in the test suite so the fastest round is stable
+MAX_TIME = 1.0
+
+
+def _run(node_ids: List[str], json_path: str) -> Dict[str, Dict]:
+    """Run the benchmarks and return their results by test id."""
+    env = dict(os.environ, PYTHONPATH="api", REPORT_BENCHMARK_MAX_TIME=os.getenv("REPORT_BENCHMARK_MAX_TIME", str(MAX_TIME)))
+    command = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "--benchmark-only", f"--benchmark-json={json_path}", *node_ids]
+    completed = subprocess.run(command, cwd=POC_DIRECTORY, env=env, stdout=subprocess.DEVNULL)
+    if completed.returncode != 0:
+        raise SystemExit(f"Benchmark tests failed (pytest exit status {completed.returncode})")
+    with open(json_path) as f:
+        return {benchmark["fullname"]: benchmark for benchmark in json.load(f)["benchmarks"]}
+
+
+def _slowdowns(best: Dict[str, float], baseline: Dict[str, float], threshold: float) -> Dict[str, float]:
+    return {name: best[name] / baseline[name] - 1 for name in best if name in baseline and best[name] > baseline[name] * (1 + threshold)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", action="store_true", help="Save this run as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--retries", type=int, default=REGRESSION_RETRIES, help="Reruns of benchmarks slower than the threshold")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = os.path.join(tmp, "results.json")
+        results = _run([BENCHMARK_TESTS], results_path)
+
+        if args.save:
+            BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            BASELINE_PATH.write_text(Path(results_path).read_text())
+            print(f"Saved {len(results)} benchmarks to {BASELINE_PATH.relative_to(POC_DIRECTORY)}")
+            return
+
+        with open(BASELINE_PATH) as f:
+            stored = json.load(f)
+        baseline = {benchmark["fullname"]: benchmark["stats"]["min"] for benchmark in stored["benchmarks"]}
+        commit = stored["commit_info"]
+        print(f"Baseline: commit {commit['id'][:12]}{' (dirty)' if commit['dirty'] else ''}, {stored['machine_info']['cpu'].get('brand_raw', 'unknown CPU')}", flush=True)
+
+        best = {name: benchmark["stats"]["min"] for name, benchmark in results.items()}
+        slower = _slowdowns(best, baseline, args.threshold)
+        for retry in range(args.retries):
+            if not slower:
+                break
+            print(f"Retry {retry + 1}: {len(slower)} benchmarks over {args.threshold:.0%} slower", flush=True)
+            for name, benchmark in _run(sorted(slower), results_path).items():
+                best[name] = min(best[name], benchmark["stats"]["min"])
+            slower = _slowdowns(best, baseline, args.threshold)
+
+    missing = sorted(set(baseline) - set(best))
+    if missing:
+        print(f"Not in this run: {', '.join(missing)}")
+    if slower:
+        print(f"{'benchmark':<60} {'baseline ms':>12} {'now ms':>10} {'slower':>8}")
+        for name, slowdown in sorted(slower.items(), key=lambda item: -item[1]):
+            print(f"{name.split('::')[-1]:<60} {baseline[name] * 1000:>12.3f} {best[name] * 1000:>10.3f} {slowdown:>8.0%}")
+        raise SystemExit(1)
+    print(f"{len(best)} benchmarks within {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Time to load a user's report data with and without the monthly rollups.
+
+Seeds one user's records over the last 170 days, then loads the UserFinancialSnapshot every
+report reads: first with no rollups (every month aggregated from the records), then after
+rebuilding the rollups (only the partial first month and the current month aggregated from
+the records).
+
+Usage (from the poc directory):
+    python -m benchmarks.report_rollups --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from api.db.db_manager import DatabaseManager
+from api.db.query_manager import AsyncQueries
+from api.finance.snapshot import UserFinancialSnapshot
+from benchmarks.report_queries import _seed
+
+
+async def _time_snapshot(db_manager: DatabaseManager, user_id: int, repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await UserFinancialSnapshot.load(db_manager, user_id, 6)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def _main(sizes: List[int], repeat: int) -> None:
+    print(f"{'expenses':>10} {'records ms':>11} {'rollups ms':>11} {'speedup':>8} {'rebuild ms':>11}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'rollups.db')}")
+            await db_manager.create_tables()
+            user_id = await _seed(db_manager, size)
+
+            records = await _time_snapshot(db_manager, user_id, repeat)
+            start = time.perf_counter()
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).rebuild_monthly_rollups(user_id)
+            rebuild = (time.perf_counter() - start) * 1000
+            rollups = await _time_snapshot(db_manager, user_id, repeat)
+            print(f"{size:>10} {records:>11.1f} {rollups:>11.1f} {records / rollups:>7.1f}x {rebuild:>11.1f}")
+
+            await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Expense rows of the benchmark user")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(_main(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Time and queries to produce all four reports for one user, with and without the shared snapshot.
+
+Generates the comprehensive, expenses, incomes and feelings reports back to back, as a user
+picking several reports from the menu does. Without the snapshot cache every report loads
+its own data; with it the first report loads the user's snapshot and the rest reuse it.
+The last columns repeat the four reports while the snapshot is still cached.
+
+Usage (from the poc directory):
+    python -m benchmarks.report_snapshot --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+from sqlalchemy import event
+
+from api.db.db_manager import DatabaseManager
+from api.finance.aggregator import FinancialAggregator
+from api.finance.category_reports import CategoryReportGenerator
+from api.finance.snapshot import FinancialSnapshotCache
+from benchmarks.report_queries import _seed
+
+
+async def _all_reports(db_manager: DatabaseManager, user_id: int, cache: FinancialSnapshotCache) -> None:
+    category_generator = CategoryReportGenerator(user_id, db_manager=db_manager, snapshot_cache=cache)
+    await FinancialAggregator(user_id, db_manager=db_manager, snapshot_cache=cache).get_comprehensive_financial_report(6)
+    await category_generator.generate_expenses_report(6)
+    await category_generator.generate_incomes_report(6)
+    await category_generator.generate_feelings_report(6)
+
+
+async def _measure(db_manager: DatabaseManager, user_id: int, cache_entries: int, warm: bool, repeat: int) -> Tuple[float, int]:
+    statements: List[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    for _ in range(repeat):
+        # A disabled cache (no entries) loads a fresh snapshot for every report
+        cache = FinancialSnapshotCache(max_entries=cache_entries)
+        if warm:
+            await _all_reports(db_manager, user_id, cache)
+        statements.clear()
+        event.listen(db_manager.engine.sync_engine, "before_cursor_execute", _record)
+        start = time.perf_counter()
+        await _all_reports(db_manager, user_id, cache)
+        timings.append((time.perf_counter() - start) * 1000)
+        event.remove(db_manager.engine.sync_engine, "before_cursor_execute", _record)
+    return statistics.median(timings), len([s for s in statements if s.lstrip().upper().startswith("SELECT")])
+
+
+async def _main(sizes: List[int], repeat: int) -> None:
+    print(f"{'expenses':>10} {'no cache ms':>12} {'queries':>8} {'snapshot ms':>12} {'queries':>8} {'cached ms':>10} {'queries':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'snapshot.db')}")
+            await db_manager.create_tables()
+            user_id = await _seed(db_manager, size)
+
+            separate, separate_queries = await _measure(db_manager, user_id, 0, warm=False, repeat=repeat)
+            shared, shared_queries = await _measure(db_manager, user_id, 100, warm=False, repeat=repeat)
+            cached, cached_queries = await _measure(db_manager, user_id, 100, warm=True, repeat=repeat)
+            print(f"{size:>10} {separate:>12.1f} {separate_queries:>8} {shared:>12.1f} {shared_queries:>8} {cached:>10.1f} {cached_queries:>8}")
+
+            await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Expense rows of the benchmark user")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(_main(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
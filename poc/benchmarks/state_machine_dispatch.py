@@ -0,0 +1,95 @@
+"""
+Microbenchmark of resolving an inbound message to its transition.
+
+Compares the previous dispatch (rebuild the template -> validator dict, run the validator,
+then probe the template's actions, response_routing and continuous_template in turn) with
+a lookup in the compiled ConversationStateMachine.
+
+Usage (from the poc directory):
+    python -m benchmarks.state_machine_dispatch --iterations 100000
+"""
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+from api.models.inbound_responses import FinancialFeelingRecordingValidator, IncomeExpenseRecordingValidator, LanguageSelector, NumberedMenuValidator
+from api.utils.template_registry import TemplateRegistry
+
+# (description, current_template, user_response)
+SCENARIOS: List[Tuple[str, str, str]] = [
+    ("language selected", "unregistered_number_language_selector_template", "Zulu"),
+    ("menu routing", "registered_user_template", "1"),
+    ("menu action", "sisonova_personal_template", "4"),
+    ("invalid option", "sisonova_personal_template", "9"),
+    ("free text", "sisonova_personal_record_expense_template", "Taxi - 25 - Okay"),
+]
+
+
+def _legacy_validators(template_name: str) -> dict:
+    # The dict literal the old get_template_validation() rebuilt on every call
+    templates = {
+        "unregistered_number_language_selector_template": {"inbound_validator": LanguageSelector},
+        "unregistered_number_welcome_template": {"inbound_validator": NumberedMenuValidator},
+        "registration_no_template": {"inbound_validator": NumberedMenuValidator},
+        "registered_user_template": {"inbound_validator": NumberedMenuValidator},
+        "sisonova_personal_template": {"inbound_validator": NumberedMenuValidator},
+        "sisonova_public_template": {"inbound_validator": NumberedMenuValidator},
+        "sisonova_personal_expense_template": {"inbound_validator": NumberedMenuValidator},
+        "sisonova_personal_income_template": {"inbound_validator": NumberedMenuValidator},
+        "sisonova_personal_record_expense_template": {"inbound_validator": IncomeExpenseRecordingValidator},
+        "sisonova_personal_record_income_template": {"inbound_validator": IncomeExpenseRecordingValidator},
+        "sisonova_personal_financial_feeling_template": {"inbound_validator": NumberedMenuValidator},
+        "sisonova_personal_record_feeling_template": {"inbound_validator": FinancialFeelingRecordingValidator},
+        "language_selector_template": {"inbound_validator": NumberedMenuValidator},
+        "not_yet_implemented_template": {"inbound_validator": NumberedMenuValidator},
+    }
+    return templates[template_name]
+
+
+def _legacy_dispatch(registry: TemplateRegistry, current_template: str, user_response: str) -> Optional[str]:
+    template = registry.get("en", current_template)
+    validator = _legacy_validators(current_template)["inbound_validator"]
+    if not validator.validate_input(user_response):
+        return None
+    if current_template == "unregistered_number_language_selector_template":
+        return template.next_template
+    option = user_response.strip()
+    if option in template.actions:
+        return template.actions[option]
+    if option in template.response_routing:
+        return template.response_routing[option]
+    if template.continuous_template:
+        return template.input_handler
+    return None
+
+
+def _compiled_dispatch(registry: TemplateRegistry, current_template: str, user_response: str) -> Optional[str]:
+    state, _, transition = registry.state_machine("en").resolve(current_template, user_response)
+    if transition is not None:
+        return transition.target
+    if state.continuous and state.validate(user_response):
+        return state.input_handler
+    return None
+
+
+def main(iterations: int) -> None:
+    registry = TemplateRegistry()
+
+    print(f"{'scenario':<20}{'legacy us':>12}{'compiled us':>14}{'speedup':>10}")
+    for description, current_template, user_response in SCENARIOS:
+        assert _legacy_dispatch(registry, current_template, user_response) == _compiled_dispatch(registry, current_template, user_response)
+
+        results = []
+        for dispatch in (_legacy_dispatch, _compiled_dispatch):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                dispatch(registry, current_template, user_response)
+            results.append((time.perf_counter() - start) * 1_000_000 / iterations)
+        print(f"{description:<20}{results[0]:>12.2f}{results[1]:>14.2f}{results[0] / results[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+    main(args.iterations)
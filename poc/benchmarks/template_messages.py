@@ -0,0 +1,76 @@
+"""
+Microbenchmark of TwilioTemplateManager.get_template_message.
+
+Compares re-reading the translation YAML for every message (the previous behaviour) with
+the shared, pre-compiled TemplateRegistry. The per-message strategy also pays for compiling,
+so the bare load_language_config() cost is printed as the reference for the old code path.
+
+Usage (from the poc directory):
+    python -m benchmarks.template_messages --iterations 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, List, Optional, Tuple
+from unittest.mock import patch
+
+from api.utils.language_config import load_language_config
+from api.utils.template_registry import DEFAULT_TRANSLATIONS_PATH, TemplateRegistry, get_template_registry
+from api.utils.twilio_templates import TwilioTemplateManager
+
+# (description, current_template, user_response, language)
+SCENARIOS: List[Tuple[str, Optional[str], str, Optional[str]]] = [
+    ("first contact", None, "hi", None),
+    ("language selected", "unregistered_number_language_selector_template", "Zulu", "English"),
+    ("menu routing", "registered_user_template", "1", "English"),
+    ("invalid option", "sisonova_personal_template", "9", "Afrikaans"),
+]
+
+
+async def _time_scenario(current_template: Optional[str], user_response: str, language: Optional[str], iterations: int) -> List[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        template_manager = TwilioTemplateManager(
+            user_exists=current_template is not None,
+            user_response=user_response,
+            query_manager=None,
+            current_template=current_template,
+            language=language,
+            has_started=current_template is not None
+        )
+        await template_manager.get_template_message()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+async def main(iterations: int) -> None:
+    # Load the shared registry up front so its one-off cost is not attributed to a message
+    get_template_registry()
+
+    load_timings = []
+    for _ in range(max(iterations // 10, 5)):
+        start = time.perf_counter()
+        load_language_config(path=str(DEFAULT_TRANSLATIONS_PATH))
+        load_timings.append((time.perf_counter() - start) * 1_000_000)
+    print(f"load_language_config() alone: {statistics.mean(load_timings):.1f} us per call\n")
+
+    strategies: List[Tuple[str, Callable[[], TemplateRegistry]]] = [
+        ("YAML per message", lambda: TemplateRegistry()),
+        ("shared registry", get_template_registry),
+    ]
+
+    print(f"{'scenario':<20}{'strategy':<20}{'mean us':>12}{'p95 us':>12}")
+    for description, current_template, user_response, language in SCENARIOS:
+        for name, registry_factory in strategies:
+            with patch("api.utils.twilio_templates.get_template_registry", registry_factory):
+                timings = sorted(await _time_scenario(current_template, user_response, language, iterations))
+            print(f"{description:<20}{name:<20}{statistics.mean(timings):>12.1f}{timings[int(len(timings) * 0.95) - 1]:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,113 @@
+"""
+Per-message database latency for the WhatsApp webhook: one engine per message vs a shared engine.
+
+Replays the existing-user path of ``/api/twilio/whatsapp`` (user lookup, message state,
+language preference, state update) for a burst of concurrent messages.
+
+Usage (from the poc directory):
+    python -m benchmarks.webhook_db_engine --concurrency 50 200 1000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User, MessageState, LanguagePreference
+from api.db.query_manager import AsyncQueries
+
+
+async def _seed(db_url: str, users: int) -> None:
+    db_manager = DatabaseManager(db_url=db_url)
+    await db_manager.create_tables()
+    async with db_manager.session_scope() as session:
+        for i in range(users):
+            user = User(phone_number=f"whatsapp:+2760000{i:04d}")
+            session.add(user)
+            await session.flush()
+            session.add(MessageState(user_id=user.id, current_state="registered_user_template", has_started=True))
+            session.add(LanguagePreference(user_id=user.id, preferred_language="English"))
+    await db_manager.dispose()
+
+
+async def _handle_message(db_manager: DatabaseManager, phone_number: str) -> None:
+    async with db_manager.session_scope() as session:
+        query_manager = AsyncQueries(session=session)
+        user = await query_manager.get_user_by_phone(phone_number=phone_number)
+        await query_manager.get_user_message_state(user_id=user.id)
+        await query_manager.get_user_language_preference(user_id=user.id)
+        await query_manager.update_current_message_state(user_id=user.id, new_state="sisonova_personal_template")
+
+
+async def _per_message_engine(db_url: str) -> Callable:
+    async def handle(phone_number: str) -> None:
+        # What the webhook did before: a new engine for every inbound message
+        db_manager = DatabaseManager(db_url=db_url)
+        try:
+            await _handle_message(db_manager, phone_number)
+        finally:
+            await db_manager.dispose()
+    return handle
+
+
+async def _run_burst(handle: Callable, concurrency: int, users: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            await handle(f"whatsapp:+2760000{i % users:04d}")
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies) if latencies else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "msgs_per_sec": len(latencies) / wall if wall > 0 else 0.0,
+        "errors": errors,
+    }
+
+
+async def main(concurrency_levels: List[int], users: int) -> None:
+    # Failed messages are counted in the table rather than logged one by one
+    logging.getLogger("db-manager").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+        await _seed(db_url, users)
+
+        shared_manager = DatabaseManager(db_url=db_url)
+        strategies = {
+            "per-message engine": await _per_message_engine(db_url),
+            "shared engine": lambda phone_number: _handle_message(shared_manager, phone_number),
+        }
+
+        print(f"{'strategy':<20}{'concurrent':>11}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'msg/s':>10}{'errors':>8}")
+        for concurrency in concurrency_levels:
+            for name, handle in strategies.items():
+                result = await _run_burst(handle, concurrency, users)
+                print(f"{name:<20}{concurrency:>11}{result['mean_ms']:>10.1f}{result['p50_ms']:>10.1f}"
+                      f"{result['p95_ms']:>10.1f}{result['msgs_per_sec']:>10.1f}{result['errors']:>8}")
+
+        await shared_manager.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.users))
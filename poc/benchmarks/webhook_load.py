@@ -0,0 +1,191 @@
+"""
+Load test of the WhatsApp webhook with signed Twilio form posts.
+
+Replays the conversations of a synthetic population of registered users (menu navigation and
+expense recording) at a fixed rate, open loop: requests are started on schedule whether or not
+earlier ones have finished, up to --max-in-flight. A user's own messages are sent one after
+another, as Twilio does, so every conversation stays valid. Reports latency percentiles,
+status codes and the error rate.
+
+Without --url the app runs in this process (httpx ASGITransport with its lifespan) against a
+temporary SQLite database loaded with the population. With --url it targets a running server,
+whose database must already hold the population:
+    python -m api.db.synthetic_population --users 1000 --seed 0
+Requests are signed with TWILIO_AUTH_TOKEN, which must be the server's.
+
+Usage (from the poc directory):
+    python -m benchmarks.webhook_load --rate 20 --duration 30 --users 200
+    python -m benchmarks.webhook_load --url http://localhost:3000 --rate 50 --duration 60 --users 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from twilio.request_validator import RequestValidator
+
+from api.db.db_manager import DatabaseManager
+from api.db.synthetic_population import load_population, synthetic_phone_number
+
+# The POC webhook, which hands the user to the recording handlers
+WEBHOOK_PATH = "/api/twilio/whatsapp/poc"
+IN_PROCESS_BASE_URL = "http://testserver"
+
+# From the main menu: Personal -> Expenses -> Record, one expense, stop recording, back to the main menu
+CONVERSATION = ("1", "1", "1", None, "1", "5")
+EXPENSE_CATEGORIES = ("Groceries", "Transport", "Airtime", "Electricity", "Rent", "Stokvel")
+RECORDING_FEELINGS = ("Struggling", "Worried", "Coping", "Okay", "Fine", "Good", "Great")
+
+
+class Conversation:
+    """The next messages of one user, sent one at a time."""
+
+    def __init__(self, index: int, seed: int):
+        self.phone_number = synthetic_phone_number(index)
+        self.rng = random.Random(f"{seed}:{index}:webhook")
+        self.step = 0
+        self.lock = asyncio.Lock()
+
+    def next_message(self) -> str:
+        message = CONVERSATION[self.step % len(CONVERSATION)]
+        self.step += 1
+        if message is None:
+            message = f"{self.rng.choice(EXPENSE_CATEGORIES)}-{self.rng.randint(5, 500)}-{self.rng.choice(RECORDING_FEELINGS)}"
+        return message
+
+
+class LoadResults:
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.exceptions: Counter = Counter()
+        self.dropped = 0
+
+    @property
+    def sent(self) -> int:
+        return sum(self.statuses.values()) + sum(self.exceptions.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status >= 400) + sum(self.exceptions.values())
+
+    def report(self, seconds: float) -> str:
+        lines = [f"{self.sent} requests in {seconds:.1f} s ({self.sent / seconds:.1f}/s), {self.dropped} not sent (max in flight)"]
+        if self.latencies_ms:
+            p50, p90, p95, p99 = np.percentile(self.latencies_ms, [50, 90, 95, 99])
+            lines.append(f"{'p50 ms':>10} {'p90 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+            lines.append(f"{p50:>10.1f} {p90:>10.1f} {p95:>10.1f} {p99:>10.1f} {max(self.latencies_ms):>10.1f}")
+        lines.append(f"status codes: {dict(sorted(self.statuses.items()))}")
+        if self.exceptions:
+            lines.append(f"exceptions: {dict(self.exceptions)}")
+        lines.append(f"error rate: {self.errors / self.sent if self.sent else 0.0:.2%}")
+        return "\n".join(lines)
+
+
+def _signed_form(validator: RequestValidator, url: str, phone_number: str, body: str, number: int) -> Dict[str, Dict[str, str]]:
+    params = {
+        "MessageSid": f"SM{number:032x}",
+        "AccountSid": "AC" + "0" * 32,
+        "From": phone_number,
+        "To": "whatsapp:+14155238886",
+        "Body": body,
+        "NumMedia": "0",
+    }
+    return {"data": params, "headers": {"X-Twilio-Signature": validator.compute_signature(url, params)}}
+
+
+async def _drive(client: httpx.AsyncClient, base_url: str, path: str, users: int, seed: int, rate: float, duration: float, max_in_flight: int, auth_token: str) -> LoadResults:
+    validator = RequestValidator(auth_token)
+    url = base_url.rstrip("/") + path
+    conversations = [Conversation(index, seed) for index in range(users)]
+    results = LoadResults()
+    in_flight = 0
+
+    async def _send(number: int) -> None:
+        nonlocal in_flight
+        conversation = conversations[number % users]
+        try:
+            async with conversation.lock:
+                request = _signed_form(validator, url, conversation.phone_number, conversation.next_message(), number)
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, **request)
+                except Exception as e:
+                    results.exceptions[type(e).__name__] += 1
+                    return
+                results.latencies_ms.append((time.perf_counter() - start) * 1000)
+                results.statuses[response.status_code] += 1
+        finally:
+            in_flight -= 1
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks = []
+    for number in range(int(rate * duration)):
+        await asyncio.sleep(max(0.0, start + number / rate - loop.time()))
+        if in_flight >= max_in_flight:
+            results.dropped += 1
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(_send(number)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+async def _main(url: Optional[str], path: str, users: int, seed: int, months: int, rate: float, duration: float, max_in_flight: int) -> None:
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    if url is not None:
+        if not auth_token:
+            raise SystemExit("Set TWILIO_AUTH_TOKEN to the server's token to sign the requests")
+        async with httpx.AsyncClient(timeout=30) as client:
+            start = time.perf_counter()
+            results = await _drive(client, url, path, users, seed, rate, duration, max_in_flight, auth_token)
+        print(results.report(time.perf_counter() - start))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Read by the app's middleware and database manager when they are imported and started below
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tmp, 'load.db')}"
+        auth_token = auth_token or "load-test-token"
+        os.environ["TWILIO_AUTH_TOKEN"] = auth_token
+        os.environ.setdefault("REPORT_QUEUE_ENABLED", "false")
+
+        db_manager = DatabaseManager(db_url=os.environ["DATABASE_URL"])
+        await db_manager.create_tables()
+        counts = await load_population(db_manager, users, months=months, seed=seed)
+        await db_manager.dispose()
+        print(f"Loaded synthetic population: {counts}")
+
+        from api.app import app
+
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=IN_PROCESS_BASE_URL, timeout=30) as client:
+                start = time.perf_counter()
+                results = await _drive(client, IN_PROCESS_BASE_URL, path, users, seed, rate, duration, max_in_flight, auth_token)
+                seconds = time.perf_counter() - start
+        print(results.report(seconds))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Base URL of a running server. Defaults to the app in this process")
+    parser.add_argument("--path", default=WEBHOOK_PATH, help="Webhook path the form posts are sent to")
+    parser.add_argument("--users", type=int, default=100, help="Synthetic users whose conversations are replayed")
+    parser.add_argument("--seed", type=int, default=0, help="Population seed")
+    parser.add_argument("--months", type=int, default=6, help="Months of records per user in the in-process database")
+    parser.add_argument("--rate", type=float, default=20, help="Requests started per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to send requests for")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Requests in flight before new ones are dropped")
+    args = parser.parse_args()
+    asyncio.run(_main(args.url, args.path, args.users, args.seed, args.months, args.rate, args.duration, args.max_in_flight))
+
+
+if __name__ == "__main__":
+    main()
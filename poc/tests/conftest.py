@@ -1,7 +1,12 @@
+import asyncio
 import os
 from unittest.mock import MagicMock, patch
 
 import pytest
+from sqlalchemy import event
+
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User, MessageState, LanguagePreference
 
 
 @pytest.fixture
@@ -91,3 +96,42 @@ def mock_twilio_client(mock_complete_twilio_env):
         mock_client_class.return_value = mock_client_instance
 
         yield mock_client_class
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """
+    Provide a DatabaseManager backed by a fresh SQLite file with all tables created.
+    """
+    manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path / 'queries.db'}")
+    asyncio.run(manager.create_tables())
+    yield manager
+    asyncio.run(manager.dispose())
+
+
+@pytest.fixture
+def statement_log(db_manager):
+    """
+    Record every SQL statement sent to the database.
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_manager.engine.sync_engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(db_manager.engine.sync_engine, "before_cursor_execute", _record)
+
+
+async def create_conversation_user(db_manager: DatabaseManager, phone_number: str, language: str = "English") -> int:
+    """
+    Insert a registered user with a message state and language preference.
+    """
+    async with db_manager.session_scope() as session:
+        user = User(phone_number=phone_number)
+        session.add(user)
+        await session.flush()
+        session.add(MessageState(user_id=user.id, current_state="registered_user_template", has_started=True))
+        session.add(LanguagePreference(user_id=user.id, preferred_language=language))
+        return user.id
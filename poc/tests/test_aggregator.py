@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from api.db.models.tables import FinancialFeelings, UnverifiedExpenses, UnverifiedIncomes
+from api.db.query_manager import AmountGroup, AsyncQueries
+from api.finance.aggregator import FinancialAggregator, FinancialFrames
+from api.finance.record_aggregates import RecordAggregates
+from tests.conftest import create_conversation_user, db_manager
+
+
+def expense(expense_type, amount, date):
+    return SimpleNamespace(expense_type=expense_type, expense_amount=amount, expense_date=date)
+
+
+def income(income_type, amount, date):
+    return SimpleNamespace(income_type=income_type, income_amount=amount, income_date=date)
+
+
+# 2025-03-03 is a Monday
+EXPENSES = [
+    expense("Food & Groceries - Shoprite", 100.0, datetime(2025, 3, 3, 9)),
+    expense("Transport - Taxi fare", 50.0, datetime(2025, 3, 4, 7)),
+    expense("Entertainment - Movies", 80.0, datetime(2025, 3, 3, 20)),
+    expense("Food & Groceries - Street vendor", 20.0, datetime(2025, 4, 5, 12)),
+    expense("Transport - Bus fare", 50.0, datetime(2025, 4, 4, 8)),
+]
+INCOMES = [
+    income("Salary - Domestic work", 1000.0, datetime(2025, 3, 1)),
+    income("Government Grant - Child support", 500.0, datetime(2025, 4, 1)),
+    income("Salary - Overtime", 500.0, datetime(2025, 4, 15)),
+]
+FEELINGS = [("Worried", 2), ("Okay", 1), ("Very Worried", 1)]
+
+
+def aggregates(records, type_column, amount_column, date_column):
+    """Group records by type, weekday and month the way the database aggregation queries do, ids following list order."""
+    keys = {
+        "type": lambda record: getattr(record, type_column),
+        "weekday": lambda record: getattr(record, date_column).strftime("%A"),
+        "month": lambda record: getattr(record, date_column).strftime("%Y-%m"),
+    }
+    groups = {}
+    for column, key in keys.items():
+        rows = {}
+        for record_id, record in enumerate(records, start=1):
+            rows.setdefault(key(record), []).append((record_id, getattr(record, amount_column)))
+        groups[column] = [
+            AmountGroup(key=(value,), total=sum(amount for _, amount in grouped), count=len(grouped),
+                        minimum=min(amount for _, amount in grouped), maximum=max(amount for _, amount in grouped), first_id=grouped[0][0])
+            for value, grouped in rows.items()
+        ]
+    return RecordAggregates(groups=groups)
+
+
+def frames_for(expenses, incomes, feelings):
+    return FinancialFrames.from_aggregates(
+        aggregates(expenses, "expense_type", "expense_amount", "expense_date"),
+        aggregates(incomes, "income_type", "income_amount", "income_date"),
+        feelings,
+    )
+
+
+class TestFinancialFrames:
+    """
+    Testing class that holds the methods related to the columnar intermediate of the financial aggregator.
+    """
+
+    def test_groups_keep_first_appearance_order(self):
+        """
+        This method tests whether the grouped totals are merged into categories and keep the order their first record appeared in.
+        """
+        frames = frames_for(EXPENSES, INCOMES, FEELINGS)
+
+        assert frames.total_expenses == 300.0
+        assert frames.total_income == 2000.0
+        assert frames.expenses_by_category.as_dict() == {"Food & Groceries": 120.0, "Transport": 100.0, "Entertainment": 80.0}
+        assert list(frames.expenses_by_category.counts) == [2, 2, 1]
+        assert frames.expenses_by_weekday.as_dict() == {"Monday": 180.0, "Tuesday": 50.0, "Saturday": 20.0, "Friday": 50.0}
+        assert frames.expenses_by_month.as_dict() == {"2025-03": 230.0, "2025-04": 70.0}
+        assert frames.incomes_by_source.as_dict() == {"Salary": 1500.0, "Government Grant": 500.0}
+        assert frames.feeling_counts == {"Worried": 2, "Okay": 1, "Very Worried": 1}
+        assert frames.expenses_matching("Food", "Transport") == 220.0
+
+    def test_empty_history(self):
+        """
+        This method tests whether a user without records gets empty sections instead of errors.
+        """
+        report = FinancialAggregator(user_id=1, db_manager=object()).build_report(frames_for([], [], []))
+
+        assert report["spending_patterns"] == {}
+        assert report["income_analysis"] == {}
+        assert report["category_breakdown"] == {"by_category": {}, "top_spending_category": "None"}
+        assert report["monthly_trends"]["trend_direction"] == "Insufficient data"
+        assert report["emergency_preparedness"]["emergency_fund_status"] == "Critical"
+
+
+class TestFinancialAggregator:
+    """
+    Testing class that holds the methods related to the comprehensive financial report sections.
+    """
+
+    def test_sections_from_shared_frames(self):
+        """
+        This method tests whether every section is computed correctly from one FinancialFrames.
+        """
+        report = FinancialAggregator(user_id=1, db_manager=object()).build_report(frames_for(EXPENSES, INCOMES, FEELINGS))
+
+        assert report["summary"]["net_position"] == 1700.0
+        assert report["summary"]["savings_rate"] == 85.0
+        assert report["spending_patterns"]["peak_spending_day"] == {"day": "Monday", "amount": 180.0}
+        assert report["spending_patterns"]["essential_spending"] == 220.0
+        assert report["spending_patterns"]["essential_percentage"] == pytest.approx(73.3)
+        assert report["income_analysis"]["primary_income_source"] == "Salary"
+        assert report["income_analysis"]["government_dependency"] == 25.0
+        assert report["financial_health"]["financial_stress_level"] == 75.0
+        assert list(report["category_breakdown"]["by_category"]) == ["Food & Groceries", "Transport", "Entertainment"]
+        assert report["monthly_trends"]["monthly_incomes"] == {"2025-03": 1000.0, "2025-04": 1000.0}
+        assert report["actionable_insights"] == ["✅ Great job! You saved R1700.00 this period."]
+        assert report["emergency_preparedness"]["months_covered"] == 34.0
+
+    def test_report_from_database(self, db_manager):
+        """
+        This method tests whether the report reads the user's rows and builds every section after the session closes.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000040"))
+        now = datetime.now()
+
+        async def _generate():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                for i, record in enumerate(EXPENSES):
+                    await query_manager.add(UnverifiedExpenses(user_id=user_id, expense_type=record.expense_type, expense_amount=record.expense_amount, expense_date=now - timedelta(days=i)))
+                await query_manager.add(UnverifiedIncomes(user_id=user_id, income_type="Salary - Domestic work", income_amount=2000.0, income_date=now))
+                await query_manager.add(FinancialFeelings(user_id=user_id, feeling="Okay", feeling_date=now))
+            return await FinancialAggregator(user_id, db_manager=db_manager).get_comprehensive_financial_report(6)
+
+        report = asyncio.run(_generate())
+
+        assert report["period"].endswith(now.strftime('%B %Y'))
+        assert report["summary"]["total_expenses"] == 300.0
+        assert report["category_breakdown"]["top_spending_category"] == "Food & Groceries"
+        assert report["financial_health"]["feeling_distribution"] == {"Okay": 1}
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.db.query_manager import AsyncQueries
+from api.finance.pdf_pool import PDFRenderPool
+from api.services.batch_reports import BatchReportRunner
+from api.services.local_storage import LocalReportStorage
+from tests.conftest import create_conversation_user, db_manager
+
+
+def seed_records(user_id, with_incomes):
+    now = datetime.now()
+    records = [
+        ("expense", {"user_id": user_id, "expense_type": "Transport - Taxi", "expense_amount": 25.0, "expense_feeling": "Okay", "expense_date": now - timedelta(days=3)}),
+        ("expense", {"user_id": user_id, "expense_type": "Food & Groceries - Shoprite", "expense_amount": 180.0, "expense_feeling": "Worried", "expense_date": now - timedelta(days=12)}),
+        ("feeling", {"user_id": user_id, "feeling": "Worried", "feeling_date": now - timedelta(days=2)}),
+    ]
+    if with_incomes:
+        records.append(("income", {"user_id": user_id, "income_type": "Salary - Domestic work", "income_amount": 2500.0, "income_feeling": "Okay", "income_date": now - timedelta(days=20)}))
+    return records
+
+
+class TestBatchReports:
+    """
+    Testing class that holds the methods related to generating the reports of every user in a batch.
+    """
+
+    def test_every_users_reports_generated_and_stored(self, db_manager, tmp_path):
+        """
+        This method tests whether all users are streamed in chunks, each loaded once, with their PDFs uploaded and stage percentiles reported.
+        """
+        user_ids = [asyncio.run(create_conversation_user(db_manager, f"whatsapp:+2760000009{index}")) for index in range(3)]
+
+        async def _run():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).bulk_insert_financial_records(
+                    seed_records(user_ids[0], with_incomes=True) + seed_records(user_ids[1], with_incomes=False)
+                )
+            runner = BatchReportRunner(
+                db_manager, report_storage=LocalReportStorage(directory=str(tmp_path / "reports")),
+                pdf_pool=PDFRenderPool(max_workers=0), workers=2, chunk_size=2
+            )
+            return await runner.run()
+
+        summary = asyncio.run(_run())
+        percentiles = summary.stage_percentiles()
+
+        assert summary.users == 3
+        # The second user has no incomes report; the third only the comprehensive one, with no records
+        assert (summary.reports, summary.no_data, summary.failed) == (8, 4, 0)
+        assert summary.snapshot_loads == 3
+        assert len(list((tmp_path / "reports").rglob("*.pdf"))) == 8
+        assert list(percentiles) == ["fetch", "aggregate", "pdf", "upload", "total"]
+        assert percentiles["total"]["count"] == 8
+        assert percentiles["pdf"]["p50_ms"] <= percentiles["pdf"]["p95_ms"]
+        assert "users/sec" in summary.format()
+
+    def test_selected_users_and_report_types(self, db_manager):
+        """
+        This method tests whether only the requested users and report types are generated, and unknown types are rejected.
+        """
+        user_ids = [asyncio.run(create_conversation_user(db_manager, f"whatsapp:+2760000010{index}")) for index in range(3)]
+
+        async def _run():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).bulk_insert_financial_records(
+                    [record for user_id in user_ids for record in seed_records(user_id, with_incomes=True)]
+                )
+            runner = BatchReportRunner(db_manager, report_types=("expenses",), generate_pdf=False, workers=4, chunk_size=10)
+            return await runner.run(user_ids=[user_ids[0], user_ids[2]])
+
+        summary = asyncio.run(_run())
+
+        assert (summary.users, summary.reports) == (2, 2)
+        assert list(summary.stage_percentiles()) == ["fetch", "aggregate", "total"]
+
+        with pytest.raises(ValueError):
+            BatchReportRunner(db_manager, report_types=("weekly",))
@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from api.db.models.tables import MonthlyRollup, UnverifiedExpenses
+from api.db.query_manager import AsyncQueries, month_key, month_start
+from api.finance.record_aggregates import RecordAggregates
+from api.utils.categories import income_source_category, is_essential_category, record_category
+from tests.conftest import create_conversation_user, db_manager
+
+
+def expense(user_id, expense_type, amount, expense_date):
+    return UnverifiedExpenses(user_id=user_id, expense_type=expense_type, expense_amount=amount, expense_feeling="Okay", expense_date=expense_date)
+
+
+class TestTransactionCategories:
+    """
+    Testing class that holds the methods related to classifying expense and income types into categories.
+    """
+
+    def test_classifier_rules(self):
+        """
+        This method tests whether types map to interned main categories, essential categories and income sources.
+        """
+        assert record_category("Food & Groceries - Shoprite") == "Food & Groceries"
+        assert record_category("Food & Groceries - Shoprite") is record_category("Food & Groceries - Spar")
+        assert record_category("Food") == "Food"
+        assert all(is_essential_category(category) for category in ("Food & Groceries", "Food", "Transport", "Healthcare"))
+        assert not any(is_essential_category(category) for category in ("Entertainment", "Personal Care", "Seafood"))
+        assert income_source_category("SASSA - Old age") == "government_grants"
+        assert income_source_category("Casual - Piece job") == "informal_work"
+
+    def test_category_stored_at_insert_and_grouped(self, db_manager):
+        """
+        This method tests whether records get their category when inserted and reports group by it, also over months rolled up without it.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000080"))
+        now = datetime.now()
+        previous_month = month_start(month_key(month_start(month_key(now)) - timedelta(days=1)))
+
+        async def _load(query_manager):
+            return await RecordAggregates.load(query_manager, "expense", user_id, previous_month, now, group_by=("type", "category", "month"))
+
+        async def _scenario():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                await query_manager.insert_user_unverified_expenses(user_id, [
+                    expense(user_id, "Transport - Taxi fare", 40.0, previous_month + timedelta(days=1)),
+                    expense(user_id, "Food & Groceries - Shoprite", 200.0, previous_month + timedelta(days=2)),
+                ])
+                await query_manager.bulk_insert_financial_records([
+                    ("expense", {"user_id": user_id, "expense_type": "Transport - Bus fare", "expense_amount": 10.0, "expense_date": month_start(month_key(now))}),
+                    ("income", {"user_id": user_id, "income_type": "Salary - Domestic work", "income_amount": 900.0, "income_date": month_start(month_key(now))}),
+                ])
+                stored = await query_manager.get_user_expenses(user_id)
+                incomes = await query_manager.aggregate_user_amounts("income", user_id, previous_month, now, group_by=("category",))
+                rolled_up = await _load(query_manager)
+                # A month rolled up before categories were kept has no category rows
+                await session.execute(delete(MonthlyRollup).where(MonthlyRollup.user_id == user_id, MonthlyRollup.dimension == "category"))
+                stale = await _load(query_manager)
+            return stored, incomes, rolled_up, stale
+
+        stored, incomes, rolled_up, stale = asyncio.run(_scenario())
+
+        assert [record.expense_category for record in stored] == ["Transport", "Food & Groceries", "Transport"]
+        assert [(group.key, group.total) for group in incomes] == [(("Salary",), 900.0)]
+        assert {category: totals.total for category, totals in rolled_up.by_category.items()} == {"Transport": 50.0, "Food & Groceries": 200.0}
+        assert stale.by_category == rolled_up.by_category
@@ -0,0 +1,129 @@
+import asyncio
+from unittest.mock import patch
+
+from api.db.conversation_cache import ConversationStateCache
+from api.db.query_manager import AsyncQueries
+from tests.conftest import create_conversation_user, db_manager, statement_log
+
+
+def _load(db_manager, cache, phone_number):
+    async def _run():
+        async with db_manager.session_scope() as session:
+            return await cache.load(AsyncQueries(session=session), phone_number=phone_number)
+    return asyncio.run(_run())
+
+
+def _save(db_manager, cache, **kwargs):
+    async def _run():
+        async with db_manager.session_scope() as session:
+            await cache.save_transition(AsyncQueries(session=session), **kwargs)
+    asyncio.run(_run())
+
+
+class TestConversationStateCache:
+    """
+    Testing class that holds the methods related to the conversation state cache.
+    """
+
+    def test_hit_after_first_load(self, db_manager, statement_log):
+        """
+        This method tests whether the second message for a phone number is answered from memory.
+        """
+        asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000001"))
+        cache = ConversationStateCache(max_entries=10, ttl_seconds=60)
+        statement_log.clear()
+
+        first = _load(db_manager, cache, "whatsapp:+27600000001")
+        second = _load(db_manager, cache, "whatsapp:+27600000001")
+
+        assert first is second
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert len([s for s in statement_log if s.lstrip().upper().startswith("SELECT")]) == 1
+
+    def test_unknown_user_is_not_cached(self, db_manager):
+        """
+        This method tests whether a phone number without a user is looked up again on the next message.
+        """
+        cache = ConversationStateCache(max_entries=10, ttl_seconds=60)
+
+        assert _load(db_manager, cache, "whatsapp:+27600000999") == (None, None, None)
+        assert cache.stats()["size"] == 0
+
+    def test_lru_eviction(self, db_manager):
+        """
+        This method tests whether the least recently used conversation is evicted when full.
+        """
+        for i in range(3):
+            asyncio.run(create_conversation_user(db_manager, f"whatsapp:+2760000000{i}"))
+        cache = ConversationStateCache(max_entries=2, ttl_seconds=60)
+
+        _load(db_manager, cache, "whatsapp:+27600000000")
+        _load(db_manager, cache, "whatsapp:+27600000001")
+        _load(db_manager, cache, "whatsapp:+27600000000")
+        _load(db_manager, cache, "whatsapp:+27600000002")
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.get("whatsapp:+27600000001") is None
+        assert cache.get("whatsapp:+27600000000") is not None
+
+    def test_ttl_expiry(self, db_manager):
+        """
+        This method tests whether an expired conversation is reloaded from the database.
+        """
+        asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000001"))
+        cache = ConversationStateCache(max_entries=10, ttl_seconds=30)
+
+        with patch("api.db.conversation_cache.time.monotonic", return_value=1000.0):
+            _load(db_manager, cache, "whatsapp:+27600000001")
+        with patch("api.db.conversation_cache.time.monotonic", return_value=1031.0):
+            _load(db_manager, cache, "whatsapp:+27600000001")
+
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_write_through_transition(self, db_manager):
+        """
+        This method tests whether a state transition updates both the database and the cached entry.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000001"))
+        cache = ConversationStateCache(max_entries=10, ttl_seconds=60)
+        _load(db_manager, cache, "whatsapp:+27600000001")
+
+        _save(db_manager, cache, user_id=user_id, current_state="sisonova_personal_template",
+              previous_state="registered_user_template", language="Zulu")
+
+        _, cached_state, cached_language = cache.get("whatsapp:+27600000001")
+        assert cached_state.current_state == "sisonova_personal_template"
+        assert cached_language.preferred_language == "Zulu"
+
+        _, stored_state, stored_language = _load(db_manager, ConversationStateCache(max_entries=10, ttl_seconds=60), "whatsapp:+27600000001")
+        assert stored_state.current_state == "sisonova_personal_template"
+        assert stored_language.preferred_language == "Zulu"
+
+    def test_unchanged_transition_skips_write(self, db_manager, statement_log):
+        """
+        This method tests whether a transition that changes nothing does not touch the database.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000001"))
+        cache = ConversationStateCache(max_entries=10, ttl_seconds=60)
+        _load(db_manager, cache, "whatsapp:+27600000001")
+        statement_log.clear()
+
+        _save(db_manager, cache, user_id=user_id, current_state="registered_user_template")
+
+        assert cache.stats()["skipped_writes"] == 1
+        assert not [s for s in statement_log if s.lstrip().upper().startswith("UPDATE")]
+
+    def test_disabled_cache_always_queries(self, db_manager):
+        """
+        This method tests whether a zero-sized cache falls through to the database every time.
+        """
+        asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000001"))
+        cache = ConversationStateCache(max_entries=0, ttl_seconds=60)
+
+        _load(db_manager, cache, "whatsapp:+27600000001")
+        _load(db_manager, cache, "whatsapp:+27600000001")
+
+        assert cache.stats()["hits"] == 0
+        assert cache.stats()["size"] == 0
@@ -0,0 +1,129 @@
+import shutil
+
+import pytest
+import yaml
+
+from api.utils.conversation_state_machine import SUPPORTED_ACTIONS, SUPPORTED_INPUT_HANDLERS, TransitionType, validate_templates
+from api.utils.template_registry import DEFAULT_TEMPLATE, DEFAULT_TRANSLATIONS_PATH, TemplateRegistry, compile_template
+from api.utils.twilio_templates import ACTION_HANDLERS, INPUT_HANDLERS
+
+
+def _english_templates(**overrides) -> dict:
+    with open(DEFAULT_TRANSLATIONS_PATH / "en.yaml", encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    for name, changes in overrides.items():
+        raw.setdefault(name, {}).update(changes)
+    return {name: compile_template(name, "en", template) for name, template in raw.items()}
+
+
+class TestConversationStateMachine:
+    """
+    Testing class that holds the methods related to the compiled conversation state machine.
+    """
+
+    def test_resolve_normalizes_input(self):
+        """
+        This method tests whether menu options and language names are normalized before the lookup.
+        """
+        state_machine = TemplateRegistry().state_machine("en")
+
+        _, option, transition = state_machine.resolve("registered_user_template", " 4 ")
+        assert option == "4"
+        assert transition.type == TransitionType.route
+        assert transition.target == "language_selector_template"
+
+        _, _, transition = state_machine.resolve(DEFAULT_TEMPLATE, "zulu ")
+        assert transition.type == TransitionType.language
+        assert transition.language == "Zulu"
+
+    def test_actions_and_free_text(self):
+        """
+        This method tests whether action options resolve to actions and free text falls back to the state's validator.
+        """
+        state_machine = TemplateRegistry().state_machine("en")
+
+        _, _, transition = state_machine.resolve("sisonova_personal_template", "4")
+        assert transition.type == TransitionType.action
+        assert transition.target == "generate_comprehensive_report"
+
+        state, _, transition = state_machine.resolve("sisonova_personal_record_expense_template", "Taxi - 25 - Okay")
+        assert transition is None
+        assert state.continuous
+        assert state.validate("Taxi - 25 - Okay")
+        assert not state.validate("Taxi")
+
+    def test_handlers_match_supported_names(self):
+        """
+        This method tests whether the template manager can dispatch every action and input handler the validation accepts.
+        """
+        assert set(ACTION_HANDLERS) == SUPPORTED_ACTIONS
+        assert set(INPUT_HANDLERS) == SUPPORTED_INPUT_HANDLERS
+
+
+class TestTemplateValidation:
+    """
+    Testing class that holds the methods related to validating templates at load time.
+    """
+
+    def test_shipped_templates_are_valid(self):
+        """
+        This method tests whether the bundled translations pass validation.
+        """
+        assert validate_templates(_english_templates(), start_state=DEFAULT_TEMPLATE) == []
+
+    def test_dangling_route(self):
+        """
+        This method tests whether a route to a template that does not exist is reported.
+        """
+        templates = _english_templates(registered_user_template={"response_routing": {"1": "missing_template"}})
+
+        problems = validate_templates(templates, start_state=DEFAULT_TEMPLATE)
+
+        assert any("routes to unknown template 'missing_template'" in problem for problem in problems)
+
+    def test_unreachable_state(self):
+        """
+        This method tests whether a template no conversation can reach is reported.
+        """
+        templates = _english_templates(orphan_template={"template_message": "Orphan", "response_routing": {"1": "registered_user_template"}})
+
+        problems = validate_templates(templates, start_state=DEFAULT_TEMPLATE)
+
+        assert any("'orphan_template' is unreachable" in problem for problem in problems)
+        assert any("'orphan_template' has no inbound validator" in problem for problem in problems)
+
+    def test_unknown_action_and_rejected_option(self):
+        """
+        This method tests whether unknown actions and options the validator would reject are reported.
+        """
+        templates = _english_templates(sisonova_personal_template={"actions": {"4": "delete_everything", "7": "generate_income_report"}})
+
+        problems = validate_templates(templates, start_state=DEFAULT_TEMPLATE)
+
+        assert any("unknown action 'delete_everything'" in problem for problem in problems)
+        assert any("option 7 is rejected by NumberedMenuValidator" in problem for problem in problems)
+
+    def test_registry_rejects_invalid_templates(self, tmp_path):
+        """
+        This method tests whether the registry refuses to load templates that fail validation.
+        """
+        with open(DEFAULT_TRANSLATIONS_PATH / "en.yaml", encoding="utf-8") as f:
+            raw = yaml.safe_load(f)
+        raw["registered_user_template"]["response_routing"]["1"] = "missing_template"
+        (tmp_path / "en.yaml").write_text(yaml.safe_dump(raw), encoding="utf-8")
+
+        with pytest.raises(ValueError, match="missing_template"):
+            TemplateRegistry(path=str(tmp_path))
+
+    def test_registry_rejects_missing_translation(self, tmp_path):
+        """
+        This method tests whether a template missing from one language is reported.
+        """
+        shutil.copy(DEFAULT_TRANSLATIONS_PATH / "en.yaml", tmp_path / "en.yaml")
+        with open(DEFAULT_TRANSLATIONS_PATH / "zu.yaml", encoding="utf-8") as f:
+            raw = yaml.safe_load(f)
+        del raw["not_yet_implemented_template"]
+        (tmp_path / "zu.yaml").write_text(yaml.safe_dump(raw), encoding="utf-8")
+
+        with pytest.raises(ValueError, match=r"\[zu\] 'not_yet_implemented_template' is missing"):
+            TemplateRegistry(path=str(tmp_path))
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+from api.db import db_manager as db_manager_module
+from api.db.db_manager import DatabaseManager, close_database_manager, get_database_manager
+from api.db.models.tables import Base, UnverifiedExpenses
+
+
+class TestDatabaseManagerPool:
+    """
+    Testing class that holds the methods related to the database engine and connection pool.
+    """
+
+    def test_pool_options_from_arguments(self, tmp_path):
+        """
+        This method tests whether explicit pool settings are applied to the engine.
+        """
+        manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=3, max_overflow=2)
+
+        assert manager.engine.pool.size() == 3
+        assert manager.engine.pool._max_overflow == 2
+        assert manager.engine.pool._pre_ping is True
+
+        asyncio.run(manager.dispose())
+
+    def test_in_memory_sqlite_skips_pool_sizing(self):
+        """
+        This method tests whether in-memory SQLite databases are created without pool sizing options.
+        """
+        manager = DatabaseManager(db_url="sqlite+aiosqlite:///:memory:", pool_size=3)
+
+        assert manager.engine is not None
+
+        asyncio.run(manager.dispose())
+
+    def test_sessions_are_not_shared(self, tmp_path):
+        """
+        This method tests whether each unit of work receives its own session from the shared engine.
+        """
+        manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+
+        assert manager.async_session() is not manager.async_session()
+
+        asyncio.run(manager.dispose())
+
+    def test_shared_manager_is_reused(self, tmp_path, monkeypatch):
+        """
+        This method tests whether the process-wide manager is created once and reused.
+        """
+        monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'shared.db'}")
+        monkeypatch.setattr(db_manager_module, "_shared_db_manager", None)
+
+        first = get_database_manager()
+        second = get_database_manager()
+
+        assert first is second
+
+        asyncio.run(close_database_manager())
+        assert db_manager_module._shared_db_manager is None
+
+
+def create_tables_without_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        connection.execute(CreateTable(table))
+
+
+class TestDatabaseIndexes:
+    """
+    Testing class that holds the methods related to the indexes declared on the models.
+    """
+
+    def test_missing_indexes_added_to_existing_tables(self, tmp_path):
+        """
+        This method tests whether tables created before the indexes were declared get them, once.
+        """
+        manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+
+        async def _migrate():
+            async with manager.engine.begin() as conn:
+                await conn.run_sync(create_tables_without_indexes)
+            created = await manager.create_missing_indexes()
+            created_again = await manager.create_missing_indexes()
+            async with manager.engine.connect() as conn:
+                indexes = await conn.run_sync(lambda sync_conn: {index["name"] for index in inspect(sync_conn).get_indexes("UnverifiedExpenses")})
+            await manager.dispose()
+            return created, created_again, indexes
+
+        created, created_again, indexes = asyncio.run(_migrate())
+
+        assert "ix_UnverifiedExpenses_user_id_expense_date" in created
+        assert "ix_MessageState_user_id" in created
+        assert created_again == []
+        assert indexes == {"ix_UnverifiedExpenses_user_id_expense_date"}
+
+    def test_date_range_query_uses_index(self, tmp_path):
+        """
+        This method tests whether a user's date range query searches the composite index instead of scanning the table.
+        """
+        manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path / 'plan.db'}")
+        statement = select(UnverifiedExpenses).where(
+            UnverifiedExpenses.user_id == 1,
+            UnverifiedExpenses.expense_date >= datetime(2025, 1, 1),
+            UnverifiedExpenses.expense_date <= datetime(2025, 6, 30),
+        )
+
+        async def _plan():
+            await manager.create_tables()
+            compiled = statement.compile(manager.engine.sync_engine)
+            async with manager.engine.connect() as conn:
+                result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", (1, "2025-01-01", "2025-06-30"))
+                plan = " ".join(row[-1] for row in result)
+            await manager.dispose()
+            return plan
+
+        plan = asyncio.run(_plan())
+
+        assert "USING INDEX ix_UnverifiedExpenses_user_id_expense_date (user_id=? AND expense_date>? AND expense_date<?)" in plan
+
+
+class TestDatabaseColumns:
+    """
+    Testing class that holds the methods related to the columns added to the models after their tables were created.
+    """
+
+    def test_missing_category_columns_added_and_filled(self, tmp_path):
+        """
+        This method tests whether tables created before the category columns get them, filled in from the record types.
+        """
+        manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+
+        async def _migrate():
+            async with manager.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(text('ALTER TABLE "UnverifiedExpenses" DROP COLUMN expense_category'))
+                await conn.execute(text('ALTER TABLE "UnverifiedIncomes" DROP COLUMN income_category'))
+                await conn.execute(text(
+                    'INSERT INTO "UnverifiedExpenses" (user_id, expense_type, expense_amount, expense_date) VALUES '
+                    "(1, 'Transport - Taxi fare', 40.0, '2025-03-03 07:00:00'), (1, 'Food', 20.0, '2025-03-04 07:00:00')"
+                ))
+            await manager.create_tables()
+            await manager.create_tables()
+            async with manager.engine.connect() as conn:
+                categories = (await conn.execute(select(UnverifiedExpenses.expense_type, UnverifiedExpenses.expense_category))).all()
+                income_columns = await conn.run_sync(lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns("UnverifiedIncomes")})
+            await manager.dispose()
+            return categories, income_columns
+
+        categories, income_columns = asyncio.run(_migrate())
+
+        assert categories == [("Transport - Taxi fare", "Transport"), ("Food", "Food")]
+        assert "income_category" in income_columns
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from api.behaviour.income_behaviour_analysis import IncomeBehaviouralInsights, income_source_category
+from api.db.models.tables import UnverifiedIncomes
+
+
+def income(income_type, amount, income_date, feeling):
+    return UnverifiedIncomes(user_id=1, income_type=income_type, income_amount=amount, income_date=income_date, income_feeling=feeling)
+
+
+class TestIncomeBehaviouralInsights:
+    """
+    Testing class that holds the methods related to finding income behaviour triggers.
+    """
+
+    def test_insights_from_amounts_timing_and_sources(self):
+        """
+        This method tests whether the tercile, timing and source analyses find the patterns in the incomes.
+        """
+        incomes = [
+            income("Government Grant - Child support", 3000.0, datetime(2025, 3, 3), "Doing Well"),
+            income("SASSA - Old age", 2800.0, datetime(2025, 3, 10), "Doing Well"),
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 21), "Worried"),
+            income("Wage - Garden work", 400.0, datetime(2025, 3, 28), "Very Worried"),
+            income("Informal Work - Car washing", 1500.0, datetime(2025, 3, 15), "Okay"),
+            income("Side Business - Selling sweets", 900.0, datetime(2025, 3, 12), None),
+        ]
+
+        result = IncomeBehaviouralInsights().analyze_behavioral_triggers(incomes)
+        insights = {insight["type"]: insight["insight"] for insight in result["behavioral_insights"]}
+
+        assert insights == {
+            "income_amount_trigger": "You feel significantly better about higher income amounts (R2,800+) vs lower amounts (under R500)",
+            "confidence_threshold": "You start feeling confident about income at around R1,500",
+            "monthly_timing_pattern": "You feel 3.5 points better about income early in the month vs late month",
+            "weekly_timing_pattern": "You feel best about income on Mondays and worst on Fridays",
+            "income_source_pattern": "You feel 3.5 points better about government grants than employment",
+            "grant_dependency_behavior": "You feel more secure about government grants than employment income",
+        }
+        assert len(result["behavior_change_recommendations"]) == 5
+
+    def test_ties_resolve_to_first_seen_and_missing_feelings(self):
+        """
+        This method tests whether equally rated weekdays resolve in order of first appearance and incomes without feelings are skipped.
+        """
+        incomes = [
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 5), "Okay"),  # Wednesday
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 3), "Worried"),  # Monday
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 12), "Okay"),
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 10), "Worried"),
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 7), "Okay"),  # Friday
+            income("Salary - Domestic work", 500.0, datetime(2025, 3, 14), "Okay"),
+        ]
+
+        result = IncomeBehaviouralInsights().analyze_behavioral_triggers(incomes)
+        weekly = [insight["insight"] for insight in result["behavioral_insights"] if insight["type"] == "weekly_timing_pattern"]
+
+        assert weekly == ["You feel best about income on Wednesdays and worst on Mondays"]
+        assert IncomeBehaviouralInsights().analyze_behavioral_triggers([income("Salary - Domestic work", 500.0, datetime(2025, 3, 5), None)]) == {"has_data": False}
+
+    def test_source_categories(self):
+        """
+        This method tests whether income types are placed in source categories by their keywords.
+        """
+        assert income_source_category("Government Grant - Child support") == "government_grants"
+        assert income_source_category("SASSA - Old age") == "government_grants"
+        assert income_source_category("Salary - Domestic work") == "employment"
+        assert income_source_category("Casual - Piece job") == "informal_work"
+        assert income_source_category("Side Business - Selling sweets") == "other"
@@ -0,0 +1,288 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
+from api.finance.llm_gateway import CircuitOpenError, InsightGateway, LatencyHistogram, LocalInsightModel
+
+
+def expenses_report(total_expenses):
+    return {
+        "summary": {"total_expenses": total_expenses, "average_daily_spending": total_expenses / 180, "total_transactions": 12},
+        "category_analysis": {"top_spending_category": "Food & Groceries", "category_breakdown": {"Food & Groceries": {"total": total_expenses}}},
+    }
+
+
+class FailingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        raise ConnectionError("model unavailable")
+
+
+class TestInsightGateway:
+    """
+    Testing class that holds the methods related to caching and coalescing the AI insight calls.
+    """
+
+    def test_unchanged_report_data_reuses_insights(self):
+        """
+        This method tests whether insights for the same report data are parsed once and then served from the cache.
+        """
+        model = LocalInsightModel()
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60)
+        analyzer = PersonalizedGeminiAnalyzer(model=model, gateway=gateway)
+
+        async def _insights():
+            first = await analyzer.generate_personalized_insights(expenses_report(900.0), "expenses")
+            second = await analyzer.generate_personalized_insights(expenses_report(900.0), "expenses")
+            changed = await analyzer.generate_personalized_insights(expenses_report(950.0), "expenses")
+            other_type = await analyzer.generate_personalized_insights(expenses_report(900.0), "comprehensive")
+            return first, second, changed, other_type
+
+        first, second, changed, other_type = asyncio.run(_insights())
+
+        assert first is second
+        assert first["actionable_recommendations"] == ["Write down every purchase this week", "Set aside R50 on payday", "Plan weekend spending in advance"]
+        assert first["analyzed_data"]["total_expenses"] == 900.0
+        assert changed["analyzed_data"]["total_expenses"] == 950.0
+        assert other_type["analysis_type"] == "Personalized Comprehensive Analysis"
+        assert model.calls == 3
+        assert gateway.stats()["hits"] == 1
+        assert gateway.stats()["hit_rate"] == 0.25
+
+    def test_concurrent_requests_share_one_call_off_the_loop(self):
+        """
+        This method tests whether identical concurrent requests wait for one model call that does not block the event loop.
+        """
+        model = LocalInsightModel(delay_seconds=0.2)
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60)
+        analyzer = PersonalizedGeminiAnalyzer(model=model, gateway=gateway)
+
+        async def _ticker(ticks):
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def _insights():
+            ticks = []
+            ticker = asyncio.create_task(_ticker(ticks))
+            results = await asyncio.gather(*(analyzer.generate_personalized_insights(expenses_report(900.0), "expenses") for _ in range(3)))
+            ticker.cancel()
+            return results, ticks
+
+        results, ticks = asyncio.run(_insights())
+
+        assert results[0] is results[1] is results[2]
+        assert model.calls == 1
+        assert gateway.stats()["misses"] == 1
+        assert gateway.stats()["coalesced"] == 2
+        # The loop kept running while the model was answering
+        assert len(ticks) >= 10
+
+    def test_cancelled_request_does_not_cancel_shared_call(self):
+        """
+        This method tests whether cancelling the request that started a call still lets the requests sharing it get the insights.
+        """
+        model = LocalInsightModel(delay_seconds=0.1)
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60)
+        analyzer = PersonalizedGeminiAnalyzer(model=model, gateway=gateway)
+
+        async def _insights():
+            owner = asyncio.create_task(analyzer.generate_personalized_insights(expenses_report(900.0), "expenses"))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(analyzer.generate_personalized_insights(expenses_report(900.0), "expenses"))
+            await asyncio.sleep(0.01)
+            owner.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await owner
+            return await waiter
+
+        insights = asyncio.run(_insights())
+
+        assert insights["ai_confidence"] == "High"
+        assert model.calls == 1
+        assert gateway.stats()["coalesced"] == 1
+        assert gateway.stats()["errors"] == 0
+        assert gateway.stats()["size"] == 1
+
+    def test_eviction_expiry_and_failures(self):
+        """
+        This method tests whether the cache stays bounded, expires entries and does not keep failed calls.
+        """
+        gateway = InsightGateway(max_entries=2, ttl_seconds=60)
+        calls = []
+
+        def _call(key):
+            def _generate():
+                calls.append(key)
+                return {"key": key}
+            return _generate
+
+        def _fail():
+            calls.append("failed")
+            raise RuntimeError("model unavailable")
+
+        async def _scenario():
+            for key in ("a", "b", "c", "a"):
+                await gateway.generate(key, _call(key))
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await gateway.generate("d", _fail)
+
+        asyncio.run(_scenario())
+
+        assert calls == ["a", "b", "c", "a", "failed", "failed"]
+        assert gateway.stats()["evictions"] == 2
+        assert gateway.stats()["errors"] == 2
+        assert gateway.stats()["size"] == 2
+
+        expiring = InsightGateway(max_entries=10, ttl_seconds=0.01)
+
+        async def _after_expiry():
+            await expiring.generate("a", _call("a"))
+            await asyncio.sleep(0.02)
+            await expiring.generate("a", _call("a"))
+
+        asyncio.run(_after_expiry())
+
+        assert expiring.stats()["misses"] == 2
+        assert expiring.stats()["expirations"] == 1
+
+
+class TestInsightGatewayLimits:
+    """
+    Testing class that holds the methods related to bounding, timing out and circuit breaking the AI insight calls.
+    """
+
+    def test_concurrent_calls_are_bounded(self):
+        """
+        This method tests whether no more than max_concurrency model calls run at the same time.
+        """
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60, max_concurrency=2, timeout_seconds=5)
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def _call(key):
+            def _generate():
+                with lock:
+                    running.append(key)
+                    peak.append(len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.remove(key)
+                return {"key": key}
+            return _generate
+
+        async def _scenario():
+            return await asyncio.gather(*(gateway.generate(str(key), _call(key), "expenses") for key in range(6)))
+
+        results = asyncio.run(_scenario())
+
+        assert [result["key"] for result in results] == list(range(6))
+        assert max(peak) == 2
+        assert gateway.stats()["latency"]["expenses"]["count"] == 6
+        assert gateway.stats()["in_flight"] == 0
+
+    def test_slow_model_falls_back_to_report_recommendations(self):
+        """
+        This method tests whether a call past its deadline returns the report's rule-based recommendations.
+        """
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60, timeout_seconds=0.05)
+        analyzer = PersonalizedGeminiAnalyzer(model=LocalInsightModel(delay_seconds=0.3), gateway=gateway)
+        report = dict(expenses_report(900.0), recommendations=["Track your daily spending", "Set weekly limits"])
+
+        async def _insights():
+            start = time.monotonic()
+            insights = await analyzer.generate_personalized_insights(report, "expenses")
+            return insights, time.monotonic() - start
+
+        insights, elapsed = asyncio.run(_insights())
+
+        assert elapsed < 0.25
+        assert insights["actionable_recommendations"] == ["Track your daily spending", "Set weekly limits"]
+        assert insights["ai_confidence"] == "Rule-based"
+        assert insights["fallback_reason"] == "TimeoutError"
+        assert gateway.stats()["timeouts"] == 1
+        assert gateway.stats()["size"] == 0
+
+    def test_breaker_opens_and_recovers(self):
+        """
+        This method tests whether repeated failures stop calls to the model until a trial call succeeds after the reset period.
+        """
+        model = FailingModel()
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60, failure_threshold=2, reset_seconds=0.05)
+        analyzer = PersonalizedGeminiAnalyzer(model=model, gateway=gateway)
+        report = dict(expenses_report(900.0), actionable_insights=["Consider diversifying income sources"])
+
+        async def _scenario():
+            failed = [await analyzer.generate_personalized_insights(report, "comprehensive") for _ in range(3)]
+            with pytest.raises(CircuitOpenError):
+                await gateway.generate("other", lambda: {}, "comprehensive")
+            await asyncio.sleep(0.06)
+            analyzer.model = LocalInsightModel()
+            recovered = await analyzer.generate_personalized_insights(report, "comprehensive")
+            return failed, recovered
+
+        failed, recovered = asyncio.run(_scenario())
+
+        assert model.calls == 2
+        assert [insights["actionable_recommendations"] for insights in failed] == [["Consider diversifying income sources"]] * 3
+        assert failed[2]["fallback_reason"].startswith("AI insights unavailable")
+        assert recovered["ai_confidence"] == "High"
+        assert gateway.stats()["breaker_state"] == "closed"
+        assert gateway.stats()["breaker_opens"] == 1
+        assert gateway.stats()["breaker_rejected"] == 2
+
+    def test_cancelled_trial_call_reopens_breaker(self):
+        """
+        This method tests whether cancelling the half open trial call lets the next call try the model again instead of being rejected.
+        """
+        gateway = InsightGateway(max_entries=10, ttl_seconds=60, failure_threshold=1, reset_seconds=0.05)
+
+        def _fail():
+            raise ConnectionError("model unavailable")
+
+        def _slow():
+            time.sleep(0.2)
+            return {"key": "slow"}
+
+        async def _scenario():
+            with pytest.raises(ConnectionError):
+                await gateway.generate("failing", _fail, "expenses")
+            await asyncio.sleep(0.06)
+            trial = asyncio.create_task(gateway.generate("trial", _slow, "expenses"))
+            await asyncio.sleep(0.01)
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+            state = gateway.stats()["breaker_state"]
+            return state, await gateway.generate("after", lambda: {"key": "after"}, "expenses")
+
+        state, insights = asyncio.run(_scenario())
+
+        assert state == "open"
+        assert insights == {"key": "after"}
+        assert gateway.stats()["breaker_state"] == "closed"
+        assert gateway.stats()["breaker_rejected"] == 0
+
+    def test_latency_histogram_percentiles(self):
+        """
+        This method tests whether the histogram reports bucket counts and bucket-bounded percentiles.
+        """
+        histogram = LatencyHistogram()
+        for seconds in (0.1, 0.2, 0.3, 0.4, 0.6, 0.7, 0.8, 0.9, 1.5, 45.0):
+            histogram.observe(seconds)
+
+        snapshot = histogram.snapshot()
+
+        assert snapshot["buckets"]["<=0.25s"] == 2
+        assert snapshot["buckets"]["<=1s"] == 4
+        assert snapshot["buckets"][">30s"] == 1
+        assert snapshot["p50_ms"] == 1000.0
+        assert snapshot["p95_ms"] == 45000.0
@@ -0,0 +1,130 @@
+import asyncio
+import os
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+from api.finance.pdf_cache import PDFDiskCache
+from api.finance.pdf_pool import PDFRenderPool
+from api.finance.report import PersonalizedReportDispatcher
+from api.services.s3_bucket import SecureS3Service
+from tests.conftest import create_conversation_user, db_manager
+
+
+class TestPDFDiskCache:
+    """
+    Testing class that holds the methods related to the content-addressed report PDF cache.
+    """
+
+    def test_key_depends_on_render_inputs(self):
+        """
+        This method tests whether identical inputs share a key and any change in the inputs produces a new one.
+        """
+        report_data = {"period": "Last 6 months", "summary": {"total": 100.0, "generated": datetime(2025, 1, 1)}}
+
+        key = PDFDiskCache.key_for("expenses", report_data, "whatsapp:+27600000001")
+
+        assert key == PDFDiskCache.key_for("expenses", dict(report_data), "whatsapp:+27600000001")
+        assert key != PDFDiskCache.key_for("incomes", report_data, "whatsapp:+27600000001")
+        assert key != PDFDiskCache.key_for("expenses", report_data, "whatsapp:+27600000002")
+        assert key != PDFDiskCache.key_for("expenses", {**report_data, "period": "Last month"}, "whatsapp:+27600000001")
+
+    def test_get_and_put(self, tmp_path):
+        """
+        This method tests whether a stored PDF is returned on a later lookup.
+        """
+        cache = PDFDiskCache(str(tmp_path), max_bytes=1024)
+
+        assert cache.get("a") is None
+        cache.put("a", b"%PDF-a")
+
+        assert cache.get("a") == b"%PDF-a"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """
+        This method tests whether the least recently used PDFs are deleted once the cache is over its size limit.
+        """
+        cache = PDFDiskCache(str(tmp_path), max_bytes=300)
+        for index, key in enumerate(["a", "b", "c"]):
+            cache.put(key, key.encode() * 100)
+            os.utime(tmp_path / f"{key}.pdf", (1000 + index, 1000 + index))
+
+        # Reading "a" makes "b" the least recently used entry
+        cache.get("a")
+        cache.put("d", b"d" * 100)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.get("d") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_oversized_pdf_is_not_cached(self, tmp_path):
+        """
+        This method tests whether a PDF larger than the whole cache is skipped.
+        """
+        cache = PDFDiskCache(str(tmp_path), max_bytes=10)
+
+        cache.put("big", b"x" * 11)
+
+        assert cache.get("big") is None
+
+
+class TestInMemoryReportPipeline:
+    """
+    Testing class that holds the methods related to keeping report PDFs in memory until upload.
+    """
+
+    def test_report_pdf_stays_in_memory_and_is_cached(self, db_manager, tmp_path, monkeypatch):
+        """
+        This method tests whether the dispatcher returns the PDF bytes without writing to the working directory and reuses the cache.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000030"))
+        workdir = tmp_path / "cwd"
+        workdir.mkdir()
+        monkeypatch.chdir(workdir)
+
+        async def _generate_twice():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).bulk_insert_financial_records([
+                    ("expense", {"user_id": user_id, "expense_type": "Transport - Taxi", "expense_amount": 25.0, "expense_feeling": "Okay", "expense_date": datetime.now()})
+                ])
+            pool = PDFRenderPool(max_workers=0)
+            cache = PDFDiskCache(str(tmp_path / "cache"))
+            dispatcher = PersonalizedReportDispatcher(
+                User(id=user_id, phone_number="whatsapp:+27600000030"), db_manager=db_manager, pdf_pool=pool, pdf_cache=cache
+            )
+            first = await dispatcher.generate_personalized_report("expenses", include_ai=False)
+            second = await dispatcher.generate_personalized_report("expenses", include_ai=False)
+            return first, second, pool.stats(), cache.stats()
+
+        first, second, pool_stats, cache_stats = asyncio.run(_generate_twice())
+
+        assert first["pdf_bytes"].startswith(b"%PDF")
+        assert second["pdf_bytes"] == first["pdf_bytes"]
+        assert "pdf_filename" not in first
+        assert os.listdir(workdir) == []
+        assert pool_stats["rendered"] == 1
+        assert cache_stats["hits"] == 1
+
+    def test_upload_from_bytes_uses_transfer_config(self):
+        """
+        This method tests whether report bytes are streamed to S3 with the multipart transfer configuration.
+        """
+        env = {"AWS_ACCESS_KEY_ID": "key", "AWS_SECRET_ACCESS_KEY": "secret", "AWS_S3_BUCKET_NAME": "reports", "S3_MULTIPART_THRESHOLD_MB": "5"}
+        with patch.dict(os.environ, env), patch("api.services.s3_bucket.boto3.client") as mock_client_factory:
+            s3_client = MagicMock()
+            s3_client.generate_presigned_url.return_value = "https://example.com/report.pdf"
+            mock_client_factory.return_value = s3_client
+
+            service = SecureS3Service()
+            url = asyncio.run(service.upload_pdf_from_bytes_secure(pdf_bytes=b"%PDF-data", user_id=7, report_type="expenses"))
+
+        assert url == "https://example.com/report.pdf"
+        args, kwargs = s3_client.upload_fileobj.call_args
+        assert args[0].getvalue() == b"%PDF-data"
+        assert args[2].startswith("reports/7/expenses_report_")
+        assert kwargs["Config"].multipart_threshold == 5 * 1024 * 1024
@@ -0,0 +1,67 @@
+import asyncio
+import pickle
+import time
+from unittest.mock import patch
+
+from api.finance.pdf_pool import PDFRenderPool, PDFRenderRequest, render_report_pdf
+
+REPORT_DATA = {"period": "Last 6 months", "summary": {}}
+
+
+def _slow_render(request: PDFRenderRequest) -> bytes:
+    time.sleep(0.3)
+    return b"%PDF-slow"
+
+
+class TestPDFRenderPool:
+    """
+    Testing class that holds the methods related to rendering report PDFs off the event loop.
+    """
+
+    def test_render_request_is_picklable(self):
+        """
+        This method tests whether a render request survives the trip to a worker process.
+        """
+        request = PDFRenderRequest(report_data=REPORT_DATA, report_type="feelings", user_phone="whatsapp:+27600000001")
+
+        assert pickle.loads(pickle.dumps(request)) == request
+
+    def test_render_in_worker_process(self):
+        """
+        This method tests whether the pool returns the same PDF a direct render produces.
+        """
+        pool = PDFRenderPool(max_workers=1)
+
+        async def _render():
+            return await pool.render(REPORT_DATA, "feelings", "whatsapp:+27600000001")
+
+        try:
+            pdf_bytes = asyncio.run(_render())
+        finally:
+            pool.shutdown()
+
+        expected = render_report_pdf(PDFRenderRequest(REPORT_DATA, "feelings", "whatsapp:+27600000001"))
+        assert pdf_bytes.startswith(b"%PDF")
+        assert abs(len(pdf_bytes) - len(expected)) < 100
+        assert pool.stats()["rendered"] == 1
+
+    def test_backpressure_when_saturated(self):
+        """
+        This method tests whether renders beyond max_pending wait for a slot and give up after the acquire timeout.
+        """
+        pool = PDFRenderPool(max_workers=0, max_pending=1, acquire_timeout=0.05)
+
+        async def _render_two():
+            return await asyncio.gather(
+                pool.render(REPORT_DATA, "feelings", "whatsapp:+27600000001"),
+                pool.render(REPORT_DATA, "feelings", "whatsapp:+27600000002"),
+                return_exceptions=True
+            )
+
+        with patch("api.finance.pdf_pool.render_report_pdf", _slow_render):
+            results = asyncio.run(_render_two())
+
+        assert results[0] == b"%PDF-slow"
+        assert isinstance(results[1], asyncio.TimeoutError)
+        assert pool.stats()["rejected"] == 1
+        assert pool.stats()["in_flight"] == 0
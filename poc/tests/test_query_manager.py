@@ -0,0 +1,321 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from api.db.models.tables import FinancialFeelings, UnverifiedExpenses, UnverifiedIncomes, User
+from api.db.query_manager import AsyncQueries, month_key
+from api.utils.template_actions import insert_poc_dummy_data, seed_poc_dummy_data
+from tests.conftest import create_conversation_user, db_manager, statement_log
+
+
+class TestConversationContext:
+    """
+    Testing class that holds the methods related to loading and saving conversation state.
+    """
+
+    def test_load_conversation_context_single_query(self, db_manager, statement_log):
+        """
+        This method tests whether the user, message state and language are loaded with one SELECT.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000001", language="Zulu"))
+        statement_log.clear()
+
+        async def _load():
+            async with db_manager.session_scope() as session:
+                return await AsyncQueries(session=session).load_conversation_context("whatsapp:+27600000001")
+
+        user, message_state, language_preference = asyncio.run(_load())
+
+        assert user.id == user_id
+        assert message_state.current_state == "registered_user_template"
+        assert language_preference.preferred_language == "Zulu"
+        assert len([s for s in statement_log if s.lstrip().upper().startswith("SELECT")]) == 1
+
+    def test_load_conversation_context_unknown_user(self, db_manager):
+        """
+        This method tests whether an unknown phone number returns an empty context.
+        """
+        async def _load():
+            async with db_manager.session_scope() as session:
+                return await AsyncQueries(session=session).load_conversation_context("whatsapp:+27600000999")
+
+        assert asyncio.run(_load()) == (None, None, None)
+
+    def test_save_conversation_transition(self, db_manager):
+        """
+        This method tests whether the state and language changes are persisted together.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000002"))
+
+        async def _save_and_load():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).save_conversation_transition(
+                    user_id=user_id,
+                    current_state="sisonova_personal_template",
+                    previous_state="registered_user_template",
+                    language="Afrikaans"
+                )
+            async with db_manager.session_scope() as session:
+                return await AsyncQueries(session=session).load_conversation_context("whatsapp:+27600000002")
+
+        _, message_state, language_preference = asyncio.run(_save_and_load())
+
+        assert message_state.current_state == "sisonova_personal_template"
+        assert message_state.previous_state == "registered_user_template"
+        assert language_preference.preferred_language == "Afrikaans"
+
+    def test_save_conversation_transition_keeps_previous_state(self, db_manager):
+        """
+        This method tests whether an empty previous state and language leave the stored values untouched.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000003"))
+
+        async def _save_and_load():
+            async with db_manager.session_scope() as session:
+                queries = AsyncQueries(session=session)
+                await queries.save_conversation_transition(user_id=user_id, current_state="a", previous_state="b")
+                await queries.save_conversation_transition(user_id=user_id, current_state="c")
+            async with db_manager.session_scope() as session:
+                return await AsyncQueries(session=session).load_conversation_context("whatsapp:+27600000003")
+
+        _, message_state, language_preference = asyncio.run(_save_and_load())
+
+        assert message_state.current_state == "c"
+        assert message_state.previous_state == "b"
+        assert language_preference.preferred_language == "English"
+
+
+class TestBulkInsert:
+    """
+    Testing class that holds the methods related to bulk inserting financial records.
+    """
+
+    def test_bulk_insert_one_statement_per_table(self, db_manager, statement_log):
+        """
+        This method tests whether each table is written with a single executemany INSERT.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000010"))
+        records = (
+            [("expense", {"user_id": user_id, "expense_type": "Transport - Taxi", "expense_amount": 25.0, "expense_feeling": None, "expense_date": datetime(2025, 1, day)}) for day in range(1, 21)]
+            + [("income", {"user_id": user_id, "income_type": "Employment", "income_amount": 4000.0, "income_feeling": "Okay", "income_date": datetime(2025, 1, day)}) for day in range(1, 4)]
+            + [("feeling", {"user_id": user_id, "feeling": "Worried", "feeling_date": datetime(2025, 1, 15)})]
+        )
+        statement_log.clear()
+
+        async def _insert_and_count():
+            async with db_manager.session_scope() as session:
+                counts = await AsyncQueries(session=session).bulk_insert_financial_records(records)
+            async with db_manager.session_scope() as session:
+                queries = AsyncQueries(session=session)
+                stored = (len(await queries.get_user_expenses(user_id)), len(await queries.get_user_incomes(user_id)), len(await queries.get_user_feelings(user_id)))
+            return counts, stored
+
+        counts, stored = asyncio.run(_insert_and_count())
+
+        assert counts == {"expense": 20, "income": 3, "feeling": 1}
+        assert stored == (20, 3, 1)
+        assert len([s for s in statement_log if s.lstrip().upper().startswith("INSERT")]) == 3
+
+    def test_bulk_insert_rejects_unknown_type(self, db_manager):
+        """
+        This method tests whether an unknown record type is rejected before anything is written.
+        """
+        async def _insert():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).bulk_insert_financial_records([("loan", {"user_id": 1})])
+
+        with pytest.raises(ValueError):
+            asyncio.run(_insert())
+
+    def test_seed_poc_dummy_data(self, db_manager):
+        """
+        This method tests whether background seeding stores the generated dummy data in its own transaction.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000011"))
+
+        async def _seed_and_count():
+            counts = await seed_poc_dummy_data(User(id=user_id, phone_number="whatsapp:+27600000011"), db_manager=db_manager)
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                stored = len(await query_manager.get_user_expenses(user_id))
+                rolled_up = await query_manager.get_monthly_rollups(user_id, "expense", [month_key(datetime.now().replace(day=1) - timedelta(days=1))], ("type",))
+            return counts, stored, rolled_up
+
+        counts, stored, (rolled_up, _) = asyncio.run(_seed_and_count())
+
+        assert counts["expense"] > 0
+        assert stored == counts["expense"]
+        assert len(rolled_up) == 1
+
+    def test_insert_poc_dummy_data_in_callers_transaction(self, db_manager):
+        """
+        This method tests whether inline seeding writes the dummy data and its monthly rollups in the webhook's own session.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000012"))
+        last_month = month_key(datetime.now().replace(day=1) - timedelta(days=1))
+
+        async def _seed_and_count():
+            async with db_manager.session_scope() as session:
+                counts = await insert_poc_dummy_data(AsyncQueries(session=session), User(id=user_id, phone_number="whatsapp:+27600000012"))
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                stored = len(await query_manager.get_user_expenses(user_id))
+                rolled_up, groups = await query_manager.get_monthly_rollups(user_id, "expense", [last_month], ("type",))
+            return counts, stored, rolled_up, groups
+
+        counts, stored, rolled_up, groups = asyncio.run(_seed_and_count())
+
+        assert stored == counts["expense"] > 0
+        assert rolled_up == {last_month}
+        assert groups["type"]
+
+
+# 2025-03-03 is a Monday
+AGGREGATE_EXPENSES = [
+    ("Transport - Taxi fare", 50.0, datetime(2025, 3, 3, 7), "Worried"),
+    ("Food & Groceries - Shoprite", 120.0, datetime(2025, 3, 3, 18), "Okay"),
+    ("Transport - Bus fare", 30.0, datetime(2025, 3, 15, 8), "Worried"),
+    ("Food & Groceries - Shoprite", 20.0, datetime(2025, 4, 25, 12), "Okay"),
+    ("Rent - Room", 900.0, datetime(2025, 6, 1, 9), "Worried"),
+]
+
+
+async def add_aggregate_expenses(db_manager, user_id):
+    async with db_manager.session_scope() as session:
+        query_manager = AsyncQueries(session=session)
+        for expense_type, amount, expense_date, feeling in AGGREGATE_EXPENSES:
+            await query_manager.add(UnverifiedExpenses(
+                user_id=user_id, expense_type=expense_type, expense_amount=amount, expense_date=expense_date, expense_feeling=feeling
+            ))
+        await query_manager.add(FinancialFeelings(user_id=user_id, feeling="Okay", feeling_date=datetime(2025, 3, 2)))
+        await query_manager.add(FinancialFeelings(user_id=user_id, feeling="Worried", feeling_date=datetime(2025, 3, 9)))
+        await query_manager.add(FinancialFeelings(user_id=user_id, feeling="Okay", feeling_date=datetime(2025, 4, 9)))
+        await query_manager.add(FinancialFeelings(user_id=user_id, feeling="Okay", feeling_date=datetime(2025, 6, 9)))
+
+
+class TestAmountAggregates:
+    """
+    Testing class that holds the methods related to the GROUP BY queries behind the financial reports.
+    """
+
+    def test_aggregate_per_column(self, db_manager):
+        """
+        This method tests whether amounts are grouped per column inside the date range, in order of first appearance.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000012"))
+        asyncio.run(add_aggregate_expenses(db_manager, user_id))
+
+        async def _aggregate(**kwargs):
+            async with db_manager.session_scope() as session:
+                return await AsyncQueries(session=session).aggregate_user_amounts(
+                    "expense", user_id, datetime(2025, 3, 1), datetime(2025, 4, 30), **kwargs
+                )
+
+        by_type = asyncio.run(_aggregate(group_by=("type",)))
+        by_day = asyncio.run(_aggregate(group_by=("day",)))
+        by_weekday = asyncio.run(_aggregate(group_by=("weekday",)))
+        by_month = asyncio.run(_aggregate(group_by=("month",)))
+        by_month_part = asyncio.run(_aggregate(group_by=("month_part",)))
+        overall = asyncio.run(_aggregate())
+        small = asyncio.run(_aggregate(below_amount=50))
+
+        assert [(group.key, group.total, group.count) for group in by_type] == [
+            (("Transport - Taxi fare",), 50.0, 1), (("Food & Groceries - Shoprite",), 140.0, 2), (("Transport - Bus fare",), 30.0, 1),
+        ]
+        assert by_type[1].minimum == 20.0 and by_type[1].maximum == 120.0
+        assert [group.key[0] for group in by_day] == [date(2025, 3, 3), date(2025, 3, 15), date(2025, 4, 25)]
+        assert {group.key[0]: group.total for group in by_weekday} == {"Monday": 170.0, "Saturday": 30.0, "Friday": 20.0}
+        assert {group.key[0]: group.total for group in by_month} == {"2025-03": 200.0, "2025-04": 20.0}
+        assert {group.key[0]: group.total for group in by_month_part} == {"Beginning": 170.0, "Middle": 30.0, "End": 20.0}
+        assert [(group.key, group.total, group.count) for group in overall] == [((), 220.0, 4)]
+        assert [(group.total, group.count) for group in small] == [(50.0, 2)]
+
+    def test_extremes_and_feeling_counts(self, db_manager):
+        """
+        This method tests whether the largest and smallest records and the feeling counts respect the date range.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000013"))
+        asyncio.run(add_aggregate_expenses(db_manager, user_id))
+
+        async def _query():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                start_date, end_date = datetime(2025, 3, 1), datetime(2025, 4, 30)
+                return (
+                    await query_manager.get_user_extreme_amount_record("expense", user_id, start_date, end_date, largest=True),
+                    await query_manager.get_user_extreme_amount_record("expense", user_id, start_date, end_date, largest=False),
+                    await query_manager.count_user_feelings(user_id, start_date, end_date),
+                )
+
+        largest, smallest, feeling_counts = asyncio.run(_query())
+
+        assert largest.expense_amount == 120.0
+        assert smallest.expense_amount == 20.0
+        assert feeling_counts == [("Okay", 2), ("Worried", 1)]
+
+    def test_aggregate_rejects_unknown_columns(self, db_manager):
+        """
+        This method tests whether an unknown record type or group by column raises a ValueError.
+        """
+        async def _aggregate(record_type, group_by):
+            async with db_manager.session_scope() as session:
+                return await AsyncQueries(session=session).aggregate_user_amounts(
+                    record_type, 1, datetime(2025, 1, 1), datetime(2025, 12, 31), group_by=group_by
+                )
+
+        with pytest.raises(ValueError):
+            asyncio.run(_aggregate("transfer", ()))
+        with pytest.raises(ValueError):
+            asyncio.run(_aggregate("expense", ("hour",)))
+
+
+class TestDateRangeQueries:
+    """
+    Testing class that holds the methods related to reading a user's records in a date range.
+    """
+
+    def test_only_the_users_records_in_range(self, db_manager):
+        """
+        This method tests whether records of other users and records outside the range are left out.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000014"))
+        other_user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000015"))
+
+        async def _query():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                for owner in (user_id, other_user_id):
+                    for day in (date(2025, 1, 31), date(2025, 2, 1), date(2025, 2, 28), date(2025, 3, 1)):
+                        moment = datetime.combine(day, datetime.min.time())
+                        await query_manager.add(UnverifiedExpenses(user_id=owner, expense_type="Transport - Taxi fare", expense_amount=day.day, expense_date=moment))
+                        await query_manager.add(UnverifiedIncomes(user_id=owner, income_type="Salary - Domestic work", income_amount=day.day, income_date=moment))
+                        await query_manager.add(FinancialFeelings(user_id=owner, feeling="Okay", feeling_date=moment))
+                start_date, end_date = datetime(2025, 2, 1), datetime(2025, 2, 28, 23, 59)
+                return (
+                    await query_manager.get_user_expenses_by_date_range(user_id, start_date, end_date),
+                    await query_manager.get_user_incomes_by_date_range(user_id, start_date, end_date),
+                    await query_manager.get_user_feelings_by_date_range(user_id, start_date, end_date),
+                )
+
+        expenses, incomes, feelings = asyncio.run(_query())
+
+        assert sorted(record.expense_date.day for record in expenses) == [1, 28]
+        assert sorted(record.income_date.day for record in incomes) == [1, 28]
+        assert sorted(record.feeling_date.day for record in feelings) == [1, 28]
+        assert {record.user_id for record in expenses + incomes + feelings} == {user_id}
+
+    def test_range_query_searches_the_index(self, db_manager, statement_log):
+        """
+        This method tests whether the issued range query is answered from the (user_id, date) index on both bounds.
+        """
+        async def _plan():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).get_user_expenses_by_date_range(1, datetime(2025, 1, 1), datetime(2025, 6, 30))
+            async with db_manager.engine.connect() as conn:
+                result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement_log[-1]}", (1, "2025-01-01", "2025-06-30"))
+                return " ".join(row[-1] for row in result)
+
+        plan = asyncio.run(_plan())
+
+        assert "USING INDEX ix_UnverifiedExpenses_user_id_expense_date (user_id=? AND expense_date>? AND expense_date<?)" in plan
@@ -0,0 +1,186 @@
+"""
+Benchmarks of the report pipeline's CPU stages across history sizes, with pytest-benchmark.
+
+Each user's records are spread over the last 170 days, so every row falls in the six month
+report period; a size is the number of expenses, with a quarter as many incomes and a tenth
+as many feelings. Reports are built from a snapshot loaded once per size, so only the
+aggregation, analysis and rendering are timed. Sizes and timing can be changed with
+REPORT_BENCHMARK_SIZES (comma separated), REPORT_BENCHMARK_ROUNDS, REPORT_BENCHMARK_MAX_TIME
+and REPORT_BENCHMARK_ROUND_TIME.
+
+The regression check against the stored baseline, and saving a new baseline, are run with
+benchmarks/report_regression.py (from the poc directory):
+    python -m benchmarks.report_regression
+    python -m benchmarks.report_regression --save
+"""
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from api.behaviour.income_behaviour_analysis import IncomeBehaviouralInsights
+from api.db.db_manager import DatabaseManager
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+from api.db.synthetic_population import EXPENSE_TYPES, FEELINGS, INCOME_TYPES
+from api.finance.aggregator import FinancialAggregator
+from api.finance.category_reports import CategoryReportGenerator
+from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
+from api.finance.llm_gateway import InsightGateway, LocalInsightModel
+from api.finance.pdf_generator import FinancialReportPDF
+from api.finance.snapshot import UserFinancialSnapshot
+
+SIZES = [int(size) for size in os.getenv("REPORT_BENCHMARK_SIZES", "100,1000,10000").split(",")]
+ROUNDS = int(os.getenv("REPORT_BENCHMARK_ROUNDS", 5))
+MAX_TIME = float(os.getenv("REPORT_BENCHMARK_MAX_TIME", 0.2))
+# Calls taking microseconds are repeated within each round until it lasts ROUND_TIME seconds,
+# so timer resolution and scheduler noise are small next to what is measured
+ROUND_TIME = float(os.getenv("REPORT_BENCHMARK_ROUND_TIME", 0.005))
+# Rounds are repeated for at least MAX_TIME seconds and ROUNDS rounds, after one warm up call
+BENCHMARK_OPTIONS = {"min_rounds": ROUNDS, "max_time": MAX_TIME, "min_time": ROUND_TIME, "warmup": True, "warmup_iterations": 1}
+REPORT_TYPES = ("expenses", "incomes", "feelings", "comprehensive")
+CATEGORY_REPORTS = {
+    "expenses": CategoryReportGenerator.generate_expenses_report,
+    "incomes": CategoryReportGenerator.generate_incomes_report,
+    "feelings": CategoryReportGenerator.generate_feelings_report,
+}
+PHONE_NUMBER = "whatsapp:+27640000000"
+
+
+def history_records(user_id, size):
+    rng = random.Random(size)
+    now = datetime.now()
+    minutes = 170 * 1440
+
+    def _date():
+        return now - timedelta(minutes=rng.randrange(1, minutes))
+
+    records = [("expense", {
+        "user_id": user_id, "expense_type": rng.choice(EXPENSE_TYPES), "expense_amount": round(rng.uniform(5, 800), 2),
+        "expense_feeling": rng.choice(FEELINGS), "expense_date": _date(),
+    }) for _ in range(size)]
+    records += [("income", {
+        "user_id": user_id, "income_type": rng.choice(INCOME_TYPES), "income_amount": round(rng.uniform(100, 4000), 2),
+        "income_feeling": rng.choice(FEELINGS), "income_date": _date(),
+    }) for _ in range(size // 4)]
+    records += [("feeling", {"user_id": user_id, "feeling": rng.choice(FEELINGS), "feeling_date": _date()}) for _ in range(size // 10)]
+    return records
+
+
+@pytest.fixture(scope="module")
+def event_loop_runner():
+    """
+    One event loop for the module, so the async report methods are timed without loop start up.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def report_inputs(tmp_path_factory, event_loop_runner):
+    """
+    Per size: the benchmark user's snapshot and the four reports built from it.
+    """
+    db_manager = DatabaseManager(db_url=f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('benchmarks') / 'reports.db'}")
+
+    async def _load(size):
+        async with db_manager.session_scope() as session:
+            query_manager = AsyncQueries(session=session)
+            user = await query_manager.add(User(phone_number=f"whatsapp:+2764{size:08d}"))
+            await query_manager.bulk_insert_financial_records(history_records(user.id, size), commit=False)
+        snapshot = await UserFinancialSnapshot.load(db_manager, user.id)
+        generator = CategoryReportGenerator(user.id, db_manager=db_manager)
+        reports = {report_type: await report(generator, snapshot=snapshot) for report_type, report in CATEGORY_REPORTS.items()}
+        reports["comprehensive"] = await FinancialAggregator(user.id, db_manager=db_manager).get_comprehensive_financial_report(snapshot=snapshot)
+        return generator, snapshot, reports
+
+    event_loop_runner(db_manager.create_tables())
+    inputs = {size: event_loop_runner(_load(size)) for size in SIZES}
+    event_loop_runner(db_manager.dispose())
+    return inputs
+
+
+class TestReportBenchmarks:
+    """
+    Testing class that holds the methods related to timing the report pipeline's aggregation, analysis and rendering.
+    """
+
+    @pytest.mark.benchmark(group="comprehensive_report", **BENCHMARK_OPTIONS)
+    @pytest.mark.parametrize("size", SIZES)
+    def test_comprehensive_report(self, benchmark, event_loop_runner, report_inputs, size):
+        """
+        This method tests how long FinancialAggregator takes to build the comprehensive report.
+        """
+        generator, snapshot, _ = report_inputs[size]
+        aggregator = FinancialAggregator(generator.user_id, db_manager=generator.db_manager)
+
+        report = benchmark(lambda: event_loop_runner(aggregator.get_comprehensive_financial_report(snapshot=snapshot)))
+
+        assert report["summary"]["total_expenses"] == round(snapshot.expenses.overall.total, 2)
+
+    @pytest.mark.benchmark(group="category_report", **BENCHMARK_OPTIONS)
+    @pytest.mark.parametrize("size", SIZES)
+    @pytest.mark.parametrize("report_type", CATEGORY_REPORTS)
+    def test_category_report(self, benchmark, event_loop_runner, report_inputs, report_type, size):
+        """
+        This method tests how long CategoryReportGenerator takes to build each category report.
+        """
+        generator, snapshot, _ = report_inputs[size]
+
+        report = benchmark(lambda: event_loop_runner(CATEGORY_REPORTS[report_type](generator, snapshot=snapshot)))
+
+        assert "error" not in report
+
+    @pytest.mark.benchmark(group="income_behaviour", **BENCHMARK_OPTIONS)
+    @pytest.mark.parametrize("size", SIZES)
+    def test_income_behaviour_triggers(self, benchmark, report_inputs, size):
+        """
+        This method tests how long the income behaviour triggers take to find.
+        """
+        _, snapshot, _ = report_inputs[size]
+
+        result = benchmark(IncomeBehaviouralInsights().analyze_behavioral_triggers, snapshot.income_records)
+
+        assert result.get("has_data", True)
+
+    @pytest.mark.benchmark(group="ai_data_points", **BENCHMARK_OPTIONS)
+    @pytest.mark.parametrize("size", SIZES)
+    @pytest.mark.parametrize("report_type", REPORT_TYPES)
+    def test_extract_key_data_points(self, benchmark, report_inputs, report_type, size):
+        """
+        This method tests how long the analyzer takes to extract the data points sent to the model.
+        """
+        _, _, reports = report_inputs[size]
+        analyzer = PersonalizedGeminiAnalyzer(model=LocalInsightModel(), gateway=InsightGateway(max_entries=0))
+
+        assert benchmark(analyzer._extract_key_data_points, reports[report_type], report_type)
+
+    @pytest.mark.benchmark(group="ai_response", **BENCHMARK_OPTIONS)
+    @pytest.mark.parametrize("report_type", REPORT_TYPES)
+    def test_parse_personalized_response(self, benchmark, report_type):
+        """
+        This method tests how long the analyzer takes to parse the model's answer, whose length does not depend on the history.
+        """
+        analyzer = PersonalizedGeminiAnalyzer(model=LocalInsightModel(), gateway=InsightGateway(max_entries=0))
+
+        insights = benchmark(analyzer._parse_personalized_response, LocalInsightModel.RESPONSE, report_type)
+
+        assert insights["specific_concerns"]
+
+    @pytest.mark.benchmark(group="report_pdf", **BENCHMARK_OPTIONS)
+    @pytest.mark.parametrize("size", SIZES)
+    @pytest.mark.parametrize("report_type", REPORT_TYPES)
+    def test_category_report_pdf(self, benchmark, report_inputs, report_type, size):
+        """
+        This method tests how long each report's PDF takes to render.
+        """
+        _, _, reports = report_inputs[size]
+
+        pdf = benchmark(FinancialReportPDF().generate_category_report_pdf, reports[report_type], report_type, PHONE_NUMBER)
+
+        assert pdf.startswith(b"%PDF")
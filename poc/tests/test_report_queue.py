@@ -0,0 +1,253 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from api.db.models.tables import ReportJob
+from api.db.query_manager import AsyncQueries
+from api.services.report_queue import EXPIRED_ERROR, FAILURE_MESSAGE, ReportJobQueue
+from tests.conftest import create_conversation_user, db_manager
+
+
+async def _wait_for_status(queue: ReportJobQueue, job_id: int, statuses=("done", "failed"), timeout: float = 5) -> ReportJob:
+    async def _poll():
+        while True:
+            job = await queue.get_job(job_id)
+            if job.status in statuses:
+                return job
+            await asyncio.sleep(0.01)
+    return await asyncio.wait_for(_poll(), timeout)
+
+
+class _Recorder:
+    """Fake runner and notifier that record what the queue asked them to do."""
+
+    def __init__(self, failures: int = 0, delay: float = 0):
+        self.failures = failures
+        self.delay = delay
+        self.runs = []
+        self.sent = []
+        self.running = 0
+        self.max_running = 0
+
+    async def runner(self, job: ReportJob):
+        self.runs.append(job.id)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                return {"error": "generation failed", "messages": [{"body": "Sorry"}]}
+            return {"error": False, "messages": [{"body": f"{job.report_type} ready"}, {"body": "Link", "media_url": "https://example.com/r.pdf"}]}
+        finally:
+            self.running -= 1
+
+    async def notifier(self, to: str, message: dict) -> bool:
+        self.sent.append((to, message))
+        return True
+
+
+class TestReportJobQueue:
+    """
+    Testing class that holds the methods related to the report job queue.
+    """
+
+    def test_enqueue_generates_and_delivers(self, db_manager):
+        """
+        This method tests whether a queued report is generated by a worker and its messages are delivered in order.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000020"))
+        recorder = _Recorder()
+
+        async def _run():
+            queue = ReportJobQueue(db_manager, runner=recorder.runner, notifier=recorder.notifier, workers=2, poll_interval=0.05)
+            await queue.start()
+            try:
+                job_id = await queue.enqueue(user_id=user_id, phone_number="whatsapp:+27600000020", report_type="generate_expense_report")
+                return await _wait_for_status(queue, job_id), queue.stats()
+            finally:
+                await queue.stop()
+
+        job, stats = asyncio.run(_run())
+
+        assert job.status == "done"
+        assert job.attempts == 1
+        assert stats["completed"] == 1
+        assert [message["body"] for _, message in recorder.sent] == ["generate_expense_report ready", "Link"]
+        assert recorder.sent[1] == ("whatsapp:+27600000020", {"body": "Link", "media_url": "https://example.com/r.pdf"})
+
+    def test_failed_job_is_retried_then_reported(self, db_manager):
+        """
+        This method tests whether a failing report is retried up to max_attempts and the user is told it failed.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000021"))
+        recorder = _Recorder(failures=5)
+
+        async def _run():
+            queue = ReportJobQueue(db_manager, runner=recorder.runner, notifier=recorder.notifier, workers=1, max_attempts=3, poll_interval=0.05)
+            await queue.start()
+            try:
+                job_id = await queue.enqueue(user_id=user_id, phone_number="whatsapp:+27600000021", report_type="generate_income_report")
+                return await _wait_for_status(queue, job_id)
+            finally:
+                await queue.stop()
+
+        job = asyncio.run(_run())
+
+        assert job.status == "failed"
+        assert job.attempts == 3
+        assert job.last_error == "generation failed"
+        assert len(recorder.runs) == 3
+        assert recorder.sent == [("whatsapp:+27600000021", {"body": "Sorry"})]
+
+    def test_interrupted_jobs_survive_restart(self, db_manager):
+        """
+        This method tests whether jobs left queued, or running past their lease by a previous process, are processed.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000022"))
+        recorder = _Recorder()
+
+        async def _run():
+            await db_manager.create_tables()
+            async with db_manager.session_scope() as session:
+                queries = AsyncQueries(session=session)
+                queued = await queries.create_report_job(user_id=user_id, phone_number="whatsapp:+27600000022", report_type="generate_feelings_report")
+                running = await queries.create_report_job(user_id=user_id, phone_number="whatsapp:+27600000022", report_type="generate_expense_report")
+                await queries.update_report_job(running.id, status="running")
+
+            queue = ReportJobQueue(db_manager, runner=recorder.runner, notifier=recorder.notifier, workers=1, poll_interval=0.05, lease_seconds=0.2)
+            await queue.start()
+            try:
+                return [await _wait_for_status(queue, job_id) for job_id in (queued.id, running.id)]
+            finally:
+                await queue.stop()
+
+        jobs = asyncio.run(_run())
+
+        assert [job.status for job in jobs] == ["done", "done"]
+
+    def test_only_expired_leases_are_recovered(self, db_manager):
+        """
+        This method tests whether a running job renewed by a live process is left alone, while an expired one is run again or failed once out of attempts.
+        """
+        phone_number = "whatsapp:+27600000024"
+        user_id = asyncio.run(create_conversation_user(db_manager, phone_number))
+        recorder = _Recorder()
+
+        async def _run():
+            await db_manager.create_tables()
+            async with db_manager.session_scope() as session:
+                queries = AsyncQueries(session=session)
+                jobs = [await queries.create_report_job(user_id=user_id, phone_number=phone_number, report_type="generate_expense_report") for _ in range(3)]
+                leased, expired, exhausted = [job.id for job in jobs]
+                an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+                for job_id, attempts, updated_at in ((leased, 1, datetime.utcnow()), (expired, 1, an_hour_ago), (exhausted, 2, an_hour_ago)):
+                    await session.execute(update(ReportJob).where(ReportJob.id == job_id).values(status="running", attempts=attempts, updated_at=updated_at))
+                await session.commit()
+
+            queue = ReportJobQueue(db_manager, runner=recorder.runner, notifier=recorder.notifier, workers=1, max_attempts=2, poll_interval=0.05, lease_seconds=30)
+            await queue.start()
+            try:
+                finished = [await _wait_for_status(queue, job_id) for job_id in (expired, exhausted)]
+                await asyncio.sleep(0.2)
+                return finished, await queue.get_job(leased), queue.stats()
+            finally:
+                await queue.stop()
+
+        (expired, exhausted), leased, stats = asyncio.run(_run())
+
+        assert leased.status == "running"
+        assert expired.status == "done" and expired.attempts == 2
+        assert exhausted.status == "failed" and exhausted.attempts == 2
+        assert exhausted.last_error == EXPIRED_ERROR
+        assert recorder.runs == [expired.id]
+        assert recorder.sent[0] == (phone_number, FAILURE_MESSAGE)
+        assert stats["expired"] == 1 and stats["failed"] == 1
+
+    def test_running_job_renews_its_lease(self, db_manager):
+        """
+        This method tests whether a job running for longer than its lease keeps it and is run only once.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000025"))
+        recorder = _Recorder(delay=0.5)
+
+        async def _run():
+            queue = ReportJobQueue(db_manager, runner=recorder.runner, notifier=recorder.notifier, workers=2, poll_interval=0.05, lease_seconds=0.15)
+            await queue.start()
+            try:
+                job_id = await queue.enqueue(user_id=user_id, phone_number="whatsapp:+27600000025", report_type="generate_income_report")
+                return await _wait_for_status(queue, job_id), queue.stats()
+            finally:
+                await queue.stop()
+
+        job, stats = asyncio.run(_run())
+
+        assert job.status == "done" and job.attempts == 1
+        assert recorder.runs == [job.id]
+        assert stats["expired"] == 0
+
+    def test_job_taken_over_is_not_delivered(self, db_manager):
+        """
+        This method tests whether a worker whose job was reclaimed by another process neither delivers it nor overwrites its status.
+        """
+        phone_number = "whatsapp:+27600000026"
+        user_id = asyncio.run(create_conversation_user(db_manager, phone_number))
+        recorder = _Recorder()
+        cancelled = []
+
+        async def _taken_over_runner(job: ReportJob):
+            # Another process requeued and claimed the job again, holding its lease well past the test
+            async with db_manager.session_scope() as session:
+                await session.execute(
+                    update(ReportJob).where(ReportJob.id == job.id)
+                    .values(attempts=job.attempts + 1, updated_at=datetime.utcnow() + timedelta(hours=1))
+                )
+                await session.commit()
+            try:
+                # The first job finishes before a renewal, the second runs until a renewal finds the lease gone
+                await asyncio.sleep(0 if job.report_type == "generate_expense_report" else 2)
+            except asyncio.CancelledError:
+                cancelled.append(job.id)
+                raise
+            return await recorder.runner(job)
+
+        async def _run():
+            queue = ReportJobQueue(db_manager, runner=_taken_over_runner, notifier=recorder.notifier, workers=2, poll_interval=0.05, lease_seconds=0.15)
+            await queue.start()
+            try:
+                job_ids = [await queue.enqueue(user_id=user_id, phone_number=phone_number, report_type=report_type) for report_type in ("generate_expense_report", "generate_income_report")]
+                await asyncio.sleep(0.3)
+                return [await queue.get_job(job_id) for job_id in job_ids], queue.stats()
+            finally:
+                await queue.stop()
+
+        (finished, abandoned), stats = asyncio.run(_run())
+
+        assert recorder.sent == []
+        assert cancelled == [abandoned.id]
+        assert finished.status == abandoned.status == "running"
+        assert finished.attempts == abandoned.attempts == 2
+        assert stats["lost"] == 2 and stats["completed"] == 0
+
+    def test_generation_concurrency_limit(self, db_manager):
+        """
+        This method tests whether no more reports are generated at once than the generation limit allows.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000023"))
+        recorder = _Recorder(delay=0.05)
+
+        async def _run():
+            queue = ReportJobQueue(db_manager, runner=recorder.runner, notifier=recorder.notifier, workers=4, generation_concurrency=2, poll_interval=0.05)
+            await queue.start()
+            try:
+                job_ids = [await queue.enqueue(user_id=user_id, phone_number="whatsapp:+27600000023", report_type="generate_expense_report") for _ in range(6)]
+                return [await _wait_for_status(queue, job_id) for job_id in job_ids]
+            finally:
+                await queue.stop()
+
+        jobs = asyncio.run(_run())
+
+        assert all(job.status == "done" for job in jobs)
+        assert sorted(recorder.runs) == [job.id for job in jobs]
+        assert recorder.max_running == 2
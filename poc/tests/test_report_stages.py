@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from api.db.models.tables import User
+from api.db.query_manager import AsyncQueries
+from api.finance.gemini_analyzer import PersonalizedGeminiAnalyzer
+from api.finance.llm_gateway import InsightGateway, LocalInsightModel
+from api.finance.pdf_pool import PDFRenderPool
+from api.finance.report import PersonalizedReportDispatcher
+from api.finance.report_stages import ReportStage, ReportStageProfile, run_report_stages
+from api.services.local_storage import LocalReportStorage
+from tests.conftest import create_conversation_user, db_manager
+
+
+def sleeping_stage(name, seconds, depends_on=(), log=None):
+    async def _run(done):
+        await asyncio.sleep(seconds)
+        if log is not None:
+            log.append(name)
+        return name
+    return ReportStage(name, _run, depends_on)
+
+
+class TestReportStages:
+    """
+    Testing class that holds the methods related to running the report pipeline stages.
+    """
+
+    def test_independent_stages_run_concurrently(self):
+        """
+        This method tests whether stages wait only for their dependencies and record their own timings.
+        """
+        log = []
+        stages = [
+            sleeping_stage("fetch", 0.02, log=log),
+            sleeping_stage("ai_insights", 0.15, ("fetch",), log=log),
+            sleeping_stage("pdf", 0.1, ("fetch",), log=log),
+            sleeping_stage("upload", 0.03, ("pdf",), log=log),
+        ]
+
+        async def _run():
+            start = time.perf_counter()
+            results, timings = await run_report_stages(stages)
+            return results, timings, time.perf_counter() - start
+
+        results, timings, elapsed = asyncio.run(_run())
+
+        assert results == {name: name for name in ("fetch", "ai_insights", "pdf", "upload")}
+        assert log == ["fetch", "pdf", "upload", "ai_insights"]
+        assert elapsed < 0.25
+        assert timings["ai_insights"] >= 150
+        assert set(timings) == {"fetch", "ai_insights", "pdf", "upload"}
+
+    def test_failure_cancels_running_stages(self):
+        """
+        This method tests whether a failing stage cancels the others and stages must follow their dependencies.
+        """
+        log = []
+
+        async def _fail(done):
+            raise RuntimeError("render failed")
+
+        stages = [sleeping_stage("fetch", 0.0), ReportStage("pdf", _fail, ("fetch",)), sleeping_stage("ai_insights", 0.2, ("fetch",), log=log)]
+
+        with pytest.raises(RuntimeError, match="render failed"):
+            asyncio.run(run_report_stages(stages))
+        assert log == []
+
+        with pytest.raises(ValueError):
+            asyncio.run(run_report_stages([sleeping_stage("upload", 0.0, ("pdf",)), sleeping_stage("pdf", 0.0)]))
+
+    def test_dispatcher_overlaps_ai_insights_with_pdf_and_upload(self, db_manager, tmp_path):
+        """
+        This method tests whether the dispatcher renders and uploads the PDF while the AI insights are generated.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000070"))
+        profile = ReportStageProfile()
+        analyzer = PersonalizedGeminiAnalyzer(model=LocalInsightModel(delay_seconds=0.3), gateway=InsightGateway(max_entries=10, ttl_seconds=60))
+        storage = LocalReportStorage(directory=str(tmp_path / "reports"), base_url="http://localhost:8000/files/")
+
+        async def _generate():
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).bulk_insert_financial_records([
+                    ("expense", {"user_id": user_id, "expense_type": "Transport - Taxi", "expense_amount": 25.0, "expense_feeling": "Okay", "expense_date": datetime.now()})
+                ])
+            dispatcher = PersonalizedReportDispatcher(
+                User(id=user_id, phone_number="whatsapp:+27600000070"), db_manager=db_manager,
+                pdf_pool=PDFRenderPool(max_workers=0), pdf_cache=None, ai_analyzer=analyzer, stage_profile=profile
+            )
+            report = await dispatcher.generate_personalized_report("expenses", report_storage=storage)
+            missing = await dispatcher.generate_personalized_report("incomes", report_storage=storage)
+            return report, missing
+
+        report, missing = asyncio.run(_generate())
+        timings = report["stage_timings_ms"]
+
+        assert report["report_data"]["summary"]["total_expenses"] == 25.0
+        assert report["pdf_bytes"].startswith(b"%PDF")
+        assert report["presigned_url"].startswith("http://localhost:8000/files/reports/")
+        assert report["personalized_ai_insights"]["ai_confidence"] == "High"
+        assert set(timings) == {"fetch", "aggregate", "ai_insights", "pdf", "upload", "total"}
+        assert timings["total"] < sum(timings[stage] for stage in ("fetch", "aggregate", "ai_insights", "pdf", "upload"))
+        assert missing == {"error": "No income data found for the specified period"}
+        assert profile.stats()["expenses.ai_insights"]["count"] == 1
+        assert "incomes.pdf" not in profile.stats()
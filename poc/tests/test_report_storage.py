@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.services import report_storage as report_storage_module
+from api.services.local_storage import LocalReportStorage
+from api.services.report_storage import close_report_storage, get_report_storage
+from api.services.s3_bucket import SecureS3Service
+
+S3_ENV = {"AWS_ACCESS_KEY_ID": "key", "AWS_SECRET_ACCESS_KEY": "secret", "AWS_S3_BUCKET_NAME": "reports"}
+
+
+class TestSecureS3Service:
+    """
+    Testing class that holds the methods related to the non-blocking S3 report storage.
+    """
+
+    def test_boto3_calls_run_off_the_event_loop(self):
+        """
+        This method tests whether every boto3 call runs in a worker thread and the bucket is only checked once.
+        """
+        s3_client = MagicMock()
+        call_threads = []
+        for name in ("head_bucket", "upload_fileobj", "generate_presigned_url", "delete_object"):
+            getattr(s3_client, name).side_effect = lambda *args, _name=name, **kwargs: call_threads.append((_name, threading.get_ident())) or "https://example.com/report.pdf"
+
+        async def _upload_twice_and_delete():
+            with patch.dict(os.environ, S3_ENV):
+                service = SecureS3Service(s3_client=s3_client)
+            await service.upload_pdf_from_bytes_secure(pdf_bytes=b"%PDF-1", user_id=1, report_type="expenses")
+            await service.upload_pdf_from_bytes_secure(pdf_bytes=b"%PDF-2", user_id=1, report_type="incomes")
+            await service.delete_file("reports/1/expenses_report_1.pdf")
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(_upload_twice_and_delete())
+
+        assert [name for name, _ in call_threads].count("head_bucket") == 1
+        assert len(call_threads) == 6
+        assert all(thread != loop_thread for _, thread in call_threads)
+
+    def test_shared_client_uses_connection_pool_config(self):
+        """
+        This method tests whether the process-wide backend builds one S3 client with the configured pool size.
+        """
+        env = dict(S3_ENV, REPORT_STORAGE_BACKEND="s3", S3_MAX_POOL_CONNECTIONS="25")
+        close_report_storage()
+        try:
+            with patch.dict(os.environ, env), patch("api.services.s3_bucket.boto3.client") as mock_client_factory:
+                first = get_report_storage()
+                second = get_report_storage()
+
+            assert first is second
+            assert mock_client_factory.call_count == 1
+            assert mock_client_factory.call_args.kwargs["config"].max_pool_connections == 25
+        finally:
+            close_report_storage()
+
+
+class TestLocalReportStorage:
+    """
+    Testing class that holds the methods related to the local filesystem report storage.
+    """
+
+    def test_upload_delete_and_cleanup(self, tmp_path):
+        """
+        This method tests whether reports are stored under the S3 key layout, can be deleted and old ones are cleaned up.
+        """
+        storage = LocalReportStorage(directory=str(tmp_path), base_url="http://localhost:8000/files/")
+
+        async def _exercise():
+            url = await storage.upload_pdf_from_bytes_secure(pdf_bytes=b"%PDF-local", user_id=3, report_type="expenses")
+            object_name = url.removeprefix("http://localhost:8000/files/")
+            stored = (tmp_path / object_name).read_bytes()
+            refreshed = await storage.generate_new_presigned_url(object_name)
+
+            old = tmp_path / "reports" / "3" / "incomes_report_1.pdf"
+            old.write_bytes(b"%PDF-old")
+            os.utime(old, (time.time() - 10 * 86400,) * 2)
+            await storage.cleanup_old_files(days_old=7)
+            old_exists = old.exists()
+
+            deleted = await storage.delete_file(object_name)
+            missing = await storage.generate_new_presigned_url(object_name)
+            return object_name, stored, refreshed, url, old_exists, deleted, missing
+
+        object_name, stored, refreshed, url, old_exists, deleted, missing = asyncio.run(_exercise())
+
+        assert object_name.startswith("reports/3/expenses_report_")
+        assert stored == b"%PDF-local"
+        assert refreshed == url
+        assert old_exists is False
+        assert deleted is True
+        assert missing is None
+
+    def test_rejects_paths_outside_the_directory(self, tmp_path):
+        """
+        This method tests whether object names cannot escape the storage directory.
+        """
+        storage = LocalReportStorage(directory=str(tmp_path / "storage"))
+
+        assert asyncio.run(storage.delete_file("../outside.pdf")) is False
+        with pytest.raises(ValueError):
+            storage._path("../outside.pdf")
+
+    def test_backend_selected_from_environment(self, tmp_path):
+        """
+        This method tests whether REPORT_STORAGE_BACKEND switches the process-wide backend to local storage.
+        """
+        close_report_storage()
+        try:
+            with patch.dict(os.environ, {"REPORT_STORAGE_BACKEND": "local", "REPORT_STORAGE_LOCAL_DIR": str(tmp_path)}):
+                storage = get_report_storage()
+
+            assert isinstance(storage, LocalReportStorage)
+            assert storage.directory == tmp_path.resolve()
+        finally:
+            close_report_storage()
+        assert report_storage_module._report_storage is None
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from api.services.local_storage import LocalReportStorage
+from api.services.retention import ReportRetentionSweeper, RetentionSweepResult, is_report_key
+from api.services.s3_bucket import SecureS3Service
+
+S3_ENV = {"AWS_ACCESS_KEY_ID": "key", "AWS_SECRET_ACCESS_KEY": "secret", "AWS_S3_BUCKET_NAME": "reports", "S3_DELETE_REQUESTS_PER_SECOND": "1000"}
+
+
+def paginated_s3_client(objects, page_size=1000):
+    """Build a mock S3 client whose list_objects_v2 paginator yields the objects in pages."""
+    s3_client = MagicMock()
+    pages = [{"Contents": objects[i:i + page_size]} for i in range(0, len(objects), page_size)] or [{}]
+    s3_client.get_paginator.return_value.paginate.return_value = pages
+    s3_client.delete_objects.return_value = {}
+    return s3_client
+
+
+class TestS3RetentionSweep:
+    """
+    Testing class that holds the methods related to the paginated S3 report cleanup.
+    """
+
+    def test_sweeps_every_page_in_batches(self):
+        """
+        This method tests whether the cleanup walks past the first 1000 keys and deletes expired ones in batches of at most 1000.
+        """
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        recent = datetime.now(timezone.utc)
+        objects = [{"Key": f"reports/{i}/expenses_report_{i}.pdf", "LastModified": old} for i in range(2300)]
+        objects += [{"Key": "whatsapp:+27600000001/reports/incomes_report_1.pdf", "LastModified": old}]
+        objects += [{"Key": "reports/1/fresh_report.pdf", "LastModified": recent}]
+        objects += [{"Key": "backups/db.sqlite", "LastModified": old}]
+        s3_client = paginated_s3_client(objects)
+
+        with patch.dict(os.environ, S3_ENV):
+            service = SecureS3Service(s3_client=s3_client)
+        result = asyncio.run(service.cleanup_old_files(days_old=7))
+
+        deleted_keys = [
+            obj["Key"]
+            for call in s3_client.delete_objects.call_args_list
+            for obj in call.kwargs["Delete"]["Objects"]
+        ]
+        batch_sizes = [len(call.kwargs["Delete"]["Objects"]) for call in s3_client.delete_objects.call_args_list]
+
+        assert result.scanned == 2303
+        assert result.expired == result.deleted == 2301
+        assert result.delete_requests == 3
+        assert batch_sizes == [1000, 1000, 301]
+        assert "whatsapp:+27600000001/reports/incomes_report_1.pdf" in deleted_keys
+        assert "reports/1/fresh_report.pdf" not in deleted_keys
+        assert "backups/db.sqlite" not in deleted_keys
+
+    def test_counts_keys_that_failed_to_delete(self):
+        """
+        This method tests whether keys reported back by delete_objects are counted as errors instead of deletions.
+        """
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        s3_client = paginated_s3_client([{"Key": f"reports/1/report_{i}.pdf", "LastModified": old} for i in range(3)])
+        s3_client.delete_objects.return_value = {"Errors": [{"Key": "reports/1/report_0.pdf", "Code": "AccessDenied", "Message": "denied"}]}
+
+        with patch.dict(os.environ, S3_ENV):
+            service = SecureS3Service(s3_client=s3_client)
+        result = asyncio.run(service.cleanup_old_files(days_old=7))
+
+        assert result.deleted == 2
+        assert result.errors == 1
+
+    def test_delete_requests_are_rate_limited(self):
+        """
+        This method tests whether consecutive delete batches are spaced by the configured request rate.
+        """
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        s3_client = paginated_s3_client([{"Key": f"reports/1/report_{i}.pdf", "LastModified": old} for i in range(3000)])
+
+        with patch.dict(os.environ, dict(S3_ENV, S3_DELETE_REQUESTS_PER_SECOND="20")):
+            service = SecureS3Service(s3_client=s3_client)
+        result = asyncio.run(service.cleanup_old_files(days_old=7))
+
+        assert result.delete_requests == 3
+        assert result.duration_seconds >= 2 / 20
+
+
+class TestReportRetentionSweeper:
+    """
+    Testing class that holds the methods related to the scheduled report retention sweeper.
+    """
+
+    def test_report_key_layouts(self):
+        """
+        This method tests whether both the current and the legacy report key layouts are recognised.
+        """
+        assert is_report_key("reports/1/expenses_report_1.pdf")
+        assert is_report_key("whatsapp:+27600000001/reports/expenses_report_1.pdf")
+        assert not is_report_key("exports/1/data.csv")
+
+    def test_scheduled_sweeps_record_metrics(self, tmp_path):
+        """
+        This method tests whether the schedule sweeps the local backend and accumulates the counts.
+        """
+        storage = LocalReportStorage(directory=str(tmp_path))
+        reports = tmp_path / "reports" / "1"
+        reports.mkdir(parents=True)
+        for name, age_days in (("old_a.pdf", 10), ("old_b.pdf", 8), ("new.pdf", 1)):
+            (reports / name).write_bytes(b"%PDF")
+            os.utime(reports / name, (time.time() - age_days * 86400,) * 2)
+
+        async def _run_schedule():
+            sweeper = ReportRetentionSweeper(storage, retention_days=7, interval_hours=0.01 / 3600, initial_delay=0)
+            sweeper.start()
+            while sweeper.sweeps < 2:
+                await asyncio.sleep(0.01)
+            await sweeper.stop()
+            return sweeper
+
+        sweeper = asyncio.run(_run_schedule())
+        stats = sweeper.stats()
+
+        assert sorted(path.name for path in reports.iterdir()) == ["new.pdf"]
+        assert stats["totals"]["deleted"] == 2
+        assert stats["last"]["scanned"] == 1
+        assert stats["last"]["deleted"] == 0
+        assert not sweeper.is_running
+
+    def test_failed_sweep_keeps_the_schedule_alive(self):
+        """
+        This method tests whether an exception from the backend does not stop later sweeps.
+        """
+        storage = MagicMock()
+        calls = []
+
+        async def cleanup_old_files(days_old):
+            calls.append(days_old)
+            if len(calls) == 1:
+                raise RuntimeError("storage unavailable")
+            return RetentionSweepResult(scanned=1)
+
+        storage.cleanup_old_files = cleanup_old_files
+
+        async def _run_schedule():
+            sweeper = ReportRetentionSweeper(storage, retention_days=3, interval_hours=0.01 / 3600, initial_delay=0)
+            sweeper.start()
+            while sweeper.sweeps < 1:
+                await asyncio.sleep(0.01)
+            await sweeper.stop()
+            return sweeper
+
+        sweeper = asyncio.run(_run_schedule())
+
+        assert calls[:2] == [3, 3]
+        assert sweeper.totals.scanned >= 1
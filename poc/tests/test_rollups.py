@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from api.db.models.tables import FinancialFeelings, MonthlyRollup, UnverifiedExpenses
+from api.db.query_manager import AsyncQueries, month_key, month_start
+from api.db.rebuild_rollups import rebuild_monthly_rollups
+from api.finance.record_aggregates import RecordAggregates, closed_months, uncovered_ranges
+from tests.conftest import create_conversation_user, db_manager
+
+
+def expense(user_id, expense_type, amount, expense_date):
+    return UnverifiedExpenses(user_id=user_id, expense_type=expense_type, expense_amount=amount, expense_feeling="Worried", expense_date=expense_date)
+
+
+class TestReportPeriodSplit:
+    """
+    Testing class that holds the methods related to splitting a report period between rollups and records.
+    """
+
+    def test_closed_months_are_whole_and_ended(self):
+        """
+        This method tests whether only whole months before the current month are read from rollups.
+        """
+        now = datetime(2025, 6, 17, 12)
+
+        assert closed_months(datetime(2025, 1, 15), now, now=now) == ["2025-02", "2025-03", "2025-04", "2025-05"]
+        assert closed_months(datetime(2025, 2, 1), now, now=now)[0] == "2025-02"
+        assert closed_months(datetime(2025, 6, 2), now, now=now) == []
+
+    def test_uncovered_ranges_skip_rolled_up_months(self):
+        """
+        This method tests whether the partial first month, gaps in the rollups and the open month are read from records.
+        """
+        ranges = uncovered_ranges(datetime(2025, 1, 15), datetime(2025, 6, 17), ["2025-02", "2025-04", "2025-05"])
+
+        assert ranges == [
+            (datetime(2025, 1, 15), datetime(2025, 2, 1) - timedelta(microseconds=1)),
+            (datetime(2025, 3, 1), datetime(2025, 4, 1) - timedelta(microseconds=1)),
+            (datetime(2025, 6, 1), datetime(2025, 6, 17)),
+        ]
+
+
+class TestMonthlyRollups:
+    """
+    Testing class that holds the methods related to maintaining and reading the monthly rollups.
+    """
+
+    def test_inserts_maintain_touched_months(self, db_manager):
+        """
+        This method tests whether inserting records recomputes the rollups of the months they fall in.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000060"))
+
+        async def _insert_and_read():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                await query_manager.insert_user_unverified_expenses(user_id, [
+                    expense(user_id, "Transport - Taxi fare", 40.0, datetime(2025, 3, 3, 7)),
+                    expense(user_id, "Food & Groceries - Shoprite", 200.0, datetime(2025, 3, 20, 18)),
+                ])
+                await query_manager.insert_user_unverified_expenses(user_id, [expense(user_id, "Transport - Bus fare", 10.0, datetime(2025, 3, 31, 23))])
+                await query_manager.insert_user_financial_feelings(user_id, [FinancialFeelings(user_id=user_id, feeling="Okay", feeling_date=datetime(2025, 4, 2))])
+                rows = (await session.execute(select(MonthlyRollup).where(MonthlyRollup.user_id == user_id))).scalars().all()
+            return rows
+
+        rows = asyncio.run(_insert_and_read())
+        expense_rows = {(row.dimension, row.group_key): row for row in rows if row.record_type == "expense"}
+
+        assert expense_rows[("month", "2025-03")].total == 250.0
+        assert expense_rows[("month", "2025-03")].count == 3
+        assert expense_rows[("type", "Transport - Taxi fare")].maximum == 40.0
+        assert expense_rows[("weekday", "Monday")].total == 50.0
+        assert expense_rows[("month_part", "End")].total == 10.0
+        assert expense_rows[("day", "2025-03-20")].first_id == expense_rows[("type", "Food & Groceries - Shoprite")].first_id
+        assert {(row.dimension, row.group_key, row.count) for row in rows if row.record_type == "feeling"} == {("type", "Okay", 1), ("month", "2025-04", 1)}
+
+    def test_reports_read_closed_months_from_rollups(self, db_manager):
+        """
+        This method tests whether closed months come from the rollups, the open month from records, with the same totals.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000061"))
+        now = datetime.now()
+        previous_month = month_start(month_key(month_start(month_key(now)) - timedelta(days=1)))
+        start_date, end_date = previous_month - timedelta(days=10), now
+
+        async def _load(query_manager):
+            return await RecordAggregates.load(
+                query_manager, "expense", user_id, start_date, end_date, group_by=("type", "weekday", "month"), extremes=True, small_below=50
+            )
+
+        async def _scenario():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                await query_manager.insert_user_unverified_expenses(user_id, [
+                    expense(user_id, "Transport - Taxi fare", 40.0, previous_month - timedelta(days=2)),
+                    expense(user_id, "Transport - Taxi fare", 60.0, previous_month),
+                    expense(user_id, "Food & Groceries - Shoprite", 200.0, previous_month + timedelta(days=5)),
+                    expense(user_id, "Personal Care - Haircut", 20.0, previous_month + timedelta(days=6)),
+                    expense(user_id, "Food & Groceries - Shoprite", 30.0, month_start(month_key(now))),
+                ])
+                rolled_up = await _load(query_manager)
+                # Tamper with the closed month's rollup to show it is what the report reads
+                await session.execute(
+                    update(MonthlyRollup)
+                    .where(MonthlyRollup.user_id == user_id, MonthlyRollup.dimension == "month", MonthlyRollup.month == month_key(previous_month))
+                    .values(total=MonthlyRollup.total + 1000)
+                )
+                tampered = await _load(query_manager)
+            return rolled_up, tampered
+
+        rolled_up, tampered = asyncio.run(_scenario())
+
+        assert rolled_up.overall.total == 350.0
+        assert {category: totals.total for category, totals in rolled_up.by_category.items()} == {"Transport": 100.0, "Food & Groceries": 230.0, "Personal Care": 20.0}
+        assert rolled_up.by_month[month_key(previous_month)].total == 280.0
+        assert (rolled_up.small.total, rolled_up.small.count) == (90.0, 3)
+        assert rolled_up.largest.expense_amount == 200.0
+        assert rolled_up.smallest.expense_type == "Personal Care - Haircut"
+        assert tampered.by_month[month_key(previous_month)].total == 1280.0
+        assert tampered.by_type == rolled_up.by_type
+
+    def test_rebuild_backfills_records_written_without_rollups(self, db_manager):
+        """
+        This method tests whether the rebuild command rolls up the months of records added without the insert methods.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000062"))
+
+        async def _add_and_rebuild():
+            async with db_manager.session_scope() as session:
+                query_manager = AsyncQueries(session=session)
+                await query_manager.add(expense(user_id, "Transport - Taxi fare", 40.0, datetime(2025, 1, 10)))
+                await query_manager.add(expense(user_id, "Transport - Taxi fare", 15.0, datetime(2025, 3, 10)))
+            results = await rebuild_monthly_rollups(db_manager, [user_id])
+            async with db_manager.session_scope() as session:
+                rolled_up, groups = await AsyncQueries(session=session).get_monthly_rollups(user_id, "expense", ["2025-01", "2025-02", "2025-03"], ("type",))
+            return results, rolled_up, groups
+
+        results, rolled_up, groups = asyncio.run(_add_and_rebuild())
+
+        assert results[user_id] == {"expense": 2, "income": 0, "feeling": 0}
+        assert rolled_up == {"2025-01", "2025-03"}
+        assert [(group.key, group.total) for group in groups["type"]] == [(("Transport - Taxi fare",), 40.0), (("Transport - Taxi fare",), 15.0)]
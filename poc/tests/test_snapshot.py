@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from api.db.models.tables import FinancialFeelings, UnverifiedExpenses, UnverifiedIncomes
+from api.db.query_manager import AsyncQueries
+from api.finance.aggregator import FinancialAggregator
+from api.finance.category_reports import CategoryReportGenerator
+from api.finance.snapshot import FinancialSnapshotCache
+from tests.conftest import create_conversation_user, db_manager, statement_log
+
+
+async def add_records(db_manager, user_id):
+    now = datetime.now()
+    async with db_manager.session_scope() as session:
+        query_manager = AsyncQueries(session=session)
+        for days_ago, (expense_type, amount) in enumerate((("Food & Groceries - Shoprite", 300.0), ("Transport - Taxi fare", 40.0), ("Entertainment - Movies", 120.0))):
+            await query_manager.add(UnverifiedExpenses(user_id=user_id, expense_type=expense_type, expense_amount=amount, expense_feeling="Worried", expense_date=now - timedelta(days=days_ago)))
+        await query_manager.add(UnverifiedIncomes(user_id=user_id, income_type="Salary - Domestic work", income_amount=2500.0, income_feeling="Okay", income_date=now - timedelta(days=1)))
+        await query_manager.add(FinancialFeelings(user_id=user_id, feeling="Worried", feeling_date=now - timedelta(days=2)))
+
+
+class TestFinancialSnapshotCache:
+    """
+    Testing class that holds the methods related to the financial snapshot shared by the report generators.
+    """
+
+    def test_reports_share_one_snapshot(self, db_manager, statement_log):
+        """
+        This method tests whether the comprehensive and category reports of one user are built from a single load.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000050"))
+        asyncio.run(add_records(db_manager, user_id))
+        cache = FinancialSnapshotCache(max_entries=10, ttl_seconds=60)
+        category_generator = CategoryReportGenerator(user_id, db_manager=db_manager, snapshot_cache=cache)
+        comprehensive_generator = FinancialAggregator(user_id, db_manager=db_manager, snapshot_cache=cache)
+
+        async def _reports():
+            comprehensive = await comprehensive_generator.get_comprehensive_financial_report(6)
+            selects_after_first = len([s for s in statement_log if s.lstrip().upper().startswith("SELECT")])
+            expenses = await category_generator.generate_expenses_report(6)
+            incomes = await category_generator.generate_incomes_report(6)
+            feelings = await category_generator.generate_feelings_report(6)
+            selects = len([s for s in statement_log if s.lstrip().upper().startswith("SELECT")])
+            return comprehensive, expenses, incomes, feelings, selects_after_first, selects
+
+        statement_log.clear()
+        comprehensive, expenses, incomes, feelings, selects_after_first, selects = asyncio.run(_reports())
+
+        assert comprehensive["summary"]["total_expenses"] == 460.0
+        assert expenses["summary"]["total_expenses"] == 460.0
+        assert incomes["summary"]["total_income"] == 2500.0
+        assert feelings["report_type"] == "Financial Wellness Analysis"
+        assert selects == selects_after_first
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 3
+
+    def test_concurrent_loads_are_coalesced(self, db_manager):
+        """
+        This method tests whether reports requested at the same time wait for one shared load.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000051"))
+        asyncio.run(add_records(db_manager, user_id))
+        cache = FinancialSnapshotCache(max_entries=10, ttl_seconds=60)
+
+        async def _load_together():
+            return await asyncio.gather(*(cache.load(db_manager, user_id, 6) for _ in range(3)))
+
+        snapshots = asyncio.run(_load_together())
+
+        assert snapshots[0] is snapshots[1] is snapshots[2]
+        assert snapshots[0].expenses.overall.count == 3
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["coalesced"] == 2
+
+    def test_invalidation_and_expiry_reload(self, db_manager):
+        """
+        This method tests whether new records and the TTL make the next report read the database again.
+        """
+        user_id = asyncio.run(create_conversation_user(db_manager, "whatsapp:+27600000052"))
+        asyncio.run(add_records(db_manager, user_id))
+        cache = FinancialSnapshotCache(max_entries=10, ttl_seconds=60)
+
+        async def _load_after_new_record():
+            first = await cache.load(db_manager, user_id, 6)
+            async with db_manager.session_scope() as session:
+                await AsyncQueries(session=session).add(UnverifiedExpenses(user_id=user_id, expense_type="Transport - Bus fare", expense_amount=20.0, expense_date=datetime.now()))
+            cache.invalidate_user(user_id)
+            second = await cache.load(db_manager, user_id, 6)
+            return first, second
+
+        first, second = asyncio.run(_load_after_new_record())
+
+        assert first.expenses.overall.count == 3
+        assert second.expenses.overall.count == 4
+
+        expiring = FinancialSnapshotCache(max_entries=10, ttl_seconds=0.01)
+
+        async def _load_after_expiry():
+            await expiring.load(db_manager, user_id, 6)
+            await asyncio.sleep(0.02)
+            await expiring.load(db_manager, user_id, 6)
+
+        asyncio.run(_load_after_expiry())
+
+        assert expiring.stats()["misses"] == 2
+        assert expiring.stats()["expirations"] == 1
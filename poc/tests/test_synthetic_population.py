@@ -0,0 +1,60 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from api.db.models.tables import LanguagePreference, MessageState, MonthlyRollup, UnverifiedExpenses
+from api.db.synthetic_population import (
+    EXPENSE_TYPES,
+    INCOME_TYPES,
+    load_population,
+    population_months,
+    synthetic_phone_number,
+    synthetic_user_records,
+)
+from tests.conftest import db_manager
+
+
+class TestSyntheticPopulation:
+    """
+    Testing class that holds the methods related to generating and loading the synthetic user population.
+    """
+
+    def test_records_reproducible_per_seed_and_user(self):
+        """
+        This method tests whether a user's records depend only on the seed and their index, and fall in the population's months.
+        """
+        months = population_months(3, "2025-02")
+        records = synthetic_user_records(1, 5, 7, months)
+
+        assert months == ["2024-11", "2024-12", "2025-01"]
+        assert records == synthetic_user_records(1, 5, 7, months)
+        assert records != synthetic_user_records(1, 5, 8, months)
+        assert records != synthetic_user_records(1, 6, 7, months)
+        assert {values[f"{kind}_date"].strftime("%Y-%m") for kind, values in records} == set(months)
+        assert all(values["expense_type"] in EXPENSE_TYPES for kind, values in records if kind == "expense")
+        assert all(values["income_type"] in INCOME_TYPES for kind, values in records if kind == "income")
+
+    def test_population_loaded_registered_with_rollups(self, db_manager):
+        """
+        This method tests whether loaded users are registered on the main menu with their records, categories and rollups stored.
+        """
+        counts = asyncio.run(load_population(db_manager, 3, months=2, seed=1, end_month="2025-03", batch_size=2))
+        expected = [synthetic_user_records(0, index, 1, ["2025-01", "2025-02"]) for index in range(3)]
+
+        async def _read():
+            async with db_manager.session_scope() as session:
+                states = (await session.execute(select(MessageState.current_state))).scalars().all()
+                languages = (await session.execute(select(LanguagePreference.preferred_language))).scalars().all()
+                categories = (await session.execute(select(UnverifiedExpenses.expense_type, UnverifiedExpenses.expense_category))).all()
+                rollups = await session.scalar(select(func.count()).select_from(MonthlyRollup))
+                return states, languages, categories, rollups
+
+        states, languages, categories, rollups = asyncio.run(_read())
+
+        assert counts["users"] == 3
+        assert counts["expense"] == sum(kind == "expense" for records in expected for kind, _ in records)
+        assert counts["income"] == sum(kind == "income" for records in expected for kind, _ in records)
+        assert states == ["registered_user_template"] * 3 and languages == ["English"] * 3
+        assert all(category == expense_type.split(" - ")[0] for expense_type, category in categories)
+        assert rollups > 0
+        assert synthetic_phone_number(12) == "whatsapp:+27790000012"
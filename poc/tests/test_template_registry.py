@@ -0,0 +1,120 @@
+import asyncio
+import dataclasses
+import os
+import shutil
+
+import pytest
+
+from api.utils.template_registry import DEFAULT_TRANSLATIONS_PATH, TemplateRegistry
+from api.utils.twilio_templates import TwilioTemplateManager
+
+
+class TestTemplateRegistry:
+    """
+    Testing class that holds the methods related to loading and compiling translation templates.
+    """
+
+    def test_loads_every_language(self):
+        """
+        This method tests whether every translation file is indexed by language and template name.
+        """
+        registry = TemplateRegistry()
+
+        assert set(registry.languages) == {"en", "af", "zu"}
+        assert registry.get("en", "registered_user_template").response_routing["1"] == "sisonova_personal_template"
+
+    def test_missing_template_name_defaults_to_language_selector(self):
+        """
+        This method tests whether a new conversation gets the language selector template.
+        """
+        registry = TemplateRegistry()
+
+        assert registry.get("en", None).name == "unregistered_number_language_selector_template"
+
+    def test_compiled_template_is_immutable(self):
+        """
+        This method tests whether compiled templates and their routing tables cannot be modified.
+        """
+        template = TemplateRegistry().get("en", "registered_user_template")
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            template.next_template = "other"
+        with pytest.raises(TypeError):
+            template.response_routing["9"] = "other"
+
+    def test_error_response_is_precomputed(self):
+        """
+        This method tests whether the error options are formatted into the error message at load time.
+        """
+        template = TemplateRegistry().get("en", "registered_user_template")
+
+        assert "- 1\n- 2\n- 3\n- 4" in template.error_response
+        assert "<Response>" in template.twiml_error_message
+
+    def test_hot_reload_picks_up_changes(self, tmp_path):
+        """
+        This method tests whether a modified translation file is reloaded when hot reload is enabled.
+        """
+        shutil.copy(DEFAULT_TRANSLATIONS_PATH / "en.yaml", tmp_path / "en.yaml")
+        registry = TemplateRegistry(path=str(tmp_path), hot_reload=True, reload_interval=0)
+
+        content = (tmp_path / "en.yaml").read_text(encoding="utf-8")
+        (tmp_path / "en.yaml").write_text(content.replace("Hi there", "Howzit"), encoding="utf-8")
+        stat = (tmp_path / "en.yaml").stat()
+        os.utime(tmp_path / "en.yaml", (stat.st_atime, stat.st_mtime + 5))
+
+        assert registry.get("en", None).template_message.startswith("Howzit")
+
+    def test_missing_translations_raise(self, tmp_path):
+        """
+        This method tests whether an empty translations directory is rejected.
+        """
+        with pytest.raises(ValueError):
+            TemplateRegistry(path=str(tmp_path))
+
+
+class TestTemplateManagerRouting:
+    """
+    Testing class that holds the methods related to routing messages through compiled templates.
+    """
+
+    def _get_message(self, current_template, user_response, language="English"):
+        template_manager = TwilioTemplateManager(
+            user_exists=True,
+            user_response=user_response,
+            query_manager=None,
+            current_template=current_template,
+            language=language,
+            has_started=True
+        )
+        return asyncio.run(template_manager.get_template_message())
+
+    def test_routing_event(self):
+        """
+        This method tests whether a menu option routes to the configured template.
+        """
+        next_template, previous_template, twiml_message = self._get_message("registered_user_template", "1")
+
+        assert next_template == "sisonova_personal_template"
+        assert previous_template == "registered_user_template"
+        assert "<Response>" in twiml_message
+
+    def test_language_selection_switches_language(self):
+        """
+        This method tests whether selecting a language answers with that language's next template.
+        """
+        next_template, _, twiml_message = self._get_message("unregistered_number_language_selector_template", "zulu")
+        expected = TemplateRegistry().get("zu", "unregistered_number_welcome_template").twiml_message
+
+        assert next_template == "unregistered_number_welcome_template"
+        assert twiml_message == expected
+
+    def test_invalid_option_returns_error(self):
+        """
+        This method tests whether an invalid option keeps the user on the current template.
+        """
+        next_template, previous_template, twiml_message = self._get_message("sisonova_personal_template", "9")
+
+        assert next_template == "sisonova_personal_template"
+        assert previous_template is None
+        assert twiml_message == TemplateRegistry().get("en", "sisonova_personal_template").twiml_error_message
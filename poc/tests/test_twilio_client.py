@@ -92,3 +92,24 @@ class TestTwilioClientMessaging:
 
     def test_send_notifcation_message(self, mock_twilio_client):
         pass
+
+    def test_send_whatsapp_message_with_media(self, mock_complete_twilio_env):
+        """
+        This method tests whether WhatsApp recipients are sent from the WhatsApp sender with the media attached.
+        """
+        with patch("api.message_clients.twilio.Client") as mock_client_class:
+            mock_client_instance = MagicMock()
+            mock_client_class.return_value = mock_client_instance
+
+            client = TwilioClient()
+            sent = client.send_mesage_notification(
+                to="whatsapp:+27600000001", body="Your report", media_url="https://example.com/report.pdf"
+            )
+
+            assert sent is True
+            mock_client_instance.messages.create.assert_called_once_with(
+                to="whatsapp:+27600000001",
+                from_="whatsapp:+12345678901",
+                body="Your report",
+                media_url=["https://example.com/report.pdf"],
+            )